@@ -1,9 +1,26 @@
 # cli_client/dockerfile_generator_cli/api_client.py
-import requests
-from typing import Optional, List, Dict, Any
+import atexit
+import httpx
+import secrets
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 import json # Import json for potential error parsing
 
-from .config import get_server_url # Get the helper to find the server URL
+from .config import ( # Get the helpers to find the server URL and client settings
+    get_server_url,
+    get_trace_enabled,
+    get_connect_timeout,
+    get_read_timeout,
+    get_max_connections,
+    get_http2_enabled,
+    get_cache_enabled
+)
+from .cache import CacheEntry, ResponseCache
+
+GENERATE_PATH = "/api/v1/generate-dockerfile"
+BATCH_PATH = "/api/v1/generate-dockerfiles:batch"
+CONFIG_STATUS_PATH = "/config/status"
 
 # Define potential custom exceptions for the client
 class APIClientError(Exception):
@@ -14,14 +31,343 @@ class ConnectionError(APIClientError):
     """Raised for network-level errors connecting to the server."""
     pass
 
+class CacheMissError(APIClientError):
+    """Raised in offline mode when the local cache has no response for the request."""
+    pass
+
 class ServerError(APIClientError):
     """Raised for non-successful (>=400) responses from the server."""
-    def __init__(self, status_code: int, detail: Any):
+    def __init__(self, status_code: int, detail: Any, trace_id: Optional[str] = None):
         self.status_code = status_code
         self.detail = detail
+        self.trace_id = trace_id
         super().__init__(f"Server returned error {status_code}: {detail}")
 
 
+def new_traceparent(sampled: bool = False) -> Tuple[str, str]:
+    """
+    Start a new trace for one CLI call.
+
+    Returns (trace_id, traceparent header value) in W3C Trace Context format.
+    The server continues this trace and returns the same id in X-Trace-Id; the
+    sampled flag asks the server to record spans for this request.
+    """
+    trace_id = secrets.token_hex(16)
+    span_id = secrets.token_hex(8)
+    return trace_id, f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+
+def build_payload(
+    language: str,
+    version: Optional[str] = None,
+    dependencies: Optional[List[str]] = None,
+    port: Optional[int] = None,
+    app_type: Optional[str] = None,
+    instructions: Optional[str] = None,
+    package_manager: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Construct the /generate-dockerfile request payload, leaving out unset values."""
+    payload: Dict[str, Any] = {"language": language}
+    if version is not None:
+        payload["version"] = version
+    if dependencies is not None:
+        payload["dependencies"] = dependencies
+    if port is not None:
+        payload["port"] = port
+    if app_type is not None:
+        payload["app_type"] = app_type
+    if instructions is not None:
+        # Use the key expected by the server model ('additional_instructions')
+        payload["additional_instructions"] = instructions
+    if package_manager is not None:
+        payload["package_manager"] = package_manager
+    return payload
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional 'h2' package (pip install 'httpx[http2]')."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _client_options(server_url: Optional[str], connect_timeout: Optional[float], read_timeout: Optional[float],
+                    max_connections: Optional[int], http2: Optional[bool]) -> Dict[str, Any]:
+    """Keyword arguments shared by the sync and async httpx clients."""
+    read = get_read_timeout() if read_timeout is None else read_timeout
+    connections = get_max_connections() if max_connections is None else max_connections
+    return {
+        "base_url": (server_url or get_server_url()).rstrip('/'),
+        # Connect fails fast; read/write/pool waits allow for slow AI generations
+        "timeout": httpx.Timeout(read, connect=get_connect_timeout() if connect_timeout is None else connect_timeout),
+        "limits": httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+        # Negotiated via ALPN, so plain HTTP/1.1 servers keep working
+        "http2": (get_http2_enabled() if http2 is None else http2) and _http2_available(),
+        # httpx already sends Accept-Encoding: gzip, deflate and decodes compressed responses
+        "headers": {"Accept": "application/json"},
+    }
+
+
+def _request_headers(trace: Optional[bool], priority: Optional[str]) -> Tuple[str, Dict[str, str]]:
+    """(trace_id, headers) for one call: a fresh traceparent and the optional admission priority."""
+    trace_id, traceparent = new_traceparent(sampled=get_trace_enabled() if trace is None else trace)
+    headers = {"traceparent": traceparent}
+    if priority:
+        headers["X-Request-Priority"] = priority
+    return trace_id, headers
+
+
+def _error_detail(response: httpx.Response) -> Any:
+    """The server's error message: FastAPI 'detail', our ErrorResponse 'message', or the raw text."""
+    try:
+        body = response.json()
+    except json.JSONDecodeError:
+        return response.text # Fallback to raw text if not JSON
+    if isinstance(body, dict):
+        return body.get("detail") or body.get("message") or response.reason_phrase
+    return body
+
+
+@contextmanager
+def _translate_errors(url: str, trace_id: str) -> Iterator[None]:
+    """Map httpx failures to the client's exception types (works in sync and async code)."""
+    try:
+        yield
+    except httpx.ConnectError as e:
+        raise ConnectionError(f"Connection Error: Failed to connect to MCP server at {url}. Is it running? Details: {e}") from e
+    except httpx.TimeoutException as e:
+        raise ConnectionError(f"Timeout Error: Request to MCP server at {url} timed out (trace ID: {trace_id}). Details: {e}") from e
+    except httpx.HTTPStatusError as e:
+        raise ServerError(e.response.status_code, _error_detail(e.response), trace_id) from e
+    except httpx.HTTPError as e:
+        raise APIClientError(f"Request Error: An unexpected error occurred during the request to {url}. Details: {e}") from e
+    except json.JSONDecodeError as e:
+        raise APIClientError(f"Unexpected Error: The server response is not valid JSON. Details: {e}") from e
+
+
+# Where a generate result came from
+SOURCE_CACHE = "cache" # Local cache, no network call
+SOURCE_REVALIDATED = "revalidated" # Local cache, confirmed by the server (304 Not Modified)
+SOURCE_SERVER = "server" # Generated (or served from its cache) by the server
+
+
+@dataclass
+class GenerateResult:
+    """A generate response and where it came from; `response` is None when no request was sent."""
+    data: Dict[str, Any]
+    source: str
+    response: Optional[httpx.Response] = None
+
+
+def _lookup_cache(cache: Optional[ResponseCache], server_url: str, payload: Dict[str, Any],
+                  offline: bool) -> Tuple[Optional[CacheEntry], bool]:
+    """(cached entry, whether it can be used without asking the server)."""
+    entry = cache.get(server_url, payload) if cache is not None else None
+    if entry is not None and (offline or cache.is_fresh(entry)):
+        return entry, True
+    if offline:
+        raise CacheMissError("Offline mode: no cached Dockerfile for this request. Run it once while online.")
+    return entry, False
+
+
+def _revalidation_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+    return {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+
+
+def _store_response(cache: Optional[ResponseCache], server_url: str, payload: Dict[str, Any],
+                    entry: Optional[CacheEntry], response: httpx.Response) -> GenerateResult:
+    """Turn a generate response (200, or 304 for a revalidated entry) into a result, updating the cache."""
+    if response.status_code == 304 and entry is not None:
+        cache.touch(entry)
+        return GenerateResult(entry.response, SOURCE_REVALIDATED, response)
+    data = response.json()
+    if cache is not None and response.headers.get("ETag"):
+        cache.put(server_url, payload, data, response.headers["ETag"], response.headers.get("X-Config-Version"))
+    return GenerateResult(data, SOURCE_SERVER, response)
+
+
+class MCPClient:
+    """
+    Synchronous MCP server client.
+
+    One client keeps a pool of keep-alive connections (HTTP/2 when available), so
+    repeated calls skip the TCP/TLS handshake. Reuse it for many generations and
+    close it when done (or use it as a context manager).
+    """
+
+    def __init__(self, server_url: Optional[str] = None, connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None, max_connections: Optional[int] = None,
+                 http2: Optional[bool] = None, transport: Optional[httpx.BaseTransport] = None,
+                 cache: Optional[ResponseCache] = None):
+        self._client = httpx.Client(transport=transport,
+                                    **_client_options(server_url, connect_timeout, read_timeout, max_connections, http2))
+        self.cache = cache
+
+    @property
+    def server_url(self) -> str:
+        return str(self._client.base_url).rstrip('/')
+
+    def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None, trace: Optional[bool] = None,
+                priority: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """
+        Send a request to a server API path and return the successful (or 304) response.
+
+        Raises:
+            ConnectionError: If unable to connect to the server or the call timed out.
+            ServerError: If the server returns a non-2xx status code.
+            APIClientError: For other request-related errors.
+        """
+        trace_id, request_headers = _request_headers(trace, priority)
+        request_headers.update(headers or {})
+        with _translate_errors(f"{self.server_url}{path}", trace_id):
+            response = self._client.request(method, path, json=payload, headers=request_headers)
+            if response.status_code != 304: # Not Modified answers a conditional request
+                response.raise_for_status()
+            return response
+
+    def post(self, path: str, payload: Dict[str, Any], trace: Optional[bool] = None,
+             priority: Optional[str] = None) -> Dict[str, Any]:
+        """POST a JSON payload to a server API path and return the JSON response (errors as request)."""
+        response = self.request("POST", path, payload, trace=trace, priority=priority)
+        with _translate_errors(f"{self.server_url}{path}", response.headers.get("X-Trace-Id", "")):
+            return response.json()
+
+    def generate(self, language: str, version: Optional[str] = None, dependencies: Optional[List[str]] = None,
+                 port: Optional[int] = None, app_type: Optional[str] = None, instructions: Optional[str] = None,
+                 trace: Optional[bool] = None, priority: Optional[str] = None,
+                 package_manager: Optional[str] = None) -> Dict[str, Any]:
+        """Generate one Dockerfile; returns the server's JSON response (see call_mcp_api)."""
+        payload = build_payload(language, version, dependencies, port, app_type, instructions, package_manager)
+        return self.generate_payload(payload, trace=trace, priority=priority).data
+
+    def generate_payload(self, payload: Dict[str, Any], trace: Optional[bool] = None, priority: Optional[str] = None,
+                         offline: bool = False) -> "GenerateResult":
+        """
+        Generate from a build_payload() request, through the client's cache if it has one:
+        a fresh entry is returned without a network call, a stale one is revalidated.
+        With offline=True only the cache is used (CacheMissError if it has no entry).
+        """
+        entry, usable = _lookup_cache(self.cache, self.server_url, payload, offline)
+        if usable:
+            return GenerateResult(entry.response, SOURCE_CACHE)
+        response = self.request("POST", GENERATE_PATH, payload, trace=trace, priority=priority,
+                                headers=_revalidation_headers(entry))
+        with _translate_errors(f"{self.server_url}{GENERATE_PATH}", response.headers.get("X-Trace-Id", "")):
+            return _store_response(self.cache, self.server_url, payload, entry, response)
+
+    def close(self) -> None:
+        self._client.close()
+
+    def __enter__(self) -> "MCPClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncMCPClient:
+    """
+    Asynchronous MCP server client with the same API as MCPClient.
+
+    Calls can run concurrently (e.g. with asyncio.gather) over the shared
+    connection pool; max_connections bounds how many are in flight at once.
+    """
+
+    def __init__(self, server_url: Optional[str] = None, connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None, max_connections: Optional[int] = None,
+                 http2: Optional[bool] = None, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[ResponseCache] = None):
+        self._client = httpx.AsyncClient(transport=transport,
+                                         **_client_options(server_url, connect_timeout, read_timeout, max_connections, http2))
+        self.cache = cache
+
+    @property
+    def server_url(self) -> str:
+        return str(self._client.base_url).rstrip('/')
+
+    async def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None,
+                      trace: Optional[bool] = None, priority: Optional[str] = None,
+                      headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """Send a request to a server API path and return the successful response (errors as MCPClient.request)."""
+        trace_id, request_headers = _request_headers(trace, priority)
+        request_headers.update(headers or {})
+        with _translate_errors(f"{self.server_url}{path}", trace_id):
+            response = await self._client.request(method, path, json=payload, headers=request_headers)
+            if response.status_code != 304: # Not Modified answers a conditional request
+                response.raise_for_status()
+            return response
+
+    async def post(self, path: str, payload: Dict[str, Any], trace: Optional[bool] = None,
+                   priority: Optional[str] = None) -> Dict[str, Any]:
+        """POST a JSON payload to a server API path and return the JSON response (errors as MCPClient.request)."""
+        response = await self.request("POST", path, payload, trace=trace, priority=priority)
+        with _translate_errors(f"{self.server_url}{path}", response.headers.get("X-Trace-Id", "")):
+            return response.json()
+
+    async def generate(self, language: str, version: Optional[str] = None, dependencies: Optional[List[str]] = None,
+                       port: Optional[int] = None, app_type: Optional[str] = None, instructions: Optional[str] = None,
+                       trace: Optional[bool] = None, priority: Optional[str] = None,
+                       package_manager: Optional[str] = None) -> Dict[str, Any]:
+        """Generate one Dockerfile; returns the server's JSON response (see call_mcp_api)."""
+        payload = build_payload(language, version, dependencies, port, app_type, instructions, package_manager)
+        return (await self.generate_payload(payload, trace=trace, priority=priority)).data
+
+    async def generate_payload(self, payload: Dict[str, Any], trace: Optional[bool] = None,
+                               priority: Optional[str] = None, offline: bool = False) -> "GenerateResult":
+        """Generate from a build_payload() request through the client's cache (see MCPClient.generate_payload)."""
+        entry, usable = _lookup_cache(self.cache, self.server_url, payload, offline)
+        if usable:
+            return GenerateResult(entry.response, SOURCE_CACHE)
+        response = await self.request("POST", GENERATE_PATH, payload, trace=trace, priority=priority,
+                                      headers=_revalidation_headers(entry))
+        with _translate_errors(f"{self.server_url}{GENERATE_PATH}", response.headers.get("X-Trace-Id", "")):
+            return _store_response(self.cache, self.server_url, payload, entry, response)
+
+    async def generate_batch(self, payloads: List[Dict[str, Any]], trace: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Generate many Dockerfiles in one call to the server's batch endpoint (see build_payload).
+        Returns the per-item results in order: {"index", "status", "result" or "error"}.
+        Successful items that carry an ETag are stored in the client's cache, as by generate_payload.
+        Raises ServerError with status 404 if the server has no batch endpoint.
+        """
+        response = await self.post(BATCH_PATH, {"requests": payloads}, trace=trace)
+        results = response["results"]
+        if self.cache is not None:
+            for payload, item in zip(payloads, results):
+                if item.get("status") == "success" and item.get("etag"):
+                    self.cache.put(self.server_url, payload, item["result"], item["etag"], response.get("config_version"))
+        return results
+
+    async def config_version(self) -> Optional[str]:
+        """Version of the server's active Harbor configuration (errors as MCPClient.request)."""
+        response = await self.request("GET", CONFIG_STATUS_PATH)
+        with _translate_errors(f"{self.server_url}{CONFIG_STATUS_PATH}", response.headers.get("X-Trace-Id", "")):
+            return response.json().get("version")
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncMCPClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+# Shared client behind call_mcp_api, created on first use and closed at exit
+_default_client: Optional[MCPClient] = None
+
+def get_default_client() -> MCPClient:
+    """Process-wide MCPClient for the configured server (MCP_SERVER_URL), with the response cache unless MCP_CACHE=false."""
+    global _default_client
+    if _default_client is None:
+        _default_client = MCPClient(cache=ResponseCache() if get_cache_enabled() else None)
+        atexit.register(_default_client.close)
+    return _default_client
+
+
 def call_mcp_api(
     language: str,
     version: Optional[str] = None,
@@ -29,9 +375,13 @@ def call_mcp_api(
     port: Optional[int] = None,
     app_type: Optional[str] = None,
     instructions: Optional[str] = None,
+    trace: Optional[bool] = None,
+    use_cache: bool = True,
+    offline: bool = False,
+    package_manager: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
-    Calls the MCP Server's /generate-dockerfile endpoint.
+    Calls the MCP Server's /generate-dockerfile endpoint through the shared pooled client.
 
     Args:
         language: Programming language.
@@ -40,75 +390,52 @@ def call_mcp_api(
         port: Port to expose.
         app_type: Application type.
         instructions: Additional instructions.
+        trace: Ask the server to record a trace for this call (defaults to MCP_TRACE).
+        use_cache: Use the local response cache, if enabled (False always asks the server).
+        offline: Answer from the local cache only, without contacting the server.
+        package_manager: Package manager whose lockfile or requirements file the project uses (e.g., pip, npm, poetry).
 
     Returns:
         The JSON response dictionary from the server if successful.
 
     Raises:
+        CacheMissError: In offline mode, if the request isn't cached.
         ConnectionError: If unable to connect to the server.
         ServerError: If the server returns a non-200 status code.
         APIClientError: For other request-related errors.
     """
-    server_url = get_server_url()
-    api_endpoint = f"{server_url}/api/v1/generate-dockerfile"
-
-    # Construct the request payload, carefully handling None values
-    payload: Dict[str, Any] = {"language": language}
-    if version is not None:
-        payload["version"] = version
-    if dependencies is not None:
-        payload["dependencies"] = dependencies
-    if port is not None:
-        payload["port"] = port
-    if app_type is not None:
-        payload["app_type"] = app_type
-    if instructions is not None:
-        # Use the key expected by the server model ('additional_instructions')
-        payload["additional_instructions"] = instructions
+    client = get_default_client()
+    payload = build_payload(language, version, dependencies, port, app_type, instructions, package_manager)
 
-    print(f"-> Calling MCP Server at: {api_endpoint}")
+    if not offline:
+        print(f"-> Calling MCP Server at: {client.server_url}{GENERATE_PATH}")
     print(f"   Payload: {json.dumps(payload)}") # Log the payload being sent
 
     try:
-        response = requests.post(
-            api_endpoint,
-            json=payload,
-            headers={"Content-Type": "application/json", "Accept": "application/json"},
-            timeout=90 # Add a timeout (e.g., 30 seconds)
-        )
-
-        # Raise an exception for bad status codes (4xx or 5xx)
-        response.raise_for_status()
-
-        # If successful (status code 200-299), parse and return JSON
-        print(f"<- Server responded with status: {response.status_code}")
-        return response.json()
-
-    except requests.exceptions.ConnectionError as e:
-        err_msg = f"Connection Error: Failed to connect to MCP server at {api_endpoint}. Is it running? Details: {e}"
-        print(f"[Error] {err_msg}")
-        raise ConnectionError(err_msg) from e
-    except requests.exceptions.Timeout as e:
-        err_msg = f"Timeout Error: Request to MCP server at {api_endpoint} timed out. Details: {e}"
-        print(f"[Error] {err_msg}")
-        raise ConnectionError(err_msg) from e
-    except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code
-        try:
-            # Try to get detail from JSON response, otherwise use reason
-            detail = e.response.json().get("detail", e.response.reason)
-        except json.JSONDecodeError:
-            detail = e.response.text # Fallback to raw text if not JSON
-        err_msg = f"Server Error: MCP server returned status {status_code}. Detail: {detail}"
-        print(f"[Error] {err_msg}")
-        raise ServerError(status_code, detail) from e
-    except requests.exceptions.RequestException as e:
-        # Catch any other requests-related errors
-        err_msg = f"Request Error: An unexpected error occurred during the request to {api_endpoint}. Details: {e}"
+        if use_cache or offline:
+            result = client.generate_payload(payload, trace=trace, offline=offline)
+        else:
+            response = client.request("POST", GENERATE_PATH, payload, trace=trace)
+            result = GenerateResult(response.json(), SOURCE_SERVER, response)
+    except ServerError as e:
+        print(f"[Error] Server Error: MCP server returned status {e.status_code}. Detail: {e.detail} (trace ID: {e.trace_id})")
+        raise
+    except APIClientError as e:
+        print(f"[Error] {e}")
+        raise
+    except json.JSONDecodeError as e:
+        err_msg = f"Unexpected Error: The server response is not valid JSON. Details: {e}"
         print(f"[Error] {err_msg}")
         raise APIClientError(err_msg) from e
-    except Exception as e:
-        # Catch potentially other errors (like JSON parsing if response isn't JSON?)
-        err_msg = f"Unexpected Error: An unexpected error occurred. Details: {e}"
-        print(f"[Error] {err_msg}")
-        raise APIClientError(err_msg) from e
\ No newline at end of file
+
+    if result.source == SOURCE_CACHE:
+        print("<- Served from the local cache (no request sent)")
+        return result.data
+    response = result.response
+    if result.source == SOURCE_REVALIDATED:
+        print(f"<- Server confirmed the cached Dockerfile is current (304 Not Modified, HTTP version: {response.http_version})")
+    else:
+        # If successful (status code 200-299), return the parsed JSON
+        print(f"<- Server responded with status: {response.status_code} (HTTP version: {response.http_version})")
+    print(f"   Trace ID: {response.headers.get('X-Trace-Id', 'n/a')}")
+    return result.data
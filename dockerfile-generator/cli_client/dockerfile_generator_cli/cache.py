@@ -0,0 +1,87 @@
+# cli_client/dockerfile_generator_cli/cache.py
+import os
+import json
+import time
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import get_cache_dir, get_cache_max_age
+
+
+@dataclass
+class CacheEntry:
+    """A stored generate response and the validators needed to revalidate it."""
+    path: Path
+    response: Dict[str, Any]
+    etag: Optional[str]
+    config_version: Optional[str]
+    stored_at: float
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.stored_at)
+
+
+class ResponseCache:
+    """
+    Generate responses kept on disk, one small JSON file per (server, request payload).
+
+    Entries are revalidated with If-None-Match, unless younger than max_age (0 by
+    default, so always). The server's ETag covers its configuration version, so a
+    Harbor mapping change replaces the entry on the next revalidation.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_age: Optional[float] = None):
+        self.directory = directory or get_cache_dir()
+        self.max_age = get_cache_max_age() if max_age is None else max_age
+
+    def key(self, server_url: str, payload: Dict[str, Any]) -> str:
+        canonical = json.dumps({"server": server_url, "request": payload}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, server_url: str, payload: Dict[str, Any]) -> Optional[CacheEntry]:
+        path = self.directory / f"{self.key(server_url, payload)}.json"
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            return CacheEntry(path, data["response"], data.get("etag"), data.get("config_version"),
+                              float(data["stored_at"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None # Missing or corrupt entry: treat as a miss
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.age < self.max_age
+
+    def put(self, server_url: str, payload: Dict[str, Any], response: Dict[str, Any], etag: Optional[str],
+            config_version: Optional[str]) -> None:
+        path = self.directory / f"{self.key(server_url, payload)}.json"
+        self._write(path, {"response": response, "etag": etag, "config_version": config_version,
+                           "stored_at": time.time()})
+
+    def touch(self, entry: CacheEntry) -> None:
+        """Restart an entry's freshness after the server confirmed it (304 Not Modified)."""
+        entry.stored_at = time.time()
+        self._write(entry.path, {"response": entry.response, "etag": entry.etag,
+                                 "config_version": entry.config_version, "stored_at": entry.stored_at})
+
+    def clear(self) -> int:
+        """Delete every entry; returns how many were removed."""
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _write(self, path: Path, data: Dict[str, Any]) -> None:
+        """Write atomically (temp file + rename); a cache that can't be written is silently skipped."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
@@ -1,11 +1,26 @@
 # cli_client/dockerfile_generator_cli/cli.py
 import typer
+import asyncio
 from typing_extensions import Annotated
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 import sys
+import json
 
-from .api_client import call_mcp_api, APIClientError, ConnectionError, ServerError
+from .api_client import (
+    call_mcp_api, build_payload, AsyncMCPClient, APIClientError, CacheMissError, ConnectionError, ServerError
+)
+from .config import get_cache_enabled
+from .cache import ResponseCache
+from .introspect import ProjectInfo, inspect_project
+from .manifest import (
+    ManifestError,
+    ServiceSpec,
+    GenerationState,
+    STATE_FILE_NAME,
+    load_manifest,
+    discover_services
+)
 from pathlib import Path # Make sure this is imported
 
 # ---> THIS LINE MUST EXIST <---
@@ -17,8 +32,8 @@ app = typer.Typer(
 # Keep app instance and Option definitions as they were
 # --- Define Command-Line Options (Corrected Annotated Usage) ---
 LanguageOption = Annotated[
-    str, # <-- Type Argument
-    typer.Option("--language", "-l", help="Programming language (e.g., python, node).", prompt="Enter the programming language") # <-- Annotation Argument
+    Optional[str], # <-- Type Argument
+    typer.Option("--language", "-l", help="Programming language (e.g., python, node). Detected from the project when omitted; prompted for if detection finds nothing.") # <-- Annotation Argument
 ]
 VersionOption = Annotated[
     Optional[str], # <-- Type Argument
@@ -36,6 +51,10 @@ AppTypeOption = Annotated[
     Optional[str], # <-- Type Argument
     typer.Option("--app-type", "-t", help="Type of application (e.g., web, cli, api).") # <-- Annotation Argument
 ]
+PackageManagerOption = Annotated[
+    Optional[str],
+    typer.Option("--package-manager", "-m", help="Package manager whose lockfile or requirements file the project uses (e.g., pip, npm, poetry, uv, pnpm, yarn).")
+]
 AdditionalInstructionsOption = Annotated[
     Optional[str], # <-- Type Argument
     typer.Option("--instructions", "-i", help="Additional instructions for the AI.") # <-- Annotation Argument
@@ -50,31 +69,86 @@ OutputFileOption = Annotated[
         resolve_path=True
         )
 ]
+TraceOption = Annotated[
+    bool,
+    typer.Option("--trace", help="Ask the server to record a trace for this request (also enabled by MCP_TRACE=1).")
+]
+ProjectDirOption = Annotated[
+    Path,
+    typer.Option("--project-dir", "-P", file_okay=False, exists=True, resolve_path=True,
+                 help="Project directory to detect language, version, dependencies and port from.")
+]
+DetectOption = Annotated[
+    bool,
+    typer.Option("--detect/--no-detect", help="Fill options you didn't give from the project's package files.")
+]
+OfflineOption = Annotated[
+    bool,
+    typer.Option("--offline", help="Use only the local response cache; never contact the server.")
+]
+CacheOption = Annotated[
+    bool,
+    typer.Option("--cache/--no-cache", help="Reuse (and revalidate) cached responses; --no-cache always asks the server.")
+]
 
 
 # --- Define the 'generate' Command (Modified for Day 11) ---
 @app.command()
 def generate(
-    language: LanguageOption,
+    language: LanguageOption = None,
     version: VersionOption = None,
     dependencies_str: DependenciesStrOption = None,
     port: PortOption = None,
     app_type: AppTypeOption = None,
     instructions: AdditionalInstructionsOption = None,
+    package_manager: PackageManagerOption = None,
     output_file: OutputFileOption = None, # This is the pathlib.Path object or None
+    trace: TraceOption = False,
+    project_dir: ProjectDirOption = Path("."),
+    detect: DetectOption = True,
+    offline: OfflineOption = False,
+    use_cache: CacheOption = True,
 ):
     """
     Generates a Dockerfile by calling the MCP server.
+
+    Options left out are detected from the project's package files (requirements.txt,
+    pyproject.toml, package.json, go.mod, Cargo.toml, pom.xml, ...); given options win.
+    Responses are cached locally (MCP_CACHE_DIR) and revalidated with the server on each
+    use (or once older than MCP_CACHE_MAX_AGE seconds); --offline answers from the cache alone.
     """
+    if offline and not use_cache:
+        typer.secho("--offline needs the cache; drop --no-cache.", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=2)
+
     # --- Input processing (Keep from Day 10) ---
     typer.echo("Starting Dockerfile generation...")
-    typer.echo(f"  Language: {language}")
 
     dependencies: Optional[List[str]] = None
     if dependencies_str:
         dependencies = [dep.strip() for dep in dependencies_str.split(',') if dep.strip()]
-        if dependencies:
-             typer.echo(f"  Dependencies: {dependencies}")
+
+    # Fill in what the user didn't specify from the project itself
+    if detect:
+        info = inspect_project(project_dir)
+        if info.language and (language is None or language.lower() == info.language):
+            detected = info.request_fields()
+            typer.echo(f"  Detected from {', '.join(info.sources) or project_dir}: "
+                       + ", ".join(f"{key}={value}" for key, value in detected.items()))
+            language = language or info.language
+            version = version or detected.get("version")
+            dependencies = dependencies or detected.get("dependencies")
+            port = port or detected.get("port")
+            app_type = app_type or detected.get("app_type")
+            package_manager = package_manager or detected.get("package_manager")
+    if language is None:
+        language = typer.prompt("Enter the programming language")
+
+    typer.echo(f"  Language: {language}")
+    if version:
+        typer.echo(f"  Version: {version}")
+    if dependencies:
+        typer.echo(f"  Dependencies: {dependencies}")
 
     if port:
         typer.echo(f"  Port: {port}")
@@ -82,6 +156,8 @@ def generate(
         typer.echo(f"  App Type: {app_type}")
     if instructions:
         typer.echo(f"  Instructions: {instructions}")
+    if package_manager:
+        typer.echo(f"  Package Manager: {package_manager}")
     if output_file:
          # output_file is already a resolved Path object due to typer.Option setup
          typer.echo(f"  Output File: {output_file}")
@@ -95,7 +171,11 @@ def generate(
             dependencies=dependencies,
             port=port,
             app_type=app_type,
-            instructions=instructions
+            instructions=instructions,
+            package_manager=package_manager,
+            trace=trace or None, # Without --trace, MCP_TRACE decides
+            use_cache=use_cache,
+            offline=offline
         )
         # Simple check if response looks okay before processing
         if not response_data or response_data.get("status") != "success":
@@ -132,6 +212,9 @@ def generate(
     except ServerError as e:
         typer.secho(f"\nError from MCP server (HTTP {e.status_code}): {e.detail}", fg=typer.colors.RED, err=True)
         raise typer.Exit(code=1)
+    except CacheMissError as e:
+        typer.secho(f"\n{e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
     except APIClientError as e:
         typer.secho(f"\nAPI Client Error: {e}", fg=typer.colors.RED, err=True)
         raise typer.Exit(code=1)
@@ -146,6 +229,243 @@ def generate(
         raise typer.Exit(code=1)
 
 
+# --- 'cache-clear': drop cached responses ---
+@app.command("cache-clear")
+def cache_clear():
+    """Deletes every cached server response (see MCP_CACHE_DIR)."""
+    cache = ResponseCache()
+    removed = cache.clear()
+    typer.echo(f"Removed {removed} cached response(s) from {cache.directory}")
+
+
+# --- 'inspect': show what would be detected ---
+@app.command("inspect")
+def inspect_command(project_dir: ProjectDirOption = Path(".")):
+    """
+    Shows the request that would be derived from a project's package files, as JSON.
+    """
+    info: ProjectInfo = inspect_project(project_dir)
+    if info.language is None:
+        typer.secho(f"No supported package files found in {project_dir}.", fg=typer.colors.YELLOW, err=True)
+        raise typer.Exit(code=1)
+    typer.echo(json.dumps({"request": build_payload(**info.request_fields()), "sources": info.sources}, indent=2))
+
+
+# --- 'generate-many': many services in one run ---
+# Manifest names picked up from the working directory when neither --manifest nor --discover is given
+DEFAULT_MANIFEST_NAMES = ("mcp-dockergen.yaml", "mcp-dockergen.yml", "mcp-dockergen.json")
+# Items per call to the server's batch endpoint (the server accepts up to BATCH_MAX_ITEMS, 500 by default)
+BATCH_CHUNK_SIZE = 100
+
+# (service, response JSON or None, error message or None)
+ServiceResult = Tuple[ServiceSpec, Optional[Dict[str, Any]], Optional[str]]
+
+
+@app.command("generate-many")
+def generate_many(
+    manifest: Annotated[Optional[Path], typer.Option(
+        "--manifest", "-m", exists=True, dir_okay=False, resolve_path=True,
+        help="JSON/YAML manifest listing services (default: ./mcp-dockergen.yaml/.yml/.json if present).")] = None,
+    discover: Annotated[Optional[Path], typer.Option(
+        "--discover", file_okay=False, exists=True, resolve_path=True,
+        help="Find services under this directory by their package files instead of reading a manifest.")] = None,
+    workers: Annotated[int, typer.Option("--workers", "-w", min=1, help="Generations in flight at once.")] = 8,
+    batch: Annotated[Optional[bool], typer.Option(
+        "--batch/--no-batch", help="Use the server's batch endpoint (default: when the server has one).")] = None,
+    force: Annotated[bool, typer.Option("--force", help="Regenerate services whose inputs haven't changed.")] = False,
+    dry_run: Annotated[bool, typer.Option("--dry-run", help="List the services and what would happen, without generating.")] = False,
+    trace: TraceOption = False,
+    offline: OfflineOption = False,
+    use_cache: CacheOption = True,
+):
+    """
+    Generates Dockerfiles for many services concurrently.
+
+    Services whose request, server and server configuration version are unchanged since
+    the last run, and whose Dockerfile still exists, are skipped; the state is kept in
+    .mcp-dockergen-state.json next to the manifest (or in the discovered directory). Fresh responses in the local
+    cache are reused as by 'generate'; --offline writes only the cached ones.
+    """
+    if offline and not use_cache:
+        typer.secho("--offline needs the cache; drop --no-cache.", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=2)
+    try:
+        if manifest is None and discover is None:
+            manifest = next((Path(name).resolve() for name in DEFAULT_MANIFEST_NAMES if Path(name).is_file()), None)
+            if manifest is None:
+                discover = Path.cwd()
+        if manifest is not None and discover is not None:
+            typer.secho("Use either --manifest or --discover, not both.", fg=typer.colors.RED, err=True)
+            raise typer.Exit(code=2)
+        if manifest is not None:
+            services, state_dir = load_manifest(manifest), manifest.parent
+            typer.echo(f"Loaded {len(services)} services from {manifest}")
+        else:
+            services, state_dir = discover_services(discover), discover
+            typer.echo(f"Discovered {len(services)} services under {discover}")
+    except ManifestError as e:
+        typer.secho(f"Manifest error: {e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+    if not services:
+        typer.secho("No services to generate.", fg=typer.colors.YELLOW)
+        return
+
+    cache = ResponseCache() if use_cache and get_cache_enabled() else None
+    client = AsyncMCPClient(max_connections=workers, cache=cache)
+    state = GenerationState(state_dir / STATE_FILE_NAME)
+    digests = {service.output: service.input_digest(client.server_url) for service in services}
+    # A Harbor mapping reload changes the output of unchanged requests (unknown offline or if unreachable)
+    config_version = None if offline else asyncio.run(_server_config_version(client.server_url))
+    pending = [service for service in services
+               if force or not state.is_unchanged(service, digests[service.output], config_version)]
+    skipped = len(services) - len(pending)
+
+    if dry_run:
+        for service in services:
+            action = "generate" if service in pending else "skip (unchanged)"
+            typer.echo(f"  {service.name}: {service.language} {service.version or ''} -> {service.output} [{action}]")
+        asyncio.run(client.aclose())
+        return
+
+    failures: List[Tuple[str, str]] = []
+    generated = 0
+    with typer.progressbar(length=len(pending), label="Generating Dockerfiles") as progress:
+        def on_result(service: ServiceSpec, response: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+            nonlocal generated
+            if error is None:
+                error = _write_service_dockerfile(service, response)
+            if error is None:
+                state.record(service, digests[service.output], config_version)
+                generated += 1
+            else:
+                failures.append((service.name, error))
+            progress.update(1)
+
+        asyncio.run(_run_generations(client, pending, workers, batch, trace or None, on_result, offline))
+
+    try:
+        state.save()
+    except OSError as e:
+        typer.secho(f"Could not save generation state to {state.state_path}: {e}", fg=typer.colors.YELLOW, err=True)
+
+    for name, error in failures:
+        typer.secho(f"  {name}: {error}", fg=typer.colors.RED, err=True)
+    color = typer.colors.RED if failures else typer.colors.GREEN
+    typer.secho(f"\nGenerated {generated}, skipped {skipped} unchanged, failed {len(failures)} "
+                f"(of {len(services)} services).", fg=color)
+    if failures:
+        raise typer.Exit(code=1)
+
+
+async def _server_config_version(server_url: str) -> Optional[str]:
+    """The server's active configuration version, or None if it can't be fetched."""
+    try:
+        async with AsyncMCPClient(server_url=server_url, max_connections=1) as client:
+            return await client.config_version()
+    except APIClientError:
+        return None
+
+
+async def _run_generations(client: AsyncMCPClient, services: List[ServiceSpec], workers: int, batch: Optional[bool],
+                           trace: Optional[bool], on_result: Callable[[ServiceSpec, Optional[Dict[str, Any]], Optional[str]], None],
+                           offline: bool = False) -> None:
+    """
+    Generate every service, reporting each outcome through on_result as it arrives.
+    Fresh entries in the client's cache are reported first. The rest use the batch
+    endpoint unless batch is False; if batch is None and the server has no batch
+    endpoint, falls back to one (cached) request per service, at most `workers` at once.
+    Offline, every service is answered from the cache alone.
+    """
+    reported = set()
+
+    def report(service: ServiceSpec, response: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        reported.add(service.output)
+        on_result(service, response, error)
+
+    try:
+        if offline:
+            await _generate_individually(client, services, workers, trace, report, offline=True)
+            return
+        services = _report_cached(client, services, report)
+        if services and batch is not False:
+            try:
+                await _generate_batched(client, services, trace, report)
+                return
+            except ServerError as e:
+                if batch or e.status_code not in (404, 405) or any(service.output in reported for service in services):
+                    raise
+        await _generate_individually(client, services, workers, trace, report)
+    except APIClientError as e:
+        # The whole run failed (e.g. server unreachable): fail the services not reported yet
+        for service in services:
+            if service.output not in reported:
+                on_result(service, None, str(e))
+    finally:
+        await client.aclose()
+
+
+def _report_cached(client: AsyncMCPClient, services: List[ServiceSpec],
+                   on_result: Callable[[ServiceSpec, Optional[Dict[str, Any]], Optional[str]], None]) -> List[ServiceSpec]:
+    """Report the services with a fresh cached response; returns the ones still to generate."""
+    if client.cache is None:
+        return services
+    remaining = []
+    for service in services:
+        entry = client.cache.get(client.server_url, service.payload())
+        if entry is not None and client.cache.is_fresh(entry):
+            on_result(service, entry.response, None)
+        else:
+            remaining.append(service)
+    return remaining
+
+
+async def _generate_batched(client: AsyncMCPClient, services: List[ServiceSpec], trace: Optional[bool],
+                            on_result: Callable[[ServiceSpec, Optional[Dict[str, Any]], Optional[str]], None]) -> None:
+    """Send services to the batch endpoint in chunks; the server runs each chunk concurrently."""
+    for start in range(0, len(services), BATCH_CHUNK_SIZE):
+        chunk = services[start:start + BATCH_CHUNK_SIZE]
+        results = await client.generate_batch([service.payload() for service in chunk], trace=trace)
+        for service, item in zip(chunk, results):
+            if item.get("status") == "success":
+                on_result(service, item.get("result"), None)
+            else:
+                on_result(service, None, (item.get("error") or {}).get("message", "unknown error"))
+
+
+async def _generate_individually(client: AsyncMCPClient, services: List[ServiceSpec], workers: int,
+                                 trace: Optional[bool],
+                                 on_result: Callable[[ServiceSpec, Optional[Dict[str, Any]], Optional[str]], None],
+                                 offline: bool = False) -> None:
+    """One request per service over the pooled client (through its cache), at most `workers` in flight."""
+    semaphore = asyncio.Semaphore(workers)
+
+    async def run(service: ServiceSpec) -> None:
+        async with semaphore:
+            try:
+                result = await client.generate_payload(service.payload(), trace=trace, priority="batch", offline=offline)
+            except ServerError as e:
+                on_result(service, None, f"HTTP {e.status_code}: {e.detail}")
+            except APIClientError as e:
+                on_result(service, None, str(e))
+            else:
+                on_result(service, result.data, None)
+
+    await asyncio.gather(*(run(service) for service in services))
+
+
+def _write_service_dockerfile(service: ServiceSpec, response: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Write a generated Dockerfile to the service's output path; returns an error message on failure."""
+    content = (response or {}).get("dockerfile_content")
+    if content is None:
+        return "server response is missing 'dockerfile_content'"
+    try:
+        service.output.parent.mkdir(parents=True, exist_ok=True)
+        service.output.write_text(content, encoding='utf-8')
+    except OSError as e:
+        return f"cannot write {service.output}: {e}"
+    return None
+
+
 # --- Other commands and entry point (Keep as before) ---
 @app.command()
 def check_server(): ...
@@ -1,5 +1,7 @@
 # cli_client/dockerfile_generator_cli/config.py
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load .env file from the current working directory OR the script's location
@@ -16,4 +18,56 @@ def get_server_url() -> str:
     # Ensure no trailing slash for consistency
     return url.rstrip('/')
 
+def get_trace_enabled() -> bool:
+    """Whether to ask the server to record traces for CLI calls (MCP_TRACE=1)."""
+    return os.getenv("MCP_TRACE", "").lower() in ("1", "true", "yes")
+
+# HTTP client settings: connect and read timeouts are split so an unreachable server fails
+# fast while slow AI generations still get time to finish
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5.0
+DEFAULT_READ_TIMEOUT_SECONDS = 90.0
+DEFAULT_MAX_CONNECTIONS = 10
+
+def get_connect_timeout() -> float:
+    """Seconds to wait for a connection to the server (MCP_CONNECT_TIMEOUT)."""
+    return float(os.getenv("MCP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT_SECONDS))
+
+def get_read_timeout() -> float:
+    """Seconds to wait for the server to answer a request (MCP_READ_TIMEOUT)."""
+    return float(os.getenv("MCP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT_SECONDS))
+
+def get_max_connections() -> int:
+    """Pooled connections a client keeps open to the server (MCP_MAX_CONNECTIONS)."""
+    return int(os.getenv("MCP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS))
+
+def get_http2_enabled() -> bool:
+    """Offer HTTP/2 unless MCP_HTTP2=0; it only takes effect when the 'h2' package is installed."""
+    return os.getenv("MCP_HTTP2", "1").lower() not in ("0", "false", "no")
+
+# Local response cache ('generate', 'generate-many' and call_mcp_api). By default every use
+# revalidates with the server (If-None-Match), which answers 304 unless the request or its
+# Harbor configuration changed; a positive max age skips that round trip but can serve
+# output from before a configuration reload for up to that long.
+DEFAULT_CACHE_MAX_AGE_SECONDS = 0.0
+
+def get_cache_enabled() -> bool:
+    """Whether CLI calls use the local response cache (MCP_CACHE=0 disables it)."""
+    return os.getenv("MCP_CACHE", "1").lower() not in ("0", "false", "no")
+
+def get_cache_dir() -> Path:
+    """Cache directory: MCP_CACHE_DIR, else the platform's user cache directory."""
+    if os.getenv("MCP_CACHE_DIR"):
+        return Path(os.getenv("MCP_CACHE_DIR")).expanduser()
+    if sys.platform == "win32":
+        base = Path(os.getenv("LOCALAPPDATA") or Path.home() / "AppData" / "Local")
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / "mcp-dockergen"
+
+def get_cache_max_age() -> float:
+    """Seconds a cached response is used without asking the server (MCP_CACHE_MAX_AGE)."""
+    return float(os.getenv("MCP_CACHE_MAX_AGE", DEFAULT_CACHE_MAX_AGE_SECONDS))
+
 # You could add more config loading logic here later (e.g., from ~/.config file)
\ No newline at end of file
@@ -0,0 +1,286 @@
+# cli_client/dockerfile_generator_cli/introspect.py
+import os
+import re
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+try: # Python 3.11+
+    import tomllib
+except ImportError: # pragma: no cover - older Pythons use tomli when installed
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# Files that mark a directory as a project, and the language they imply (first match wins)
+SERVICE_MARKERS = [
+    ("pyproject.toml", "python"),
+    ("requirements.txt", "python"),
+    ("Pipfile", "python"),
+    ("setup.py", "python"),
+    ("package.json", "node"),
+    ("go.mod", "go"),
+    ("Cargo.toml", "rust"),
+    ("pom.xml", "java"),
+    ("build.gradle", "java"),
+    ("build.gradle.kts", "kotlin"),
+    ("Gemfile", "ruby"),
+    ("composer.json", "php"),
+    ("mix.exs", "elixir"),
+    ("Package.swift", "swift"),
+    ("pubspec.yaml", "dart"),
+]
+
+# Only the head of each manifest is read, so huge or generated files stay cheap
+MAX_MANIFEST_BYTES = 256 * 1024
+# Dependencies passed on to the request (the prompt only needs the important ones)
+MAX_DEPENDENCIES = 30
+
+# Frameworks that make a project a web service, with their usual port (checked in order)
+WEB_FRAMEWORKS = [
+    ("django", 8000), ("fastapi", 8000), ("uvicorn", 8000), ("gunicorn", 8000), ("flask", 5000),
+    ("starlette", 8000), ("aiohttp", 8080), ("tornado", 8888), ("streamlit", 8501),
+    ("next", 3000), ("nuxt", 3000), ("express", 3000), ("koa", 3000), ("fastify", 3000),
+    ("@nestjs/core", 3000), ("hapi", 3000), ("@hapi/hapi", 3000),
+    ("github.com/gin-gonic/gin", 8080), ("github.com/labstack/echo/v4", 8080),
+    ("github.com/gofiber/fiber/v2", 3000), ("github.com/go-chi/chi/v5", 8080), ("github.com/gorilla/mux", 8080),
+    ("actix-web", 8080), ("axum", 3000), ("rocket", 8000), ("warp", 3030),
+    ("spring-boot-starter-web", 8080), ("spring-boot-starter-webflux", 8080), ("quarkus-resteasy", 8080),
+    ("rails", 3000), ("sinatra", 4567), ("puma", 3000),
+    ("laravel/framework", 8000), ("symfony/framework-bundle", 8000),
+    ("phoenix", 4000), ("vapor", 8080),
+]
+
+# Dependency files and the package manager they imply, per language (first match wins;
+# sent as the request's package_manager so the server knows which file the build can use)
+LOCKFILE_TOOLS = {
+    "python": [("poetry.lock", "poetry"), ("uv.lock", "uv"), ("Pipfile.lock", "pipenv"), ("requirements.txt", "pip")],
+    "node": [("pnpm-lock.yaml", "pnpm"), ("yarn.lock", "yarn"), ("bun.lockb", "bun"), ("package-lock.json", "npm")],
+}
+
+_VERSION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)")
+_REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+@dataclass
+class ProjectInfo:
+    """What introspection derived for a project directory; None where nothing was found."""
+    language: Optional[str] = None
+    version: Optional[str] = None
+    dependencies: List[str] = field(default_factory=list)
+    port: Optional[int] = None
+    app_type: Optional[str] = None
+    package_manager: Optional[str] = None
+    sources: List[str] = field(default_factory=list) # Files that were read
+
+    def request_fields(self) -> Dict[str, Any]:
+        """Keyword arguments for build_payload (and call_mcp_api), unset values left out."""
+        fields: Dict[str, Any] = {"language": self.language, "version": self.version,
+                                  "dependencies": self.dependencies or None, "port": self.port,
+                                  "app_type": self.app_type, "package_manager": self.package_manager}
+        return {key: value for key, value in fields.items() if value is not None}
+
+
+def detect_language(file_names: Iterable[str]) -> Optional[str]:
+    """Language implied by a directory's file names, by SERVICE_MARKERS order."""
+    names = set(file_names)
+    return next((language for marker, language in SERVICE_MARKERS if marker in names), None)
+
+
+def inspect_project(directory: Path, file_names: Optional[Set[str]] = None) -> ProjectInfo:
+    """
+    Derive language, version, dependencies, port and app type from the manifests in one
+    directory (not its subdirectories). Only the manifests of the detected language are
+    read, each up to MAX_MANIFEST_BYTES; pass file_names when the directory was already listed.
+    """
+    if file_names is None:
+        try:
+            file_names = {entry.name for entry in os.scandir(directory) if not entry.is_dir()}
+        except OSError:
+            file_names = set()
+    info = ProjectInfo(language=detect_language(file_names))
+    inspector = _INSPECTORS.get(info.language)
+    if inspector is not None:
+        inspector(_ManifestReader(directory, file_names, info), info)
+    info.package_manager = next((tool for lockfile, tool in LOCKFILE_TOOLS.get(info.language, [])
+                                 if lockfile in file_names), None)
+    _derive_app_type(info)
+    del info.dependencies[MAX_DEPENDENCIES:]
+    return info
+
+
+class _ManifestReader:
+    """Bounded reads of the manifests present in a directory; records what was read."""
+
+    def __init__(self, directory: Path, file_names: Set[str], info: ProjectInfo):
+        self.directory = directory
+        self.file_names = file_names
+        self.info = info
+
+    def text(self, name: str) -> Optional[str]:
+        if name not in self.file_names:
+            return None
+        try:
+            with open(self.directory / name, "rb") as f:
+                data = f.read(MAX_MANIFEST_BYTES)
+        except OSError:
+            return None
+        self.info.sources.append(name)
+        return data.decode("utf-8", errors="replace")
+
+    def json(self, name: str) -> Dict[str, Any]:
+        text = self.text(name)
+        try:
+            data = json.loads(text) if text else {}
+        except ValueError:
+            return {} # Truncated or invalid: treat as absent
+        return data if isinstance(data, dict) else {}
+
+    def toml(self, name: str) -> Dict[str, Any]:
+        text = self.text(name)
+        if not text or tomllib is None:
+            return {}
+        try:
+            return tomllib.loads(text)
+        except (tomllib.TOMLDecodeError, ValueError):
+            return {}
+
+    def first_line(self, name: str) -> Optional[str]:
+        text = self.text(name)
+        return text.strip().splitlines()[0].strip() if text and text.strip() else None
+
+
+def _version_from(spec: Optional[str]) -> Optional[str]:
+    """Major(.minor) version from a version spec like '>=3.11,<4', '^18.2', 'python-3.12.1' or 'v20'."""
+    match = _VERSION_PATTERN.search(spec or "")
+    return match.group(1) if match else None
+
+
+def _add_dependencies(info: ProjectInfo, names: Iterable[str]) -> None:
+    seen = set(info.dependencies)
+    for name in names:
+        if name and name not in seen:
+            info.dependencies.append(name)
+            seen.add(name)
+
+
+# --- Per-language inspectors ---
+def _inspect_python(reader: _ManifestReader, info: ProjectInfo) -> None:
+    pyproject = reader.toml("pyproject.toml")
+    project = pyproject.get("project", {})
+    poetry = pyproject.get("tool", {}).get("poetry", {})
+    info.version = (_version_from(reader.first_line(".python-version"))
+                    or _version_from(project.get("requires-python"))
+                    or _version_from(poetry.get("dependencies", {}).get("python"))
+                    or _version_from(reader.first_line("runtime.txt")))
+    _add_dependencies(info, (_requirement_name(spec) for spec in project.get("dependencies", [])))
+    _add_dependencies(info, (name for name in poetry.get("dependencies", {}) if name.lower() != "python"))
+    requirements = reader.text("requirements.txt")
+    if requirements:
+        _add_dependencies(info, (_requirement_name(line) for line in requirements.splitlines()
+                                 if line.strip() and not line.lstrip().startswith(("#", "-"))))
+    if not info.dependencies:
+        _add_dependencies(info, reader.toml("Pipfile").get("packages", {}))
+
+
+def _requirement_name(spec: str) -> Optional[str]:
+    """Distribution name of a PEP 508 requirement ('Flask[async]>=2.0 ; python_version>"3"' -> 'flask')."""
+    match = _REQUIREMENT_NAME.match(spec)
+    return match.group(1).lower() if match else None
+
+
+def _inspect_node(reader: _ManifestReader, info: ProjectInfo) -> None:
+    package = reader.json("package.json")
+    engines = package.get("engines") if isinstance(package.get("engines"), dict) else {}
+    info.version = _version_from(reader.first_line(".nvmrc")) or _version_from(engines.get("node"))
+    dependencies = package.get("dependencies")
+    _add_dependencies(info, dependencies if isinstance(dependencies, dict) else {})
+
+
+def _inspect_go(reader: _ManifestReader, info: ProjectInfo) -> None:
+    go_mod = reader.text("go.mod") or ""
+    in_require = False
+    modules = []
+    for line in go_mod.splitlines():
+        line = line.split("//")[0].strip()
+        if line.startswith("go ") and info.version is None:
+            info.version = _version_from(line[3:])
+        elif line.startswith("require ("):
+            in_require = True
+        elif in_require and line == ")":
+            in_require = False
+        elif in_require or line.startswith("require "):
+            parts = line.replace("require ", "", 1).split()
+            if parts:
+                modules.append(parts[0])
+    _add_dependencies(info, modules)
+
+
+def _inspect_rust(reader: _ManifestReader, info: ProjectInfo) -> None:
+    cargo = reader.toml("Cargo.toml")
+    toolchain = reader.toml("rust-toolchain.toml").get("toolchain", {})
+    info.version = _version_from(toolchain.get("channel")) or _version_from(cargo.get("package", {}).get("rust-version"))
+    _add_dependencies(info, cargo.get("dependencies", {}))
+
+
+_POM_VERSION = re.compile(
+    r"<(?:maven\.compiler\.release|java\.version|maven\.compiler\.source|release)>\s*(?:1\.)?(\d+)\s*<")
+_POM_ARTIFACT = re.compile(r"<artifactId>\s*([\w.-]+)\s*</artifactId>")
+_GRADLE_VERSION = re.compile(r"(?:JavaLanguageVersion\.of\(|VERSION_(?:1_)?|jvmTarget\s*=\s*[\"'])(\d+)")
+_GRADLE_DEPENDENCY = re.compile(r"""(?:implementation|api|compile)\s*\(?\s*["'][\w.-]+:([\w.-]+)""")
+
+
+def _inspect_jvm(reader: _ManifestReader, info: ProjectInfo) -> None:
+    pom = reader.text("pom.xml")
+    if pom is not None:
+        match = _POM_VERSION.search(pom)
+        info.version = match.group(1) if match else None
+        dependencies = pom.split("<dependencies>", 1)[1] if "<dependencies>" in pom else ""
+        _add_dependencies(info, _POM_ARTIFACT.findall(dependencies))
+        return
+    gradle = reader.text("build.gradle.kts") or reader.text("build.gradle") or ""
+    match = _GRADLE_VERSION.search(gradle)
+    info.version = match.group(1) if match else None
+    _add_dependencies(info, _GRADLE_DEPENDENCY.findall(gradle))
+
+
+_GEMFILE_RUBY = re.compile(r"""^\s*ruby\s+["']([^"']+)""", re.MULTILINE)
+_GEMFILE_GEM = re.compile(r"""^\s*gem\s+["']([\w.-]+)""", re.MULTILINE)
+
+
+def _inspect_ruby(reader: _ManifestReader, info: ProjectInfo) -> None:
+    gemfile = reader.text("Gemfile") or ""
+    match = _GEMFILE_RUBY.search(gemfile)
+    info.version = _version_from(reader.first_line(".ruby-version")) or _version_from(match.group(1) if match else None)
+    _add_dependencies(info, _GEMFILE_GEM.findall(gemfile))
+
+
+def _inspect_php(reader: _ManifestReader, info: ProjectInfo) -> None:
+    require = reader.json("composer.json").get("require", {})
+    if isinstance(require, dict):
+        info.version = _version_from(require.get("php"))
+        _add_dependencies(info, (name for name in require if name != "php" and not name.startswith("ext-")))
+
+
+_INSPECTORS = {
+    "python": _inspect_python,
+    "node": _inspect_node,
+    "go": _inspect_go,
+    "rust": _inspect_rust,
+    "java": _inspect_jvm,
+    "kotlin": _inspect_jvm,
+    "ruby": _inspect_ruby,
+    "php": _inspect_php,
+}
+
+
+def _derive_app_type(info: ProjectInfo) -> None:
+    """A known web framework among the dependencies makes the project 'web' with that framework's usual port."""
+    lowered = {dep.lower() for dep in info.dependencies}
+    for framework, port in WEB_FRAMEWORKS:
+        if framework in lowered:
+            info.app_type = "web"
+            info.port = port
+            return
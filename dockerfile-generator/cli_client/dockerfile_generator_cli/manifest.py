@@ -0,0 +1,203 @@
+# cli_client/dockerfile_generator_cli/manifest.py
+import os
+import json
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .api_client import build_payload
+from .introspect import detect_language, inspect_project
+
+# File next to the manifest (or at the discovery root) remembering what each service was generated from
+STATE_FILE_NAME = ".mcp-dockergen-state.json"
+
+# Directories never searched for services
+IGNORED_DIRS = {".git", ".hg", ".svn", "node_modules", "vendor", "venv", ".venv", "env", "__pycache__",
+                ".tox", ".mypy_cache", ".pytest_cache", "target", "dist", "build", ".next", ".idea", ".vscode"}
+
+
+class ManifestError(Exception):
+    """Raised when a manifest can't be read or describes an invalid service."""
+    pass
+
+
+@dataclass
+class ServiceSpec:
+    """One service to generate a Dockerfile for."""
+    name: str
+    language: str
+    output: Path
+    version: Optional[str] = None
+    dependencies: Optional[List[str]] = None
+    port: Optional[int] = None
+    app_type: Optional[str] = None
+    instructions: Optional[str] = None
+    package_manager: Optional[str] = None
+    path: Optional[Path] = None # Service directory, when known
+
+    def payload(self) -> Dict[str, Any]:
+        """The /generate-dockerfile request for this service."""
+        return build_payload(self.language, self.version, self.dependencies, self.port, self.app_type, self.instructions,
+                             self.package_manager)
+
+    def input_digest(self, server_url: str) -> str:
+        """Fingerprint of everything the generated Dockerfile depends on."""
+        inputs = json.dumps({"server": server_url, "request": self.payload()}, sort_keys=True)
+        return hashlib.sha256(inputs.encode("utf-8")).hexdigest()
+
+
+def load_manifest(manifest_path: Path) -> List[ServiceSpec]:
+    """
+    Read services from a JSON or YAML manifest:
+
+        services:
+          - name: api                  # defaults to the path's directory name
+            path: services/api         # service directory (default: the manifest's directory)
+            language: python
+            version: "3.11"
+            dependencies: [flask, gunicorn]
+            port: 5000
+            app_type: web
+            instructions: Use gunicorn
+            package_manager: poetry    # installs from its dependency file (pip, npm, poetry, uv, pnpm, ...)
+            output: services/api/Dockerfile   # default: <path>/Dockerfile
+
+    Relative paths are resolved against the manifest's directory.
+    """
+    try:
+        text = manifest_path.read_text(encoding="utf-8")
+    except OSError as e:
+        raise ManifestError(f"Cannot read manifest {manifest_path}: {e}") from e
+    if manifest_path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ManifestError("YAML manifests need PyYAML (pip install 'mcp-dockergen-cli[yaml]'); or use a JSON manifest.") from e
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ManifestError(f"Invalid YAML in {manifest_path}: {e}") from e
+    else:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ManifestError(f"Invalid JSON in {manifest_path}: {e}") from e
+
+    entries = data.get("services") if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        raise ManifestError(f"{manifest_path} must contain a non-empty 'services' list.")
+    base_dir = manifest_path.resolve().parent
+    services = [_service_from_entry(entry, index, base_dir) for index, entry in enumerate(entries)]
+    _check_unique_outputs(services)
+    return services
+
+
+def _service_from_entry(entry: Any, index: int, base_dir: Path) -> ServiceSpec:
+    if not isinstance(entry, dict):
+        raise ManifestError(f"Service #{index + 1} must be a mapping.")
+    if not entry.get("language"):
+        raise ManifestError(f"Service #{index + 1} ({entry.get('name', 'unnamed')}) has no 'language'.")
+    path = (base_dir / entry["path"]).resolve() if entry.get("path") else base_dir
+    dependencies = entry.get("dependencies", entry.get("deps"))
+    if isinstance(dependencies, str):
+        dependencies = [dep.strip() for dep in dependencies.split(",") if dep.strip()]
+    port = entry.get("port")
+    try:
+        port = int(port) if port is not None else None
+    except (TypeError, ValueError) as e:
+        raise ManifestError(f"Service #{index + 1} has an invalid port: {port!r}") from e
+    return ServiceSpec(
+        name=str(entry.get("name") or path.name),
+        language=str(entry["language"]),
+        version=str(entry["version"]) if entry.get("version") is not None else None,
+        dependencies=[str(dep) for dep in dependencies] if dependencies else None,
+        port=port,
+        app_type=entry.get("app_type"),
+        instructions=entry.get("instructions", entry.get("additional_instructions")),
+        package_manager=entry.get("package_manager"),
+        output=(base_dir / entry["output"]).resolve() if entry.get("output") else path / "Dockerfile",
+        path=path,
+    )
+
+
+def _check_unique_outputs(services: List[ServiceSpec]) -> None:
+    seen: Dict[Path, str] = {}
+    for service in services:
+        if service.output in seen:
+            raise ManifestError(f"Services '{seen[service.output]}' and '{service.name}' both write {service.output}.")
+        seen[service.output] = service.name
+
+
+def discover_services(root: Path, max_depth: int = 4) -> List[ServiceSpec]:
+    """
+    Find service directories under root by their marker files (package.json, go.mod, ...)
+    and derive each service's request from its manifests (see introspect.inspect_project).
+    A directory is one service; its subdirectories are still searched (monorepos nest
+    services), except well-known dependency and build directories.
+    """
+    root = root.resolve()
+    services: List[ServiceSpec] = []
+    pending = [(root, 0)]
+    while pending:
+        directory, depth = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                files, subdirs = set(), []
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRS and not entry.name.startswith("."):
+                            subdirs.append(Path(entry.path))
+                    else:
+                        files.add(entry.name)
+        except OSError:
+            continue # Unreadable directory: skip it
+        if detect_language(files) is not None:
+            info = inspect_project(directory, files)
+            name = directory.relative_to(root).as_posix() if directory != root else root.name
+            fields = info.request_fields()
+            services.append(ServiceSpec(name=name, output=directory / "Dockerfile", path=directory, **fields))
+        if depth < max_depth:
+            pending.extend((subdir, depth + 1) for subdir in sorted(subdirs, reverse=True))
+    services.sort(key=lambda service: service.name)
+    return services
+
+
+class GenerationState:
+    """
+    Input digests (and server configuration versions) of the services generated last
+    time, persisted as JSON in state_path.
+    """
+
+    def __init__(self, state_path: Path):
+        self.state_path = state_path
+        try:
+            self._entries: Dict[str, Any] = json.loads(state_path.read_text(encoding="utf-8")).get("services", {})
+        except (OSError, ValueError, AttributeError):
+            self._entries = {}
+
+    def is_unchanged(self, service: ServiceSpec, digest: str, config_version: Optional[str] = None) -> bool:
+        """
+        True if the service was generated from the same inputs and its Dockerfile is still there.
+        Given the server's current config_version, a service generated under another one
+        (e.g. before a Harbor mapping reload) is changed too.
+        """
+        entry = self._entries.get(self._key(service))
+        if not entry or entry.get("digest") != digest or not service.output.exists():
+            return False
+        return config_version is None or entry.get("config_version") == config_version
+
+    def record(self, service: ServiceSpec, digest: str, config_version: Optional[str] = None) -> None:
+        self._entries[self._key(service)] = {"name": service.name, "digest": digest, "config_version": config_version}
+
+    def _key(self, service: ServiceSpec) -> str:
+        """Output path relative to the state file, so the state survives moving the checkout."""
+        try:
+            return service.output.relative_to(self.state_path.parent).as_posix()
+        except ValueError:
+            return str(service.output)
+
+    def save(self) -> None:
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"services": self._entries}, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_path, self.state_path)
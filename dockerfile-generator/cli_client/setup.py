@@ -8,10 +8,14 @@ setup(
     include_package_data=True,
     install_requires=[
         'typer[all]',
-        'requests',
+        'httpx',
         'python-dotenv',
         # Add other dependencies as needed
     ],
+    extras_require={
+        'http2': ['httpx[http2]'], # HTTP/2 to servers that offer it
+        'yaml': ['PyYAML'], # YAML manifests for 'generate-many'
+    },
     entry_points='''
         [console_scripts]
         mcp-dockergen=dockerfile_generator_cli.cli:app
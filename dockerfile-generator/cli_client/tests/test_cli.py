@@ -0,0 +1,589 @@
+# tests/test_cli.py
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+from typer.testing import CliRunner
+
+from dockerfile_generator_cli import cli
+from dockerfile_generator_cli.api_client import (
+    BATCH_PATH, CONFIG_STATUS_PATH, GENERATE_PATH, SOURCE_CACHE, SOURCE_REVALIDATED, SOURCE_SERVER, APIClientError, AsyncMCPClient,
+    CacheMissError, ConnectionError, MCPClient, ServerError, build_payload
+)
+from dockerfile_generator_cli.cache import ResponseCache
+from dockerfile_generator_cli.introspect import MAX_DEPENDENCIES, inspect_project
+from dockerfile_generator_cli.manifest import STATE_FILE_NAME, ServiceSpec, discover_services
+
+SERVER_URL = "http://mcp.test"
+PAYLOAD = {"language": "python", "version": "3.11"}
+DOCKERFILE = "FROM harbor.example.com/python:3.11-slim\nCMD [\"python\", \"app.py\"]"
+
+
+def _success(dockerfile=DOCKERFILE, **headers):
+    body = {"status": "success", "dockerfile_content": dockerfile,
+            "base_image": {"generic": "python:3.11-slim", "harbor_path": "harbor.example.com/python:3.11-slim"}}
+    return httpx.Response(200, json=body, headers={"X-Trace-Id": "abc123", **headers})
+
+
+class _RecordingTransport:
+    """MockTransport handler that records requests and answers with a canned response (or raises)."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        outcome = self.respond(request)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class TestBuildPayload(unittest.TestCase):
+
+    def test_unset_values_are_left_out(self):
+        self.assertEqual(build_payload("go"), {"language": "go"})
+        self.assertEqual(build_payload("python", "3.11", ["flask"], 5000, "web", "Use gunicorn", "poetry"), {
+            "language": "python", "version": "3.11", "dependencies": ["flask"], "port": 5000, "app_type": "web",
+            "additional_instructions": "Use gunicorn", "package_manager": "poetry",
+        })
+
+
+class TestMCPClient(unittest.TestCase):
+
+    def _client(self, respond):
+        self.handler = _RecordingTransport(respond)
+        return MCPClient(server_url=SERVER_URL, transport=httpx.MockTransport(self.handler), http2=False)
+
+    def test_generate_posts_payload(self):
+        with self._client(lambda request: _success()) as client:
+            data = client.generate("python", "3.11", priority="batch")
+        self.assertEqual(data["dockerfile_content"], DOCKERFILE)
+        request = self.handler.requests[0]
+        self.assertEqual(request.url.path, GENERATE_PATH)
+        self.assertEqual(json.loads(request.content), PAYLOAD)
+        self.assertEqual(request.headers["X-Request-Priority"], "batch")
+        self.assertRegex(request.headers["traceparent"], r"^00-[0-9a-f]{32}-[0-9a-f]{16}-0[01]$")
+
+    def test_each_call_starts_a_new_trace(self):
+        with self._client(lambda request: _success()) as client:
+            client.post(GENERATE_PATH, PAYLOAD)
+            client.post(GENERATE_PATH, PAYLOAD)
+        first, second = (request.headers["traceparent"] for request in self.handler.requests)
+        self.assertNotEqual(first.split("-")[1], second.split("-")[1])
+
+    def test_error_response_message_becomes_server_error(self):
+        body = {"status": "error", "message": "Language 'cobol' is not supported", "error_code": "UNSUPPORTED_LANGUAGE"}
+        with self._client(lambda request: httpx.Response(400, json=body)) as client:
+            with self.assertRaises(ServerError) as ctx:
+                client.generate("cobol")
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertEqual(ctx.exception.detail, "Language 'cobol' is not supported")
+        self.assertRegex(ctx.exception.trace_id, r"^[0-9a-f]{32}$")
+
+    def test_fastapi_detail_and_plain_text_errors(self):
+        with self._client(lambda request: httpx.Response(404, json={"detail": "Not Found"})) as client:
+            with self.assertRaises(ServerError) as ctx:
+                client.post(BATCH_PATH, {"requests": [PAYLOAD]})
+        self.assertEqual((ctx.exception.status_code, ctx.exception.detail), (404, "Not Found"))
+        with self._client(lambda request: httpx.Response(502, text="Bad Gateway")) as client:
+            with self.assertRaises(ServerError) as ctx:
+                client.generate("python")
+        self.assertEqual(ctx.exception.detail, "Bad Gateway")
+
+    def test_connect_failure_becomes_connection_error(self):
+        with self._client(lambda request: httpx.ConnectError("connection refused", request=request)) as client:
+            with self.assertRaisesRegex(ConnectionError, "Failed to connect"):
+                client.generate("python")
+
+    def test_timeout_becomes_connection_error(self):
+        with self._client(lambda request: httpx.ReadTimeout("read timed out", request=request)) as client:
+            with self.assertRaisesRegex(ConnectionError, "timed out"):
+                client.generate("python")
+
+    def test_invalid_json_becomes_client_error(self):
+        with self._client(lambda request: httpx.Response(200, text="<html>proxy login</html>")) as client:
+            with self.assertRaisesRegex(APIClientError, "not valid JSON"):
+                client.generate("python")
+
+    def test_connection_errors_are_client_errors(self):
+        self.assertTrue(issubclass(ConnectionError, APIClientError))
+        self.assertTrue(issubclass(ServerError, APIClientError))
+
+
+class TestAsyncMCPClient(unittest.IsolatedAsyncioTestCase):
+
+    def _client(self, respond):
+        self.handler = _RecordingTransport(respond)
+        return AsyncMCPClient(server_url=SERVER_URL, transport=httpx.MockTransport(self.handler), http2=False)
+
+    async def test_concurrent_generations(self):
+        async with self._client(lambda request: _success(json.loads(request.content)["language"])) as client:
+            results = await asyncio.gather(*(client.generate(language) for language in ("python", "node", "go")))
+        self.assertEqual([result["dockerfile_content"] for result in results], ["python", "node", "go"])
+        self.assertEqual(len(self.handler.requests), 3)
+
+    async def test_errors_are_translated_like_the_sync_client(self):
+        async with self._client(lambda request: httpx.Response(503, json={"message": "AI unavailable"})) as client:
+            with self.assertRaises(ServerError) as ctx:
+                await client.generate("python")
+        self.assertEqual((ctx.exception.status_code, ctx.exception.detail), (503, "AI unavailable"))
+        async with self._client(lambda request: httpx.ConnectError("refused", request=request)) as client:
+            with self.assertRaises(ConnectionError):
+                await client.generate("python")
+
+    async def test_generate_batch_returns_items_in_order(self):
+        def respond(request):
+            items = json.loads(request.content)["requests"]
+            return httpx.Response(200, json={"status": "success", "results": [
+                {"index": index, "status": "success", "result": {"dockerfile_content": item["language"]}}
+                for index, item in enumerate(items)
+            ]})
+
+        async with self._client(respond) as client:
+            results = await client.generate_batch([{"language": "python"}, {"language": "go"}])
+        self.assertEqual(self.handler.requests[0].url.path, BATCH_PATH)
+        self.assertEqual([item["result"]["dockerfile_content"] for item in results], ["python", "go"])
+
+
+def _batch_response(request, etag_prefix=None):
+    """Batch endpoint stand-in: each item's Dockerfile names its language."""
+    items = json.loads(request.content)["requests"]
+    results = []
+    for index, item in enumerate(items):
+        if item["language"] == "cobol":
+            results.append({"index": index, "status": "error",
+                            "error": {"status": "error", "message": "cobol is not supported", "error_code": "UNSUPPORTED_LANGUAGE"}})
+        else:
+            result = {"index": index, "status": "success", "result": {"status": "success", "dockerfile_content": f"FROM {item['language']}"}}
+            if etag_prefix:
+                result["etag"] = f'W/"{etag_prefix}-{item["language"]}"'
+            results.append(result)
+    return httpx.Response(200, json={"status": "partial", "config_version": "v1", "results": results})
+
+
+class TestRunGenerations(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.services = [ServiceSpec(name=language, language=language, output=self.root / language / "Dockerfile")
+                         for language in ("python", "node", "cobol")]
+        self.results = {}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _on_result(self, service, response, error):
+        self.results[service.name] = error or response["dockerfile_content"]
+
+    async def _run(self, respond, batch=None, cache=None, offline=False):
+        self.handler = _RecordingTransport(respond)
+        client = AsyncMCPClient(server_url=SERVER_URL, transport=httpx.MockTransport(self.handler), cache=cache)
+        await cli._run_generations(client, self.services, 2, batch, None, self._on_result, offline)
+
+    async def test_batch_results_are_reported_per_service(self):
+        await self._run(_batch_response)
+        self.assertEqual([request.url.path for request in self.handler.requests], [BATCH_PATH])
+        self.assertEqual(self.results, {"python": "FROM python", "node": "FROM node", "cobol": "cobol is not supported"})
+
+    async def test_falls_back_to_individual_requests_without_batch_endpoint(self):
+        def respond(request):
+            if request.url.path == BATCH_PATH:
+                return httpx.Response(404, json={"detail": "Not Found"})
+            language = json.loads(request.content)["language"]
+            if language == "cobol":
+                return httpx.Response(400, json={"message": "cobol is not supported"})
+            return _success(f"FROM {language}")
+
+        await self._run(respond)
+        paths = [request.url.path for request in self.handler.requests]
+        self.assertEqual((paths[0], paths[1:]), (BATCH_PATH, [GENERATE_PATH] * 3))
+        self.assertTrue(all(request.headers["X-Request-Priority"] == "batch" for request in self.handler.requests[1:]))
+        self.assertEqual(self.results, {"python": "FROM python", "node": "FROM node", "cobol": "HTTP 400: cobol is not supported"})
+
+    async def test_required_batch_endpoint_is_not_replaced(self):
+        await self._run(lambda request: httpx.Response(404, json={"detail": "Not Found"}), batch=True)
+        self.assertEqual(len(self.handler.requests), 1)
+        self.assertTrue(all("404" in error for error in self.results.values()))
+
+    async def test_unreachable_server_fails_every_service(self):
+        await self._run(lambda request: httpx.ConnectError("refused", request=request))
+        self.assertEqual(len(self.results), 3)
+        self.assertTrue(all("Failed to connect" in error for error in self.results.values()))
+
+    async def test_individual_requests_use_the_cache(self):
+        cache = ResponseCache(self.root / "cache", max_age=3600)
+        cache.put(SERVER_URL, self.services[0].payload(), {"dockerfile_content": "FROM cached"}, 'W/"a"', "v1")
+        await self._run(lambda request: _success(f"FROM {json.loads(request.content)['language']}", ETag='W/"b"'),
+                        batch=False, cache=cache)
+        self.assertEqual(len(self.handler.requests), 2)
+        self.assertEqual(self.results["python"], "FROM cached")
+        self.assertIsNotNone(cache.get(SERVER_URL, self.services[1].payload()))
+
+    async def test_offline_answers_from_the_cache_only(self):
+        cache = ResponseCache(self.root / "cache", max_age=0)
+        cache.put(SERVER_URL, self.services[0].payload(), {"dockerfile_content": "FROM cached"}, 'W/"a"', "v1")
+        await self._run(_batch_response, cache=cache, offline=True)
+        self.assertEqual(self.handler.requests, [])
+        self.assertEqual(self.results["python"], "FROM cached")
+        self.assertIn("Offline mode", self.results["node"])
+
+    async def test_batch_results_are_cached(self):
+        cache = ResponseCache(self.root / "cache", max_age=0)
+        await self._run(lambda request: _batch_response(request, etag_prefix="k"), cache=cache)
+        entry = cache.get(SERVER_URL, self.services[1].payload())
+        self.assertEqual((entry.response["dockerfile_content"], entry.etag, entry.config_version),
+                         ("FROM node", 'W/"k-node"', "v1"))
+        self.assertIsNone(cache.get(SERVER_URL, self.services[2].payload()))
+
+
+class TestGenerateManyCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.manifest = self.root / "mcp-dockergen.json"
+        self._write_manifest([{"name": "api", "path": "api", "language": "python", "version": "3.11"},
+                              {"name": "web", "path": "web", "language": "node", "version": "18"}])
+        self.config_version = "v1"
+        self.handler = _RecordingTransport(self._respond)
+
+        def client_factory(**kwargs):
+            kwargs["server_url"] = SERVER_URL
+            return AsyncMCPClient(transport=httpx.MockTransport(self.handler), **kwargs)
+
+        self._patch = patch.object(cli, "AsyncMCPClient", side_effect=client_factory)
+        self._patch.start()
+
+    def tearDown(self):
+        self._patch.stop()
+        self.tmp.cleanup()
+
+    def _respond(self, request):
+        if request.url.path == CONFIG_STATUS_PATH:
+            return httpx.Response(200, json={"version": self.config_version})
+        return _batch_response(request)
+
+    def _write_manifest(self, services):
+        self.manifest.write_text(json.dumps({"services": services}), encoding="utf-8")
+
+    def _generate_many(self, *args):
+        return CliRunner().invoke(cli.app, ["generate-many", "--manifest", str(self.manifest), "--no-cache", *args])
+
+    def _batched_languages(self):
+        return [[item["language"] for item in json.loads(request.content)["requests"]]
+                for request in self.handler.requests if request.url.path == BATCH_PATH]
+
+    def test_writes_dockerfiles_and_state(self):
+        result = self._generate_many()
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual((self.root / "api" / "Dockerfile").read_text(), "FROM python")
+        self.assertEqual((self.root / "web" / "Dockerfile").read_text(), "FROM node")
+        state = json.loads((self.root / STATE_FILE_NAME).read_text())
+        self.assertEqual(sorted(state["services"]), ["api/Dockerfile", "web/Dockerfile"])
+
+    def test_unchanged_services_are_skipped(self):
+        self._generate_many()
+        self._write_manifest([{"name": "api", "path": "api", "language": "python", "version": "3.12"},
+                              {"name": "web", "path": "web", "language": "node", "version": "18"}])
+        result = self._generate_many()
+        self.assertIn("Generated 1, skipped 1 unchanged", result.output)
+        self.assertEqual(self._batched_languages(), [["python", "node"], ["python"]])
+
+    def test_deleted_dockerfile_and_force_regenerate(self):
+        self._generate_many()
+        (self.root / "web" / "Dockerfile").unlink()
+        self._generate_many()
+        self._generate_many("--force")
+        self.assertEqual(self._batched_languages(), [["python", "node"], ["node"], ["python", "node"]])
+
+    def test_config_reload_regenerates_unchanged_services(self):
+        self._generate_many()
+        self._generate_many()
+        self.config_version = "v2"
+        result = self._generate_many()
+        self.assertIn("Generated 2, skipped 0 unchanged", result.output)
+        self.assertEqual(self._batched_languages(), [["python", "node"], ["python", "node"]])
+        state = json.loads((self.root / STATE_FILE_NAME).read_text())
+        self.assertEqual({entry["config_version"] for entry in state["services"].values()}, {"v2"})
+
+    def test_unknown_config_version_falls_back_to_the_request_digest(self):
+        self._generate_many()
+        self.handler.respond = lambda request: (httpx.Response(404, json={"detail": "Not Found"})
+                                                if request.url.path == CONFIG_STATUS_PATH else _batch_response(request))
+        result = self._generate_many()
+        self.assertIn("Generated 0, skipped 2 unchanged", result.output)
+
+    def test_failures_exit_non_zero_and_are_not_recorded(self):
+        self._write_manifest([{"name": "api", "path": "api", "language": "python"},
+                              {"name": "old", "path": "old", "language": "cobol"}])
+        result = self._generate_many()
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("old: cobol is not supported", result.output)
+        state = json.loads((self.root / STATE_FILE_NAME).read_text())
+        self.assertEqual(list(state["services"]), ["api/Dockerfile"])
+
+    def test_dry_run_sends_nothing(self):
+        result = self._generate_many("--dry-run")
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("api: python 3.11", result.output)
+        self.assertEqual([request.url.path for request in self.handler.requests], [CONFIG_STATUS_PATH])
+        self.assertFalse((self.root / "api" / "Dockerfile").exists())
+
+
+def _write_files(directory, files):
+    for name, content in files.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+class TestInspectProject(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _inspect(self, files):
+        _write_files(self.root, files)
+        return inspect_project(self.root)
+
+    def test_poetry_project(self):
+        info = self._inspect({
+            "pyproject.toml": '[tool.poetry.dependencies]\npython = "^3.11"\nfastapi = "^0.110"\nhttpx = "*"\n',
+            "poetry.lock": "",
+        })
+        self.assertEqual(info.request_fields(), {"language": "python", "version": "3.11", "dependencies": ["fastapi", "httpx"],
+                                                 "port": 8000, "app_type": "web", "package_manager": "poetry"})
+        self.assertEqual(info.sources, ["pyproject.toml"])
+
+    def test_requirements_and_python_version_file(self):
+        info = self._inspect({
+            "requirements.txt": "# web\nFlask[async]>=2.0 ; python_version > '3'\n-r base.txt\nrequests==2.31\n",
+            ".python-version": "3.12.1\n",
+        })
+        self.assertEqual((info.language, info.version), ("python", "3.12"))
+        self.assertEqual(info.dependencies, ["flask", "requests"])
+        self.assertEqual((info.app_type, info.port, info.package_manager), ("web", 5000, "pip"))
+
+    def test_node_project(self):
+        info = self._inspect({
+            "package.json": json.dumps({"engines": {"node": ">=20"}, "dependencies": {"express": "^4", "pg": "^8"}}),
+            "yarn.lock": "",
+        })
+        self.assertEqual(info.request_fields(), {"language": "node", "version": "20", "dependencies": ["express", "pg"],
+                                                 "port": 3000, "app_type": "web", "package_manager": "yarn"})
+
+    def test_npm_lockfile_is_reported(self):
+        info = self._inspect({"package.json": "{}", "package-lock.json": "{}", ".nvmrc": "v18.19.0\n"})
+        self.assertEqual(info.request_fields(), {"language": "node", "version": "18.19", "package_manager": "npm"})
+
+    def test_without_dependency_file_no_package_manager_is_sent(self):
+        info = self._inspect({"pyproject.toml": '[project]\ndependencies = ["click"]\n', "yarn.lock": ""})
+        self.assertEqual(info.request_fields(), {"language": "python", "dependencies": ["click"]})
+
+    def test_go_module(self):
+        info = self._inspect({"go.mod": "module example.com/svc\n\ngo 1.22\n\nrequire (\n"
+                                        "\tgithub.com/gin-gonic/gin v1.9.1\n\tgolang.org/x/sync v0.6.0 // indirect\n)\n"})
+        self.assertEqual((info.language, info.version, info.port), ("go", "1.22", 8080))
+        self.assertEqual(info.dependencies, ["github.com/gin-gonic/gin", "golang.org/x/sync"])
+
+    def test_rust_jvm_ruby_and_php_manifests(self):
+        cases = {
+            "rust": ({"Cargo.toml": '[package]\nname = "svc"\nrust-version = "1.75"\n[dependencies]\naxum = "0.7"\n'},
+                     ("rust", "1.75", ["axum"], 3000)),
+            "java": ({"pom.xml": "<project><properties><java.version>17</java.version></properties><dependencies>"
+                                 "<dependency><artifactId>spring-boot-starter-web</artifactId></dependency>"
+                                 "</dependencies></project>"},
+                     ("java", "17", ["spring-boot-starter-web"], 8080)),
+            "ruby": ({"Gemfile": "source 'https://rubygems.org'\nruby '3.3.0'\ngem 'sinatra'\n"},
+                     ("ruby", "3.3", ["sinatra"], 4567)),
+            "php": ({"composer.json": json.dumps({"require": {"php": "^8.2", "ext-json": "*", "laravel/framework": "^11"}})},
+                    ("php", "8.2", ["laravel/framework"], 8000)),
+        }
+        for name, (files, expected) in cases.items():
+            with self.subTest(name):
+                directory = self.root / name
+                _write_files(directory, files)
+                info = inspect_project(directory)
+                self.assertEqual((info.language, info.version, info.dependencies, info.port), expected)
+
+    def test_invalid_manifest_is_ignored(self):
+        info = self._inspect({"package.json": '{"dependencies": {"express": '})
+        self.assertEqual(info.request_fields(), {"language": "node"})
+
+    def test_dependencies_are_capped(self):
+        requirements = "\n".join(f"pkg{i}" for i in range(MAX_DEPENDENCIES + 10))
+        self.assertEqual(len(self._inspect({"requirements.txt": requirements}).dependencies), MAX_DEPENDENCIES)
+
+    def test_unknown_project(self):
+        info = self._inspect({"README.md": "# notes"})
+        self.assertEqual(info.request_fields(), {})
+
+
+class TestDiscoverServices(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        _write_files(self.root, {
+            "services/api/requirements.txt": "fastapi\n",
+            "services/api/poetry.lock": "",
+            "services/web/package.json": json.dumps({"dependencies": {"next": "14"}}),
+            "services/web/node_modules/left-pad/package.json": "{}",
+            "services/web/worker/go.mod": "module worker\n\ngo 1.21\n",
+            "docs/index.md": "",
+            ".git/config/package.json": "{}",
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_finds_nested_services_and_skips_dependency_dirs(self):
+        services = discover_services(self.root)
+        self.assertEqual([service.name for service in services], ["services/api", "services/web", "services/web/worker"])
+        api, web, worker = services
+        self.assertEqual(api.payload(), {"language": "python", "dependencies": ["fastapi"], "port": 8000,
+                                         "app_type": "web", "package_manager": "poetry"})
+        self.assertEqual(api.output, self.root / "services" / "api" / "Dockerfile")
+        self.assertEqual((web.language, web.port), ("node", 3000))
+        self.assertEqual((worker.language, worker.version), ("go", "1.21"))
+
+    def test_depth_is_bounded(self):
+        self.assertEqual([service.name for service in discover_services(self.root, max_depth=2)],
+                         ["services/api", "services/web"])
+
+    def test_inspect_command_prints_the_derived_request(self):
+        result = CliRunner().invoke(cli.app, ["inspect", "--project-dir", str(self.root / "services" / "api")])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(json.loads(result.output), {
+            "request": {"language": "python", "dependencies": ["fastapi"], "port": 8000, "app_type": "web",
+                        "package_manager": "poetry"},
+            "sources": ["requirements.txt"],
+        })
+
+    def test_generate_fills_missing_options_from_the_project(self):
+        with patch.object(cli, "call_mcp_api", return_value={"status": "success", "dockerfile_content": "FROM x"}) as call:
+            result = CliRunner().invoke(cli.app, ["generate", "--project-dir", str(self.root / "services" / "api"),
+                                                  "--port", "9000", "--no-cache"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        kwargs = call.call_args.kwargs
+        self.assertEqual((kwargs["language"], kwargs["dependencies"], kwargs["port"], kwargs["package_manager"]),
+                         ("python", ["fastapi"], 9000, "poetry"))
+        self.assertIsNone(kwargs["instructions"])
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name) / "cache"
+        self.etag = 'W/"k1-auto"'
+        self.config_version = "v1"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _respond(self, request):
+        """Generate endpoint stand-in that honours If-None-Match like the server."""
+        headers = {"ETag": self.etag, "X-Config-Version": self.config_version}
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers=headers)
+        return _success(f"FROM {self.config_version}", **headers)
+
+    def _client(self, max_age):
+        self.handler = _RecordingTransport(self._respond)
+        self.cache = ResponseCache(self.directory, max_age=max_age)
+        return MCPClient(server_url=SERVER_URL, transport=httpx.MockTransport(self.handler), cache=self.cache)
+
+    def test_revalidates_on_every_use_by_default(self):
+        with patch.dict(os.environ):
+            os.environ.pop("MCP_CACHE_MAX_AGE", None)
+            self.assertEqual(ResponseCache(self.directory).max_age, 0)
+        with self._client(max_age=0) as client:
+            first = client.generate_payload(PAYLOAD)
+            second = client.generate_payload(PAYLOAD)
+        self.assertEqual((first.source, second.source), (SOURCE_SERVER, SOURCE_REVALIDATED))
+        self.assertEqual(second.data, first.data)
+        self.assertNotIn("If-None-Match", self.handler.requests[0].headers)
+        self.assertEqual(self.handler.requests[1].headers["If-None-Match"], self.etag)
+
+    def test_config_reload_replaces_the_entry(self):
+        with self._client(max_age=0) as client:
+            client.generate_payload(PAYLOAD)
+            self.etag, self.config_version = 'W/"k2-auto"', "v2"
+            result = client.generate_payload(PAYLOAD)
+        self.assertEqual((result.source, result.data["dockerfile_content"]), (SOURCE_SERVER, "FROM v2"))
+        entry = self.cache.get(SERVER_URL, PAYLOAD)
+        self.assertEqual((entry.etag, entry.config_version), ('W/"k2-auto"', "v2"))
+
+    def test_fresh_entry_skips_the_server(self):
+        with self._client(max_age=3600) as client:
+            client.generate_payload(PAYLOAD)
+            result = client.generate_payload(PAYLOAD)
+        self.assertEqual(result.source, SOURCE_CACHE)
+        self.assertEqual(len(self.handler.requests), 1)
+
+    def test_stale_entry_is_revalidated_and_refreshed(self):
+        with self._client(max_age=60) as client:
+            client.generate_payload(PAYLOAD)
+            path = self.cache.get(SERVER_URL, PAYLOAD).path
+            data = json.loads(path.read_text())
+            data["stored_at"] -= 120
+            path.write_text(json.dumps(data))
+            self.assertEqual(client.generate_payload(PAYLOAD).source, SOURCE_REVALIDATED)
+            self.assertEqual(client.generate_payload(PAYLOAD).source, SOURCE_CACHE) # 304 restarted its freshness
+        self.assertEqual(len(self.handler.requests), 2)
+
+    def test_offline_uses_stale_entries_and_never_sends(self):
+        with self._client(max_age=0) as client:
+            client.generate_payload(PAYLOAD)
+            self.assertEqual(client.generate_payload(PAYLOAD, offline=True).source, SOURCE_CACHE)
+            with self.assertRaises(CacheMissError):
+                client.generate_payload({"language": "go"}, offline=True)
+        self.assertEqual(len(self.handler.requests), 1)
+
+    def test_responses_without_etag_are_not_stored(self):
+        self.handler = _RecordingTransport(lambda request: _success())
+        cache = ResponseCache(self.directory, max_age=3600)
+        with MCPClient(server_url=SERVER_URL, transport=httpx.MockTransport(self.handler), cache=cache) as client:
+            client.generate_payload(PAYLOAD)
+        self.assertIsNone(cache.get(SERVER_URL, PAYLOAD))
+
+    def test_entries_are_keyed_by_server_and_request(self):
+        cache = ResponseCache(self.directory, max_age=3600)
+        cache.put(SERVER_URL, PAYLOAD, {"dockerfile_content": "FROM a"}, self.etag, "v1")
+        self.assertIsNotNone(cache.get(SERVER_URL, dict(reversed(PAYLOAD.items()))))
+        self.assertIsNone(cache.get("http://other.test", PAYLOAD))
+        self.assertIsNone(cache.get(SERVER_URL, {**PAYLOAD, "port": 80}))
+
+    def test_corrupt_entry_is_a_miss_and_clear_removes_entries(self):
+        cache = ResponseCache(self.directory, max_age=3600)
+        cache.put(SERVER_URL, PAYLOAD, {"dockerfile_content": "FROM a"}, self.etag, "v1")
+        cache.put(SERVER_URL, {"language": "go"}, {"dockerfile_content": "FROM b"}, self.etag, "v1")
+        (self.directory / f"{cache.key(SERVER_URL, PAYLOAD)}.json").write_text("{not json")
+        self.assertIsNone(cache.get(SERVER_URL, PAYLOAD))
+        self.assertEqual(cache.clear(), 2)
+        self.assertIsNone(cache.get(SERVER_URL, {"language": "go"}))
+
+    def test_unwritable_cache_directory_is_skipped(self):
+        blocker = Path(self.tmp.name) / "file"
+        blocker.write_text("")
+        cache = ResponseCache(blocker / "cache", max_age=3600)
+        cache.put(SERVER_URL, PAYLOAD, {"dockerfile_content": "FROM a"}, self.etag, "v1")
+        self.assertIsNone(cache.get(SERVER_URL, PAYLOAD))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,32 +1,70 @@
-# mcp_server/app/api/v1/dockerfile.py (Corrected Version with Fixed get_base_image)
+# mcp_server/app/api/v1/docker_file.py
 
-import re
-from fastapi import APIRouter, Depends, status
-from app.models.request import DockerfileRequest
-from app.models.response import DockerfileResponse, BaseImage, ErrorResponse
+import os
+import json
+import time
+import asyncio
+from typing import AsyncIterator, Dict, List, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from app.models.request import DockerfileRequest, BatchDockerfileRequest
+from app.models.response import (
+    DockerfileResponse, BaseImage, ErrorResponse, CacheStatsResponse,
+    BatchDockerfileResponse, BatchItemResult
+)
 from app.config import Config, get_config
-from app.utils.logger import logger
+from app.core.base_images import BaseImageTable, default_base_images
+from app.core.cache import DockerfileCache, get_response_cache, make_etag, make_request_key
+from app.core.singleflight import SingleFlight, get_inflight_generations
+from app.core.dockerfile_parser import DockerfileProcessor, process_dockerfile
+from app.core.templates import render_template_dockerfile
+from app.core.validator import ValidationProblem, PROBLEM_BASE_IMAGE, apply_local_fixes, validate_dockerfile
+from app.core.rate_limiter import admission_controller, PRIORITIES, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from app.utils.logger import logger, truncate
 
 # Import specific exceptions that this module might raise or encounter
 from app.utils.exceptions import (
     UnsupportedLanguageError,
+    UnsupportedProviderError,
+    TemplateNotAvailableError,
     AIResponseError,
     DockerfileGeneratorError # Base error for unexpected issues
 )
 # Import AI exceptions to let them bubble up
 from app.core.ai_service import (
-    get_gemini_dockerfile_suggestion,
     create_dockerfile_prompt,
+    create_repair_prompt,
+    DEFAULT_MODEL_NAME,
     AIAuthenticationError,
     AIConnectionError,
+    AICircuitOpenError,
     AIServiceError # Base AI error class
 )
+from app.core.resilience import get_resilience_stats
+from app.core.ai_router import ai_router, generate_dockerfile_suggestion, stream_dockerfile_suggestion
+from app.core import metrics
 
 router = APIRouter()
 
+
+def get_request_priority(
+    x_request_priority: str | None = Header(None, description="AI admission priority: 'interactive' (default) or 'batch'")
+) -> str:
+    """FastAPI dependency reading the caller's AI admission priority class (e.g. CI sends 'batch')."""
+    priority = (x_request_priority or PRIORITY_INTERACTIVE).strip().lower()
+    return priority if priority in PRIORITIES else PRIORITY_INTERACTIVE
+
+
+# Maximum number of distinct generations a single batch call runs at once
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# Follow-up AI prompts allowed per generation to correct validation problems (0: local fixes only)
+AI_REPAIR_MAX_ATTEMPTS = int(os.getenv("AI_REPAIR_MAX_ATTEMPTS", "1"))
+
 @router.post("/generate-dockerfile",
              response_model=DockerfileResponse,
              responses={
+                 304: {"description": "Not Modified: If-None-Match matches the current ETag"},
                  400: {"model": ErrorResponse, "description": "Invalid input (e.g., unsupported language)"},
                  404: {"model": ErrorResponse, "description": "Mapping not found (if logic changes)"},
                  500: {"model": ErrorResponse, "description": "Internal Server Error (AI Response, Auth, Unexpected)"},
@@ -34,140 +72,575 @@ router = APIRouter()
              })
 async def generate_dockerfile(
     request: DockerfileRequest,
-    config: Config = Depends(get_config)
+    config: Config = Depends(get_config),
+    cache: DockerfileCache | None = Depends(get_response_cache),
+    flights: SingleFlight = Depends(get_inflight_generations),
+    priority: str = Depends(get_request_priority),
+    http_response: Response = None,
+    if_none_match: str | None = Header(None)
 ):
     """
     Generate a Dockerfile using AI suggestions, replacing the base image
     with the company-specific Harbor path.
+    Identical requests are answered from the response cache without calling the AI,
+    and identical concurrent requests share one AI call.
+
+    Responses carry a weak ETag derived from the normalized request and the active
+    configuration version (also sent as X-Config-Version). A request whose If-None-Match
+    matches it gets 304 Not Modified at once, without generating anything. Degraded
+    responses (template fallback while the AI circuit is open) get Cache-Control: no-store
+    and no ETag instead, so clients don't keep them once the AI recovers.
     """
     logger.info(f"Received request to generate Dockerfile for language: {request.language}, version: {request.version}")
-    try:
-        # Step 1: Determine generic base image (uses the FIXED function below)
-        generic_base_image = get_base_image(request.language, request.version) # Call the fixed function
-        logger.info(f"Determined generic base image: {generic_base_image}")
+    with metrics.RequestTracker("generate") as tracker:
+        try:
+            generic_base_image, harbor_path = _resolve_images(request, config, tracker)
+            request_key = make_request_key(request, harbor_path, DEFAULT_MODEL_NAME, config.version)
+            cache_headers = {"ETag": make_etag(request_key, request.generation_mode), "X-Config-Version": config.version}
+            if if_none_match and _etag_matches(if_none_match, cache_headers["ETag"]):
+                tracker.generator = "not_modified"
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+            # Steps 3-6: Cache lookup, AI generation and response
+            response = await _build_dockerfile_response(request, generic_base_image, harbor_path, config, cache, flights,
+                                                        priority, request_key)
+            tracker.generator = _generator_label(response)
+            if response.degraded:
+                cache_headers = {"Cache-Control": "no-store", "X-Config-Version": config.version}
+            http_response.headers.update(cache_headers)
+            return response
+        except (UnsupportedLanguageError, UnsupportedProviderError, TemplateNotAvailableError, AIAuthenticationError, AIConnectionError, AIServiceError, AIResponseError) as e:
+             raise e # Let specific errors bubble up to main handlers
+        except Exception as e:
+            logger.error(f"Unexpected internal error in generate_dockerfile endpoint: {e}", exc_info=True)
+            raise DockerfileGeneratorError(f"An unexpected internal server error occurred processing the request: {e}") from e
+
+
+async def generate_for_request(
+    request: DockerfileRequest,
+    config: Config,
+    cache: DockerfileCache | None,
+    flights: SingleFlight,
+    priority: str,
+    tracker: metrics.RequestTracker
+) -> DockerfileResponse:
+    """Steps of the generate endpoint, shared with asynchronous job workers; labels the tracker."""
+    generic_base_image, harbor_path = _resolve_images(request, config, tracker)
+
+    # Steps 3-6: Cache lookup, AI generation and response
+    response = await _build_dockerfile_response(request, generic_base_image, harbor_path, config, cache, flights,
+                                                priority)
+    tracker.generator = _generator_label(response)
+    return response
+
+
+def _resolve_images(request: DockerfileRequest, config: Config, tracker: metrics.RequestTracker) -> Tuple[str, str]:
+    """Steps 1-2: the generic base image and its Harbor path; sets the tracker's language."""
+    # Step 1: Determine generic base image (uses the FIXED function below)
+    with metrics.time_stage(metrics.STAGE_BASE_IMAGE):
+        generic_base_image = get_base_image(request.language, request.version, config.base_images)
+    tracker.language = config.base_images.canonical_language(request.language)
+    logger.info(f"Determined generic base image: {generic_base_image}")
 
-        # Step 2: Resolve Harbor path
+    # Step 2: Resolve Harbor path
+    with metrics.time_stage(metrics.STAGE_HARBOR_RESOLVE):
         harbor_path = config.resolve_harbor_path(generic_base_image)
-        logger.info(f"Resolved Harbor path: {harbor_path}")
+    logger.info(f"Resolved Harbor path: {harbor_path}")
+    return generic_base_image, harbor_path
 
-        # Step 3: Construct the prompt for the AI service
-        prompt = create_dockerfile_prompt(
-            language=request.language, version=request.version,
-            dependencies=request.dependencies, port=request.port,
-            app_type=request.app_type, additional_instructions=request.additional_instructions,
-            generic_base_image=generic_base_image
-        )
 
-        # Step 4: Call the AI service
-        logger.info("Requesting Dockerfile suggestion from AI service...")
-        ai_dockerfile_content = get_gemini_dockerfile_suggestion(prompt)
-        logger.info("Successfully received AI suggestion.")
-
-        # Step 5: Parse the AI response and replace the FROM line(s)
-        modified_lines = []
-        found_and_replaced = False
-        from_pattern = re.compile(r"^\s*FROM\s+(\S+)", re.IGNORECASE)
-        ai_lines = ai_dockerfile_content.splitlines()
-
-        for line in ai_lines:
-            match = from_pattern.match(line)
-            # Use case-insensitive comparison for robustness
-            if match and not found_and_replaced and match.group(1).strip().lower() == generic_base_image.lower():
-                modified_lines.append(f"FROM {harbor_path}")
-                found_and_replaced = True
-                logger.info(f"Replaced FROM line using generic image '{generic_base_image}' with Harbor path.")
-            else:
-                modified_lines.append(line)
-
-        if not found_and_replaced:
-            err_msg = f"AI response processed, but failed to find and replace the expected generic FROM line ('FROM {generic_base_image}'). Check AI output format."
-            logger.error(err_msg + f" Raw AI content: \n{ai_dockerfile_content}")
-            raise AIResponseError(err_msg)
-
-        final_dockerfile_content = "\n".join(modified_lines)
-
-        # Step 6: Return the successful response
-        logger.info(f"Successfully generated Dockerfile for language {request.language}.")
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match semantics: '*' or any listed tag, compared weakly (W/ prefixes ignored)."""
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+@router.post("/generate-dockerfiles:batch",
+             response_model=BatchDockerfileResponse,
+             responses={
+                 422: {"model": ErrorResponse, "description": "Invalid batch (empty, too many items, or malformed item)"},
+                 503: {"model": ErrorResponse, "description": "Service Unavailable (Config Error)"},
+             })
+async def generate_dockerfiles_batch(
+    batch: BatchDockerfileRequest,
+    config: Config = Depends(get_config),
+    cache: DockerfileCache | None = Depends(get_response_cache),
+    flights: SingleFlight = Depends(get_inflight_generations)
+):
+    """
+    Generate Dockerfiles for many requests in one call.
+
+    Identical items are generated once, base images and Harbor paths are resolved once
+    per distinct image, and distinct AI generations run concurrently (up to
+    BATCH_MAX_CONCURRENCY). Failures are reported per item: the call returns 200 with
+    status 'partial' (or 'error' if nothing succeeded) and an error entry for each failed
+    item. Batches that are empty or exceed BATCH_MAX_ITEMS are rejected with 422.
+    """
+    items = batch.requests
+    logger.info(f"Received batch request with {len(items)} Dockerfile requests.")
+    with metrics.RequestTracker("batch", count=False):
+        return await _generate_batch(items, config, cache, flights)
+
+
+async def _generate_batch(items: List[DockerfileRequest], config: Config, cache: DockerfileCache | None,
+                          flights: SingleFlight) -> BatchDockerfileResponse:
+    """Steps of the batch endpoint; failures are collected per item."""
+    outcomes: List[DockerfileResponse | ErrorResponse | None] = [None] * len(items)
+
+    # Step 1: Determine generic base images (failures are per item)
+    generic_images: Dict[int, str] = {}
+    for index, item in enumerate(items):
+        try:
+            with metrics.time_stage(metrics.STAGE_BASE_IMAGE):
+                generic_images[index] = get_base_image(item.language, item.version, config.base_images)
+        except Exception as e:
+            outcomes[index] = error_response_for(e)
+
+    # Step 2: Resolve each distinct generic image once (failures are per image)
+    harbor_paths: Dict[str, str] = {}
+    resolve_errors: Dict[str, ErrorResponse] = {}
+    for image in set(generic_images.values()):
+        try:
+            with metrics.time_stage(metrics.STAGE_HARBOR_RESOLVE):
+                harbor_paths[image] = config.resolve_harbor_path(image)
+        except Exception as e:
+            logger.warning(f"Batch could not resolve Harbor path for '{image}': {e}")
+            resolve_errors[image] = error_response_for(e)
+
+    # Step 3: De-duplicate by normalized request key
+    groups: Dict[str, List[int]] = {}
+    etags: Dict[int, str] = {}
+    for index, generic_image in generic_images.items():
+        if generic_image in resolve_errors:
+            outcomes[index] = resolve_errors[generic_image]
+            continue
+        key = make_request_key(items[index], harbor_paths[generic_image], DEFAULT_MODEL_NAME, config.version)
+        groups.setdefault(key, []).append(index)
+        etags[index] = make_etag(key, items[index].generation_mode)
+
+    # Step 4: Generate each distinct request, bounded by the batch concurrency limit
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def run_group(key: str, indexes: List[int]) -> Tuple[List[int], DockerfileResponse | ErrorResponse]:
+        first = indexes[0]
+        generic_image = generic_images[first]
+        async with semaphore:
+            try:
+                return indexes, await _build_dockerfile_response(
+                    items[first], generic_image, harbor_paths[generic_image], config, cache, flights, PRIORITY_BATCH, key
+                )
+            except Exception as e:
+                logger.warning(f"Batch item {first} failed: {e}")
+                return indexes, error_response_for(e)
+
+    for indexes, outcome in await asyncio.gather(*(run_group(key, indexes) for key, indexes in groups.items())):
+        for index in indexes:
+            outcomes[index] = outcome
+
+    # Step 5: Assemble per-item results in submission order
+    for index, outcome in enumerate(outcomes):
+        language = config.base_images.canonical_language(items[index].language) if index in generic_images else "unknown"
+        if isinstance(outcome, DockerfileResponse):
+            metrics.count_request("batch", language, "success", _generator_label(outcome))
+        else:
+            metrics.count_request("batch", language, outcome.error_code)
+    results = [
+        BatchItemResult(index=index, status="success", result=outcome,
+                        etag=None if outcome.degraded else etags[index])
+        if isinstance(outcome, DockerfileResponse)
+        else BatchItemResult(index=index, status="error", error=outcome)
+        for index, outcome in enumerate(outcomes)
+    ]
+    succeeded = sum(1 for r in results if r.status == "success")
+    failed = len(results) - succeeded
+    overall = "success" if failed == 0 else ("error" if succeeded == 0 else "partial")
+    logger.info(f"Batch finished: {succeeded} succeeded, {failed} failed, {len(groups)} unique requests.")
+    return BatchDockerfileResponse(
+        status=overall,
+        total=len(results),
+        succeeded=succeeded,
+        failed=failed,
+        unique_requests=len(groups),
+        config_version=config.version,
+        results=results
+    )
+
+
+@router.post("/generate-dockerfile:stream",
+             response_class=StreamingResponse,
+             responses={
+                 200: {"content": {"application/x-ndjson": {}},
+                       "description": "NDJSON events: metadata, chunk..., then done or error"},
+                 400: {"model": ErrorResponse, "description": "Invalid input (e.g., unsupported language)"},
+                 503: {"model": ErrorResponse, "description": "Service Unavailable (Config Error)"},
+             })
+async def generate_dockerfile_stream(
+    request: DockerfileRequest,
+    config: Config = Depends(get_config),
+    cache: DockerfileCache | None = Depends(get_response_cache),
+    priority: str = Depends(get_request_priority)
+):
+    """
+    Stream a generated Dockerfile as newline-delimited JSON events.
+
+    Events, one JSON object per line:
+    - {"type": "metadata", "base_image": {...}} as soon as the Harbor path is resolved
+    - {"type": "chunk", "content": "..."} as AI text arrives; the generic FROM line is
+      rewritten to the Harbor path as soon as it is complete
+    - {"type": "done", "status": "success", "cached": bool, "generator": "template"|"ai"} at the end
+      (AI streams add "warnings": validation problems that couldn't be fixed in flight), or
+      {"type": "error", "message": "...", "error_code": "..."} if generation fails mid-stream
+    Input errors (e.g. unsupported language) are returned as regular HTTP errors.
+    """
+    started = time.perf_counter()
+    logger.info(f"Received streaming request for language: {request.language}, version: {request.version}")
+    tracker = metrics.RequestTracker("stream")
+    try:
+        with metrics.time_stage(metrics.STAGE_BASE_IMAGE):
+            generic_base_image = get_base_image(request.language, request.version, config.base_images)
+        tracker.language = config.base_images.canonical_language(request.language)
+        with metrics.time_stage(metrics.STAGE_HARBOR_RESOLVE):
+            harbor_path = config.resolve_harbor_path(generic_base_image)
+        request_key = make_request_key(request, harbor_path, DEFAULT_MODEL_NAME, config.version)
+        with metrics.time_stage(metrics.STAGE_TEMPLATE_RENDER):
+            template_content = _render_template_for(request, harbor_path, config)
+        if request.provider and template_content is None:
+            ai_router.get_provider(request.provider)  # Reject unknown providers before streaming starts
+    except Exception as e:
+        tracker.finish(e)
+        raise
+
+    async def events() -> AsyncIterator[str]:
+        inner = _stream_events()
+        try:
+            async for event in inner:
+                yield event
+        finally:
+            await inner.aclose()
+            # Only still open if the client disconnected mid-stream
+            tracker.finish(outcome="cancelled")
+
+    async def _stream_events() -> AsyncIterator[str]:
+        yield _ndjson_event({
+            "type": "metadata",
+            "base_image": {"generic": generic_base_image, "harbor_path": harbor_path}
+        })
+
+        if template_content is not None:
+            tracker.generator = "template"
+            tracker.finish()
+            yield _ndjson_event({"type": "chunk", "content": template_content})
+            yield _ndjson_event({"type": "done", "status": "success", "cached": False, "generator": "template"})
+            return
+
+        with metrics.time_stage(metrics.STAGE_CACHE_LOOKUP):
+            cached_content = await cache.aget(request_key) if cache is not None else None
+        if cached_content is not None:
+            logger.info(f"Serving streamed Dockerfile for language {request.language} from response cache.")
+            tracker.generator = "cache"
+            tracker.finish()
+            yield _ndjson_event({"type": "chunk", "content": cached_content})
+            yield _ndjson_event({"type": "done", "status": "success", "cached": True, "generator": "ai"})
+            return
+
+        with metrics.time_stage(metrics.STAGE_PROMPT_BUILD):
+            prompt = create_dockerfile_prompt(
+                language=request.language, version=request.version,
+                dependencies=request.dependencies, port=request.port,
+                app_type=request.app_type, additional_instructions=request.additional_instructions,
+                generic_base_image=generic_base_image, package_manager=request.package_manager
+            )
+        rewriter = DockerfileProcessor(generic_base_image, harbor_path, resolve=config.resolve_harbor_path,
+                                       harbor_base_url=config.harbor_base_url)
+        first_chunk_sent = False
+        try:
+            async for text in stream_dockerfile_suggestion(prompt, provider=request.provider, priority=priority):
+                content = rewriter.feed(text)
+                if content:
+                    if not first_chunk_sent:
+                        first_chunk_sent = True
+                        metrics.STREAM_FIRST_CHUNK.observe(time.perf_counter() - started)
+                        logger.info(f"Streaming time to first content byte: {(time.perf_counter() - started) * 1000:.1f} ms")
+                    yield _ndjson_event({"type": "chunk", "content": content})
+            tail = rewriter.finish()
+            if tail:
+                yield _ndjson_event({"type": "chunk", "content": tail})
+
+            if not rewriter.base_image_found:
+                raise AIResponseError(f"AI response processed, but no stage uses the expected base image ('FROM {generic_base_image}'). Check AI output format.")
+            # Streamed text can't be corrected any more; report what the validator finds
+            problems = validate_dockerfile(rewriter, request.port, request.dependencies)
+            for problem in problems:
+                metrics.VALIDATION_PROBLEMS_TOTAL.labels(problem=problem.code, resolution="unresolved").inc()
+                logger.warning(f"Streamed Dockerfile problem: {problem.message}")
+
+            if cache is not None:
+                cache.set_nowait(request_key, rewriter.content)
+            logger.info(f"Streamed Dockerfile for language {request.language} in {(time.perf_counter() - started) * 1000:.1f} ms.")
+            tracker.generator = "ai"
+            tracker.finish()
+            yield _ndjson_event({"type": "done", "status": "success", "cached": False, "generator": "ai",
+                                 "warnings": [problem.message for problem in problems]})
+        except Exception as e:
+            logger.error(f"Streaming generation failed: {e}")
+            error = error_response_for(e)
+            tracker.finish(outcome=error.error_code)
+            yield _ndjson_event({"type": "error", "message": error.message, "error_code": error.error_code})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.get("/languages", response_model=dict)
+async def get_supported_languages(config: Config = Depends(get_config)):
+    """List the supported languages with their base image rules (default image, variants, aliases)."""
+    return {"config_version": config.version, "languages": config.base_images.describe()}
+
+
+@router.get("/ai/admission/stats", response_model=dict)
+async def get_admission_stats():
+    """Report AI admission control state: queue depth per priority, wait times and rejections."""
+    return admission_controller.stats()
+
+
+@router.get("/ai/resilience/stats", response_model=dict)
+async def get_ai_resilience_stats():
+    """Report the AI circuit breaker state per provider and retry counters."""
+    return get_resilience_stats()
+
+
+@router.get("/ai/providers", response_model=dict)
+async def get_ai_providers():
+    """Report the AI routing policy, hedging counters and recent latency/error rate per provider."""
+    return ai_router.stats()
+
+
+def _generator_label(response: DockerfileResponse) -> str:
+    return "cache" if response.cached else response.generator
+
+
+def _ndjson_event(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+
+def error_response_for(exc: Exception) -> ErrorResponse:
+    """Map an exception to the ErrorResponse the main exception handlers would return."""
+    if isinstance(exc, DockerfileGeneratorError):
+        return ErrorResponse(status="error", message=exc.message, error_code=exc.error_code)
+    if isinstance(exc, AIConnectionError):
+        return ErrorResponse(status="error", message="The AI service is currently unavailable or rate limited. Please try again later.", error_code="AI_SERVICE_UNAVAILABLE")
+    if isinstance(exc, AIAuthenticationError):
+        return ErrorResponse(status="error", message="AI service authentication failed. Please contact the administrator.", error_code="AI_AUTH_ERROR")
+    if isinstance(exc, AIServiceError):
+        return ErrorResponse(status="error", message=str(exc), error_code="AI_SERVICE_ERROR")
+    logger.error(f"Unexpected error generating a Dockerfile: {exc}", exc_info=exc)
+    return ErrorResponse(status="error", message="An unexpected internal server error occurred.", error_code="UNEXPECTED_SERVER_ERROR")
+
+
+async def _build_dockerfile_response(
+    request: DockerfileRequest,
+    generic_base_image: str,
+    harbor_path: str,
+    config: Config,
+    cache: DockerfileCache | None,
+    flights: SingleFlight,
+    priority: str = PRIORITY_INTERACTIVE,
+    request_key: str | None = None
+) -> DockerfileResponse:
+    """
+    Produce the response for a request whose base image and Harbor path are already resolved
+    (request_key: the caller's make_request_key for it, if already computed).
+    Renders a local template when one covers the request (unless generation_mode is 'ai').
+    Otherwise serves from the response cache when possible, and identical concurrent
+    requests share one in-flight AI generation.
+    """
+    # Step 3a: Deterministic template fast path (no AI call)
+    with metrics.time_stage(metrics.STAGE_TEMPLATE_RENDER):
+        template_content = _render_template_for(request, harbor_path, config)
+    if template_content is not None:
+        logger.info(f"Rendered Dockerfile for language {request.language} from local template.")
         return DockerfileResponse(
             status="success",
-            dockerfile_content=final_dockerfile_content,
+            dockerfile_content=template_content,
             base_image=BaseImage(
                 generic=generic_base_image,
                 harbor_path=harbor_path
+            ),
+            generator="template"
+        )
+
+    # Step 3b: Serve from the response cache if this request was generated before
+    if request_key is None:
+        request_key = make_request_key(request, harbor_path, DEFAULT_MODEL_NAME, config.version)
+    if cache is not None:
+        with metrics.time_stage(metrics.STAGE_CACHE_LOOKUP):
+            cached_content = await cache.aget(request_key)
+        if cached_content is not None:
+            logger.info(f"Serving Dockerfile for language {request.language} from response cache.")
+            return DockerfileResponse(
+                status="success",
+                dockerfile_content=cached_content,
+                base_image=BaseImage(
+                    generic=generic_base_image,
+                    harbor_path=harbor_path
+                ),
+                cached=True
             )
+
+    # Steps 4-5: Prompt, AI call, FROM rewrite and validation (coalesced per request key)
+    async def generate_and_cache() -> str:
+        content = await _generate_with_ai(request, generic_base_image, harbor_path, config, priority)
+        if cache is not None:
+            cache.set_nowait(request_key, content)
+        return content
+
+    try:
+        final_dockerfile_content = await flights.do(request_key, generate_and_cache)
+    except AICircuitOpenError:
+        # Upstream is unhealthy: degrade to a local template when one covers the request
+        fallback_content = render_template_dockerfile(
+            request, harbor_path, config.base_images.canonical_language(request.language)
+        )
+        if fallback_content is None:
+            raise
+        logger.warning(f"AI circuit open; serving template fallback for language {request.language}.")
+        return DockerfileResponse(
+            status="success",
+            dockerfile_content=fallback_content,
+            base_image=BaseImage(
+                generic=generic_base_image,
+                harbor_path=harbor_path
+            ),
+            generator="template",
+            degraded=True
         )
 
-    except (UnsupportedLanguageError, AIAuthenticationError, AIConnectionError, AIServiceError, AIResponseError) as e:
-         raise e # Let specific errors bubble up to main handlers
-    except Exception as e:
-        logger.error(f"Unexpected internal error in generate_dockerfile endpoint: {e}", exc_info=True)
-        raise DockerfileGeneratorError(f"An unexpected internal server error occurred processing the request: {e}") from e
+    # Step 6: Return the successful response
+    logger.info(f"Successfully generated Dockerfile for language {request.language}.")
+    return DockerfileResponse(
+        status="success",
+        dockerfile_content=final_dockerfile_content,
+        base_image=BaseImage(
+            generic=generic_base_image,
+            harbor_path=harbor_path
+        )
+    )
 
 
-# --- FIXED Helper function to determine generic base image name ---
-def get_base_image(language: str, version: str = None) -> str:
+def _render_template_for(request: DockerfileRequest, harbor_path: str, config: Config) -> str | None:
     """
-    Determine the appropriate generic base image name based on language and version.
-    Handles different language conventions and defaults intelligently.
-    Raises UnsupportedLanguageError if language is not mapped.
+    Apply the request's generation_mode to the template fast path.
+    Returns rendered content, or None when the AI should be used.
+    Raises TemplateNotAvailableError if a template is required but none applies.
     """
-    lang_lower = language.lower()
-
-    # --- Python Logic ---
-    if lang_lower == "python":
-        if not version:
-            image = "python:3.11-slim" # Default Python version if none provided
-        # Check if user explicitly asked for a variant in the version string
-        elif "-slim" in version or "-alpine" in version or "-buster" in version: # Add other common variants
-             image = f"python:{version}" # Use the provided version directly
-        else: # Assume slim if no variant specified by user
-            image = f"python:{version}-slim"
-
-    # --- Node Logic ---
-    elif lang_lower == "node":
-        if not version:
-            image = "node:18-alpine" # Default Node version
-        # Check if user explicitly asked for a variant
-        elif "-alpine" in version or "-slim" in version or "-buster" in version: # Add other common variants
-             image = f"node:{version}" # Use the provided version directly
-        else: # Assume alpine if no variant specified
-             image = f"node:{version}-alpine"
-
-    # --- Java Logic ---
-    elif lang_lower == "java":
-        if not version:
-             image = "openjdk:17-jdk-slim" # Default Java
-        # Check if user explicitly asked for a variant
-        elif "-jre" in version or "-jdk" in version or "-slim" in version: # Add other common variants
-             image = f"openjdk:{version}" # Use directly (base name is openjdk)
-        else: # Assume jdk-slim otherwise
-             image = f"openjdk:{version}-jdk-slim"
-
-    # --- Go Logic ---
-    elif lang_lower == "go":
-        if not version:
-             image = "golang:1.20-alpine" # Default Go
-        # Check if user explicitly asked for alpine
-        elif "-alpine" in version:
-             image = f"golang:{version}" # Use directly
-        else: # Assume alpine otherwise
-             image = f"golang:{version}-alpine"
-
-    # --- Rust Logic ---
-    elif lang_lower == "rust":
-        if not version:
-             image = "rust:1.68" # Default Rust
-        else:
-             image = f"rust:{version}" # Rust tags usually don't have variants like slim/alpine
+    if request.generation_mode == "ai":
+        return None
+    content = render_template_dockerfile(request, harbor_path, config.base_images.canonical_language(request.language))
+    if content is None and request.generation_mode == "template":
+        raise TemplateNotAvailableError(request.language, request.app_type)
+    return content
+
+
+async def _generate_with_ai(request: DockerfileRequest, generic_base_image: str, harbor_path: str,
+                           config: Config, priority: str = PRIORITY_INTERACTIVE) -> str:
+    """
+    Build the prompt, call the AI service, rewrite the stage base images to Harbor paths
+    and validate the result. Problems with a deterministic fix are fixed locally; the rest
+    are sent back to the AI in a targeted follow-up prompt, at most AI_REPAIR_MAX_ATTEMPTS
+    times. Raises AIResponseError if, in the end, no stage uses the requested base image.
+    """
+    # Construct the prompt for the AI service
+    with metrics.time_stage(metrics.STAGE_PROMPT_BUILD):
+        prompt = create_dockerfile_prompt(
+            language=request.language, version=request.version,
+            dependencies=request.dependencies, port=request.port,
+            app_type=request.app_type, additional_instructions=request.additional_instructions,
+            generic_base_image=generic_base_image, package_manager=request.package_manager
+        )
+
+    # Call the AI service
+    logger.info("Requesting Dockerfile suggestion from AI service...")
+    with metrics.time_stage(metrics.STAGE_AI_CALL):
+        ai_dockerfile_content = await generate_dockerfile_suggestion(prompt, provider=request.provider, priority=priority)
+    logger.info("Successfully received AI suggestion.")
+
+    attempt, sent_codes = 0, set()
+    while True:
+        with metrics.time_stage(metrics.STAGE_FROM_REWRITE):
+            content, problems = _postprocess_ai_output(ai_dockerfile_content, generic_base_image, harbor_path, config,
+                                                       request.port, request.dependencies)
+        if attempt > 0:
+            still_open = {problem.code for problem in problems}
+            for code in sent_codes - still_open:
+                metrics.VALIDATION_PROBLEMS_TOTAL.labels(problem=code, resolution="ai").inc()
+            metrics.AI_REPAIR_ATTEMPTS_TOTAL.labels(outcome="failed" if problems else "fixed").inc()
+        if not problems or attempt >= AI_REPAIR_MAX_ATTEMPTS:
+            break
+
+        # Targeted follow-up: send the problems and the AI's own output back, not the full request
+        attempt += 1
+        sent_codes = {problem.code for problem in problems}
+        repair_prompt = create_repair_prompt(ai_dockerfile_content, [problem.message for problem in problems],
+                                             generic_base_image)
+        logger.info(f"AI repair attempt {attempt}/{AI_REPAIR_MAX_ATTEMPTS} for {', '.join(sorted(sent_codes))} "
+                    f"(prompt {len(repair_prompt)} chars; full generation prompt {len(prompt)} chars).")
+        try:
+            with metrics.time_stage(metrics.STAGE_AI_REPAIR):
+                ai_dockerfile_content = await generate_dockerfile_suggestion(repair_prompt, provider=request.provider,
+                                                                             priority=priority)
+        except AIServiceError as e:
+            metrics.AI_REPAIR_ATTEMPTS_TOTAL.labels(outcome="error").inc()
+            logger.warning(f"AI repair attempt {attempt} failed: {e}")
+            break
+
+    for problem in problems:
+        metrics.VALIDATION_PROBLEMS_TOTAL.labels(problem=problem.code, resolution="unresolved").inc()
+        logger.warning(f"Generated Dockerfile problem left unresolved: {problem.message}")
+    if any(problem.code == PROBLEM_BASE_IMAGE for problem in problems):
+        err_msg = f"AI response processed, but no stage uses the expected base image ('FROM {generic_base_image}'). Check AI output format."
+        logger.error("%s Raw AI content: \n%s", err_msg, truncate(ai_dockerfile_content))
+        raise AIResponseError(err_msg)
+    return content
+
 
-    # --- Add other languages as needed ---
-    # Example:
-    # elif lang_lower == "ruby":
-    #    # ... add logic for ruby ...
+def _postprocess_ai_output(ai_dockerfile_content: str, generic_base_image: str, harbor_path: str,
+                           config: Config | None = None, port: int | None = None,
+                           dependencies: List[str] | None = None) -> Tuple[str, List[ValidationProblem]]:
+    """
+    Run the AI output through the Dockerfile processor in one pass (drop code fences, point
+    every stage's base image at its Harbor path), validate it against the request and apply
+    the local fixes. Returns the content and the problems that still need the AI.
+    """
+    processor = process_dockerfile(
+        ai_dockerfile_content, generic_base_image, harbor_path,
+        resolve=config.resolve_harbor_path if config is not None else None,
+        harbor_base_url=config.harbor_base_url if config is not None else None
+    )
+    problems = validate_dockerfile(processor, port, dependencies)
+    if not problems:
+        return processor.content, problems
+    content, fixed, remaining = apply_local_fixes(processor.content, problems, harbor_path, port)
+    for problem in fixed:
+        metrics.VALIDATION_PROBLEMS_TOTAL.labels(problem=problem.code, resolution="local").inc()
+        logger.info(f"Fixed generated Dockerfile locally: {problem.message}")
+    return content, remaining
+
+
+@router.get("/cache/stats", response_model=CacheStatsResponse,
+            responses={404: {"model": ErrorResponse, "description": "Response cache is disabled"}})
+async def get_cache_stats(cache: DockerfileCache | None = Depends(get_response_cache)):
+    """Report hit/miss counters for the Dockerfile response cache."""
+    if cache is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Response cache is disabled.")
+    return CacheStatsResponse(**cache.stats())
 
-    else:
-        # Language not explicitly handled above
-        raise UnsupportedLanguageError(language=language)
 
-    logger.debug(f"Mapping language '{language}' version '{version}' to generic base image '{image}'")
-    return image
\ No newline at end of file
+# --- Helper function to determine generic base image name ---
+def get_base_image(language: str, version: str = None, table: BaseImageTable | None = None) -> str:
+    """
+    Determine the generic base image name for a language and version from the
+    base image table (the active config's table, or the built-in rules).
+    Raises UnsupportedLanguageError if language is not mapped.
+    """
+    return (table or default_base_images).select(language, version)
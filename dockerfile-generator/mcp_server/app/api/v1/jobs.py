@@ -0,0 +1,87 @@
+# mcp_server/app/api/v1/jobs.py
+
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Response, status
+
+from app.api.v1.docker_file import error_response_for, generate_for_request, get_request_priority
+from app.config import get_config
+from app.core.cache import get_response_cache
+from app.core.jobs import (
+    FINISHED_STATES, JOB_POLL_INTERVAL_SECONDS, Job, JobQueue, get_job_queue, job_payload, resolve_webhook_target
+)
+from app.core.singleflight import get_inflight_generations
+from app.core import metrics
+from app.models.request import DockerfileRequest, JobRequest
+from app.models.response import ErrorResponse, JobResponse
+from app.utils.exceptions import JobNotFoundError
+from app.utils.logger import logger
+
+router = APIRouter()
+
+
+@router.post("/jobs",
+             response_model=JobResponse,
+             status_code=status.HTTP_202_ACCEPTED,
+             responses={
+                 400: {"model": ErrorResponse, "description": "Webhook URL not allowed"},
+                 422: {"model": ErrorResponse, "description": "Invalid request"},
+                 503: {"model": ErrorResponse, "description": "Job queue is full"},
+             })
+async def submit_job(
+    request: JobRequest,
+    response: Response,
+    queue: JobQueue = Depends(get_job_queue),
+    priority: str = Depends(get_request_priority)
+):
+    """
+    Queue a Dockerfile generation and return its job ID at once (202 Accepted).
+
+    Poll GET /api/v1/jobs/{job_id} (the Location header) until the status is 'succeeded'
+    or 'failed', or pass webhook_url to receive the finished job as a POST. Finished jobs
+    are kept for JOB_RESULT_TTL_SECONDS. Input errors such as an unsupported language are
+    reported as a failed job, the same way the generate endpoint reports them.
+
+    Webhooks must be https and resolve to public addresses, or match
+    JOB_WEBHOOK_ALLOWED_HOSTS; other URLs are rejected with 400.
+    """
+    if request.webhook_url:
+        await resolve_webhook_target(str(request.webhook_url))
+    job = await queue.submit(request.model_dump(mode="json", exclude={"webhook_url"}), priority,
+                       str(request.webhook_url) if request.webhook_url else None)
+    response.headers["Location"] = f"/api/v1/jobs/{job.id}"
+    return job_payload(job)
+
+
+@router.get("/jobs/stats", response_model=dict)
+async def get_job_stats(queue: JobQueue = Depends(get_job_queue)):
+    """Jobs held by the job store, by status."""
+    return await queue.stats()
+
+
+@router.get("/jobs/{job_id}",
+            response_model=JobResponse,
+            responses={404: {"model": ErrorResponse, "description": "Unknown job, or its result expired"}})
+async def get_job(job_id: str, response: Response, queue: JobQueue = Depends(get_job_queue)):
+    """Status of a job, with its result or error once finished. Unfinished jobs carry a Retry-After hint."""
+    job = await queue.get(job_id)
+    if job is None:
+        raise JobNotFoundError(job_id)
+    if job.status not in FINISHED_STATES:
+        response.headers["Retry-After"] = str(max(1, round(JOB_POLL_INTERVAL_SECONDS)))
+    return job_payload(job)
+
+
+async def run_generation_job(job: Job) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Job handler for the worker pool: generate the job's Dockerfile and return (result, error)."""
+    tracker = metrics.RequestTracker("job")
+    try:
+        request = DockerfileRequest.model_validate(job.request)
+        result = await generate_for_request(request, get_config(), get_response_cache(), get_inflight_generations(),
+                                            job.priority, tracker)
+    except Exception as e:
+        tracker.finish(e)
+        logger.warning(f"Job {job.id} failed: {e}")
+        return None, error_response_for(e).model_dump()
+    tracker.finish()
+    return result.model_dump(), None
@@ -1,13 +1,24 @@
 # mcp_server/app/config.py (Updated for Day 12)
 
 import os
+import time
+import signal
+import asyncio
+import hashlib
 import yaml
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from app.utils.logger import logger
 from fastapi import HTTPException, status # Keep for get_config
 
 # Import the custom exception
 from app.utils.exceptions import ConfigurationError
+from app.core.base_images import BaseImageTable, default_base_images
+
+# Upper bound on memoized resolve_harbor_path results per Config instance
+HARBOR_RESOLVE_CACHE_SIZE = int(os.getenv("HARBOR_RESOLVE_CACHE_SIZE", "4096"))
+# Seconds between checks of the mapping file for changes (0 disables the watcher)
+CONFIG_WATCH_INTERVAL_SECONDS = float(os.getenv("CONFIG_WATCH_INTERVAL_SECONDS", "5"))
 
 class Config:
     def __init__(self, config_path: str = "harbor_mapping.yaml"):
@@ -17,8 +28,21 @@ class Config:
         """
         self.harbor_base_url: str = ""
         self.mappings: Dict[str, str] = {}
+        # Language -> generic base image rules (built-ins merged with the 'base_images' section)
+        self.base_images: BaseImageTable = default_base_images
+        # Snapshot identity: content hash of the loaded file and load time
+        self.config_path: str = ""
+        self.version: str = ""
+        self.loaded_at: float = 0.0
+        # Precompiled resolution index (built by _build_index after load)
+        self._base_url_prefix: str = ""
+        self._exact_index: Dict[str, str] = {}
+        self._base_name_index: Dict[str, Tuple[str, bool]] = {}
+        # Bounded memo of resolved paths, bound per instance
+        self._resolve_memo = lru_cache(maxsize=HARBOR_RESOLVE_CACHE_SIZE)(self._resolve_uncached)
 
         effective_config_path = os.environ.get("HARBOR_MAPPING_PATH", config_path)
+        self.config_path = effective_config_path
         logger.info(f"Attempting to load configuration from: {effective_config_path}")
 
         try:
@@ -41,7 +65,10 @@ class Config:
         """
         try:
             with open(file_path, "r") as file:
-                config_data = yaml.safe_load(file)
+                raw_content = file.read()
+                config_data = yaml.safe_load(raw_content)
+                self.version = hashlib.sha256(raw_content.encode("utf-8")).hexdigest()[:12]
+                self.loaded_at = time.time()
                 if not config_data:
                     logger.warning(f"Configuration file '{file_path}' is empty.")
                     # Treat empty file same as missing base URL - critical
@@ -57,12 +84,20 @@ class Config:
                      logger.info(f"Harbor Base URL set to: {self.harbor_base_url}")
 
                 # Extract mappings (Warn if missing, but don't fail startup for this)
-                self.mappings = config_data.get("mappings", {})
+                self.mappings = config_data.get("mappings") or {}
+                if not isinstance(self.mappings, dict):
+                    raise ConfigurationError(f"'mappings' in '{file_path}' must be a mapping of image names to Harbor paths.")
                 if not self.mappings:
                     logger.warning(f"No image mappings found in configuration file: {file_path}")
                 else:
                     logger.info(f"Loaded {len(self.mappings)} image mappings.")
 
+                self._build_index()
+
+                # Base image rules (optional section; built-in rules apply without it)
+                self.base_images = BaseImageTable.from_config(config_data.get("base_images"))
+                logger.info(f"Loaded base image rules for {len(self.base_images)} languages.")
+
         except FileNotFoundError as e:
             err_msg = f"Configuration file not found at '{file_path}'."
             logger.critical(err_msg)
@@ -78,55 +113,72 @@ class Config:
             raise ConfigurationError(err_msg) from e # WRAP
 
 
+    def _build_index(self):
+        """
+        Precompile the mappings into lookup tables so resolution is O(1) with no
+        per-call string formatting:
+        - _exact_index: normalized key -> fully resolved Harbor path (tag applied)
+        - _base_name_index: key -> (pre-joined Harbor path, path already has a tag)
+        """
+        self._base_url_prefix = self.harbor_base_url.rstrip('/')
+        self._exact_index = {}
+        self._base_name_index = {}
+        for generic_name, harbor_specific_part in self.mappings.items():
+            key = str(generic_name).strip()
+            joined = f"{self._base_url_prefix}/{str(harbor_specific_part).strip().lstrip('/')}"
+            part_has_tag = ":" in str(harbor_specific_part)
+            # Exact table: an untagged key and untagged path resolve to ':latest'
+            if ":" not in key and not part_has_tag:
+                self._exact_index[key] = f"{joined}:latest"
+            else:
+                self._exact_index[key] = joined
+            # Base-name table: only untagged keys can match by base name
+            if ":" not in key:
+                self._base_name_index[key] = (joined, part_has_tag)
+        self._resolve_memo.cache_clear()
+        logger.info(f"Built Harbor resolution index ({len(self._exact_index)} exact, {len(self._base_name_index)} base-name entries).")
+
     def resolve_harbor_path(self, generic_image_name: str) -> str:
         """
         Resolve a generic image name to a full Harbor-specific path.
-        (Logic unchanged for Day 12, but could raise HarborPathNotFoundError if needed)
+        Lookups go through the precompiled index and a bounded memo of results.
         """
         if not self.harbor_base_url:
             # This state shouldn't be reachable if __init__ raises ConfigurationError correctly
             logger.error(f"BUG: Attempted to resolve path for '{generic_image_name}' but harbor_base_url is not set.")
             # Raise an error here as well, as it indicates a problem
             raise ConfigurationError("Cannot resolve path: harbor_base_url is missing, configuration load likely failed.")
+        return self._resolve_memo(generic_image_name.strip())
 
-        # Determine base_name and tag first
-        input_has_tag = ":" in generic_image_name
-        if input_has_tag:
-            parts = generic_image_name.split(":", 1)
-            base_name = parts[0]
-            tag = parts[1]
-        else:
-            base_name = generic_image_name
-            tag = "latest" # Default tag if none provided
-
+    def _resolve_uncached(self, generic_image_name: str) -> str:
+        """Resolve a normalized image name against the index (memoized by resolve_harbor_path)."""
         # 1. Check for exact match (image:tag or image_without_tag)
-        if generic_image_name in self.mappings:
-            harbor_specific_part = self.mappings[generic_image_name]
-            if not input_has_tag and ":" not in harbor_specific_part:
-                 full_path = f"{self.harbor_base_url.rstrip('/')}/{harbor_specific_part.lstrip('/')}:{tag}"
-                 logger.debug(f"Exact mapping found for '{generic_image_name}', appended default tag '{tag}': {full_path}")
-            else:
-                 full_path = f"{self.harbor_base_url.rstrip('/')}/{harbor_specific_part.lstrip('/')}"
-                 logger.debug(f"Exact mapping found for '{generic_image_name}': {full_path}")
-            return full_path
+        exact = self._exact_index.get(generic_image_name)
+        if exact is not None:
+            logger.debug("Exact mapping found for '%s': %s", generic_image_name, exact)
+            return exact
+
+        # Determine base_name and tag
+        base_name, _, tag = generic_image_name.partition(":")
+        tag = tag or "latest" # Default tag if none provided
 
         # 2. Check for base name match only if exact match failed
-        if base_name in self.mappings:
-            harbor_specific_part = self.mappings[base_name]
-            if ":" in harbor_specific_part:
-                full_path = f"{self.harbor_base_url.rstrip('/')}/{harbor_specific_part.lstrip('/')}"
-                logger.debug(f"Base name mapping for '{base_name}' found (path includes tag): {full_path}")
-            else:
-                full_path = f"{self.harbor_base_url.rstrip('/')}/{harbor_specific_part.lstrip('/')}:{tag}"
-                logger.debug(f"Base name mapping for '{base_name}' found, appending tag '{tag}': {full_path}")
+        base_entry = self._base_name_index.get(base_name)
+        if base_entry is not None:
+            joined, part_has_tag = base_entry
+            full_path = joined if part_has_tag else f"{joined}:{tag}"
+            logger.debug("Base name mapping for '%s' found: %s", base_name, full_path)
             return full_path
 
         # 3. No mapping found - construct default path
         logger.warning(f"No mapping found for '{generic_image_name}'. Constructing default path using 'library' scope.")
-        default_path = f"{self.harbor_base_url.rstrip('/')}/library/{base_name}:{tag}"
         # If reaching here without finding any mapping isn't allowed, you would:
         # raise HarborPathNotFoundError(image_name=generic_image_name)
-        return default_path
+        return f"{self._base_url_prefix}/library/{base_name}:{tag}"
+
+    def resolve_cache_info(self):
+        """Return hit/miss statistics of the resolve_harbor_path memo."""
+        return self._resolve_memo.cache_info()
 
 
 # == Dependency Injection Setup ==
@@ -153,4 +205,103 @@ def get_config() -> Config:
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Server configuration is unavailable. Please check server startup logs."
         )
-    return config
\ No newline at end of file
+    return config
+
+# == Hot Reload ==
+# Each Config is an immutable snapshot. Reloading builds a new snapshot off the
+# request path and swaps the module-level reference; requests already holding
+# the old snapshot keep using it until they finish.
+_reload_status: Dict[str, Any] = {
+    "reload_count": 0,
+    "failed_reloads": 0,
+    "last_reload_at": None,
+    "last_reload_ms": None,
+    "last_error": None,
+}
+
+
+def reload_config(config_path: Optional[str] = None) -> Config:
+    """
+    Load and validate the mapping file into a new Config, then atomically swap it in.
+    Raises ConfigurationError if the file is invalid; the current snapshot stays active.
+    """
+    global config
+    path = config_path or (config.config_path if config is not None else "harbor_mapping.yaml")
+    start = time.perf_counter()
+    try:
+        new_config = Config(config_path=path)
+    except ConfigurationError as e:
+        _reload_status["failed_reloads"] += 1
+        _reload_status["last_error"] = str(e)
+        logger.error(f"Configuration reload failed, keeping version {config.version if config else None}: {e}")
+        raise
+
+    previous_version = config.version if config is not None else None
+    config = new_config
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _reload_status["reload_count"] += 1
+    _reload_status["last_reload_at"] = new_config.loaded_at
+    _reload_status["last_reload_ms"] = round(elapsed_ms, 3)
+    _reload_status["last_error"] = None
+    logger.info(f"Configuration reloaded from '{path}': version {previous_version} -> {new_config.version} in {elapsed_ms:.1f} ms.")
+    return new_config
+
+
+async def reload_config_async() -> Optional[Config]:
+    """Run reload_config in a worker thread. Returns None (after logging) if the reload failed."""
+    try:
+        return await asyncio.to_thread(reload_config)
+    except ConfigurationError:
+        return None
+
+
+def _file_signature(path: str) -> Optional[Tuple[float, int, int]]:
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (stat_result.st_mtime, stat_result.st_size, stat_result.st_ino)
+
+
+async def watch_config_file(interval: float = CONFIG_WATCH_INTERVAL_SECONDS) -> None:
+    """
+    Poll the mapping file and reload when its mtime/size/inode changes.
+    Polling (rather than inotify) also catches Kubernetes ConfigMap symlink swaps.
+    """
+    if config is None:
+        logger.warning("Configuration watcher not started: no configuration is loaded.")
+        return
+    path = config.config_path
+    last_signature = _file_signature(path)
+    logger.info(f"Watching '{path}' for configuration changes every {interval}s.")
+    while True:
+        await asyncio.sleep(interval)
+        signature = _file_signature(path)
+        if signature is not None and signature != last_signature:
+            last_signature = signature
+            await reload_config_async()
+
+
+def install_sighup_reload_handler() -> bool:
+    """Reload the configuration on SIGHUP. Returns False where signals are unsupported."""
+    try:
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(reload_config_async()))
+    except (AttributeError, NotImplementedError, RuntimeError, ValueError) as e:
+        logger.warning(f"SIGHUP configuration reload unavailable: {e}")
+        return False
+    logger.info("SIGHUP triggers a configuration reload.")
+    return True
+
+
+def get_config_status() -> Dict[str, Any]:
+    """Return the active configuration version and reload statistics."""
+    return {
+        "version": config.version if config is not None else None,
+        "config_path": config.config_path if config is not None else None,
+        "loaded_at": config.loaded_at if config is not None else None,
+        "mappings": len(config.mappings) if config is not None else 0,
+        "base_image_languages": len(config.base_images) if config is not None else 0,
+        **_reload_status,
+    }
@@ -0,0 +1,283 @@
+# mcp_server/app/core/ai_router.py
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from app.core.ai_service import (
+    GEMINI_PROVIDER,
+    AIConnectionError,
+    AIServiceError,
+    call_with_resilience,
+    estimate_tokens,
+    stream_with_resilience
+)
+from app.core.providers import AIProvider, build_providers
+from app.core.rate_limiter import PRIORITY_INTERACTIVE
+from app.core.resilience import CIRCUIT_OPEN
+from app.core.metrics import AI_CALLS_IN_FLIGHT, AI_ERRORS_TOTAL
+from app.core.tracing import detached_span, start_span
+from app.utils.exceptions import UnsupportedProviderError
+from app.utils.logger import logger
+
+# --- Routing settings (environment overridable) ---
+# Providers the router may pick from when a request doesn't name one, in preference order
+AI_PROVIDERS = [name.strip().lower() for name in os.getenv("AI_PROVIDERS", GEMINI_PROVIDER).split(",") if name.strip()]
+# 'primary': first healthy provider in AI_PROVIDERS order
+# 'latency': lowest recent p95 latency
+# 'error_rate': lowest recent error rate, then lowest p95
+AI_ROUTING_POLICY = os.getenv("AI_ROUTING_POLICY", "primary").strip().lower()
+# Send a second (hedged) request if the first hasn't answered after this many seconds (0 disables)
+AI_HEDGE_DELAY_SECONDS = float(os.getenv("AI_HEDGE_DELAY_SECONDS", "0"))
+# Number of recent calls per provider used for the latency and error statistics
+AI_ROUTING_WINDOW = int(os.getenv("AI_ROUTING_WINDOW", "100"))
+
+ROUTING_POLICIES = ("primary", "latency", "error_rate")
+
+
+class LatencyTracker:
+    """Rolling window of (latency, success) samples per provider."""
+
+    def __init__(self, window: int = 100):
+        self.window = window
+        self._samples: Dict[str, Deque[Tuple[float, bool]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider_name: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            samples = self._samples.get(provider_name)
+            if samples is None:
+                samples = self._samples[provider_name] = deque(maxlen=self.window)
+            samples.append((seconds, ok))
+
+    def p95(self, provider_name: str) -> float:
+        """p95 latency of successful calls in the window (0.0 without successful samples)."""
+        with self._lock:
+            latencies = sorted(seconds for seconds, ok in self._samples.get(provider_name, ()) if ok)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def error_rate(self, provider_name: str) -> float:
+        with self._lock:
+            samples = list(self._samples.get(provider_name, ()))
+        if not samples:
+            return 0.0
+        return sum(1 for _, ok in samples if not ok) / len(samples)
+
+    def sample_count(self, provider_name: str) -> int:
+        with self._lock:
+            return len(self._samples.get(provider_name, ()))
+
+
+class AIRouter:
+    """
+    Picks an AI provider per call and hedges slow calls.
+
+    A request may name a provider explicitly; otherwise the router ranks the configured
+    providers in its pool by the routing policy, skipping those whose circuit breaker is
+    open. Providers without samples rank first under the latency policies, so a new
+    backend gets traffic and builds up statistics.
+
+    With hedging enabled, if the chosen provider hasn't answered after hedge_delay
+    seconds, the same prompt is sent to the next-ranked provider (or again to the same
+    one if it is the only candidate); the first successful answer wins and the other
+    call is abandoned.
+    """
+
+    def __init__(self, providers: Dict[str, AIProvider], pool: List[str], policy: str = "primary",
+                 hedge_delay: float = 0.0, tracker: Optional[LatencyTracker] = None):
+        if policy not in ROUTING_POLICIES:
+            logger.warning(f"Unknown AI routing policy '{policy}'; using 'primary'.")
+            policy = "primary"
+        unknown = [name for name in pool if name not in providers]
+        if unknown:
+            logger.warning(f"Ignoring unknown AI providers in routing pool: {', '.join(unknown)}")
+        self.providers = providers
+        self.pool = [name for name in pool if name in providers]
+        self.policy = policy
+        self.hedge_delay = hedge_delay
+        self.tracker = tracker or LatencyTracker()
+        # Counters
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.failovers = 0
+
+    def get_provider(self, name: str) -> AIProvider:
+        provider = self.providers.get(name.strip().lower())
+        if provider is None:
+            raise UnsupportedProviderError(name, sorted(self.providers))
+        if not provider.is_configured:
+            raise UnsupportedProviderError(name, sorted(self.providers), configured=False)
+        return provider
+
+    def candidates(self, preferred: Optional[str] = None) -> List[AIProvider]:
+        """Providers to try for a call, best first."""
+        if preferred:
+            return [self.get_provider(preferred)]
+        configured = [self.providers[name] for name in self.pool if self.providers[name].is_configured]
+        if not configured:
+            # Nothing usable: keep the pool order so the first provider reports why
+            return [self.providers[name] for name in self.pool[:1]] or [self.providers[GEMINI_PROVIDER]]
+        healthy = [provider for provider in configured if provider.breaker.state != CIRCUIT_OPEN]
+        ranked = healthy or configured
+        if self.policy == "latency":
+            ranked = sorted(ranked, key=self._latency_key)
+        elif self.policy == "error_rate":
+            ranked = sorted(ranked, key=lambda p: (self.tracker.error_rate(p.name), self._latency_key(p)))
+        return ranked
+
+    async def generate(self, prompt: str, provider: Optional[str] = None,
+                       priority: str = PRIORITY_INTERACTIVE) -> str:
+        """Generate with the best provider, hedging to the runner-up if it is slow and failing over if it fails fast."""
+        ranked = self.candidates(provider)
+        primary = ranked[0]
+        if self.hedge_delay <= 0:
+            return await self._call(primary, prompt, priority)
+        backup = ranked[1] if len(ranked) > 1 else primary
+        return await self._hedged(primary, backup, prompt, priority)
+
+    async def stream(self, prompt: str, provider: Optional[str] = None,
+                     priority: str = PRIORITY_INTERACTIVE) -> AsyncIterator[str]:
+        """Stream from the best provider. Streams are not hedged: text may already be on its way to the client."""
+        chosen = self.candidates(provider)[0]
+        logger.info(f"Routing streamed AI call to provider '{chosen.name}'.")
+        started = time.perf_counter()
+        span = detached_span("ai.stream", self._span_attributes(chosen, prompt))
+        in_flight = AI_CALLS_IN_FLIGHT.labels(provider=chosen.name)
+        in_flight.inc()
+        response_chars = chunks = 0
+        try:
+            async for text in stream_with_resilience(chosen.stream, prompt, priority, chosen.breaker):
+                response_chars += len(text)
+                chunks += 1
+                yield text
+        except AIServiceError as e:
+            span.record_exception(e)
+            self._record_failure(chosen, e, time.perf_counter() - started)
+            raise
+        finally:
+            in_flight.dec()
+            span.set_attribute("ai.response_chars", response_chars)
+            span.set_attribute("ai.chunks", chunks)
+            span.end()
+        self.tracker.record(chosen.name, time.perf_counter() - started, True)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "policy": self.policy,
+            "pool": self.pool,
+            "hedge_delay_seconds": self.hedge_delay,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "failovers": self.failovers,
+            "providers": {
+                name: {
+                    **provider.describe(),
+                    "in_pool": name in self.pool,
+                    "circuit_state": provider.breaker.state,
+                    "samples": self.tracker.sample_count(name),
+                    "p95_ms": round(self.tracker.p95(name) * 1000, 3),
+                    "error_rate": round(self.tracker.error_rate(name), 4),
+                }
+                for name, provider in sorted(self.providers.items())
+            },
+        }
+
+    # --- Internal helpers ---
+
+    def _latency_key(self, provider: AIProvider) -> float:
+        """p95 for ranking: unsampled providers first, providers with only failures last."""
+        if self.tracker.sample_count(provider.name) == 0:
+            return 0.0
+        p95 = self.tracker.p95(provider.name)
+        return p95 if p95 > 0 else float("inf")
+
+    async def _call(self, provider: AIProvider, prompt: str, priority: str, hedge: bool = False) -> str:
+        logger.info(f"Routing AI call to provider '{provider.name}'.")
+        started = time.perf_counter()
+        in_flight = AI_CALLS_IN_FLIGHT.labels(provider=provider.name)
+        in_flight.inc()
+        with start_span("ai.generate", self._span_attributes(provider, prompt)) as span:
+            span.set_attribute("ai.hedge", hedge)
+            try:
+                result = await call_with_resilience(provider.generate, prompt, priority, provider.breaker)
+            except AIServiceError as e:
+                self._record_failure(provider, e, time.perf_counter() - started)
+                raise
+            finally:
+                in_flight.dec()
+            span.set_attribute("ai.response_chars", len(result))
+        self.tracker.record(provider.name, time.perf_counter() - started, True)
+        return result
+
+    @staticmethod
+    def _span_attributes(provider: AIProvider, prompt: str) -> Dict[str, object]:
+        return {
+            "ai.provider": provider.name,
+            "ai.model": provider.model_name,
+            "ai.prompt_chars": len(prompt),
+            "ai.prompt_tokens_estimate": estimate_tokens(prompt),
+        }
+
+    def _record_failure(self, provider: AIProvider, error: AIServiceError, seconds: float) -> None:
+        """Count the error by class; only availability errors count against the provider's routing score."""
+        AI_ERRORS_TOTAL.labels(provider=provider.name, error=type(error).__name__).inc()
+        if isinstance(error, AIConnectionError):
+            self.tracker.record(provider.name, seconds, False)
+
+    async def _hedged(self, primary: AIProvider, backup: AIProvider, prompt: str, priority: str) -> str:
+        first = asyncio.create_task(self._call(primary, prompt, priority))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            if first.exception() is None or backup is primary:
+                return first.result()
+            # Failed fast: fail over instead of waiting for a hedge
+            self.failovers += 1
+            logger.warning(f"AI call to '{primary.name}' failed ({first.exception()}); failing over to '{backup.name}'.")
+            return await self._call(backup, prompt, priority, hedge=True)
+
+        self.hedges_sent += 1
+        logger.info(f"AI call to '{primary.name}' slower than {self.hedge_delay:.2f}s; hedging to '{backup.name}'.")
+        second = asyncio.create_task(self._call(backup, prompt, priority, hedge=True))
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+# == Shared instance ==
+ai_router = AIRouter(
+    providers=build_providers(),
+    pool=AI_PROVIDERS,
+    policy=AI_ROUTING_POLICY,
+    hedge_delay=AI_HEDGE_DELAY_SECONDS,
+    tracker=LatencyTracker(AI_ROUTING_WINDOW)
+)
+
+
+async def generate_dockerfile_suggestion(prompt: str, provider: Optional[str] = None,
+                                         priority: str = PRIORITY_INTERACTIVE) -> str:
+    """Generate Dockerfile text through the shared router (explicit provider or routing policy)."""
+    return await ai_router.generate(prompt, provider=provider, priority=priority)
+
+
+async def stream_dockerfile_suggestion(prompt: str, provider: Optional[str] = None,
+                                       priority: str = PRIORITY_INTERACTIVE) -> AsyncIterator[str]:
+    """Stream Dockerfile text through the shared router."""
+    async for text in ai_router.stream(prompt, provider=provider, priority=priority):
+        yield text
@@ -1,12 +1,35 @@
 # mcp_server/app/core/ai_service.py (Corrected Exception Handling for Google Gemini)
 
 import os
+import time
+import asyncio
+import contextvars
+import threading
+from datetime import timedelta
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
+from google.generativeai import caching
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from google.api_core import exceptions as google_exceptions # Import Google exceptions
 from dotenv import load_dotenv
-from typing import List, Optional # Import these for the example prompt function
-from app.utils.logger import logger
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+from app.utils.logger import logger, log_payload
+from app.core import metrics
+# Prompt builders live in app.core.prompts; re-exported here for existing callers
+from app.core.prompts import (  # noqa: F401
+    CHARS_PER_TOKEN,
+    SYSTEM_PROMPT,
+    count_tokens,
+    create_dockerfile_prompt,
+    create_repair_prompt,
+    split_prompt
+)
+from app.core.rate_limiter import (
+    admission_controller,
+    AdmissionRejectedError
+)
+from app.core import resilience
 
 # Load environment variables from .env file
 load_dotenv()
@@ -27,10 +50,55 @@ else:
         logger.error(f"Failed to configure Google Generative AI client: {e}", exc_info=True)
         # is_configured remains False
 
+# Provider name of the Gemini backend (see app.core.providers)
+GEMINI_PROVIDER = "gemini"
+
+# Gemini model used for Dockerfile generation
+DEFAULT_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "models/gemini-1.5-pro-latest")
+
+# --- Concurrency settings for the async AI path ---
+# Maximum number of Gemini calls in flight at once per worker process.
+# The blocking SDK call runs on this bounded pool so the event loop stays free.
+# A call that times out keeps its thread until the SDK returns, and keeps its slot too
+# (see run_on_ai_executor), so abandoned calls count against this limit.
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "32"))
+_ai_executor: Optional[ThreadPoolExecutor] = None
+_ai_slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+_ai_threads_busy = 0 # Blocking calls holding a slot, including ones their caller gave up on
+_ai_threads_lock = threading.Lock()
+metrics.AI_EXECUTOR_BUSY.set_function(lambda: _ai_threads_busy)
+
+# --- Shared, precomputed request options (built once, reused by every call) ---
+SAFETY_SETTINGS = MappingProxyType({
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+})
+GENERATION_CONFIG = genai.types.GenerationConfig(temperature=0.3)
+
+# Expected response size, added to the prompt estimate for tokens-per-minute budgeting
+AI_EXPECTED_OUTPUT_TOKENS = int(os.getenv("AI_EXPECTED_OUTPUT_TOKENS", "800"))
+
+# Warm up the default model client during application startup
+AI_WARMUP_ON_STARTUP = os.getenv("AI_WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Store the shared system prompt as Gemini cached content for this many seconds (0 disables).
+# Gemini only caches prefixes above a model-specific minimum size and needs an explicit model
+# version; when caching is refused the system prompt is sent as a system instruction instead.
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "0"))
+
+# Ready-to-use model clients per (model name, system instruction), with the time
+# (time.monotonic) at which each must be rebuilt because its cached content expires
+_model_registry: Dict[Tuple[str, Optional[str]], Tuple[genai.GenerativeModel, float]] = {}
+_model_registry_lock = threading.Lock()
+
 # --- Define Custom Exceptions (can reuse from previous OpenAI version) ---
 class AIServiceError(Exception):
     """Base exception for AI service errors."""
-    pass
+    def __init__(self, message: str = ""):
+        self.message = message
+        super().__init__(message)
 
 class AIConnectionError(AIServiceError):
     """Raised for connection or availability issues with the AI service."""
@@ -40,14 +108,101 @@ class AIAuthenticationError(AIServiceError):
     """Raised for authentication issues with the AI service."""
     pass
 
+class AIRateLimitError(AIConnectionError):
+    """Raised when admission control rejects a call (wait queue full or deadline passed)."""
+    pass
+
+class AICircuitOpenError(AIConnectionError):
+    """Raised without calling upstream while the circuit breaker is open."""
+    pass
+
+# --- Model client registry ---
+def get_model(model_name: str = DEFAULT_MODEL_NAME, system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+    """
+    Return the shared GenerativeModel for model_name and system_instruction, creating it
+    on first use. The model carries the shared safety settings and generation config, so
+    callers don't rebuild them per request.
+    """
+    key = (model_name, system_instruction)
+    entry = _model_registry.get(key)
+    if entry is None or entry[1] <= time.monotonic():
+        with _model_registry_lock:
+            entry = _model_registry.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                entry = _create_model(model_name, system_instruction)
+                _model_registry[key] = entry
+    return entry[0]
+
+
+def _create_model(model_name: str, system_instruction: Optional[str]) -> Tuple[genai.GenerativeModel, float]:
+    """Build a model client, on cached content for the system instruction when enabled."""
+    if system_instruction and GEMINI_CONTEXT_CACHE_TTL_SECONDS > 0:
+        try:
+            cached = caching.CachedContent.create(
+                model=model_name, system_instruction=system_instruction,
+                ttl=timedelta(seconds=GEMINI_CONTEXT_CACHE_TTL_SECONDS)
+            )
+            model = genai.GenerativeModel.from_cached_content(
+                cached, safety_settings=SAFETY_SETTINGS, generation_config=GENERATION_CONFIG
+            )
+            logger.info(f"Created Gemini model client for '{model_name}' on cached system prompt '{cached.name}'.")
+            # Rebuild shortly before the cached content expires
+            return model, time.monotonic() + GEMINI_CONTEXT_CACHE_TTL_SECONDS * 0.9
+        except Exception as e:
+            logger.warning(f"Gemini context caching unavailable for '{model_name}'; "
+                           f"sending the system prompt with each request: {e}")
+    model = genai.GenerativeModel(
+        model_name,
+        safety_settings=SAFETY_SETTINGS,
+        generation_config=GENERATION_CONFIG,
+        system_instruction=system_instruction
+    )
+    logger.info(f"Created Gemini model client for '{model_name}'.")
+    return model, float("inf")
+
+
+def _usage_count(usage: Any, field: str) -> int:
+    value = getattr(usage, field, None)
+    return value if isinstance(value, int) else 0
+
+
+def _record_gemini_usage(usage: Any, prompt: str, output_chars: int) -> None:
+    """Record token metrics from Gemini usage metadata, or estimates when it is missing."""
+    input_tokens = _usage_count(usage, "prompt_token_count")
+    if not input_tokens:
+        output_tokens = (output_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+        metrics.record_ai_tokens(GEMINI_PROVIDER, count_tokens(prompt), output_tokens)
+        return
+    metrics.record_ai_tokens(GEMINI_PROVIDER, input_tokens, _usage_count(usage, "candidates_token_count"),
+                             _usage_count(usage, "cached_content_token_count"))
+
+
+def warm_up_ai_client(model_name: str = DEFAULT_MODEL_NAME) -> bool:
+    """
+    Create the model client and make one cheap call (count_tokens) so the
+    underlying gRPC channel is connected before the first user request.
+    Returns True on success; failures are logged and never raised.
+    """
+    if not is_configured:
+        logger.warning("Skipping AI warm-up: Google Generative AI client is not configured.")
+        return False
+    try:
+        get_model(model_name, SYSTEM_PROMPT).count_tokens("warm-up")
+        logger.info(f"AI client warm-up for '{model_name}' completed.")
+        return True
+    except Exception as e:
+        logger.warning(f"AI client warm-up for '{model_name}' failed: {e}")
+        return False
+
+
 # --- Function to call Gemini API ---
-def get_gemini_dockerfile_suggestion(prompt: str, model_name: str = "models/gemini-1.5-pro-latest") -> str:
+def get_gemini_dockerfile_suggestion(prompt: str, model_name: str = DEFAULT_MODEL_NAME) -> str:
     """
     Sends a prompt to the Google Gemini API and returns the AI's response text.
 
     Args:
-        prompt: The detailed prompt for the AI.
-        model_name: The Gemini model to use (default: gemini-pro).
+        prompt: The detailed prompt for the AI; the system part of a Prompt is sent as the system instruction.
+        model_name: The Gemini model to use (default: DEFAULT_MODEL_NAME).
 
     Returns:
         The content of the AI's response as a string.
@@ -62,27 +217,15 @@ def get_gemini_dockerfile_suggestion(prompt: str, model_name: str = "models/gemi
         raise AIServiceError("Google client is not configured. Check API key and logs.")
 
     logger.info(f"Sending prompt to Google Gemini model: {model_name}")
-    logger.debug(f"Prompt:\n---\n{prompt}\n---")
+    log_payload(logger, "Prompt", prompt)
 
     try:
-        model = genai.GenerativeModel(model_name)
-
-        # Configure safety settings
-        safety_settings = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        }
+        # Reuse the shared client (safety settings, generation config and system prompt are baked in)
+        system, user = split_prompt(prompt)
+        model = get_model(model_name, system)
 
         # Make the API call
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.3
-            ),
-            safety_settings=safety_settings
-        )
+        response = model.generate_content(user)
 
         # Check if the response was blocked or didn't generate text
         if not response.candidates:
@@ -93,82 +236,283 @@ def get_gemini_dockerfile_suggestion(prompt: str, model_name: str = "models/gemi
 
         # Extract text
         ai_content = response.text
+        _record_gemini_usage(getattr(response, "usage_metadata", None), prompt, len(ai_content))
 
         logger.info("Received response from Google Gemini.")
-        logger.debug(f"Raw AI Response Content:\n---\n{ai_content}\n---")
+        log_payload(logger, "Raw AI Response Content", ai_content)
 
         # Simple cleaning
         cleaned_content = ai_content.strip().removeprefix("```dockerfile").removesuffix("```").strip()
 
         return cleaned_content
 
+    except AIServiceError:
+        raise # Already translated (e.g., blocked response)
+    except Exception as e:
+        raise _to_ai_error(e) from e
+
+
+def _to_ai_error(e: Exception) -> AIServiceError:
+    """
+    Translate an exception from the Google SDK into our AI exception hierarchy.
+    Shared by the regular and streaming call paths.
+    """
     # --- CORRECTED Exception Handling ---
-    except google_exceptions.PermissionDenied as e:
+    if isinstance(e, AIServiceError):
+        return e
+    if isinstance(e, google_exceptions.PermissionDenied):
         logger.error(f"Google API Permission Denied Error: {e}")
-        raise AIAuthenticationError(f"Google API authentication failed (Permission Denied). Check your API key and permissions. Original error: {e}") from e
-    except google_exceptions.ResourceExhausted as e:
-         logger.error(f"Google API Rate Limit/Quota Error: {e}")
-         raise AIConnectionError(f"Google API rate limit or quota exceeded. Original error: {e}") from e
-    except google_exceptions.ServiceUnavailable as e: # CORRECTED: Use ServiceUnavailable
-         logger.error(f"Google API Service Unavailable Error: {e}")
-         raise AIConnectionError(f"Google API service is unavailable. Please try again later. Original error: {e}") from e
-    except google_exceptions.InvalidArgument as e: # ADDED: Catch invalid arguments
+        return AIAuthenticationError(f"Google API authentication failed (Permission Denied). Check your API key and permissions. Original error: {e}")
+    if isinstance(e, google_exceptions.ResourceExhausted):
+        logger.error(f"Google API Rate Limit/Quota Error: {e}")
+        return AIConnectionError(f"Google API rate limit or quota exceeded. Original error: {e}")
+    if isinstance(e, google_exceptions.ServiceUnavailable): # CORRECTED: Use ServiceUnavailable
+        logger.error(f"Google API Service Unavailable Error: {e}")
+        return AIConnectionError(f"Google API service is unavailable. Please try again later. Original error: {e}")
+    if isinstance(e, google_exceptions.InvalidArgument): # ADDED: Catch invalid arguments
         logger.error(f"Google API Invalid Argument Error: {e}")
-        raise AIServiceError(f"Invalid argument provided to Google API (e.g., model name, safety setting). Original error: {e}") from e
-    except google_exceptions.GoogleAPIError as e: # Catch-all for other Google errors
+        return AIServiceError(f"Invalid argument provided to Google API (e.g., model name, safety setting). Original error: {e}")
+    if isinstance(e, google_exceptions.GoogleAPIError): # Catch-all for other Google errors
         logger.error(f"Google API Error: {e}")
-        raise AIServiceError(f"A Google API error occurred: {e}") from e
-    except Exception as e:
-        # Catch any other unexpected errors
-        logger.error(f"Unexpected error during Google Gemini API call: {e}", exc_info=True)
-        raise AIServiceError(f"An unexpected error occurred while contacting the Google AI service: {e}") from e
+        return AIServiceError(f"A Google API error occurred: {e}")
+    # Catch any other unexpected errors
+    logger.error(f"Unexpected error during Google Gemini API call: {e}", exc_info=e)
+    return AIServiceError(f"An unexpected error occurred while contacting the Google AI service: {e}")
     # --- End of CORRECTED Exception Handling ---
 
 
-# --- Example Basic Prompt Construction (Same as before, generally compatible) ---
-# The actual prompt will be built dynamically in the API endpoint (Day 7).
-def create_dockerfile_prompt(
-    language: str,
-    version: Optional[str] = None,
-    dependencies: Optional[List[str]] = None,
-    port: Optional[int] = None,
-    app_type: Optional[str] = None,
-    additional_instructions: Optional[str] = None,
-    generic_base_image: str = "GENERIC_BASE_IMAGE_PLACEHOLDER" # Placeholder for base image
-) -> str:
-    """
-    Constructs a basic prompt for the AI Dockerfile generation.
-    (This is an example; the real logic might live in the endpoint or another helper)
-    """
-    prompt_lines = [
-        f"Generate a concise and best-practice Dockerfile for a '{language}' application."
-    ]
-    if version:
-        prompt_lines.append(f"Use language version '{version}'.")
-    if app_type:
-        prompt_lines.append(f"The application type is '{app_type}'.")
-
-    # IMPORTANT: Tell the AI to use the *generic* name, we will replace it later
-    prompt_lines.append(f"Use the base image '{generic_base_image}'. Do not use any registry prefix in the FROM line.")
-
-    if dependencies:
-        deps_str = ", ".join(dependencies)
-        if language.lower() == "python":
-             prompt_lines.append(f"The application requires these dependencies: {deps_str}. Install them using pip, preferably from a requirements.txt file.")
-        elif language.lower() == "node":
-             prompt_lines.append(f"The application requires these dependencies: {deps_str}. Install them using npm from a package.json file.")
-        else:
-            prompt_lines.append(f"The application requires these dependencies: {deps_str}.")
-
-    if port:
-        prompt_lines.append(f"The application needs to expose port {port}.")
-
-    prompt_lines.append("Ensure the Dockerfile copies necessary application code (e.g., using `COPY . .`).")
-    prompt_lines.append("Set a reasonable default command (CMD or ENTRYPOINT) to run the application.")
-
-    if additional_instructions:
-        prompt_lines.append(f"Follow these additional instructions: {additional_instructions}")
-
-    prompt_lines.append("\nOutput only the raw Dockerfile content, without any explanation or markdown formatting like ```dockerfile.")
-
-    return "\n".join(prompt_lines)
\ No newline at end of file
+# --- Async wrapper used by the API endpoints ---
+def _get_ai_executor() -> ThreadPoolExecutor:
+    """Lazily create the bounded thread pool that runs blocking Gemini calls."""
+    global _ai_executor
+    if _ai_executor is None:
+        _ai_executor = ThreadPoolExecutor(
+            max_workers=AI_MAX_CONCURRENCY,
+            thread_name_prefix="gemini-call"
+        )
+        logger.info(f"AI executor started with max concurrency {AI_MAX_CONCURRENCY}.")
+    return _ai_executor
+
+
+def _get_ai_slots(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    """The slot semaphore of the running event loop (one per loop, e.g. per test)."""
+    global _ai_slots
+    if _ai_slots is None or _ai_slots[0] is not loop:
+        _ai_slots = (loop, asyncio.Semaphore(AI_MAX_CONCURRENCY))
+    return _ai_slots[1]
+
+
+def _set_threads_busy(delta: int) -> None:
+    global _ai_threads_busy
+    with _ai_threads_lock:
+        _ai_threads_busy += delta
+
+
+async def run_on_ai_executor(call: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a blocking call on the AI executor, holding one of its AI_MAX_CONCURRENCY slots
+    until the call actually returns.
+
+    asyncio.wait_for can stop waiting for a call but can't stop its thread. The slot
+    is released by the thread itself, so a timed-out call still counts until the SDK
+    gives up, and new calls wait here (inside the caller's deadline) instead of
+    queueing unseen behind busy threads. The call runs in a copy of the caller's
+    context, so its log records carry the request's trace id.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _get_ai_slots(loop)
+    await slots.acquire()
+
+    def release() -> None:
+        _set_threads_busy(-1)
+        try:
+            loop.call_soon_threadsafe(slots.release)
+        except RuntimeError:
+            pass # Loop already closed
+
+    def run() -> Any:
+        try:
+            return call(*args)
+        finally:
+            release()
+
+    _set_threads_busy(1)
+    try:
+        future = _get_ai_executor().submit(contextvars.copy_context().run, run)
+    except BaseException:
+        release()
+        raise
+    # Cancelled before a thread picked it up: run() never executes, so release here
+    future.add_done_callback(lambda f: release() if f.cancelled() else None)
+    return await asyncio.wrap_future(future)
+
+
+async def warm_up_ai_client_async(model_name: str = DEFAULT_MODEL_NAME) -> bool:
+    """Run warm_up_ai_client on the AI executor without blocking the event loop."""
+    return await run_on_ai_executor(warm_up_ai_client, model_name)
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Token estimate of the prompt (see count_tokens) plus the expected output size."""
+    return count_tokens(prompt) + AI_EXPECTED_OUTPUT_TOKENS
+
+
+async def _admit(prompt: str, priority: str) -> None:
+    """Wait for admission control; translate rejections into AIRateLimitError."""
+    try:
+        waited = await admission_controller.acquire(estimate_tokens(prompt), priority)
+    except AdmissionRejectedError as e:
+        logger.warning(f"AI call rejected by admission control ({e.reason}): {e}")
+        raise AIRateLimitError(str(e)) from e
+    if waited > 0:
+        logger.info(f"AI call admitted after waiting {waited * 1000:.0f} ms ({priority} priority).")
+
+
+async def call_with_resilience(call: Callable[[str], str], prompt: str, priority: str,
+                               breaker: resilience.CircuitBreaker) -> str:
+    """
+    Run a blocking provider call (prompt -> text) from async code.
+
+    Each attempt first passes admission control (rate limits and a priority wait queue,
+    see app.core.rate_limiter), then runs the blocking call on a bounded thread
+    pool (AI_MAX_CONCURRENCY workers, see run_on_ai_executor), so the event loop keeps
+    serving other requests (e.g. /health) while the provider works.
+
+    Transient failures (AIConnectionError: unavailable, quota, attempt timeout) are
+    retried with decorrelated jitter within AI_REQUEST_DEADLINE_SECONDS, and feed the
+    provider's circuit breaker (see app.core.resilience). While the breaker is open the
+    call fails fast with AICircuitOpenError. Raises the same exceptions as the sync
+    call, plus AIRateLimitError if admission is rejected.
+    """
+    policy = resilience.ai_retry_policy
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + resilience.AI_REQUEST_DEADLINE_SECONDS
+    delay = policy.base_delay
+
+    for attempt in range(1, policy.max_attempts + 1):
+        if not breaker.allow_request():
+            raise AICircuitOpenError("AI service circuit breaker is open after repeated upstream failures. Failing fast.")
+        try:
+            await _admit(prompt, priority)
+        except AIRateLimitError:
+            breaker.release_trial()
+            raise
+        try:
+            remaining = max(0.0, deadline - loop.time())
+            result = await asyncio.wait_for(run_on_ai_executor(call, prompt), remaining)
+            breaker.record_success()
+            return result
+        except asyncio.CancelledError:
+            # Abandoned by the caller (e.g. a hedged call that lost): no verdict on upstream health
+            breaker.release_trial()
+            raise
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            policy.exhausted += 1
+            raise AIConnectionError(f"AI request exceeded its {resilience.AI_REQUEST_DEADLINE_SECONDS:.0f}s deadline.") from None
+        except AIConnectionError as e:
+            breaker.record_failure()
+            delay = policy.next_delay(delay)
+            if attempt == policy.max_attempts or loop.time() + delay >= deadline:
+                policy.exhausted += 1
+                raise
+            policy.retries += 1
+            logger.warning(f"Transient AI error on attempt {attempt}/{policy.max_attempts}; retrying in {delay:.2f}s: {e}")
+            await asyncio.sleep(delay)
+        except AIServiceError:
+            # Authentication, invalid argument, blocked output: retrying won't help.
+            # The upstream answered, so this doesn't count against the breaker.
+            breaker.record_success()
+            raise
+
+
+def iter_gemini_stream(prompt: str, model_name: str = DEFAULT_MODEL_NAME) -> Iterator[str]:
+    """
+    Blocking iterator over the text chunks of a streamed Gemini response.
+    Raw chunks are yielded as-is (no markdown cleaning).
+    """
+    if not is_configured:
+        logger.error("Google Generative AI client is not configured. Cannot make AI calls.")
+        raise AIServiceError("Google client is not configured. Check API key and logs.")
+    logger.info(f"Streaming prompt to Google Gemini model: {model_name}")
+    system, user = split_prompt(prompt)
+    response = get_model(model_name, system).generate_content(user, stream=True)
+    usage, output_chars = None, 0
+    for chunk in response:
+        if not chunk.candidates:
+            block_reason = chunk.prompt_feedback.block_reason if chunk.prompt_feedback else "Unknown"
+            raise AIServiceError(f"AI response was blocked or empty. Reason: {block_reason}.")
+        usage = getattr(chunk, "usage_metadata", None) or usage  # Complete on the last chunk
+        text = chunk.text
+        if text:
+            output_chars += len(text)
+            yield text
+    _record_gemini_usage(usage, prompt, output_chars)
+
+
+async def stream_with_resilience(open_stream: Callable[[str], Iterator[str]], prompt: str, priority: str,
+                                 breaker: resilience.CircuitBreaker) -> AsyncIterator[str]:
+    """
+    Consume a blocking provider stream (prompt -> iterator of text chunks) from async code.
+
+    The blocking iterator runs on the AI executor and hands chunks to the event loop
+    through a queue; callers post-process them incrementally. If the consumer stops
+    early, the producer thread stops at the next chunk. Streams are not retried (text
+    may already have reached the client), but they pass admission control and report
+    to the provider's circuit breaker.
+    """
+    if not breaker.allow_request():
+        raise AICircuitOpenError("AI service circuit breaker is open after repeated upstream failures. Failing fast.")
+    try:
+        await _admit(prompt, priority)
+    except AIRateLimitError:
+        breaker.release_trial()
+        raise
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop_requested = threading.Event()
+    end_of_stream = object()
+
+    def produce():
+        try:
+            for text in open_stream(prompt):
+                if stop_requested.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, text)
+            loop.call_soon_threadsafe(queue.put_nowait, end_of_stream)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, _to_ai_error(e))
+
+    producer = asyncio.ensure_future(run_on_ai_executor(produce))
+    finished = False
+    try:
+        while True:
+            item = await queue.get()
+            if item is end_of_stream:
+                break
+            if isinstance(item, AIServiceError):
+                finished = True
+                if isinstance(item, AIConnectionError):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise item
+            yield item
+        await producer
+        finished = True
+        breaker.record_success()
+    finally:
+        stop_requested.set()
+        if not producer.done():
+            producer.cancel() # Still waiting for a slot; a running thread stops at its next chunk
+        if not finished:
+            breaker.release_trial()
+
+
+def shutdown_ai_executor() -> None:
+    """Stop the AI thread pool (called on application shutdown)."""
+    global _ai_executor
+    if _ai_executor is not None:
+        _ai_executor.shutdown(wait=False, cancel_futures=True)
+        _ai_executor = None
+        logger.info("AI executor shut down.")
@@ -0,0 +1,203 @@
+# mcp_server/app/core/base_images.py
+
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils.exceptions import ConfigurationError, UnsupportedLanguageError
+from app.utils.logger import logger
+
+# Upper bound on memoized (language, version) -> image results per table
+BASE_IMAGE_CACHE_SIZE = int(os.getenv("BASE_IMAGE_CACHE_SIZE", "1024"))
+
+# Built-in language -> generic base image rules. The 'base_images' section of the
+# mapping file can override fields of these entries, add languages, or remove one
+# by setting it to null.
+#   image:           repository of the generic base image
+#   default_version: tag used when the request has no version
+#   default_variant: suffix appended to a bare version ('3.11' -> '3.11-slim')
+#   variants:        markers that mean the version already names a variant; used verbatim
+#   aliases:         other names accepted for the language
+DEFAULT_BASE_IMAGES: Dict[str, Dict[str, Any]] = {
+    "python": {"image": "python", "default_version": "3.11", "default_variant": "slim",
+               "variants": ["slim", "alpine", "buster", "bullseye", "bookworm"], "aliases": ["py", "python3"]},
+    "node": {"image": "node", "default_version": "18", "default_variant": "alpine",
+             "variants": ["alpine", "slim", "buster", "bullseye", "bookworm"],
+             "aliases": ["nodejs", "javascript", "js", "typescript", "ts"]},
+    "java": {"image": "openjdk", "default_version": "17", "default_variant": "jdk-slim",
+             "variants": ["jre", "jdk", "slim"], "aliases": ["jdk"]},
+    "go": {"image": "golang", "default_version": "1.20", "default_variant": "alpine",
+           "variants": ["alpine", "bookworm", "bullseye"], "aliases": ["golang"]},
+    "rust": {"image": "rust", "default_version": "1.68", "variants": ["slim", "alpine", "bookworm", "bullseye"]},
+    "ruby": {"image": "ruby", "default_version": "3.3", "default_variant": "slim",
+             "variants": ["slim", "alpine", "bookworm", "bullseye"], "aliases": ["rb", "rails"]},
+    "php": {"image": "php", "default_version": "8.3", "default_variant": "fpm-alpine",
+            "variants": ["fpm", "cli", "apache", "zts", "alpine"]},
+    "dotnet": {"image": "mcr.microsoft.com/dotnet/sdk", "default_version": "8.0",
+               "variants": ["alpine", "jammy", "bookworm", "noble"], "aliases": ["csharp", "c#", ".net", "fsharp"]},
+    "elixir": {"image": "elixir", "default_version": "1.16", "default_variant": "slim",
+               "variants": ["slim", "alpine", "otp"], "aliases": ["ex", "phoenix"]},
+    "erlang": {"image": "erlang", "default_version": "26", "default_variant": "slim",
+               "variants": ["slim", "alpine"]},
+    "kotlin": {"image": "gradle", "default_version": "8.7", "default_variant": "jdk17",
+               "variants": ["jdk", "alpine", "focal", "jammy"], "aliases": ["kt"]},
+    "perl": {"image": "perl", "default_version": "5.38", "default_variant": "slim",
+             "variants": ["slim", "threaded", "bookworm", "bullseye"]},
+    "swift": {"image": "swift", "default_version": "5.10", "default_variant": "slim",
+              "variants": ["slim", "jammy", "focal", "amazonlinux", "rhel"]},
+    "dart": {"image": "dart", "default_version": "3.3", "variants": ["sdk"], "aliases": ["flutter"]},
+    "haskell": {"image": "haskell", "default_version": "9.8", "default_variant": "slim",
+                "variants": ["slim", "buster", "bullseye"]},
+    "bun": {"image": "oven/bun", "default_version": "1.1", "default_variant": "alpine",
+            "variants": ["alpine", "slim", "debian", "distroless"]},
+}
+
+_RULE_FIELDS = {"image", "default_version", "default_variant", "variants", "aliases"}
+
+
+class BaseImageRule:
+    """How one language turns a requested version into a generic base image name."""
+
+    __slots__ = ("language", "image", "default_version", "default_variant", "variants", "aliases", "_variant_pattern")
+
+    def __init__(self, language: str, image: str, default_version: str, default_variant: Optional[str] = None,
+                 variants: Iterable[str] = (), aliases: Iterable[str] = ()):
+        self.language = language
+        self.image = image
+        self.default_version = default_version
+        self.default_variant = default_variant
+        self.variants = list(variants)
+        self.aliases = list(aliases)
+        # One precompiled scan instead of a substring test per variant
+        self._variant_pattern = None
+        if self.variants:
+            alternation = "|".join(re.escape(v) for v in sorted(self.variants, key=len, reverse=True))
+            self._variant_pattern = re.compile(f"(?:^|-)(?:{alternation})")
+
+    def image_for(self, version: Optional[str]) -> str:
+        """Generic image for a normalized version (None -> the default version)."""
+        if not version:
+            version = self.default_version
+        elif self._variant_pattern is not None and self._variant_pattern.search(version):
+            return f"{self.image}:{version}"  # The request already names a variant
+        if self.default_variant:
+            return f"{self.image}:{version}-{self.default_variant}"
+        return f"{self.image}:{version}"
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "image": self.image,
+            "default_version": self.default_version,
+            "default_variant": self.default_variant,
+            "variants": self.variants,
+            "aliases": self.aliases,
+            "default_image": self.image_for(None),
+        }
+
+
+class BaseImageTable:
+    """
+    Precompiled language -> base image rules.
+
+    Language names and aliases share one lookup dict, and results are memoized per
+    (language, version), so selection is a dict hit on the hot path. A table is
+    immutable; a configuration reload builds a new one with the new Config snapshot.
+    """
+
+    def __init__(self, rules: Iterable[BaseImageRule]):
+        self._rules: Dict[str, BaseImageRule] = {}
+        self._lookup: Dict[str, BaseImageRule] = {}
+        for rule in rules:
+            self._rules[rule.language] = rule
+            for name in [rule.language, *rule.aliases]:
+                key = name.strip().lower()
+                existing = self._lookup.get(key)
+                if existing is not None and existing is not rule:
+                    raise ConfigurationError(
+                        f"Base image name '{name}' is used by both '{existing.language}' and '{rule.language}'.")
+                self._lookup[key] = rule
+        self._select_memo = lru_cache(maxsize=BASE_IMAGE_CACHE_SIZE)(self._select_uncached)
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]]) -> "BaseImageTable":
+        """
+        Build a table from the built-in rules merged with a 'base_images' config section.
+        Raises ConfigurationError if the section is malformed.
+        """
+        if section is None:
+            section = {}
+        if not isinstance(section, dict):
+            raise ConfigurationError("'base_images' must be a mapping of language names to base image rules.")
+
+        merged: Dict[str, Optional[Dict[str, Any]]] = {name: dict(entry) for name, entry in DEFAULT_BASE_IMAGES.items()}
+        for name, entry in section.items():
+            language = str(name).strip().lower()
+            if entry is None:
+                merged[language] = None  # Remove a built-in language
+                continue
+            if not isinstance(entry, dict):
+                raise ConfigurationError(f"Base image rule for '{language}' must be a mapping.")
+            unknown = set(entry) - _RULE_FIELDS
+            if unknown:
+                raise ConfigurationError(f"Unknown fields in base image rule for '{language}': {', '.join(sorted(unknown))}.")
+            merged[language] = {**(merged.get(language) or {}), **entry}
+
+        rules = []
+        for language, entry in merged.items():
+            if entry is None:
+                continue
+            if not entry.get("image") or not entry.get("default_version"):
+                raise ConfigurationError(f"Base image rule for '{language}' needs 'image' and 'default_version'.")
+            if isinstance(entry["default_version"], float):
+                # YAML reads 3.10 as the number 3.1
+                raise ConfigurationError(f"'default_version' of base image rule for '{language}' must be quoted.")
+            for field in ("variants", "aliases"):
+                if not isinstance(entry.get(field, []), list):
+                    raise ConfigurationError(f"'{field}' of base image rule for '{language}' must be a list.")
+            rules.append(BaseImageRule(
+                language=language,
+                image=str(entry["image"]).strip(),
+                default_version=str(entry["default_version"]).strip(),
+                default_variant=str(entry["default_variant"]).strip() if entry.get("default_variant") else None,
+                variants=[str(v).strip() for v in entry.get("variants", [])],
+                aliases=[str(a).strip().lower() for a in entry.get("aliases", [])],
+            ))
+        return cls(rules)
+
+    def select(self, language: str, version: Optional[str] = None) -> str:
+        """
+        Return the generic base image for a language and optional version.
+        Raises UnsupportedLanguageError if the language isn't in the table.
+        """
+        return self._select_memo(language.strip().lower(), version.strip() if version else None)
+
+    def _select_uncached(self, language: str, version: Optional[str]) -> str:
+        rule = self._lookup.get(language)
+        if rule is None:
+            raise UnsupportedLanguageError(language=language, supported=self.languages())
+        image = rule.image_for(version)
+        logger.debug("Mapping language '%s' version '%s' to generic base image '%s'", language, version, image)
+        return image
+
+    def canonical_language(self, language: str) -> Optional[str]:
+        """Table name for a language or alias ('golang' -> 'go'), or None if unsupported."""
+        rule = self._lookup.get(language.strip().lower())
+        return rule.language if rule is not None else None
+
+    def languages(self) -> List[str]:
+        return sorted(self._rules)
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        return {language: self._rules[language].describe() for language in self.languages()}
+
+    def cache_info(self):
+        """Return hit/miss statistics of the select memo."""
+        return self._select_memo.cache_info()
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+
+# Built-in rules only; used when no configuration snapshot is at hand
+default_base_images = BaseImageTable.from_config(None)
@@ -0,0 +1,258 @@
+# mcp_server/app/core/cache.py
+
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from app.models.request import DockerfileRequest
+from app.utils.logger import logger
+
+# --- Cache settings (environment overridable) ---
+CACHE_ENABLED = os.getenv("DOCKERFILE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_ENTRIES = int(os.getenv("DOCKERFILE_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("DOCKERFILE_CACHE_TTL_SECONDS", "86400"))
+# Optional SQLite file for the persistent tier. Leave unset to keep the cache in memory only.
+CACHE_DB_PATH = os.getenv("DOCKERFILE_CACHE_DB")
+
+
+def make_request_key(request: DockerfileRequest, harbor_path: str, model_name: str,
+                     config_version: Optional[str] = None) -> str:
+    """
+    Build a content-addressed cache key for a generation request.
+
+    The request fields are normalized first (case, whitespace, dependency order)
+    so semantically identical requests share one entry. The resolved Harbor path
+    and model name (and the explicitly requested provider, if any) are part of the
+    key, so mapping or model changes never serve stale output. The configuration
+    version covers the Harbor paths of the other stages of multi-stage output.
+    """
+    dependencies = sorted({dep.strip() for dep in (request.dependencies or []) if dep.strip()})
+    instructions = " ".join(request.additional_instructions.split()) if request.additional_instructions else None
+    normalized = {
+        "language": request.language.strip().lower(),
+        "version": request.version.strip() if request.version else None,
+        "dependencies": dependencies,
+        "port": request.port,
+        "app_type": request.app_type.strip().lower() if request.app_type else None,
+        "additional_instructions": instructions,
+        "package_manager": request.package_manager.strip().lower() if request.package_manager else None,
+        "harbor_path": harbor_path,
+        "model": model_name,
+        "provider": request.provider.strip().lower() if request.provider else None,
+        "config_version": config_version,
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_etag(request_key: str, generation_mode: str) -> str:
+    """
+    Weak HTTP ETag of a generate response. It identifies the inputs (the request key,
+    which includes the configuration version, plus the generation mode) rather than the
+    bytes, so a client's If-None-Match can be answered without generating anything.
+    """
+    return f'W/"{request_key[:32]}-{generation_mode}"'
+
+
+class DockerfileCache:
+    """
+    Two-tier cache for generated Dockerfile content.
+
+    - Memory tier: LRU with a per-entry TTL, bounded by max_entries.
+    - Disk tier (optional): SQLite file that survives restarts. Disk hits are
+      promoted into the memory tier.
+
+    Disk reads and writes run on one dedicated thread, so they are serialized and a
+    read sees every earlier write. The async API (aget, set_nowait) keeps only the
+    memory tier on the event loop; get and set block until the disk tier answers.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock() # Guards the memory tier and counters
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_executor: Optional[ThreadPoolExecutor] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS dockerfile_cache ("
+                    "key TEXT PRIMARY KEY, content TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._db.commit()
+                self._disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dockerfile-cache-disk")
+                logger.info(f"Dockerfile cache disk tier enabled at '{db_path}'.")
+            except sqlite3.Error as e:
+                # The disk tier is an optimization; fall back to memory only
+                logger.error(f"Failed to open Dockerfile cache database '{db_path}': {e}. Using memory tier only.")
+                self._db = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached content for key, or None on a miss or expired entry."""
+        found, content = self._memory_get(key)
+        if found:
+            return content
+        if self._db is not None:
+            content = self._disk_executor.submit(self._disk_get, key).result()
+        return self._record_lookup(key, content)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Like get, but awaits the disk tier instead of blocking the event loop on it."""
+        found, content = self._memory_get(key)
+        if found:
+            return content
+        if self._db is not None:
+            content = await asyncio.wrap_future(self._disk_executor.submit(self._disk_get, key))
+        return self._record_lookup(key, content)
+
+    def set(self, key: str, content: str) -> None:
+        """Store content under key in every enabled tier, waiting for the disk write."""
+        pending = self.set_nowait(key, content)
+        if pending is not None:
+            pending.result()
+
+    def set_nowait(self, key: str, content: str) -> Optional[Future]:
+        """
+        Store content in the memory tier now and queue the disk write (write-behind).
+        Returns the pending disk write, or None without a disk tier.
+        """
+        with self._lock:
+            self._memory_set(key, content, time.monotonic())
+        if self._db is None:
+            return None
+        return self._disk_executor.submit(self._disk_set, key, content, time.time())
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            self._disk_executor.submit(self._disk_clear).result()
+
+    def close(self) -> None:
+        """Finish queued disk writes and close the database (called on application shutdown)."""
+        if self._db is not None:
+            self._disk_executor.shutdown(wait=True)
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, object]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_tier_enabled": self._db is not None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hits": hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    # --- Memory tier ---
+
+    def _memory_get(self, key: str) -> Tuple[bool, Optional[str]]:
+        """(found, content) from the memory tier; counts memory hits."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, content = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return True, content
+                del self._entries[key]
+        return False, None
+
+    def _record_lookup(self, key: str, disk_content: Optional[str]) -> Optional[str]:
+        """Count a lookup that missed memory, promoting a disk hit into the memory tier."""
+        with self._lock:
+            if disk_content is None:
+                self.misses += 1
+            else:
+                self._memory_set(key, disk_content, time.monotonic())
+                self.disk_hits += 1
+        return disk_content
+
+    def _memory_set(self, key: str, content: str, now: float) -> None:
+        # Callers hold self._lock
+        self._entries[key] = (now + self.ttl_seconds, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # --- Disk tier (runs on the disk thread only) ---
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        try:
+            row = self._db.execute(
+                "SELECT content, created_at FROM dockerfile_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read Dockerfile cache entry from disk: {e}")
+            return None
+        if row is None:
+            return None
+        content, created_at = row
+        if time.time() - created_at > self.ttl_seconds:
+            try:
+                self._db.execute("DELETE FROM dockerfile_cache WHERE key = ?", (key,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to evict expired Dockerfile cache entry: {e}")
+            return None
+        return content
+
+    def _disk_set(self, key: str, content: str, created_at: float) -> None:
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO dockerfile_cache (key, content, created_at) VALUES (?, ?, ?)",
+                (key, content, created_at)
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write Dockerfile cache entry to disk: {e}")
+
+    def _disk_clear(self) -> None:
+        try:
+            self._db.execute("DELETE FROM dockerfile_cache")
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to clear Dockerfile cache database: {e}")
+
+
+# == Dependency Injection Setup ==
+response_cache: DockerfileCache | None = None
+if CACHE_ENABLED:
+    response_cache = DockerfileCache(
+        max_entries=CACHE_MAX_ENTRIES,
+        ttl_seconds=CACHE_TTL_SECONDS,
+        db_path=CACHE_DB_PATH
+    )
+    logger.info(f"Dockerfile response cache enabled (max_entries={CACHE_MAX_ENTRIES}, ttl={CACHE_TTL_SECONDS}s).")
+else:
+    logger.info("Dockerfile response cache disabled via DOCKERFILE_CACHE_ENABLED.")
+
+
+def get_response_cache() -> DockerfileCache | None:
+    """FastAPI dependency returning the shared response cache (None when disabled)."""
+    return response_cache
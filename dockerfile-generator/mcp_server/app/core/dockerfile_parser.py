@@ -0,0 +1,375 @@
+# mcp_server/app/core/dockerfile_parser.py
+
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional, Set, Tuple
+
+from app.utils.logger import logger
+
+FENCE = "```"
+# BuildKit heredoc start: <<EOF, <<-EOF, <<"EOF", <<'EOF'
+HEREDOC_PATTERN = re.compile(r"<<(-?)([\"']?)([A-Za-z_][A-Za-z0-9_]*)\2")
+ESCAPE_DIRECTIVE_PATTERN = re.compile(r"^#\s*escape\s*=\s*([\\`])\s*$", re.IGNORECASE)
+HEREDOC_KEYWORDS = {"RUN", "COPY", "ADD"}
+
+# Instruction keywords of the Dockerfile reference
+KNOWN_KEYWORDS = {
+    "FROM", "RUN", "CMD", "LABEL", "MAINTAINER", "EXPOSE", "ENV", "ADD", "COPY", "ENTRYPOINT",
+    "VOLUME", "USER", "WORKDIR", "ARG", "ONBUILD", "STOPSIGNAL", "HEALTHCHECK", "SHELL",
+}
+
+# Line states of the tokenizer
+_NEW_INSTRUCTION = "instruction"
+_CONTINUATION = "continuation"
+_HEREDOC = "heredoc"
+
+
+@lru_cache(maxsize=1024)
+def normalize_image(image: str) -> str:
+    """
+    Canonical form of an image reference for comparisons: lowercase, no digest,
+    no implicit Docker Hub prefix ('docker.io/', 'library/') and an explicit tag.
+    """
+    name = image.strip().strip("\"'").lower().split("@", 1)[0]
+    for prefix in ("docker.io/", "index.docker.io/", "library/"):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    if ":" not in name.rsplit("/", 1)[-1]:
+        name += ":latest"
+    return name
+
+
+def image_repository(image: str) -> str:
+    """Repository part of an image reference ('python:3.11-slim' -> 'python')."""
+    return normalize_image(image).rsplit(":", 1)[0]
+
+
+class Instruction:
+    """One logical instruction: keyword, its arguments with continuations joined, and its first line number."""
+
+    __slots__ = ("keyword", "args", "line")
+
+    def __init__(self, keyword: str, args: str, line: int):
+        self.keyword = keyword
+        self.args = args
+        self.line = line
+
+    def __repr__(self) -> str:
+        return f"Instruction({self.keyword!r}, {self.args!r}, line={self.line})"
+
+
+class Stage:
+    """A build stage opened by FROM: the image the AI wrote, the image emitted, and its alias."""
+
+    __slots__ = ("index", "original_image", "image", "alias", "flags", "line")
+
+    def __init__(self, index: int, original_image: str, image: str, alias: Optional[str],
+                 flags: List[str], line: int):
+        self.index = index
+        self.original_image = original_image
+        self.image = image
+        self.alias = alias
+        self.flags = flags
+        self.line = line
+
+
+class DockerfileProcessor:
+    """
+    Single-pass tokenizer and post-processor for AI-generated Dockerfiles.
+
+    Text can be fed in arbitrary chunks (a stream) or all at once; the output is
+    identical. In one pass it:
+    - drops markdown code fences,
+    - rewrites the base image of every stage: the requested generic image becomes the
+      Harbor path, other images go through `resolve` (when given); stage references,
+      'scratch' and images using build args are left alone,
+    - normalizes FROM instructions to 'FROM [flags] <image> [AS <name>]' on one line,
+    - records the instructions and stages (the AST) and structural issues such as an
+      unterminated heredoc or line continuation.
+
+    Line continuations, '# escape=' directives, comments and BuildKit heredocs are
+    tracked, so continuation or heredoc lines are never mistaken for instructions.
+    Only the start of a line that may still be a FROM or fence line is held back;
+    everything else is forwarded as soon as it arrives.
+    """
+
+    def __init__(self, generic_base_image: str, harbor_path: str,
+                 resolve: Optional[Callable[[str], str]] = None, harbor_base_url: Optional[str] = None):
+        self.generic_base_image = generic_base_image
+        self.harbor_path = harbor_path
+        self._generic_image = normalize_image(generic_base_image)
+        self._generic_repository = image_repository(generic_base_image)
+        self._resolve = resolve
+        self._harbor_prefix = f"{harbor_base_url.strip().rstrip('/').lower()}/" if harbor_base_url else None
+
+        self.escape = "\\"
+        self._instructions: List[Tuple[str, str, int]] = []  # (keyword, args, line); see instructions
+        self.stages: List[Stage] = []
+        self.issues: List[str] = []
+        # True once a stage uses the requested base image (exactly, or with a different tag)
+        self.base_image_found = False
+
+        self._output: List[str] = []
+        self._aliases: Set[str] = set()
+        self._line_no = 0
+        self._mode = _NEW_INSTRUCTION
+        self._holding = True                 # Current physical line is held back
+        self._line_parts: List[str] = []     # Text of the current physical line so far
+        self._keyword: Optional[str] = None  # Keyword of the instruction being read
+        self._instruction_line = 0
+        self._instruction_lines: List[str] = []
+        self._heredocs: List[Tuple[str, bool]] = []  # Pending (delimiter, strip tabs)
+
+    # --- Streaming interface ---
+    def feed(self, text: str) -> str:
+        """Consume a chunk of AI output and return the text that can be emitted now."""
+        emitted: List[str] = []
+        pos, size = 0, len(text)
+        while pos < size:
+            newline = text.find("\n", pos)
+            end = size if newline == -1 else newline + 1
+            segment = text[pos:end]
+            pos = end
+            if newline != -1 and self._mode == _NEW_INSTRUCTION and not self._line_parts:
+                # Fast path: a whole line starting a new instruction
+                self._line_no += 1
+                self._start_line(segment, True, emitted)
+                self._holding = self._mode == _NEW_INSTRUCTION or self._keyword == "FROM"
+                continue
+
+            self._line_parts.append(segment)
+
+            if not self._holding:
+                emitted.append(segment)
+                if newline != -1:
+                    self._end_line(emitted)
+            elif newline != -1:
+                self._end_line(emitted)  # Emits (or rewrites) the held line
+            elif not self._may_hold():
+                emitted.append("".join(self._line_parts))
+                self._holding = False
+        return self._collect(emitted)
+
+    def finish(self) -> str:
+        """Flush the last (unterminated) line and close any open instruction at the end of the stream."""
+        emitted: List[str] = []
+        if self._line_parts:
+            self._end_line(emitted)
+        if self._mode == _HEREDOC:
+            self.issues.append(f"Line {self._instruction_line}: heredoc is not terminated "
+                               f"(missing '{self._heredocs[0][0]}').")
+            self._heredocs = []
+            self._end_instruction(emitted)
+        elif self._mode == _CONTINUATION:
+            self.issues.append(f"Line {self._instruction_line}: instruction ends with a line continuation.")
+            self._end_instruction(emitted)
+        return self._collect(emitted)
+
+    @property
+    def instructions(self) -> List[Instruction]:
+        """The instructions read so far, in order (the AST)."""
+        return [Instruction(keyword, args, line) for keyword, args, line in self._instructions]
+
+    @property
+    def content(self) -> str:
+        """Everything emitted so far, trimmed of surrounding blank lines."""
+        return "".join(self._output).strip()
+
+    def process(self, text: str) -> str:
+        """Process a complete response in one call and return the final content."""
+        self.feed(text)
+        self.finish()
+        return self.content
+
+    # --- Line handling ---
+    def _collect(self, emitted: List[str]) -> str:
+        result = "".join(emitted)
+        if result:
+            self._output.append(result)
+        return result
+
+    def _may_hold(self) -> bool:
+        """True while the current partial line could still need rewriting (FROM, fence, directive)."""
+        if self._mode == _CONTINUATION:
+            return self._keyword == "FROM"
+        head = "".join(self._line_parts).lstrip().lower()
+        if not head:
+            return True
+        if head.startswith(("from", FENCE)) or "from".startswith(head) or FENCE.startswith(head):
+            return True
+        return head.startswith("#") and not self._instructions and self._keyword is None
+
+    def _end_line(self, emitted: List[str]) -> None:
+        line = "".join(self._line_parts) if len(self._line_parts) > 1 else self._line_parts[0]
+        held = self._holding
+        self._line_parts = []
+        self._line_no += 1
+
+        if self._mode == _HEREDOC:
+            if held:
+                emitted.append(line)
+            self._end_heredoc_line(line, emitted)
+        elif self._mode == _CONTINUATION:
+            if held and self._keyword != "FROM":
+                emitted.append(line)
+            self._instruction_lines.append(line)
+            self._continue_instruction(line, emitted)
+        else:
+            self._start_line(line, held, emitted)
+
+        # FROM instructions are held whole; other lines only while they may be FROM/fence lines
+        self._holding = self._mode == _NEW_INSTRUCTION or self._keyword == "FROM"
+
+    def _start_line(self, line: str, held: bool, emitted: List[str]) -> None:
+        stripped = line.strip()
+        if not stripped:
+            if held:
+                emitted.append(line)
+            return
+        first = stripped[0]
+        if first == "#":
+            if not self._instructions:
+                directive = ESCAPE_DIRECTIVE_PATTERN.match(stripped)
+                if directive:
+                    self.escape = directive.group(1)
+            if held:
+                emitted.append(line)
+            return
+        if first == "`" and stripped.startswith(FENCE):
+            if not held:
+                emitted.append(line)  # Unreachable in practice: fence starts are always held
+            return
+
+        parts = stripped.split(None, 1)
+        keyword = parts[0].upper()
+        args = parts[1] if len(parts) > 1 else ""
+        if keyword == "FROM" and not held:
+            self.issues.append(f"Line {self._line_no}: FROM instruction could not be rewritten.")
+            keyword = "FROM_UNPROCESSED"
+        if held and keyword != "FROM":
+            emitted.append(line)
+
+        if args.endswith(self.escape) or (keyword in HEREDOC_KEYWORDS and "<<" in args):
+            # Multi-line instruction: collect its lines
+            self._keyword = keyword
+            self._instruction_line = self._line_no
+            self._instruction_lines = [line]
+            self._continue_instruction(line, emitted)
+            return
+        if keyword == "FROM":
+            emitted.append(self._rewrite_from(args, self._line_no) + ("\n" if line.endswith("\n") else ""))
+        elif keyword not in KNOWN_KEYWORDS or (keyword != "ARG" and not self.stages):
+            self._record(keyword, args, self._line_no)
+            return
+        self._instructions.append((keyword, args, self._line_no))
+
+    def _continue_instruction(self, line: str, emitted: List[str]) -> None:
+        """After a physical line of an instruction: stay in continuation, enter a heredoc, or end it."""
+        body = line.rstrip()
+        if self._keyword in HEREDOC_KEYWORDS and "<<" in body:
+            for strip_tabs, _, delimiter in HEREDOC_PATTERN.findall(body):
+                self._heredocs.append((delimiter, bool(strip_tabs)))
+        if body.endswith(self.escape) or (self._mode == _CONTINUATION and (not body.strip() or body.lstrip().startswith("#"))):
+            # Escaped newline; blank and comment lines inside a continuation don't end it
+            self._mode = _CONTINUATION
+        elif self._heredocs:
+            self._mode = _HEREDOC
+        else:
+            self._end_instruction(emitted)
+
+    def _end_heredoc_line(self, line: str, emitted: List[str]) -> None:
+        delimiter, strip_tabs = self._heredocs[0]
+        candidate = line.rstrip("\r\n")
+        if strip_tabs:
+            candidate = candidate.lstrip("\t")
+        if candidate == delimiter:
+            self._heredocs.pop(0)
+            if not self._heredocs:
+                self._end_instruction(emitted)
+
+    def _end_instruction(self, emitted: List[str]) -> None:
+        keyword, lines = self._keyword, self._instruction_lines
+        args = self._logical_args(lines)
+        if keyword == "FROM":
+            newline = "\n" if lines[-1].endswith("\n") else ""
+            emitted.append(self._rewrite_from(args, self._instruction_line) + newline)
+        self._record(keyword, args, self._instruction_line)
+        self._keyword = None
+        self._instruction_lines = []
+        self._mode = _NEW_INSTRUCTION
+
+    def _record(self, keyword: str, args: str, line: int) -> None:
+        """Add a finished instruction to the AST, noting structural issues."""
+        if keyword == "FROM_UNPROCESSED":
+            keyword = "FROM"
+        if keyword not in KNOWN_KEYWORDS:
+            self.issues.append(f"Line {line}: unknown instruction '{keyword}'.")
+        elif keyword != "FROM" and keyword != "ARG" and not self.stages:
+            self.issues.append(f"Line {line}: '{keyword}' appears before the first FROM.")
+        self._instructions.append((keyword, args, line))
+
+    def _logical_args(self, lines: List[str]) -> str:
+        """Arguments of an instruction with escaped newlines joined (heredoc bodies are not included)."""
+        if len(lines) == 1:
+            parts = lines[0].strip().split(None, 1)
+            return parts[1] if len(parts) > 1 else ""
+        pieces = []
+        for line in lines:
+            body = line.strip()
+            if not body or body.startswith("#"):
+                continue
+            pieces.append(body[:-1].rstrip() if body.endswith(self.escape) else body)
+        joined = " ".join(pieces)
+        parts = joined.split(None, 1)
+        return parts[1] if len(parts) > 1 else ""
+
+    # --- FROM rewriting ---
+    def _rewrite_from(self, args: str, line: int) -> str:
+        tokens = args.split()
+        flags = []
+        while tokens and tokens[0].startswith("--"):
+            flags.append(tokens.pop(0))
+        if not tokens:
+            self.issues.append(f"Line {line}: FROM without an image.")
+            return f"FROM {args}".rstrip()
+
+        original_image, alias = tokens[0], None
+        if len(tokens) == 3 and tokens[1].lower() == "as":
+            alias = tokens[2]
+        elif len(tokens) != 1:
+            self.issues.append(f"Line {line}: malformed FROM instruction 'FROM {args}'.")
+
+        image = self._stage_image(original_image)
+        self.stages.append(Stage(len(self.stages), original_image, image, alias, flags, line))
+        if alias:
+            self._aliases.add(alias.lower())
+        return " ".join(["FROM", *flags, image, *(["AS", alias] if alias else tokens[1:])])
+
+    def _stage_image(self, image: str) -> str:
+        """Base image to emit for a stage."""
+        lowered = image.lower()
+        if lowered in self._aliases or lowered == "scratch" or "$" in image:
+            return image  # Earlier stage, empty image or build-arg image
+        if self._harbor_prefix is not None and lowered.startswith(self._harbor_prefix):
+            return image  # Already a Harbor path
+        normalized = normalize_image(image)
+        if normalized == self._generic_image:
+            self.base_image_found = True
+            logger.info(f"Replaced FROM line using generic image '{self.generic_base_image}' with Harbor path.")
+            return self.harbor_path
+        if normalized.rsplit(":", 1)[0] == self._generic_repository:
+            self.base_image_found = True
+            logger.warning(f"AI used '{image}' instead of the requested base image '{self.generic_base_image}'; "
+                           f"resolving it on its own.")
+        if self._resolve is None:
+            return image
+        return self._resolve(image.strip("\"'").split("@", 1)[0])
+
+
+def process_dockerfile(text: str, generic_base_image: str, harbor_path: str,
+                       resolve: Optional[Callable[[str], str]] = None,
+                       harbor_base_url: Optional[str] = None) -> DockerfileProcessor:
+    """Post-process a complete AI response; the result holds the content, AST and issues."""
+    processor = DockerfileProcessor(generic_base_image, harbor_path, resolve=resolve, harbor_base_url=harbor_base_url)
+    processor.process(text)
+    return processor
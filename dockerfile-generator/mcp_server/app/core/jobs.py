@@ -0,0 +1,621 @@
+# mcp_server/app/core/jobs.py
+
+import os
+import hmac
+import json
+import time
+import uuid
+import asyncio
+import socket
+import hashlib
+import sqlite3
+import ipaddress
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.core import metrics
+from app.core.rate_limiter import PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from app.utils.exceptions import JobQueueFullError, WebhookNotAllowedError
+from app.utils.logger import logger
+
+# --- Job settings (environment overridable) ---
+# Generation workers run by the API process; 0 leaves the queue to separate worker
+# processes ('python -m app.worker'), which requires the SQLite store (JOB_DB)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# SQLite file holding the queue and results, shared by API and worker processes.
+# Leave unset to keep jobs in memory (single process; lost on restart).
+JOB_DB_PATH = os.getenv("JOB_DB")
+# How long finished jobs (and their results) can be fetched
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+# Queued jobs accepted before submissions are rejected
+JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "1000"))
+# A running job whose lease runs out (its worker renews it every third of the lease while
+# the job runs, so only a dead or stuck worker lets it lapse) is handed to another worker
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+# How often idle workers check a shared store for jobs submitted by other processes
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "0.5"))
+# Completion webhooks: per-attempt timeout, attempts, and the HMAC-SHA256 signing secret
+JOB_WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("JOB_WEBHOOK_TIMEOUT_SECONDS", "10"))
+JOB_WEBHOOK_MAX_ATTEMPTS = int(os.getenv("JOB_WEBHOOK_MAX_ATTEMPTS", "3"))
+# On shutdown, how long to wait for webhook deliveries still in progress
+JOB_WEBHOOK_DRAIN_SECONDS = float(os.getenv("JOB_WEBHOOK_DRAIN_SECONDS", "10"))
+JOB_WEBHOOK_SECRET = os.getenv("JOB_WEBHOOK_SECRET")
+# Webhook targets. By default only https URLs whose host resolves to public addresses are
+# called (no loopback, private, link-local or metadata addresses). JOB_WEBHOOK_ALLOWED_HOSTS
+# (comma-separated; '*.example.com' matches subdomains) limits webhooks to those hosts,
+# which may then also be on a private network.
+JOB_WEBHOOK_ALLOWED_HOSTS = [host.strip().lower() for host in os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",")
+                             if host.strip()]
+JOB_WEBHOOK_ALLOW_HTTP = os.getenv("JOB_WEBHOOK_ALLOW_HTTP", "false").lower() in ("1", "true", "yes")
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_STATES = (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+# Claim order: interactive jobs before batch jobs, then oldest first
+_PRIORITY_RANK = {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 1}
+
+
+class Job:
+    """A queued Dockerfile generation and, once finished, its result or error (both JSON-ready dicts)."""
+
+    __slots__ = ("id", "status", "request", "priority", "webhook_url", "created_at", "started_at",
+                 "finished_at", "expires_at", "result", "error", "webhook_status")
+
+    def __init__(self, id: str, request: Dict[str, Any], priority: str = PRIORITY_INTERACTIVE,
+                 webhook_url: Optional[str] = None, status: str = JOB_QUEUED, created_at: Optional[float] = None,
+                 started_at: Optional[float] = None, finished_at: Optional[float] = None,
+                 expires_at: Optional[float] = None, result: Optional[Dict[str, Any]] = None,
+                 error: Optional[Dict[str, Any]] = None, webhook_status: Optional[str] = None):
+        self.id = id
+        self.status = status
+        self.request = request
+        self.priority = priority
+        self.webhook_url = webhook_url
+        self.created_at = created_at if created_at is not None else time.time()
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.expires_at = expires_at
+        self.result = result
+        self.error = error
+        self.webhook_status = webhook_status
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+# --- Stores ---
+class MemoryJobStore:
+    """Jobs in a dict with a FIFO per priority; for a single API process with in-process workers."""
+
+    shared = False
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._queues: Dict[str, Deque[str]] = {priority: deque() for priority in _PRIORITY_RANK}
+        self._lock = threading.Lock()
+
+    def add(self, job: Job, max_queued: int) -> None:
+        with self._lock:
+            if sum(len(queue) for queue in self._queues.values()) >= max_queued:
+                raise JobQueueFullError(max_queued)
+            self._jobs[job.id] = job
+            self._queues[job.priority].append(job.id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def claim(self, now: float, lease_seconds: float) -> Optional[Job]:
+        with self._lock:
+            for priority in _PRIORITY_RANK:
+                queue = self._queues[priority]
+                if queue:
+                    job = self._jobs[queue.popleft()]
+                    job.status, job.started_at = JOB_RUNNING, now
+                    return job
+        return None
+
+    def renew(self, job: Job, lease_expires: float) -> bool:
+        # Claimed jobs stay with their worker: nothing to renew
+        return True
+
+    def finish(self, job: Job) -> bool:
+        self.save(job)
+        return True
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.expires_at is not None and job.expires_at <= now]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict.fromkeys(JOB_STATES, 0)
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+
+class SQLiteJobStore:
+    """
+    Jobs in a SQLite table, shared by the API and any number of worker processes.
+
+    Workers claim jobs atomically (BEGIN IMMEDIATE) with a lease; a running job whose
+    lease expired (its worker died) is claimed again. A claim is identified by its
+    started_at: renewals and writes from a worker whose job was claimed again don't apply.
+    """
+
+    shared = True
+    _COLUMNS = ("id", "status", "request", "priority", "webhook_url", "created_at", "started_at",
+                "finished_at", "expires_at", "result", "error", "webhook_status")
+    _JSON_COLUMNS = ("request", "result", "error")
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, priority TEXT NOT NULL, "
+            "priority_rank INTEGER NOT NULL, webhook_url TEXT, created_at REAL NOT NULL, started_at REAL, "
+            "finished_at REAL, expires_at REAL, lease_expires REAL, result TEXT, error TEXT, webhook_status TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority_rank, created_at)")
+        self._lock = threading.Lock()
+        logger.info(f"Job store opened at '{db_path}'.")
+
+    def add(self, job: Job, max_queued: int) -> None:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                (queued,) = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (JOB_QUEUED,)).fetchone()
+                if queued >= max_queued:
+                    raise JobQueueFullError(max_queued)
+                row = self._to_row(job)
+                self._db.execute(
+                    f"INSERT INTO jobs ({', '.join(row)}, priority_rank) VALUES ({', '.join('?' * len(row))}, ?)",
+                    (*row.values(), _PRIORITY_RANK.get(job.priority, 0))
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._from_row(row) if row is not None else None
+
+    def claim(self, now: float, lease_seconds: float) -> Optional[Job]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    f"SELECT {', '.join(self._COLUMNS)} FROM jobs "
+                    "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                    "ORDER BY priority_rank, created_at LIMIT 1",
+                    (JOB_QUEUED, JOB_RUNNING, now)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE jobs SET status = ?, started_at = ?, lease_expires = ? WHERE id = ?",
+                                     (JOB_RUNNING, now, now + lease_seconds, row[0]))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._from_row(row)
+        if job.status == JOB_RUNNING:
+            logger.warning(f"Job {job.id} lease expired; running it again.")
+        job.status, job.started_at = JOB_RUNNING, now
+        return job
+
+    def renew(self, job: Job, lease_expires: float) -> bool:
+        """Extend the lease of the worker's claim on job; False if the claim was lost."""
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ? AND started_at = ?",
+                (lease_expires, job.id, JOB_RUNNING, job.started_at)
+            ).rowcount == 1
+
+    def finish(self, job: Job) -> bool:
+        """Store the finished job if the worker still holds its claim; False if it was claimed again."""
+        return self._update(job, "status = ?", JOB_RUNNING)
+
+    def save(self, job: Job) -> None:
+        self._update(job)
+
+    def _update(self, job: Job, condition: str = "1", *params: Any) -> bool:
+        # Only the claim that produced this copy of the job (same started_at) may write it
+        row = self._to_row(job)
+        with self._lock:
+            return self._db.execute(
+                f"UPDATE jobs SET {', '.join(f'{column} = ?' for column in row if column != 'id')} "
+                f"WHERE id = ? AND started_at IS ? AND {condition}",
+                (*(value for column, value in row.items() if column != "id"), job.id, job.started_at, *params)
+            ).rowcount == 1
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            return self._db.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def _to_row(self, job: Job) -> Dict[str, Any]:
+        row = job.to_dict()
+        for column in self._JSON_COLUMNS:
+            if row[column] is not None:
+                row[column] = json.dumps(row[column], separators=(",", ":"))
+        return row
+
+    def _from_row(self, row: Tuple) -> Job:
+        values = dict(zip(self._COLUMNS, row))
+        for column in self._JSON_COLUMNS:
+            if values[column] is not None:
+                values[column] = json.loads(values[column])
+        return Job(**values)
+
+
+# --- Queue ---
+class JobQueue:
+    """
+    Submission, lookup and completion of generation jobs on top of a store.
+
+    Finished jobs expire JOB_RESULT_TTL_SECONDS after they finish. Submitting wakes idle
+    in-process workers at once; workers of other processes find new jobs by polling
+    the shared store. Calls to the SQLite store (which may wait up to its 30s busy
+    timeout under write contention) run on a dedicated thread, never on the event loop.
+    """
+
+    def __init__(self, store, result_ttl: float = 3600, max_queued: int = 1000, lease_seconds: float = 300):
+        self.store = store
+        self.result_ttl = result_ttl
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store") if store.shared else None
+
+    async def submit(self, request: Dict[str, Any], priority: str = PRIORITY_INTERACTIVE,
+                     webhook_url: Optional[str] = None) -> Job:
+        """Queue a generation request (a DockerfileRequest as a dict). Raises JobQueueFullError."""
+        job = Job(uuid.uuid4().hex, request, priority, webhook_url,
+                  webhook_status="pending" if webhook_url else None)
+        await self._call(self.store.add, job, self.max_queued)
+        self._wakeup.set()
+        logger.info(f"Queued job {job.id} ({priority} priority).")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """The job, or None if it doesn't exist or its result expired."""
+        job = await self._call(self.store.get, job_id)
+        if job is None or (job.expires_at is not None and job.expires_at <= time.time()):
+            return None
+        return job
+
+    async def claim(self) -> Optional[Job]:
+        return await self._call(self.store.claim, time.time(), self.lease_seconds)
+
+    async def finish(self, job: Job, result: Optional[Dict[str, Any]] = None,
+                     error: Optional[Dict[str, Any]] = None) -> bool:
+        """Record the job's outcome; False (nothing stored) if another worker claimed it meanwhile."""
+        job.status = JOB_FAILED if error is not None else JOB_SUCCEEDED
+        job.result, job.error = result, error
+        job.finished_at = time.time()
+        job.expires_at = job.finished_at + self.result_ttl
+        return await self._call(self.store.finish, job)
+
+    async def renew(self, job: Job) -> bool:
+        """Extend the lease on a running job; False if its lease ran out and another worker claimed it."""
+        return await self._call(self.store.renew, job, time.time() + self.lease_seconds)
+
+    async def save(self, job: Job) -> None:
+        await self._call(self.store.save, job)
+
+    async def wait_for_work(self, timeout: float) -> None:
+        """Sleep until a job is submitted in this process, or for timeout seconds."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def clear_wakeup(self) -> None:
+        self._wakeup.clear()
+
+    async def purge_expired(self) -> int:
+        return await self._call(self.store.purge_expired, time.time())
+
+    async def stats(self) -> Dict[str, object]:
+        return {"store": "sqlite" if self.store.shared else "memory", **await self._call(self.store.counts)}
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Run a store method: on the store thread for SQLite, inline for the in-memory store."""
+        if self._executor is None:
+            return method(*args)
+        return await asyncio.wrap_future(self._executor.submit(method, *args))
+
+
+# --- Webhook targets ---
+def _host_allowlisted(host: str) -> bool:
+    for pattern in JOB_WEBHOOK_ALLOWED_HOSTS:
+        if host == pattern or (pattern.startswith("*.") and host.endswith(pattern[1:])):
+            return True
+    return False
+
+
+async def _resolve_host(host: str, port: int) -> List[str]:
+    """Addresses of host (without blocking the event loop)."""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0]) # Drop an IPv6 zone ID
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def resolve_webhook_target(url: str) -> Optional[str]:
+    """
+    Check a webhook URL against the webhook policy (see JOB_WEBHOOK_ALLOWED_HOSTS).
+    Returns the public address to connect to, or None for an allowlisted host
+    (connect by name). Raises WebhookNotAllowedError.
+    """
+    parsed = httpx.URL(url)
+    if parsed.scheme != "https" and not (parsed.scheme == "http" and JOB_WEBHOOK_ALLOW_HTTP):
+        raise WebhookNotAllowedError(url, "only https webhooks are accepted")
+    host = parsed.raw_host.decode("ascii").lower() # IDNA-encoded
+    if not host:
+        raise WebhookNotAllowedError(url, "the URL has no host")
+    if _host_allowlisted(host):
+        return None
+    if JOB_WEBHOOK_ALLOWED_HOSTS:
+        raise WebhookNotAllowedError(url, f"host '{host}' is not in JOB_WEBHOOK_ALLOWED_HOSTS")
+    try:
+        addresses = await _resolve_host(host, parsed.port or (443 if parsed.scheme == "https" else 80))
+    except (socket.gaierror, UnicodeError) as e:
+        raise WebhookNotAllowedError(url, f"host '{host}' does not resolve ({e})") from e
+    blocked = [address for address in addresses if not _is_public(address)]
+    if blocked or not addresses:
+        raise WebhookNotAllowedError(url, f"host '{host}' resolves to a non-public address ({', '.join(blocked)})")
+    return addresses[0]
+
+
+# --- Workers ---
+JobHandler = Callable[[Job], Awaitable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]]
+
+
+class JobWorkerPool:
+    """
+    Asyncio workers that claim jobs, run them through `handler` and deliver webhooks.
+
+    The handler receives the job and returns (result, error); it should not raise.
+    While it runs, the job's lease is renewed every third of JOB_LEASE_SECONDS; a run
+    whose job was claimed by another worker meanwhile (lease lost) is discarded.
+    Webhooks are delivered by separate tasks, so a slow or dead receiver (retries and
+    backoff included) never holds up a worker; stop() waits up to JOB_WEBHOOK_DRAIN_SECONDS
+    for deliveries still in progress. Workers also purge expired jobs about once a minute.
+    """
+
+    PURGE_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, queue: JobQueue, handler: JobHandler, workers: int = 4,
+                 poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._deliveries: Set[asyncio.Task] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._next_purge = 0.0
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._tasks:
+            return
+        self._client = httpx.AsyncClient(timeout=JOB_WEBHOOK_TIMEOUT_SECONDS)
+        self._tasks = [asyncio.create_task(self._work(index)) for index in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers ({'sqlite' if self.queue.store.shared else 'memory'} store).")
+
+    async def stop(self, drain_timeout: float = JOB_WEBHOOK_DRAIN_SECONDS) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._deliveries:
+            logger.info(f"Waiting up to {drain_timeout:.0f}s for {len(self._deliveries)} webhook deliveries.")
+            await self.drain_webhooks(drain_timeout)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def run_pending(self) -> int:
+        """Run queued jobs in the calling task until none is left, then wait for their webhooks; returns how many ran."""
+        ran = 0
+        while (job := await self.queue.claim()) is not None:
+            await self._run(job)
+            ran += 1
+        await self.drain_webhooks()
+        return ran
+
+    async def drain_webhooks(self, timeout: Optional[float] = None) -> None:
+        """Wait for webhook deliveries in progress; those still running after timeout are cancelled."""
+        if not self._deliveries:
+            return
+        _, pending = await asyncio.wait(set(self._deliveries), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} webhook deliveries still in progress.")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _work(self, index: int) -> None:
+        while True:
+            try:
+                await self._maybe_purge()
+                job = await self.queue.claim()
+                if job is None:
+                    self.queue.clear_wakeup()
+                    job = await self.queue.claim()  # Submitted between the claim and the clear
+                if job is None:
+                    await self.queue.wait_for_work(self.poll_interval)
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} failed: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job: Job) -> None:
+        logger.info(f"Running job {job.id}.")
+        heartbeat = asyncio.create_task(self._keep_lease(job))
+        try:
+            result, error = await self.handler(job)
+        finally:
+            heartbeat.cancel()
+        if not await self.queue.finish(job, result, error):
+            logger.warning(f"Job {job.id} was claimed by another worker; discarding this run's result.")
+            return
+        logger.info(f"Job {job.id} {job.status}.")
+        if job.webhook_url:
+            delivery = asyncio.create_task(self._notify(job))
+            self._deliveries.add(delivery)
+            delivery.add_done_callback(self._deliveries.discard)
+
+    async def _keep_lease(self, job: Job) -> None:
+        """Renew the job's lease until cancelled, or until the lease turns out to be lost."""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if not await self.queue.renew(job):
+                    logger.warning(f"Job {job.id} lost its lease to another worker.")
+                    return
+            except Exception as e:
+                logger.error(f"Renewing the lease of job {job.id} failed: {e}")
+
+    async def _notify(self, job: Job) -> None:
+        """Deliver the job's webhook and record the outcome (runs as its own task)."""
+        try:
+            delivered = await self._deliver_webhook(job)
+        except Exception as e:
+            logger.error(f"Webhook delivery for job {job.id} failed: {e}", exc_info=True)
+            delivered = False
+        job.webhook_status = "delivered" if delivered else "failed"
+        await self.queue.save(job)
+
+    async def _deliver_webhook(self, job: Job) -> bool:
+        """POST the finished job to its webhook URL, retrying with backoff. Returns True on a 2xx answer."""
+        body = json.dumps(job_payload(job), separators=(",", ":")).encode("utf-8")
+        headers = {"Content-Type": "application/json", "X-Job-Id": job.id}
+        if JOB_WEBHOOK_SECRET:
+            signature = hmac.new(JOB_WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+            headers["X-Signature-256"] = f"sha256={signature}"
+        client = self._client or httpx.AsyncClient(timeout=JOB_WEBHOOK_TIMEOUT_SECONDS)
+        try:
+            for attempt in range(1, JOB_WEBHOOK_MAX_ATTEMPTS + 1):
+                try:
+                    # Checked on every attempt (DNS may change) and pinned to the checked address
+                    address = await resolve_webhook_target(job.webhook_url)
+                    response = await client.send(_webhook_request(client, job.webhook_url, address, body, headers))
+                    if response.is_success:
+                        return True
+                    reason = f"HTTP {response.status_code}"
+                except WebhookNotAllowedError as e:
+                    logger.warning(f"Webhook for job {job.id} not sent: {e.message}")
+                    return False
+                except httpx.HTTPError as e:
+                    reason = str(e) or type(e).__name__
+                logger.warning(f"Webhook for job {job.id} failed on attempt {attempt}/{JOB_WEBHOOK_MAX_ATTEMPTS}: {reason}")
+                if attempt < JOB_WEBHOOK_MAX_ATTEMPTS:
+                    await asyncio.sleep(min(2 ** attempt, 30))
+            return False
+        finally:
+            if client is not self._client:
+                await client.aclose()
+
+    async def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now >= self._next_purge:
+            self._next_purge = now + self.PURGE_INTERVAL_SECONDS
+            purged = await self.queue.purge_expired()
+            if purged:
+                logger.info(f"Purged {purged} expired jobs.")
+
+
+def _webhook_request(client: httpx.AsyncClient, url: str, address: Optional[str], body: bytes,
+                     headers: Dict[str, str]) -> httpx.Request:
+    """
+    POST request for a webhook. With an address, the connection goes to that address
+    while Host and TLS (SNI and certificate checks) still use the URL's host name.
+    Redirects are not followed (the client default), so a target can't bounce elsewhere.
+    """
+    if address is None:
+        return client.build_request("POST", url, content=body, headers=headers)
+    parsed = httpx.URL(url)
+    return client.build_request(
+        "POST", parsed.copy_with(host=address), content=body,
+        headers={**headers, "Host": parsed.netloc.decode("ascii")},
+        extensions={"sni_hostname": parsed.raw_host.decode("ascii")}
+    )
+
+
+def job_payload(job: Job) -> Dict[str, Any]:
+    """Public view of a job, as returned by the API and sent to webhooks."""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "expires_at": job.expires_at,
+        "result": job.result,
+        "error": job.error,
+        "webhook_status": job.webhook_status,
+    }
+
+
+def _create_store():
+    if JOB_DB_PATH:
+        try:
+            return SQLiteJobStore(JOB_DB_PATH)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open job database '{JOB_DB_PATH}': {e}. Keeping jobs in memory.")
+    if JOB_WORKERS <= 0:
+        logger.warning("JOB_WORKERS=0 without a shared job store (JOB_DB): submitted jobs will never run.")
+    return MemoryJobStore()
+
+
+# == Dependency Injection Setup ==
+job_queue = JobQueue(_create_store(), result_ttl=JOB_RESULT_TTL_SECONDS, max_queued=JOB_QUEUE_MAX_SIZE,
+                     lease_seconds=JOB_LEASE_SECONDS)
+
+for _status in JOB_STATES:
+    metrics.JOBS.labels(status=_status).set_function(lambda status=_status: job_queue.store.counts()[status])
+
+
+def get_job_queue() -> JobQueue:
+    """FastAPI dependency returning the shared job queue."""
+    return job_queue
@@ -0,0 +1,180 @@
+# mcp_server/app/core/metrics.py
+
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+from app.core.tracing import start_span
+from app.core.rate_limiter import admission_controller
+from app.core.singleflight import inflight_generations
+from app.utils.logger import logger, dropped_log_records
+
+# Buckets from sub-millisecond lookups (Harbor resolution) up to slow AI calls
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# Token counts per AI call, from tiny repair prompts up to very large responses
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+# Pipeline stages timed in STAGE_DURATION
+STAGE_BASE_IMAGE = "base_image"
+STAGE_HARBOR_RESOLVE = "harbor_resolve"
+STAGE_TEMPLATE_RENDER = "template_render"
+STAGE_CACHE_LOOKUP = "cache_lookup"
+STAGE_PROMPT_BUILD = "prompt_build"
+STAGE_AI_CALL = "ai_call"
+STAGE_FROM_REWRITE = "from_rewrite"  # Post-processing: stage rewrite, validation and local fixes
+STAGE_AI_REPAIR = "ai_repair"
+
+# --- Metric definitions ---
+STAGE_DURATION = Histogram(
+    "dockerfile_stage_duration_seconds",
+    "Time spent in each stage of the Dockerfile generation pipeline.",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+REQUEST_DURATION = Histogram(
+    "dockerfile_request_duration_seconds",
+    "End-to-end handling time per API call.",
+    ["endpoint"], buckets=LATENCY_BUCKETS
+)
+STREAM_FIRST_CHUNK = Histogram(
+    "dockerfile_stream_first_chunk_seconds",
+    "Time from a streaming request to its first content chunk.",
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_TOTAL = Counter(
+    "dockerfile_requests_total",
+    "Dockerfiles requested, by language, outcome (success or error code) and generator (ai, template, cache).",
+    ["endpoint", "language", "outcome", "generator"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "dockerfile_requests_in_flight",
+    "API calls currently being handled.",
+    ["endpoint"]
+)
+AI_CALLS_IN_FLIGHT = Gauge(
+    "dockerfile_ai_calls_in_flight",
+    "AI provider calls currently in flight (including retries and admission wait).",
+    ["provider"]
+)
+AI_ERRORS_TOTAL = Counter(
+    "dockerfile_ai_errors_total",
+    "Failed AI provider calls, by exception class.",
+    ["provider", "error"]
+)
+AI_TOKENS = Histogram(
+    "dockerfile_ai_tokens",
+    "Tokens per AI provider call, by kind: input (not served from the provider's prompt cache), cached_input "
+    "and output. Reported by the provider, or estimated from the text length when it doesn't report usage.",
+    ["provider", "kind"], buckets=TOKEN_BUCKETS
+)
+VALIDATION_PROBLEMS_TOTAL = Counter(
+    "dockerfile_validation_problems_total",
+    "Problems found in AI-generated Dockerfiles, by problem and how they were resolved (local, ai or unresolved).",
+    ["problem", "resolution"]
+)
+AI_REPAIR_ATTEMPTS_TOTAL = Counter(
+    "dockerfile_ai_repair_attempts_total",
+    "Follow-up AI prompts sent to correct a generated Dockerfile, by outcome (fixed, failed or error).",
+    ["outcome"]
+)
+# Wired to the AI executor by app.core.ai_service (which imports this module)
+AI_EXECUTOR_BUSY = Gauge(
+    "dockerfile_ai_executor_busy",
+    "AI executor threads running a provider call, including calls whose caller timed out."
+)
+AI_GENERATIONS_IN_FLIGHT = Gauge(
+    "dockerfile_ai_generations_in_flight",
+    "Distinct AI generations in flight after single-flight coalescing."
+)
+AI_GENERATIONS_IN_FLIGHT.set_function(lambda: inflight_generations.stats()["in_flight"])
+AI_ADMISSION_QUEUE_DEPTH = Gauge(
+    "dockerfile_ai_admission_queue_depth",
+    "AI calls waiting for admission control."
+)
+AI_ADMISSION_QUEUE_DEPTH.set_function(lambda: admission_controller.stats()["queue_depth"])
+# Wired to the job store by app.core.jobs (which imports this module)
+JOBS = Gauge(
+    "dockerfile_jobs",
+    "Asynchronous generation jobs held by the job store, by status.",
+    ["status"]
+)
+LOG_RECORDS_DROPPED = Gauge(
+    "dockerfile_log_records_dropped",
+    "Log records dropped because the asynchronous log queue was full."
+)
+LOG_RECORDS_DROPPED.set_function(lambda: dropped_log_records(logger))
+
+
+@contextmanager
+def time_stage(stage: str):
+    """
+    Time the wrapped block as a pipeline stage: observes the stage histogram and
+    records a 'stage.<name>' tracing span, which is yielded for extra attributes.
+    """
+    started = time.perf_counter()
+    with start_span(f"stage.{stage}") as span:
+        try:
+            yield span
+        finally:
+            STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - started)
+
+
+def outcome_for(error: Optional[BaseException]) -> str:
+    """Low-cardinality outcome label: 'success', the app error code, or the exception class name."""
+    if error is None:
+        return "success"
+    return getattr(error, "error_code", None) or type(error).__name__
+
+
+def count_request(endpoint: str, language: str, outcome: str, generator: str = "none") -> None:
+    REQUESTS_TOTAL.labels(endpoint=endpoint, language=language, outcome=outcome, generator=generator).inc()
+
+
+def record_ai_tokens(provider: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> None:
+    """Observe the token usage of one AI call; input_tokens includes cached_tokens."""
+    AI_TOKENS.labels(provider=provider, kind="input").observe(max(0, input_tokens - cached_tokens))
+    AI_TOKENS.labels(provider=provider, kind="cached_input").observe(cached_tokens)
+    AI_TOKENS.labels(provider=provider, kind="output").observe(output_tokens)
+
+
+class RequestTracker:
+    """
+    Records the in-flight gauge, duration and outcome of one API call.
+
+    The language label stays 'unknown' until the caller sets it (after the language
+    was accepted), which keeps the label set bounded by the supported languages.
+    With count=False only the gauge and duration are recorded (batch calls count
+    their items individually).
+    """
+
+    def __init__(self, endpoint: str, count: bool = True):
+        self.endpoint = endpoint
+        self.count = count
+        self.language = "unknown"
+        self.generator = "none"
+        self._started = time.perf_counter()
+        self._finished = False
+        REQUESTS_IN_FLIGHT.labels(endpoint=endpoint).inc()
+
+    def finish(self, error: Optional[BaseException] = None, outcome: Optional[str] = None) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        REQUESTS_IN_FLIGHT.labels(endpoint=self.endpoint).dec()
+        REQUEST_DURATION.labels(endpoint=self.endpoint).observe(time.perf_counter() - self._started)
+        if self.count:
+            count_request(self.endpoint, self.language, outcome or outcome_for(error), self.generator)
+
+    def __enter__(self) -> "RequestTracker":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.finish(exc)
+
+
+def render_metrics() -> bytes:
+    """Current metrics in the Prometheus text exposition format."""
+    return generate_latest()
@@ -0,0 +1,132 @@
+# mcp_server/app/core/prompts.py
+
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Upper bound on memoized per-(language, app_type) request templates
+PROMPT_TEMPLATE_CACHE_SIZE = int(os.getenv("PROMPT_TEMPLATE_CACHE_SIZE", "256"))
+
+# Rough characters-per-token ratio used when a provider doesn't report usage
+CHARS_PER_TOKEN = 4
+
+# Instructions shared by every request. Sent as the system instruction, byte-identical
+# across calls, so providers can cache it as a prompt prefix (see app.core.ai_service).
+SYSTEM_PROMPT = "\n".join([
+    "You write concise, best-practice Dockerfiles.",
+    "- Use exactly the base image given in the request, without any registry prefix in the FROM line.",
+    "- Copy the application code into the image (e.g. `COPY . .`).",
+    "- Install the listed dependencies with the language's package manager.",
+    "- EXPOSE the requested port, if any.",
+    "- Set a reasonable default command (CMD or ENTRYPOINT) to run the application.",
+    "- Output only the raw Dockerfile content, without any explanation or markdown formatting like ```dockerfile.",
+])
+
+# How a language installs dependencies; part of its precompiled request template
+DEPENDENCY_HINTS = {
+    "python": "install with pip, preferably from a requirements.txt file",
+    "node": "install with npm from a package.json file",
+}
+
+
+class Prompt(str):
+    """
+    Prompt text split into the shared system prefix and the per-request part.
+
+    The string value is the full text, so code that only needs text (admission
+    estimates, logging, the stub backend) uses it as a plain str; providers with
+    system instructions send `system` and `user` separately.
+    """
+
+    def __new__(cls, system: str, user: str):
+        prompt = str.__new__(cls, system + "\n\n" + user)
+        prompt.system = system
+        prompt.user = user
+        return prompt
+
+
+def split_prompt(prompt: str) -> Tuple[Optional[str], str]:
+    """(system prefix, request text) of a prompt; plain strings have no system prefix."""
+    if isinstance(prompt, Prompt):
+        return prompt.system, prompt.user
+    return None, prompt
+
+
+def count_tokens(text: str) -> int:
+    """Token estimate for text (about CHARS_PER_TOKEN characters per token)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _literal(text: str) -> str:
+    """Escape text baked into a template so %-formatting leaves it alone."""
+    return text.replace("%", "%%")
+
+
+@lru_cache(maxsize=PROMPT_TEMPLATE_CACHE_SIZE)
+def _request_template(language: str, app_type: Optional[str], has_version: bool, has_dependencies: bool,
+                      has_port: bool, has_package_manager: bool, has_instructions: bool) -> str:
+    """
+    %-format string for the request part of a prompt. Everything fixed for a language and
+    app_type is baked in; only the per-request values remain as positional fields, in the
+    order version, base image, dependencies, port, package manager, additional instructions
+    (present ones only).
+    """
+    application = f"Application: '{_literal(language)}'" + (" %s" if has_version else "")
+    if app_type:
+        application += f", {_literal(app_type)}"
+    lines = [application, "Base image: '%s'"]
+    if has_dependencies:
+        # The default installer hint would contradict an explicit package manager
+        hint = None if has_package_manager else DEPENDENCY_HINTS.get(language.lower())
+        lines.append(f"Dependencies ({hint}): %s" if hint else "Dependencies: %s")
+    if has_port:
+        lines.append("Port: %s")
+    if has_package_manager:
+        lines.append("Package manager: %s (install from its lockfile)")
+    if has_instructions:
+        lines.append("Additional instructions: %s")
+    return "\n".join(lines)
+
+
+def create_dockerfile_prompt(
+    language: str,
+    version: Optional[str] = None,
+    dependencies: Optional[List[str]] = None,
+    port: Optional[int] = None,
+    app_type: Optional[str] = None,
+    additional_instructions: Optional[str] = None,
+    generic_base_image: str = "GENERIC_BASE_IMAGE_PLACEHOLDER", # Placeholder for base image
+    package_manager: Optional[str] = None
+) -> Prompt:
+    """
+    Build the generation prompt: the shared SYSTEM_PROMPT plus a compact request part
+    rendered from the precompiled template for the language and app_type.
+    The AI is told to use the *generic* base image; the Harbor path is substituted later.
+    """
+    template = _request_template(language, app_type, bool(version), bool(dependencies), bool(port),
+                                 bool(package_manager), bool(additional_instructions))
+    values = (version, generic_base_image, ", ".join(dependencies) if dependencies else None, port,
+              package_manager, additional_instructions)
+    return Prompt(SYSTEM_PROMPT, template % tuple(value for value in values if value))
+
+
+def create_repair_prompt(
+    dockerfile: str,
+    problems: List[str],
+    generic_base_image: str = "GENERIC_BASE_IMAGE_PLACEHOLDER"
+) -> Prompt:
+    """
+    Build a targeted follow-up prompt asking the AI to correct specific problems in a
+    Dockerfile it generated, instead of regenerating it from scratch. Shares SYSTEM_PROMPT
+    with the generation prompt.
+    """
+    lines = ["Fix only these problems in the Dockerfile below and keep everything else unchanged:"]
+    lines += [f"- {problem}" for problem in problems]
+    lines.append(f"Base image: '{generic_base_image}'")
+    lines.append(f"\nDockerfile:\n{dockerfile}")
+    return Prompt(SYSTEM_PROMPT, "\n".join(lines))
+
+
+def template_cache_info():
+    """Return hit/miss statistics of the request template memo."""
+    return _request_template.cache_info()
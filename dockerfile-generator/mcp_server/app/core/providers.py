@@ -0,0 +1,282 @@
+# mcp_server/app/core/providers.py
+
+import os
+import re
+import time
+import random
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+from app.core import ai_service, metrics, resilience
+from app.core.ai_service import (
+    GEMINI_PROVIDER,
+    DEFAULT_MODEL_NAME,
+    AIServiceError,
+    AIConnectionError,
+    AIAuthenticationError
+)
+from app.core.prompts import count_tokens, split_prompt
+from app.utils.logger import logger
+
+# --- Provider settings (environment overridable) ---
+OPENAI_PROVIDER = "openai"
+STUB_PROVIDER = "stub"
+
+# OpenAI-compatible endpoint (OpenAI itself, or any server speaking its chat completions API)
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None -> api.openai.com
+OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+# Simulated behaviour of the offline stub backend (local development, load tests)
+AI_STUB_LATENCY_SECONDS = float(os.getenv("AI_STUB_LATENCY_SECONDS", "0"))
+# Standard deviation of the latency (normal distribution, clipped at zero)
+AI_STUB_LATENCY_JITTER_SECONDS = float(os.getenv("AI_STUB_LATENCY_JITTER_SECONDS", "0"))
+# Fraction of calls failing with a connection error / a non-retryable service error
+AI_STUB_ERROR_RATE = float(os.getenv("AI_STUB_ERROR_RATE", "0"))
+AI_STUB_FATAL_ERROR_RATE = float(os.getenv("AI_STUB_FATAL_ERROR_RATE", "0"))
+# Seed for the latency/error draws, for reproducible runs (unset -> random)
+AI_STUB_SEED = os.getenv("AI_STUB_SEED")
+
+# The prompt names the generic base image the output must use (see app.core.prompts)
+_BASE_IMAGE_PATTERN = re.compile(r"^Base image: '([^']+)'", re.MULTILINE)
+_PORT_PATTERN = re.compile(r"^Port: (\d+)", re.MULTILINE)
+_DEPENDENCIES_PATTERN = re.compile(r"^Dependencies[^:]*: (.+)$", re.MULTILINE)
+
+
+def _clean_output(content: str) -> str:
+    """Strip markdown fences from a complete response, like the Gemini path does."""
+    return content.strip().removeprefix("```dockerfile").removesuffix("```").strip()
+
+
+class AIProvider(ABC):
+    """
+    A backend that turns a prompt into Dockerfile text.
+
+    generate() and stream() are blocking; the async layer (call_with_resilience /
+    stream_with_resilience in app.core.ai_service) runs them on the AI executor.
+    Both raise exceptions from the AIServiceError hierarchy.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    def is_configured(self) -> bool:
+        return True
+
+    @property
+    def breaker(self) -> resilience.CircuitBreaker:
+        return resilience.get_circuit_breaker(self.name)
+
+    @abstractmethod
+    def generate(self, prompt: str) -> str:
+        """Return the Dockerfile text for the prompt."""
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the response in chunks. Providers without native streaming yield it whole."""
+        yield self.generate(prompt)
+
+    def describe(self) -> Dict[str, object]:
+        return {"model": self.model_name, "configured": self.is_configured}
+
+
+class GeminiProvider(AIProvider):
+    """Google Gemini through the google-generativeai SDK (see app.core.ai_service)."""
+
+    name = GEMINI_PROVIDER
+
+    @property
+    def is_configured(self) -> bool:
+        return ai_service.is_configured
+
+    def generate(self, prompt: str) -> str:
+        return ai_service.get_gemini_dockerfile_suggestion(prompt, self.model_name)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        return ai_service.iter_gemini_stream(prompt, self.model_name)
+
+
+class OpenAICompatibleProvider(AIProvider):
+    """Chat completions API of OpenAI or any OpenAI-compatible server (vLLM, Ollama, LiteLLM, ...)."""
+
+    name = OPENAI_PROVIDER
+
+    def __init__(self, model_name: str, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: float = 60.0):
+        super().__init__(model_name)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def is_configured(self) -> bool:
+        # Self-hosted compatible servers often don't need a key
+        return bool(self.api_key or self.base_url)
+
+    def _get_client(self):
+        """Create the shared client (and its connection pool) on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import openai
+                    # Retries are handled by our own retry policy and circuit breaker
+                    self._client = openai.OpenAI(
+                        api_key=self.api_key or "unused",
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        max_retries=0
+                    )
+                    logger.info(f"Created OpenAI-compatible client for model '{self.model_name}'.")
+        return self._client
+
+    def _create(self, prompt: str, stream: bool):
+        if not self.is_configured:
+            raise AIServiceError("OpenAI-compatible provider is not configured. Set OPENAI_API_KEY or OPENAI_BASE_URL.")
+        logger.info(f"Sending prompt to OpenAI-compatible model: {self.model_name}")
+        # The shared system prompt goes first and never changes, so servers with automatic
+        # prefix caching (OpenAI, vLLM) reuse it across requests
+        system, user = split_prompt(prompt)
+        messages = [{"role": "user", "content": user}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        try:
+            return self._get_client().chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                temperature=0.3,
+                stream=stream
+            )
+        except Exception as e:
+            raise self._to_ai_error(e) from e
+
+    def generate(self, prompt: str) -> str:
+        response = self._create(prompt, stream=False)
+        if not response.choices or not response.choices[0].message.content:
+            raise AIServiceError("AI response was empty.")
+        content = response.choices[0].message.content
+        self._record_usage(getattr(response, "usage", None), prompt, content)
+        return _clean_output(content)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        response = self._create(prompt, stream=True)
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise self._to_ai_error(e) from e
+
+    def _record_usage(self, usage, prompt: str, content: str) -> None:
+        """Record token metrics from the response usage, or estimates when the server doesn't report it."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if not isinstance(prompt_tokens, int):
+            metrics.record_ai_tokens(self.name, count_tokens(prompt), count_tokens(content))
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None)
+        completion = getattr(usage, "completion_tokens", None)
+        metrics.record_ai_tokens(self.name, prompt_tokens, completion if isinstance(completion, int) else 0,
+                                 cached if isinstance(cached, int) else 0)
+
+    @staticmethod
+    def _to_ai_error(e: Exception) -> AIServiceError:
+        """Translate an exception from the openai SDK into our AI exception hierarchy."""
+        import openai
+        if isinstance(e, AIServiceError):
+            return e
+        if isinstance(e, (openai.AuthenticationError, openai.PermissionDeniedError)):
+            logger.error(f"OpenAI-compatible API authentication error: {e}")
+            return AIAuthenticationError(f"OpenAI-compatible API authentication failed. Original error: {e}")
+        if isinstance(e, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+            # APITimeoutError is a subclass of APIConnectionError
+            logger.error(f"OpenAI-compatible API unavailable or rate limited: {e}")
+            return AIConnectionError(f"OpenAI-compatible API is unavailable or rate limited. Original error: {e}")
+        if isinstance(e, openai.APIError):
+            logger.error(f"OpenAI-compatible API error: {e}")
+            return AIServiceError(f"An OpenAI-compatible API error occurred: {e}")
+        logger.error(f"Unexpected error during OpenAI-compatible API call: {e}", exc_info=e)
+        return AIServiceError(f"An unexpected error occurred while contacting the OpenAI-compatible AI service: {e}")
+
+
+class StubProvider(AIProvider):
+    """
+    Offline backend that answers without network access.
+
+    Renders a minimal Dockerfile on the base image named in the prompt, after an
+    optional simulated latency. Latency jitter and injected failures (retryable
+    connection errors and fatal service errors) mimic a real backend under load.
+    Used for local development, tests and load tests.
+    """
+
+    name = STUB_PROVIDER
+
+    def __init__(self, model_name: str = "stub", latency: float = 0.0, chunk_size: int = 16,
+                 latency_jitter: float = 0.0, error_rate: float = 0.0, fatal_error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        super().__init__(model_name)
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.fatal_error_rate = fatal_error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()  # Calls run on executor threads; keep the draws reproducible
+
+    def _draw(self):
+        with self._lock:
+            delay = self.latency
+            if self.latency_jitter > 0:
+                delay = max(0.0, self._random.gauss(self.latency, self.latency_jitter))
+            roll = self._random.random()
+        return delay, roll
+
+    def generate(self, prompt: str) -> str:
+        delay, roll = self._draw()
+        if delay > 0:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            raise AIConnectionError("Stub provider injected a connection error.")
+        if roll < self.error_rate + self.fatal_error_rate:
+            raise AIServiceError("Stub provider injected a service error.")
+        match = _BASE_IMAGE_PATTERN.search(prompt)
+        if match is None:
+            raise AIServiceError("Stub provider could not find a base image in the prompt.")
+        lines = [f"FROM {match.group(1)}", "", "WORKDIR /app", "", "COPY . .", ""]
+        dependencies = _DEPENDENCIES_PATTERN.search(prompt)
+        if dependencies:
+            lines += [f"RUN ./install-dependencies.sh {dependencies.group(1).replace(',', '')}", ""]
+        port = _PORT_PATTERN.search(prompt)
+        if port:
+            lines += [f"EXPOSE {port.group(1)}", ""]
+        lines.append('CMD ["./start.sh"]')
+        content = "\n".join(lines)
+        metrics.record_ai_tokens(self.name, count_tokens(prompt), count_tokens(content))
+        return content
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        content = self.generate(prompt)
+        for start in range(0, len(content), self.chunk_size):
+            yield content[start:start + self.chunk_size]
+
+    def describe(self) -> Dict[str, object]:
+        return {**super().describe(), "latency_seconds": self.latency,
+                "latency_jitter_seconds": self.latency_jitter, "error_rate": self.error_rate,
+                "fatal_error_rate": self.fatal_error_rate}
+
+
+def build_providers() -> Dict[str, AIProvider]:
+    """Create every known provider from the environment settings."""
+    providers: List[AIProvider] = [
+        GeminiProvider(DEFAULT_MODEL_NAME),
+        OpenAICompatibleProvider(OPENAI_MODEL_NAME, api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL,
+                                 timeout=OPENAI_TIMEOUT_SECONDS),
+        StubProvider(latency=AI_STUB_LATENCY_SECONDS, latency_jitter=AI_STUB_LATENCY_JITTER_SECONDS,
+                     error_rate=AI_STUB_ERROR_RATE, fatal_error_rate=AI_STUB_FATAL_ERROR_RATE,
+                     seed=int(AI_STUB_SEED) if AI_STUB_SEED else None),
+    ]
+    return {provider.name: provider for provider in providers}
@@ -0,0 +1,199 @@
+# mcp_server/app/core/rate_limiter.py
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.logger import logger
+
+# --- Admission control settings (environment overridable) ---
+# Requests/tokens per minute allowed towards the AI provider (0 disables that bucket)
+AI_RATE_LIMIT_RPM = float(os.getenv("AI_RATE_LIMIT_RPM", "0"))
+AI_RATE_LIMIT_TPM = float(os.getenv("AI_RATE_LIMIT_TPM", "0"))
+# Maximum number of calls waiting for admission; further calls are rejected
+AI_QUEUE_MAX_SIZE = int(os.getenv("AI_QUEUE_MAX_SIZE", "200"))
+# How long a call may wait for admission, per priority class
+AI_QUEUE_TIMEOUT_INTERACTIVE_SECONDS = float(os.getenv("AI_QUEUE_TIMEOUT_INTERACTIVE_SECONDS", "20"))
+AI_QUEUE_TIMEOUT_BATCH_SECONDS = float(os.getenv("AI_QUEUE_TIMEOUT_BATCH_SECONDS", "300"))
+
+# Priority classes: lower value is admitted first
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITIES = {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 1}
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a call can't be admitted: the wait queue is full or its deadline passed."""
+    def __init__(self, reason: str, message: str):
+        self.reason = reason
+        super().__init__(message)
+
+
+class TokenBucket:
+    """Continuously refilling token bucket sized for one minute of budget."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate_per_second = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill(now)
+        # A request larger than the whole bucket is admitted once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate_per_second
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class AdmissionController:
+    """
+    Admission control in front of the AI provider.
+
+    Calls take one request token (RPM bucket) and their estimated token count
+    (TPM bucket). When the buckets are empty, calls wait in a bounded priority
+    queue: interactive calls are admitted before batch calls, FIFO within a class.
+    A call that waits past its deadline, or arrives when the queue is full, is
+    rejected with AdmissionRejectedError.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, max_queue_size: int = 200,
+                 timeouts: Optional[Dict[str, float]] = None):
+        self.rpm_bucket = TokenBucket(rpm) if rpm > 0 else None
+        self.tpm_bucket = TokenBucket(tpm) if tpm > 0 else None
+        self.max_queue_size = max_queue_size
+        self.timeouts = timeouts or {
+            PRIORITY_INTERACTIVE: AI_QUEUE_TIMEOUT_INTERACTIVE_SECONDS,
+            PRIORITY_BATCH: AI_QUEUE_TIMEOUT_BATCH_SECONDS,
+        }
+        self._queue: List[Tuple[int, int, float, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        # Counters
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm_bucket is not None or self.tpm_bucket is not None
+
+    async def acquire(self, estimated_tokens: int, priority: str = PRIORITY_INTERACTIVE,
+                      timeout: Optional[float] = None) -> float:
+        """
+        Wait until the call may proceed. Returns the time spent waiting, in seconds.
+        Raises AdmissionRejectedError if the queue is full or the deadline passes.
+        """
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        if not self._queue and self._wait_time(estimated_tokens, started) == 0:
+            self._consume(estimated_tokens)
+            self._record_admission(0.0)
+            return 0.0
+
+        live = sum(1 for entry in self._queue if not entry[4].done())
+        if live >= self.max_queue_size:
+            self.rejected_queue_full += 1
+            raise AdmissionRejectedError("queue_full", f"AI admission queue is full ({self.max_queue_size} waiting).")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (PRIORITIES.get(priority, PRIORITIES[PRIORITY_BATCH]),
+                                     next(self._sequence), estimated_tokens, priority, future))
+        self._pump()
+
+        deadline = timeout if timeout is not None else self.timeouts.get(priority, AI_QUEUE_TIMEOUT_BATCH_SECONDS)
+        try:
+            await asyncio.wait_for(future, deadline)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            self._pump()
+            raise AdmissionRejectedError(
+                "timeout", f"Timed out after {deadline:.1f}s waiting for AI admission ({priority} priority)."
+            ) from None
+        waited = time.monotonic() - started
+        self._record_admission(waited)
+        return waited
+
+    def stats(self) -> Dict[str, object]:
+        """Queue depth per priority class, wait times and rejection counters."""
+        depth = {name: 0 for name in PRIORITIES}
+        for _, _, _, priority, future in self._queue:
+            if not future.done():
+                depth[priority] = depth.get(priority, 0) + 1
+        return {
+            "enabled": self.enabled,
+            "queue_depth": sum(depth.values()),
+            "queue_depth_by_priority": depth,
+            "max_queue_size": self.max_queue_size,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_wait_ms": round(self.total_wait_seconds / self.admitted * 1000, 3) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            "rpm_tokens_available": round(self.rpm_bucket.tokens, 2) if self.rpm_bucket else None,
+            "tpm_tokens_available": round(self.tpm_bucket.tokens, 2) if self.tpm_bucket else None,
+        }
+
+    # --- Internal helpers ---
+
+    def _wait_time(self, estimated_tokens: int, now: float) -> float:
+        wait = 0.0
+        if self.rpm_bucket is not None:
+            wait = max(wait, self.rpm_bucket.wait_time(1, now))
+        if self.tpm_bucket is not None:
+            wait = max(wait, self.tpm_bucket.wait_time(estimated_tokens, now))
+        return wait
+
+    def _consume(self, estimated_tokens: int) -> None:
+        if self.rpm_bucket is not None:
+            self.rpm_bucket.consume(1)
+        if self.tpm_bucket is not None:
+            self.tpm_bucket.consume(estimated_tokens)
+
+    def _record_admission(self, waited: float) -> None:
+        self.admitted += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def _pump(self) -> None:
+        """Admit queued calls in priority order while budget allows; schedule the next check."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._queue:
+            _, _, estimated_tokens, _, future = self._queue[0]
+            if future.done():  # Timed out or cancelled while waiting
+                heapq.heappop(self._queue)
+                continue
+            wait = self._wait_time(estimated_tokens, time.monotonic())
+            if wait > 0:
+                self._wakeup = asyncio.get_running_loop().call_later(wait, self._pump)
+                return
+            heapq.heappop(self._queue)
+            self._consume(estimated_tokens)
+            future.set_result(None)
+
+
+# == Shared instance ==
+admission_controller = AdmissionController(
+    rpm=AI_RATE_LIMIT_RPM,
+    tpm=AI_RATE_LIMIT_TPM,
+    max_queue_size=AI_QUEUE_MAX_SIZE
+)
+if admission_controller.enabled:
+    logger.info(f"AI admission control enabled (rpm={AI_RATE_LIMIT_RPM}, tpm={AI_RATE_LIMIT_TPM}, queue={AI_QUEUE_MAX_SIZE}).")
@@ -0,0 +1,139 @@
+# mcp_server/app/core/resilience.py
+
+import os
+import time
+import random
+from typing import Dict, Optional
+
+from app.utils.logger import logger
+
+# --- Retry and circuit breaker settings (environment overridable) ---
+AI_RETRY_MAX_ATTEMPTS = int(os.getenv("AI_RETRY_MAX_ATTEMPTS", "3"))
+AI_RETRY_BASE_DELAY_SECONDS = float(os.getenv("AI_RETRY_BASE_DELAY_SECONDS", "0.5"))
+AI_RETRY_MAX_DELAY_SECONDS = float(os.getenv("AI_RETRY_MAX_DELAY_SECONDS", "8"))
+# Total time budget for one AI request, across all attempts and backoff sleeps
+AI_REQUEST_DEADLINE_SECONDS = float(os.getenv("AI_REQUEST_DEADLINE_SECONDS", "90"))
+AI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("AI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+AI_CIRCUIT_RECOVERY_SECONDS = float(os.getenv("AI_CIRCUIT_RECOVERY_SECONDS", "30"))
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class RetryPolicy:
+    """Bounded retries with decorrelated jitter backoff (delay = U(base, previous * 3), capped)."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 rng: Optional[random.Random] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+        # Counters
+        self.retries = 0
+        self.exhausted = 0
+
+    def next_delay(self, previous_delay: float) -> float:
+        """Backoff before the next attempt, given the previous delay (use base_delay for the first retry)."""
+        upper = max(self.base_delay, previous_delay * 3)
+        return min(self.max_delay, self._rng.uniform(self.base_delay, upper))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    -> calls flow; `failure_threshold` consecutive failures open the circuit.
+    open      -> calls fail fast until `recovery_timeout` has elapsed.
+    half_open -> one trial call is let through; success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        # Counters
+        self.times_opened = 0
+        self.rejected_calls = 0
+
+    def allow_request(self) -> bool:
+        """Return True if a call may go upstream now (moves open -> half_open after the recovery timeout)."""
+        if self.state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self.state = CIRCUIT_HALF_OPEN
+            self._trial_in_flight = False
+            logger.info("AI circuit breaker half-open: allowing a trial call.")
+        if self.state == CIRCUIT_CLOSED:
+            return True
+        if self.state == CIRCUIT_HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected_calls += 1
+        return False
+
+    def release_trial(self) -> None:
+        """Give back a half-open trial slot when the call never reached upstream."""
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != CIRCUIT_CLOSED:
+            logger.info("AI circuit breaker closed: upstream recovered.")
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != CIRCUIT_OPEN:
+                self.times_opened += 1
+                logger.warning(f"AI circuit breaker opened after {self.consecutive_failures} consecutive failures.")
+            self.state = CIRCUIT_OPEN
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout_seconds": self.recovery_timeout,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected_calls,
+        }
+
+
+# == Shared instances for the AI client ==
+ai_retry_policy = RetryPolicy(
+    max_attempts=AI_RETRY_MAX_ATTEMPTS,
+    base_delay=AI_RETRY_BASE_DELAY_SECONDS,
+    max_delay=AI_RETRY_MAX_DELAY_SECONDS
+)
+# One breaker per AI provider, so an outage at one backend doesn't block the others
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider_name: str) -> CircuitBreaker:
+    """Return the circuit breaker for an AI provider, creating it on first use."""
+    breaker = circuit_breakers.get(provider_name)
+    if breaker is None:
+        breaker = circuit_breakers.setdefault(provider_name, CircuitBreaker(
+            failure_threshold=AI_CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout=AI_CIRCUIT_RECOVERY_SECONDS
+        ))
+    return breaker
+
+
+def get_resilience_stats() -> Dict[str, object]:
+    """Circuit breaker state per provider and retry counters for the AI client."""
+    return {
+        "circuit_breakers": {name: breaker.stats() for name, breaker in sorted(circuit_breakers.items())},
+        "retries": ai_retry_policy.retries,
+        "retries_exhausted": ai_retry_policy.exhausted,
+        "max_attempts": ai_retry_policy.max_attempts,
+        "request_deadline_seconds": AI_REQUEST_DEADLINE_SECONDS,
+    }
@@ -0,0 +1,60 @@
+# mcp_server/app/core/singleflight.py
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from app.utils.logger import logger
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls onto one in-flight task.
+
+    The first caller for a key (the leader) starts the work; callers arriving
+    while it runs (followers) await the same task and receive its result or
+    its exception. The key is released as soon as the task finishes, so later
+    calls start fresh work (or hit the response cache).
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once per key among concurrent callers and share the outcome.
+
+        The shared task is shielded, so a disconnecting caller (leader or
+        follower) does not cancel the work for everyone else.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._release(k, _t))
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalescing request onto in-flight generation {key[:12]}.")
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """Return leader/follower counters and the number of keys in flight."""
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "coalesced": self.coalesced}
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+
+# == Dependency Injection Setup ==
+inflight_generations = SingleFlight()
+
+
+def get_inflight_generations() -> SingleFlight:
+    """FastAPI dependency returning the shared single-flight group for AI generations."""
+    return inflight_generations
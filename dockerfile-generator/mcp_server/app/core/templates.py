@@ -0,0 +1,194 @@
+# mcp_server/app/core/templates.py
+
+import shlex
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from app.models.request import DockerfileRequest
+from app.utils.logger import logger
+
+# A renderer receives the request, the resolved Harbor path and the port to expose,
+# and returns the Dockerfile lines.
+Renderer = Callable[[DockerfileRequest, str, Optional[int]], List[str]]
+
+# Default ports used when the request doesn't specify one
+DEFAULT_PORTS = {"python": 8000, "node": 3000, "go": 8080}
+
+# Install steps per package manager: (files copied before installing, install command).
+# None means no dependency file is known: Python installs the listed dependencies by
+# name and npm resolves package.json without requiring a package-lock.json.
+PYTHON_INSTALL: Dict[Optional[str], Tuple[str, str]] = {
+    "pip": ("requirements.txt", "pip install --no-cache-dir -r requirements.txt"),
+    "poetry": ("pyproject.toml poetry.lock", "pip install --no-cache-dir poetry && poetry config virtualenvs.create false "
+                                            "&& poetry install --only main --no-root --no-interaction"),
+    "uv": ("pyproject.toml uv.lock", "pip install --no-cache-dir uv "
+                                    "&& UV_PROJECT_ENVIRONMENT=/usr/local uv sync --frozen --no-dev --no-install-project"),
+    "pipenv": ("Pipfile Pipfile.lock", "pip install --no-cache-dir pipenv && pipenv install --system --deploy"),
+}
+NODE_INSTALL: Dict[Optional[str], Tuple[str, str]] = {
+    None: ("package*.json", "npm install --omit=dev"),
+    "npm": ("package*.json", "npm ci --omit=dev"),
+    "pnpm": ("package.json pnpm-lock.yaml", "corepack enable && pnpm install --frozen-lockfile --prod"),
+    "yarn": ("package.json yarn.lock", "corepack enable && yarn install --frozen-lockfile --production"),
+}
+# Package managers each language's templates can install with (others need the AI)
+PACKAGE_MANAGERS: Dict[str, Set[Optional[str]]] = {
+    "python": {None, *PYTHON_INSTALL}, "node": set(NODE_INSTALL), "go": {None, "go"},
+}
+
+
+def _deps(request: DockerfileRequest) -> List[str]:
+    return [dep.strip().lower() for dep in (request.dependencies or []) if dep.strip()]
+
+
+def _expose(port: Optional[int]) -> List[str]:
+    return [f"EXPOSE {port}"] if port else []
+
+
+def _package_manager(request: DockerfileRequest) -> Optional[str]:
+    return request.package_manager.strip().lower() or None if request.package_manager else None
+
+
+# --- Python ---
+def _python_common(request: DockerfileRequest, harbor_path: str) -> List[str]:
+    lines = [
+        f"FROM {harbor_path}",
+        "",
+        "ENV PYTHONDONTWRITEBYTECODE=1 \\",
+        "    PYTHONUNBUFFERED=1",
+        "",
+        "WORKDIR /app",
+        "",
+    ]
+    manager = _package_manager(request)
+    if manager is not None: # A dependency file installs even without listed dependencies
+        files, command = PYTHON_INSTALL[manager]
+        lines += [
+            f"COPY {files} ./",
+            f"RUN {command}",
+            "",
+        ]
+    elif request.dependencies:
+        lines += [
+            f"RUN pip install --no-cache-dir {' '.join(shlex.quote(dep) for dep in _deps(request))}",
+            "",
+        ]
+    lines += ["COPY . .", ""]
+    return lines
+
+
+def _python_web(request: DockerfileRequest, harbor_path: str, port: Optional[int]) -> List[str]:
+    deps = _deps(request)
+    port = port or DEFAULT_PORTS["python"]
+    if any(dep.startswith("uvicorn") for dep in deps) or "fastapi" in deps:
+        cmd = f'CMD ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "{port}"]'
+    elif "gunicorn" in deps:
+        cmd = f'CMD ["gunicorn", "--bind", "0.0.0.0:{port}", "app:app"]'
+    else:
+        cmd = 'CMD ["python", "app.py"]'
+    return _python_common(request, harbor_path) + _expose(port) + ["", "USER nobody", "", cmd]
+
+
+def _python_cli(request: DockerfileRequest, harbor_path: str, port: Optional[int]) -> List[str]:
+    return _python_common(request, harbor_path) + _expose(port) + ["", "USER nobody", "", 'ENTRYPOINT ["python", "main.py"]']
+
+
+# --- Node ---
+def _node_service(request: DockerfileRequest, harbor_path: str, port: Optional[int]) -> List[str]:
+    port = port or DEFAULT_PORTS["node"]
+    files, command = NODE_INSTALL[_package_manager(request)]
+    return [
+        f"FROM {harbor_path}",
+        "",
+        "ENV NODE_ENV=production",
+        "",
+        "WORKDIR /app",
+        "",
+        f"COPY {files} ./",
+        f"RUN {command}",
+        "",
+        "COPY . .",
+        "",
+        *_expose(port),
+        "",
+        "USER node",
+        "",
+        'CMD ["node", "index.js"]',
+    ]
+
+
+# --- Go (static binary on scratch) ---
+def _go_static(request: DockerfileRequest, harbor_path: str, port: Optional[int]) -> List[str]:
+    if port is None and (request.app_type or "").strip().lower() in ("web", "api"):
+        port = DEFAULT_PORTS["go"]
+    return [
+        f"FROM {harbor_path} AS build",
+        "",
+        "WORKDIR /src",
+        "",
+        "COPY go.mod go.sum* ./",
+        "RUN go mod download",
+        "",
+        "COPY . .",
+        'RUN CGO_ENABLED=0 go build -trimpath -ldflags="-s -w" -o /out/app .',
+        "",
+        "FROM scratch",
+        "",
+        "COPY --from=build /etc/ssl/certs/ca-certificates.crt /etc/ssl/certs/",
+        "COPY --from=build /out/app /app",
+        "",
+        *_expose(port),
+        "",
+        "USER 65534:65534",
+        "",
+        'ENTRYPOINT ["/app"]',
+    ]
+
+
+# Template table: (language, app_type) -> renderer. app_type None is the fallback
+# used when the request has no app_type.
+TEMPLATES: Dict[Tuple[str, Optional[str]], Renderer] = {
+    ("python", "web"): _python_web,
+    ("python", "api"): _python_web,
+    ("python", "cli"): _python_cli,
+    ("python", None): _python_web,
+    ("node", "web"): _node_service,
+    ("node", "api"): _node_service,
+    ("node", None): _node_service,
+    ("go", "web"): _go_static,
+    ("go", "api"): _go_static,
+    ("go", "cli"): _go_static,
+    ("go", None): _go_static,
+}
+
+
+def find_template(request: DockerfileRequest, language: Optional[str] = None) -> Optional[Renderer]:
+    """
+    Return the renderer for this request, or None if it needs the AI: free-form
+    additional_instructions, an uncovered language/app_type or a package manager the
+    language's templates don't install with. language is the canonical name from the
+    base-image table ('golang' -> 'go'); without it the request's language is used as given.
+    """
+    if request.additional_instructions and request.additional_instructions.strip():
+        return None
+    language = (language or request.language).strip().lower()
+    if _package_manager(request) not in PACKAGE_MANAGERS.get(language, {None}):
+        return None
+    app_type = request.app_type.strip().lower() if request.app_type else None
+    return TEMPLATES.get((language, app_type))
+
+
+def render_template_dockerfile(request: DockerfileRequest, harbor_path: str,
+                               language: Optional[str] = None) -> Optional[str]:
+    """
+    Render a Dockerfile locally from the template table, with the Harbor path
+    already in the FROM line. Returns None when no template covers the request.
+    """
+    renderer = find_template(request, language)
+    if renderer is None:
+        return None
+    content = "\n".join(renderer(request, harbor_path, request.port))
+    # Collapse runs of blank lines left by optional sections
+    while "\n\n\n" in content:
+        content = content.replace("\n\n\n", "\n\n")
+    logger.debug("Rendered template Dockerfile for language '%s', app_type '%s'.", request.language, request.app_type)
+    return content.strip()
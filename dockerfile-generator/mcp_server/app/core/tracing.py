@@ -0,0 +1,377 @@
+# mcp_server/app/core/tracing.py
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from app.utils.logger import logger
+
+# --- Tracing settings (environment overridable) ---
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+# Fraction of requests traced when the caller didn't ask for a sampled trace
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+# Append finished spans as JSON lines to this file
+TRACING_EXPORT_FILE = os.getenv("TRACING_EXPORT_FILE")
+# OTLP/HTTP JSON endpoint of a collector, e.g. http://localhost:4318/v1/traces
+TRACING_COLLECTOR_URL = os.getenv("TRACING_COLLECTOR_URL")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "dockerfile-generator-server")
+# Spans are exported in batches from a background thread
+TRACING_EXPORT_INTERVAL_SECONDS = float(os.getenv("TRACING_EXPORT_INTERVAL_SECONDS", "2"))
+TRACING_MAX_QUEUE_SIZE = int(os.getenv("TRACING_MAX_QUEUE_SIZE", "2048"))
+
+TRACEPARENT_HEADER = "traceparent"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """Parse a W3C traceparent header into (trace_id, parent_span_id, sampled), or None if invalid."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    version, trace_id, span_id, flags = parts[:4]
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 0x01)
+    except ValueError:
+        return None
+    if version == "ff" or trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id.lower(), span_id.lower(), sampled
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool) -> str:
+    return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+
+def new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """A timed operation within a trace. Use as a context manager via start_span()."""
+
+    recording = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error.type"] = type(exc).__name__
+        self.attributes["error.message"] = str(exc)[:500]
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            span_processor.on_end(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "service": TRACING_SERVICE_NAME,
+        }
+
+
+class _NonRecordingSpan:
+    """Shared stand-in used when a request isn't sampled: every operation is a no-op."""
+
+    recording = False
+    name = ""
+    trace_id = ""
+    span_id = ""
+    parent_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+# Span of the code currently running (per asyncio task / thread)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=NON_RECORDING_SPAN)
+# Trace id of the current request, kept even when the request isn't sampled
+_current_trace_id: contextvars.ContextVar = contextvars.ContextVar("current_trace_id", default=None)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace id of the current request, sampled or not (for log correlation)."""
+    return _current_trace_id.get()
+
+
+@contextmanager
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """
+    Start a child of the current span. When the current request isn't sampled this
+    yields the shared non-recording span without allocating anything.
+    """
+    parent = _current_span.get()
+    if not parent.recording:
+        yield NON_RECORDING_SPAN
+        return
+    span = Span(name, parent.trace_id, parent.span_id, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+@contextmanager
+def start_request_trace(name: str, traceparent: Optional[str], attributes: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """
+    Start the root span of a server request, continuing the caller's trace when a
+    valid traceparent header is present. A caller-sampled trace is always recorded;
+    otherwise TRACING_SAMPLE_RATIO decides. With tracing disabled only the trace id
+    is kept (for log correlation) and no span is recorded.
+    """
+    parsed = parse_traceparent(traceparent)
+    trace_id, parent_id, caller_sampled = parsed if parsed else (new_trace_id(), None, False)
+    id_token = _current_trace_id.set(trace_id)
+    try:
+        sampled = TRACING_ENABLED and (caller_sampled or random.random() < TRACING_SAMPLE_RATIO)
+        if not sampled:
+            yield NON_RECORDING_SPAN
+            return
+        span = Span(name, trace_id, parent_id, attributes)
+        span_token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(span_token)
+            span.end()
+    finally:
+        _current_trace_id.reset(id_token)
+
+
+def detached_span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """
+    Create a child of the current span without making it current. For async
+    generators, whose context is shared with the consumer; call end() when done.
+    """
+    parent = _current_span.get()
+    if not parent.recording:
+        return NON_RECORDING_SPAN
+    return Span(name, parent.trace_id, parent.span_id, attributes)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware: starts the request's root span (continuing the caller's
+    traceparent) and returns the trace id in the X-Trace-Id response header, so a
+    slow request can be matched to server logs and spans. Streaming responses are
+    covered until the last body chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        with start_request_trace(f"{scope['method']} {scope['path']}", traceparent) as span:
+            span.set_attribute("http.method", scope["method"])
+            span.set_attribute("http.target", scope["path"])
+            trace_header = (b"x-trace-id", current_trace_id().encode("ascii"))
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    message["headers"] = [*message.get("headers", []), trace_header]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
+
+
+class TraceIdLogFilter(logging.Filter):
+    """
+    Tags records logged while handling a request with its trace id (the request id
+    in text and JSON log output). Runs in the logging thread, before the record is
+    queued, so the request's context is still current.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace_id = _current_trace_id.get()
+        if trace_id and not getattr(record, "trace_id", None):
+            record.trace_id = trace_id
+        return True
+
+
+logger.addFilter(TraceIdLogFilter())
+
+
+# --- Exporters ---
+class FileSpanExporter:
+    """Appends spans as JSON lines to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """Posts spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self._client = httpx.Client(timeout=timeout)
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", TRACING_SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "dockerfile-generator"},
+                "spans": [self._otlp_span(span) for span in spans],
+            }],
+        }]}
+        self._client.post(self.url, json=payload).raise_for_status()
+
+    @staticmethod
+    def _otlp_span(span: Span) -> Dict[str, Any]:
+        return {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id or "",
+            "name": span.name,
+            "kind": 2 if span.parent_id is None else 1,  # SERVER for roots, INTERNAL otherwise
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": 2 if span.status == "error" else 1},
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class BatchSpanProcessor:
+    """
+    Buffers finished spans and exports them from a background thread, so request
+    handling never waits on file or network I/O. When the buffer is full, new spans
+    are dropped (and counted) rather than blocking.
+    """
+
+    def __init__(self, exporters: List[Any], interval: float = 2.0, max_queue_size: int = 2048):
+        self.exporters = exporters
+        self.interval = interval
+        self.max_queue_size = max_queue_size
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped = 0
+
+    def on_end(self, span: Span) -> None:
+        if not self.exporters:
+            return
+        with self._lock:
+            if len(self._buffer) >= self.max_queue_size:
+                self.dropped += 1
+                return
+            self._buffer.append(span)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def force_flush(self) -> None:
+        """Export everything buffered now (called on shutdown and from tests)."""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if not spans:
+            return
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                logger.warning(f"Span export via {type(exporter).__name__} failed: {e}")
+        self.exported += len(spans)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.force_flush()
+
+
+def _build_exporters() -> List[Any]:
+    exporters: List[Any] = []
+    if TRACING_EXPORT_FILE:
+        exporters.append(FileSpanExporter(TRACING_EXPORT_FILE))
+    if TRACING_COLLECTOR_URL:
+        exporters.append(OTLPHttpSpanExporter(TRACING_COLLECTOR_URL))
+    if TRACING_ENABLED and not exporters:
+        logger.warning("Tracing is enabled but neither TRACING_EXPORT_FILE nor TRACING_COLLECTOR_URL is set; spans are discarded.")
+    return exporters
+
+
+# == Shared instance ==
+span_processor = BatchSpanProcessor(
+    _build_exporters() if TRACING_ENABLED else [],
+    interval=TRACING_EXPORT_INTERVAL_SECONDS,
+    max_queue_size=TRACING_MAX_QUEUE_SIZE
+)
@@ -0,0 +1,138 @@
+# mcp_server/app/core/validator.py
+
+import re
+from typing import List, Optional, Tuple
+
+from app.core.dockerfile_parser import DockerfileProcessor, Instruction
+
+# Problem codes reported by validate_dockerfile (also used as metric labels)
+PROBLEM_BASE_IMAGE = "missing_base_image"
+PROBLEM_EXPOSE = "missing_expose"
+PROBLEM_COMMAND = "missing_command"
+PROBLEM_DEPENDENCIES = "missing_dependency_install"
+PROBLEM_SYNTAX = "syntax"
+
+# RUN commands that install application dependencies, for any supported ecosystem
+INSTALL_COMMAND_PATTERN = re.compile(
+    r"\b(?:pip3?|uv pip|poetry|pipenv|conda)\s+install\b|\buv\s+sync\b"
+    r"|\b(?:npm|pnpm)\s+(?:ci|install|i)\b|\byarn(?:\s+install)?\b|\bbun\s+install\b"
+    r"|\bgo\s+(?:mod\s+download|get|build)\b|\bcargo\s+(?:build|fetch|install)\b"
+    r"|\bbundle\s+install\b|\bgem\s+install\b|\bcomposer\s+install\b"
+    r"|\bmvn\b|\bgradlew?\b|\bdotnet\s+(?:restore|publish|build)\b|\bmix\s+deps\.get\b"
+    r"|\brebar3\b|\bcpanm?\b|\bswift\s+build\b|\bdart\s+pub\s+get\b|\bcabal\b|\bstack\s+build\b",
+    re.IGNORECASE
+)
+_EXPOSE_PORT_PATTERN = re.compile(r"^(\d+)(?:/(?:tcp|udp))?$", re.IGNORECASE)
+# Ending of the parser issue for instructions that precede the first FROM
+_BEFORE_FROM_SUFFIX = "appears before the first FROM."
+
+
+class ValidationProblem:
+    """One problem found in a generated Dockerfile; `fixable` means a local fix exists."""
+
+    __slots__ = ("code", "message", "fixable")
+
+    def __init__(self, code: str, message: str, fixable: bool = False):
+        self.code = code
+        self.message = message
+        self.fixable = fixable
+
+    def __repr__(self) -> str:
+        return f"ValidationProblem({self.code!r}, {self.message!r}, fixable={self.fixable})"
+
+
+def validate_dockerfile(processor: DockerfileProcessor, port: Optional[int] = None,
+                        dependencies: Optional[List[str]] = None) -> List[ValidationProblem]:
+    """
+    Check a processed Dockerfile against the request, using the processor's AST:
+    a stage on the requested base image, EXPOSE of the requested port and a CMD or
+    ENTRYPOINT in the final stage, a step installing the requested dependencies,
+    and no structural issues.
+    """
+    problems: List[ValidationProblem] = []
+    if not processor.base_image_found:
+        if processor.stages:
+            images = ", ".join(stage.original_image for stage in processor.stages)
+            problems.append(ValidationProblem(
+                PROBLEM_BASE_IMAGE, f"No stage uses the base image '{processor.generic_base_image}' (found: {images})."))
+        else:
+            problems.append(ValidationProblem(PROBLEM_BASE_IMAGE, "The Dockerfile has no FROM instruction.", fixable=True))
+
+    final_stage = _final_stage(processor)
+    if port and not any(_exposes(instruction.args, port) for instruction in final_stage if instruction.keyword == "EXPOSE"):
+        problems.append(ValidationProblem(PROBLEM_EXPOSE, f"The final stage does not EXPOSE port {port}.", fixable=True))
+
+    if not any(instruction.keyword in ("CMD", "ENTRYPOINT") for instruction in final_stage):
+        problems.append(ValidationProblem(PROBLEM_COMMAND, "The final stage has no CMD or ENTRYPOINT."))
+
+    wanted = [dep.strip() for dep in (dependencies or []) if dep.strip()]
+    if wanted and not _installs_dependencies(processor, wanted):
+        problems.append(ValidationProblem(
+            PROBLEM_DEPENDENCIES, f"No RUN step installs the dependencies ({', '.join(wanted)})."))
+
+    for issue in processor.issues:
+        if not processor.stages and issue.endswith(_BEFORE_FROM_SUFFIX):
+            continue  # Covered by the missing FROM, which the local fix prepends
+        problems.append(ValidationProblem(PROBLEM_SYNTAX, issue))
+    return problems
+
+
+def apply_local_fixes(content: str, problems: List[ValidationProblem], harbor_path: str,
+                      port: Optional[int] = None) -> Tuple[str, List[ValidationProblem], List[ValidationProblem]]:
+    """
+    Apply the deterministic fixes for fixable problems to processed content.
+    Returns (content, fixed problems, remaining problems).
+    """
+    fixed, remaining = [], []
+    lines = content.split("\n")
+    for problem in problems:
+        if not problem.fixable:
+            remaining.append(problem)
+            continue
+        if problem.code == PROBLEM_BASE_IMAGE:
+            lines[:0] = [f"FROM {harbor_path}", ""]
+        elif problem.code == PROBLEM_EXPOSE:
+            _insert_before_command(lines, f"EXPOSE {port}")
+        fixed.append(problem)
+    return "\n".join(lines), fixed, remaining
+
+
+def _final_stage(processor: DockerfileProcessor) -> List[Instruction]:
+    """Instructions after the last FROM (all of them if there is none)."""
+    instructions = processor.instructions
+    for index in range(len(instructions) - 1, -1, -1):
+        if instructions[index].keyword == "FROM":
+            return instructions[index + 1:]
+    return instructions
+
+
+def _exposes(args: str, port: int) -> bool:
+    for token in args.split():
+        match = _EXPOSE_PORT_PATTERN.match(token)
+        if match and int(match.group(1)) == port:
+            return True
+    return False
+
+
+def _installs_dependencies(processor: DockerfileProcessor, dependencies: List[str]) -> bool:
+    """True if a RUN step runs a package manager install or names one of the dependencies."""
+    lowered = [dep.lower() for dep in dependencies]
+    for instruction in processor.instructions:
+        if instruction.keyword != "RUN":
+            continue
+        if INSTALL_COMMAND_PATTERN.search(instruction.args):
+            return True
+        args = instruction.args.lower()
+        if any(dep in args for dep in lowered):
+            return True
+    return False
+
+
+def _insert_before_command(lines: List[str], new_line: str) -> None:
+    """Insert new_line before the last CMD/ENTRYPOINT line, or append it."""
+    for index in range(len(lines) - 1, -1, -1):
+        head = lines[index].lstrip()[:10].upper()
+        if head.startswith(("CMD", "ENTRYPOINT")):
+            lines.insert(index, new_line)
+            return
+    lines.append(new_line)
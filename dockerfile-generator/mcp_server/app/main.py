@@ -1,13 +1,27 @@
 # mcp_server/app/main.py (Updated for Day 12)
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.docker_file import router as dockerfile_router
-from app.config import config # Import config to check during startup
+from app.api.v1.jobs import router as jobs_router, run_generation_job
+from app.config import (
+    config, # Import config to check during startup
+    CONFIG_WATCH_INTERVAL_SECONDS,
+    watch_config_file,
+    install_sighup_reload_handler,
+    get_config_status
+)
 from app.models.response import ErrorResponse # Use our standard error model
+from app.core.metrics import CONTENT_TYPE_LATEST, render_metrics
+from app.core.tracing import TracingMiddleware, span_processor
+from app.core.jobs import JOB_WORKERS, JobWorkerPool, job_queue
+from app.core.cache import response_cache
 from app.utils.logger import logger
 
 # Import custom exceptions and AI exceptions to handle them
@@ -16,13 +30,19 @@ from app.utils.exceptions import (
     ConfigurationError,
     HarborPathNotFoundError,
     UnsupportedLanguageError,
-    AIResponseError
+    AIResponseError,
+    JobNotFoundError,
+    JobQueueFullError,
+    WebhookNotAllowedError
     # AIServiceInteractionError could be caught by DockerfileGeneratorError handler
 )
 from app.core.ai_service import ( # Import specific AI errors
     AIAuthenticationError,
     AIConnectionError,
-    AIServiceError # Base AI error if not caught specifically
+    AIServiceError, # Base AI error if not caught specifically
+    AI_WARMUP_ON_STARTUP,
+    warm_up_ai_client_async,
+    shutdown_ai_executor
 )
 
 # --- Check critical config during startup ---
@@ -36,11 +56,40 @@ else:
      logger.info("Application configuration loaded/checked during startup.")
 
 
+# --- Application lifespan (startup/shutdown hooks) ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background resources owned by the application."""
+    # Prime the Gemini client and its gRPC channel before the first request
+    if AI_WARMUP_ON_STARTUP:
+        await warm_up_ai_client_async()
+    # Hot reload of harbor_mapping.yaml (file watcher and SIGHUP)
+    watcher_task = None
+    if CONFIG_WATCH_INTERVAL_SECONDS > 0:
+        watcher_task = asyncio.create_task(watch_config_file(CONFIG_WATCH_INTERVAL_SECONDS))
+    install_sighup_reload_handler()
+    # In-process workers for asynchronous jobs (more can run as 'python -m app.worker')
+    job_workers = JobWorkerPool(job_queue, run_generation_job, JOB_WORKERS)
+    job_workers.start()
+    yield
+    if watcher_task is not None:
+        watcher_task.cancel()
+    await job_workers.stop()
+    # Release the worker threads used for blocking AI calls
+    shutdown_ai_executor()
+    # Finish write-behind disk cache writes
+    if response_cache is not None:
+        response_cache.close()
+    # Export spans still buffered
+    span_processor.force_flush()
+
+
 # --- Create FastAPI App ---
 app = FastAPI(
     title="Dockerfile Generator",
     description="Service that generates Dockerfiles with company-specific Harbor paths",
     version="0.1.0",
+    lifespan=lifespan,
     # Add OpenAPI URL if needed, e.g., for proxies
     # openapi_url="/api/v1/openapi.json"
 )
@@ -52,8 +101,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "ETag", "X-Config-Version"],
 )
 
+# Trace context propagation (traceparent in, X-Trace-Id out) and request spans
+app.add_middleware(TracingMiddleware)
+
 # --- Exception Handlers ---
 
 @app.exception_handler(RequestValidationError)
@@ -89,6 +142,17 @@ async def harbor_path_not_found_handler(request: Request, exc: HarborPathNotFoun
         content=ErrorResponse(status="error", message=exc.message, error_code=exc.error_code).dict(),
     )
 
+@app.exception_handler(JobNotFoundError)
+@app.exception_handler(JobQueueFullError)
+@app.exception_handler(WebhookNotAllowedError)
+async def job_error_handler(request: Request, exc: DockerfileGeneratorError):
+    """Handles unknown/expired job IDs, a full job queue and disallowed webhook URLs."""
+    logger.warning(f"{type(exc).__name__} caught: {exc.message}")
+    return JSONResponse(
+        status_code=exc.status_code, # 404 / 503 / 400
+        content=ErrorResponse(status="error", message=exc.message, error_code=exc.error_code).dict(),
+    )
+
 @app.exception_handler(AIResponseError)
 async def ai_response_error_handler(request: Request, exc: AIResponseError):
     """Handles errors related to invalid/unusable AI responses."""
@@ -150,6 +214,12 @@ app.include_router(
     tags=["Dockerfile Generation"] # Add a tag for Swagger UI
 )
 
+app.include_router(
+    jobs_router,
+    prefix="/api/v1",
+    tags=["Asynchronous Jobs"]
+)
+
 # --- Root/Health endpoints ---
 @app.get("/", tags=["Status"])
 async def root():
@@ -160,4 +230,15 @@ async def root():
 async def health():
     """Simple health check endpoint."""
     # Could add checks here for DB, AI service connectivity etc. if needed later
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/config/status", tags=["Status"], response_model=dict)
+async def config_status():
+    """Active Harbor mapping version and hot-reload statistics."""
+    return get_config_status()
+
+@app.get("/metrics", tags=["Status"], include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: per-stage latency histograms, request/error counters and in-flight gauges."""
+    # Off the event loop: some gauges read the SQLite job store
+    return Response(content=await asyncio.to_thread(render_metrics), media_type=CONTENT_TYPE_LATEST)
@@ -1,5 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+import os
+from pydantic import BaseModel, Field, HttpUrl
+from typing import List, Literal, Optional
+
+# Maximum number of requests accepted in one batch call
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
 
 class DockerfileRequest(BaseModel):
     language: str = Field(..., description="Programming language (e.g., python, node, java)")
@@ -8,6 +12,20 @@ class DockerfileRequest(BaseModel):
     port: Optional[int] = Field(None, description="Port to expose in the Dockerfile")
     app_type: Optional[str] = Field(None, description="Type of application (e.g., web, cli, api)")
     additional_instructions: Optional[str] = Field(None, description="Custom instructions for the AI")
+    package_manager: Optional[str] = Field(
+        None,
+        description="Package manager whose lockfile or requirements file the project has (e.g., pip, npm, poetry, "
+                    "uv, pipenv, pnpm, yarn); unset when none is known, so no such file is assumed"
+    )
+    generation_mode: Literal["auto", "template", "ai"] = Field(
+        "auto",
+        description="'auto' renders a local template when one covers the request and falls back to the AI; "
+                    "'template' requires a template; 'ai' always asks the AI"
+    )
+    provider: Optional[str] = Field(
+        None,
+        description="AI provider to use (e.g., gemini, openai, stub); by default the server's routing policy picks one"
+    )
     
     class Config:
         schema_extra = {
@@ -19,4 +37,38 @@ class DockerfileRequest(BaseModel):
                 "app_type": "web",
                 "additional_instructions": "Include healthcheck"
             }
-        }
\ No newline at end of file
+        }
+
+class BatchDockerfileRequest(BaseModel):
+    requests: List[DockerfileRequest] = Field(
+        ..., min_length=1, max_length=BATCH_MAX_ITEMS,
+        description=f"Dockerfile requests to generate (1 to {BATCH_MAX_ITEMS} items)"
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "requests": [
+                    {"language": "python", "version": "3.11", "port": 5000, "app_type": "web"},
+                    {"language": "node", "version": "18", "port": 3000, "app_type": "api"}
+                ]
+            }
+        }
+
+class JobRequest(DockerfileRequest):
+    webhook_url: Optional[HttpUrl] = Field(
+        None,
+        description="https URL that receives a POST with the finished job (same body as GET /jobs/{job_id}); "
+                    "must resolve to a public address unless its host is in JOB_WEBHOOK_ALLOWED_HOSTS"
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "language": "python",
+                "version": "3.11",
+                "port": 5000,
+                "app_type": "web",
+                "webhook_url": "https://ci.example.com/hooks/dockerfile"
+            }
+        }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class BaseImage(BaseModel):
@@ -10,6 +10,9 @@ class DockerfileResponse(BaseModel):
     status: str = Field(..., description="Status of the request (success or error)")
     dockerfile_content: str = Field(..., description="The generated Dockerfile content")
     base_image: BaseImage = Field(..., description="Information about the base image used")
+    cached: bool = Field(False, description="True if the Dockerfile was served from the response cache")
+    generator: str = Field("ai", description="Which path produced the Dockerfile: 'template' or 'ai'")
+    degraded: bool = Field(False, description="True for a template fallback served while the AI service is unavailable (not cacheable)")
     
     class Config:
         schema_extra = {
@@ -19,7 +22,9 @@ class DockerfileResponse(BaseModel):
                 "base_image": {
                     "generic": "python:3.11-slim",
                     "harbor_path": "harbor.company.com/custom-images/python:3.11-slim-hardened"
-                }
+                },
+                "cached": False,
+                "generator": "ai"
             }
         }
 
@@ -35,4 +40,44 @@ class ErrorResponse(BaseModel):
                 "message": "Failed to generate Dockerfile: Language not supported",
                 "error_code": "UNSUPPORTED_LANGUAGE"
             }
-        }
\ No newline at end of file
+        }
+
+class CacheStatsResponse(BaseModel):
+    entries: int = Field(..., description="Entries currently held in the memory tier")
+    max_entries: int = Field(..., description="Capacity of the memory tier")
+    ttl_seconds: float = Field(..., description="Time-to-live applied to each entry")
+    disk_tier_enabled: bool = Field(..., description="Whether the persistent SQLite tier is active")
+    memory_hits: int = Field(..., description="Lookups answered from memory")
+    disk_hits: int = Field(..., description="Lookups answered from the disk tier")
+    hits: int = Field(..., description="Total cache hits")
+    misses: int = Field(..., description="Lookups that required an AI call")
+    hit_ratio: float = Field(..., description="hits / (hits + misses)")
+
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the submitted batch")
+    status: str = Field(..., description="'success' or 'error' for this item")
+    result: Optional[DockerfileResponse] = Field(None, description="Generated Dockerfile when status is 'success'")
+    error: Optional[ErrorResponse] = Field(None, description="Error details when status is 'error'")
+    etag: Optional[str] = Field(None, description="ETag the generate endpoint sends for this request (for client caches; none for degraded results)")
+
+class BatchDockerfileResponse(BaseModel):
+    status: str = Field(..., description="'success' if every item succeeded, 'partial' if some failed, 'error' if all failed")
+    total: int = Field(..., description="Number of items submitted")
+    succeeded: int = Field(..., description="Number of items generated successfully")
+    failed: int = Field(..., description="Number of items that failed")
+    unique_requests: int = Field(..., description="Distinct requests after de-duplication")
+    config_version: Optional[str] = Field(None, description="Configuration version the batch was generated with")
+    results: List[BatchItemResult] = Field(..., description="Per-item results, in submission order")
+
+
+class JobResponse(BaseModel):
+    job_id: str = Field(..., description="ID of the job, used to poll GET /api/v1/jobs/{job_id}")
+    status: str = Field(..., description="'queued', 'running', 'succeeded' or 'failed'")
+    created_at: float = Field(..., description="Submission time (Unix seconds)")
+    started_at: Optional[float] = Field(None, description="When a worker started the job (Unix seconds)")
+    finished_at: Optional[float] = Field(None, description="When the job finished (Unix seconds)")
+    expires_at: Optional[float] = Field(None, description="When the finished job and its result are deleted (Unix seconds)")
+    result: Optional[DockerfileResponse] = Field(None, description="Generated Dockerfile when status is 'succeeded'")
+    error: Optional[ErrorResponse] = Field(None, description="Error details when status is 'failed'")
+    webhook_status: Optional[str] = Field(None, description="'pending', 'delivered' or 'failed' when a webhook_url was given")
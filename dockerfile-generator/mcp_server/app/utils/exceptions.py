@@ -32,12 +32,33 @@ class HarborPathNotFoundError(DockerfileGeneratorError):
 # Base Image selection errors
 class UnsupportedLanguageError(DockerfileGeneratorError):
     """Raised when a requested language isn't supported for base image selection."""
-    def __init__(self, language: str):
+    def __init__(self, language: str, supported: list[str] | None = None):
         message = f"The requested language '{language}' is not supported for base image selection."
+        if supported:
+            message += f" Supported languages: {', '.join(supported)}."
         # 400 Bad Request as it's invalid user input
         super().__init__(message, status_code=400, error_code="UNSUPPORTED_LANGUAGE")
         self.language = language
 
+class UnsupportedProviderError(DockerfileGeneratorError):
+    """Raised when a request names an AI provider that doesn't exist or isn't configured on this server."""
+    def __init__(self, provider: str, available: list[str], configured: bool = True):
+        if configured:
+            message = f"The requested AI provider '{provider}' is not supported. Available providers: {', '.join(available)}."
+        else:
+            message = f"The requested AI provider '{provider}' is not configured on this server."
+        super().__init__(message, status_code=400, error_code="UNSUPPORTED_PROVIDER")
+        self.provider = provider
+
+class TemplateNotAvailableError(DockerfileGeneratorError):
+    """Raised when generation_mode='template' is requested but no template covers the request."""
+    def __init__(self, language: str, app_type: str | None):
+        message = (f"No local template is available for language '{language}' and app_type '{app_type}'"
+                   " (or the request has additional_instructions). Use generation_mode 'auto' or 'ai'.")
+        super().__init__(message, status_code=400, error_code="TEMPLATE_NOT_AVAILABLE")
+        self.language = language
+        self.app_type = app_type
+
 # AI Service related errors
 class AIServiceInteractionError(DockerfileGeneratorError):
     """Raised for general issues during AI service interaction."""
@@ -50,4 +71,26 @@ class AIResponseError(DockerfileGeneratorError):
     """Raised when the AI response is invalid or unusable (e.g., missing FROM line)."""
     def __init__(self, message: str):
         # Internal Server Error as the backend failed to process AI output
-        super().__init__(message, status_code=500, error_code="AI_RESPONSE_INVALID")
\ No newline at end of file
+        super().__init__(message, status_code=500, error_code="AI_RESPONSE_INVALID")
+# Asynchronous job errors
+class JobQueueFullError(DockerfileGeneratorError):
+    """Raised when a job is submitted while JOB_QUEUE_MAX_SIZE jobs are already queued."""
+    def __init__(self, max_queued: int):
+        message = f"The job queue is full ({max_queued} queued jobs). Please try again later."
+        super().__init__(message, status_code=503, error_code="JOB_QUEUE_FULL")
+        self.max_queued = max_queued
+
+class JobNotFoundError(DockerfileGeneratorError):
+    """Raised when a job ID is unknown or its result has expired."""
+    def __init__(self, job_id: str):
+        message = f"Job '{job_id}' was not found or its result has expired."
+        super().__init__(message, status_code=404, error_code="JOB_NOT_FOUND")
+        self.job_id = job_id
+
+class WebhookNotAllowedError(DockerfileGeneratorError):
+    """Raised when a job's webhook URL is not an allowed target (scheme, host allowlist or address)."""
+    def __init__(self, url: str, reason: str):
+        message = f"Webhook URL '{url}' is not allowed: {reason}."
+        super().__init__(message, status_code=400, error_code="WEBHOOK_NOT_ALLOWED")
+        self.url = url
+        self.reason = reason
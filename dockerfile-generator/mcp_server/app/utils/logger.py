@@ -1,31 +1,144 @@
-import logging
+import os
 import sys
-from datetime import datetime
+import json
+import queue
+import atexit
+import random
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# --- Logging settings (environment overridable) ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# 'text' (human readable) or 'json' (one JSON object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Records waiting for the writer thread; when full, new records are dropped instead of blocking
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Large payloads (prompts, AI responses) are cut to this many characters
+LOG_MAX_PAYLOAD_CHARS = int(os.getenv("LOG_MAX_PAYLOAD_CHARS", "2000"))
+# Fraction of DEBUG payload logs that are actually written
+LOG_PAYLOAD_SAMPLE_RATIO = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATIO", "1.0"))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def truncate(text: str, limit: int = LOG_MAX_PAYLOAD_CHARS) -> str:
+    """Cut text to limit characters, noting how much was dropped."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated {len(text) - limit} chars]"
+
+
+class TextFormatter(logging.Formatter):
+    """The classic text format, with the request's trace id when there is one."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        trace_id = getattr(record, "trace_id", None)
+        return f"[trace={trace_id}] {line}" if trace_id else line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message, trace_id and exception."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without waiting on I/O.
+
+    The message is merged with its args and any traceback rendered here, in the
+    logging thread, so the queued record doesn't keep request objects alive.
+    When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
 
 # Configure logging
 def setup_logger(name: str = "dockerfile_generator"):
-    """Set up and return a logger with the given name."""
+    """
+    Set up and return a logger with the given name.
+
+    Records go through a bounded in-memory queue to a background thread that
+    formats (text or JSON) and writes them to stdout, so request handlers never
+    block on log I/O.
+    """
     logger = logging.getLogger(name)
-    
+
     # Avoid adding handlers multiple times
     if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        
-        # Console handler
+        logger.setLevel(LOG_LEVEL)
+
+        # Console handler, driven by the background listener
         console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        
+        console_handler.setLevel(LOG_LEVEL)
+
         # Format
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        if LOG_FORMAT == "json":
+            formatter = JsonFormatter()
+        else:
+            formatter = TextFormatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
         console_handler.setFormatter(formatter)
-        
+
         # Add handlers
-        logger.addHandler(console_handler)
-    
+        queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        listener = QueueListener(queue_handler.queue, console_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)  # Flush what's queued on exit
+        logger.addHandler(queue_handler)
+
     return logger
 
+
+def log_payload(logger: logging.Logger, label: str, payload: str) -> None:
+    """
+    Log a large payload (prompt, AI response) at DEBUG, truncated and sampled.
+    Nothing is built unless DEBUG is enabled for the logger.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if LOG_PAYLOAD_SAMPLE_RATIO < 1.0 and random.random() >= LOG_PAYLOAD_SAMPLE_RATIO:
+        return
+    logger.debug("%s (%d chars):\n---\n%s\n---", label, len(payload), truncate(payload, LOG_MAX_PAYLOAD_CHARS))
+
+
+def dropped_log_records(logger: logging.Logger) -> int:
+    """Number of records dropped because the log queue was full."""
+    return sum(getattr(handler, "dropped", 0) for handler in logger.handlers)
+
+
 # Create default logger
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
@@ -0,0 +1,62 @@
+# mcp_server/app/worker.py
+"""
+Standalone job worker: runs asynchronous generation jobs without serving HTTP.
+
+Run it next to (or instead of) the API's in-process workers, sharing the SQLite job store:
+
+    JOB_DB=/var/lib/dockerfile-generator/jobs.sqlite3 python -m app.worker --workers 8
+
+Scale generation by adding worker processes; set JOB_WORKERS=0 on the API to keep the
+HTTP front end free of generation work.
+"""
+
+import argparse
+import asyncio
+import signal
+import sys
+
+from app.api.v1.jobs import run_generation_job
+from app.core.ai_service import AI_WARMUP_ON_STARTUP, shutdown_ai_executor, warm_up_ai_client_async
+from app.core.jobs import JOB_WORKERS, JobWorkerPool, job_queue
+from app.core.tracing import span_processor
+from app.utils.logger import logger
+
+
+async def run_workers(workers: int) -> None:
+    """Run the worker pool until SIGINT/SIGTERM."""
+    if AI_WARMUP_ON_STARTUP:
+        await warm_up_ai_client_async()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported on this platform; Ctrl+C still ends the process
+    pool = JobWorkerPool(job_queue, run_generation_job, workers)
+    pool.start()
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Stopping job workers.")
+        await pool.stop()
+        shutdown_ai_executor()
+        span_processor.force_flush()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run Dockerfile generation job workers against the shared job store.")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS or 4,
+                        help="Concurrent jobs in this process (default: JOB_WORKERS, or 4 if that is 0)")
+    args = parser.parse_args()
+    if not job_queue.store.shared:
+        logger.critical("A standalone worker needs the shared SQLite job store: set JOB_DB to the API's job database.")
+        return 1
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    asyncio.run(run_workers(args.workers))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# mcp_server/benchmarks/bench_harbor_resolve.py
+#
+# Micro-benchmark for Config.resolve_harbor_path.
+# Compares the original per-call implementation with the precompiled index + memo.
+#
+# Usage (from mcp_server/):
+#   python -m benchmarks.bench_harbor_resolve [--mappings 5000] [--lookups 200000]
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import timeit
+
+import yaml
+
+from app.config import Config
+from app.utils.logger import logger
+
+
+def legacy_resolve(harbor_base_url: str, mappings: dict, generic_image_name: str) -> str:
+    """The pre-index resolve_harbor_path logic (without logging), kept for comparison."""
+    input_has_tag = ":" in generic_image_name
+    if input_has_tag:
+        base_name, tag = generic_image_name.split(":", 1)
+    else:
+        base_name, tag = generic_image_name, "latest"
+    if generic_image_name in mappings:
+        part = mappings[generic_image_name]
+        if not input_has_tag and ":" not in part:
+            return f"{harbor_base_url.rstrip('/')}/{part.lstrip('/')}:{tag}"
+        return f"{harbor_base_url.rstrip('/')}/{part.lstrip('/')}"
+    if base_name in mappings:
+        part = mappings[base_name]
+        if ":" in part:
+            return f"{harbor_base_url.rstrip('/')}/{part.lstrip('/')}"
+        return f"{harbor_base_url.rstrip('/')}/{part.lstrip('/')}:{tag}"
+    return f"{harbor_base_url.rstrip('/')}/library/{base_name}:{tag}"
+
+
+def build_mapping_file(directory: str, n_mappings: int) -> str:
+    """Write a synthetic mapping file with n_mappings entries and return its path."""
+    mappings = {}
+    for i in range(n_mappings):
+        mappings[f"team{i % 50}-image{i}"] = f"team{i % 50}/image{i}"
+        mappings[f"team{i % 50}-image{i}:{i % 7}.0"] = f"team{i % 50}/image{i}:{i % 7}.0-hardened"
+    path = os.path.join(directory, "bench_mapping.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump({"harbor_base_url": "harbor.bench.local/", "mappings": mappings}, f)
+    return path
+
+
+def run(n_mappings: int, n_lookups: int, n_distinct: int) -> dict:
+    logger.setLevel(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Config(config_path=build_mapping_file(tmp, n_mappings))
+
+    rng = random.Random(42)
+    names = [f"team{i % 50}-image{i}:{rng.choice(['1.0', '2.0', '3.0', 'latest'])}"
+             for i in (rng.randrange(n_mappings) for _ in range(n_distinct))]
+    lookups = [names[rng.randrange(n_distinct)] for _ in range(n_lookups)]
+
+    # Sanity check: both implementations agree
+    for name in names:
+        assert config.resolve_harbor_path(name) == legacy_resolve(config.harbor_base_url, config.mappings, name), name
+
+    legacy_s = timeit.timeit(
+        lambda: [legacy_resolve(config.harbor_base_url, config.mappings, n) for n in lookups], number=1)
+    indexed_s = timeit.timeit(lambda: [config.resolve_harbor_path(n) for n in lookups], number=1)
+
+    return {
+        "mappings": len(config.mappings),
+        "lookups": n_lookups,
+        "distinct_images": n_distinct,
+        "legacy_ns_per_lookup": round(legacy_s / n_lookups * 1e9, 1),
+        "indexed_ns_per_lookup": round(indexed_s / n_lookups * 1e9, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Harbor path resolution.")
+    parser.add_argument("--mappings", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=500)
+    args = parser.parse_args()
+
+    result = run(args.mappings, args.lookups, args.distinct)
+    for key, value in result.items():
+        print(f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# mcp_server/benchmarks/bench_logging.py
+#
+# Micro-benchmark for the cost of logging on the request path.
+# Compares a synchronous StreamHandler with the queue-based handler used by the
+# app logger, and the old eager f-string DEBUG payload with log_payload().
+#
+# Usage (from mcp_server/):
+#   python -m benchmarks.bench_logging [--records 50000] [--payload-chars 4000] [--sink-latency-us 50] > /dev/null
+# Results are printed to stderr so stdout (the log sink) can be discarded.
+
+import argparse
+import io
+import logging
+import queue
+import sys
+import time
+import timeit
+from logging.handlers import QueueListener
+
+from app.utils.logger import TEXT_FORMAT, DATE_FORMAT, NonBlockingQueueHandler, TextFormatter, log_payload
+
+
+class SlowSink(io.TextIOBase):
+    """Stdout stand-in whose writes block for a while, like a pipe to a busy log collector."""
+
+    def __init__(self, stream, latency_us: float):
+        self.stream = stream
+        self.latency = latency_us / 1e6
+
+    def write(self, text: str) -> int:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def make_sync_logger(stream) -> logging.Logger:
+    logger = logging.getLogger("bench.sync")
+    logger.handlers.clear()
+    logger.propagate = False
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def make_queued_logger(stream):
+    logger = logging.getLogger("bench.queued")
+    logger.handlers.clear()
+    logger.propagate = False
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(TextFormatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=1_000_000))
+    listener = QueueListener(queue_handler.queue, handler)
+    logger.addHandler(queue_handler)
+    logger.setLevel(logging.INFO)
+    return logger, listener
+
+
+def run(n_records: int, payload_chars: int, sink_latency_us: float) -> dict:
+    payload = "RUN pip install -r requirements.txt\n" * (payload_chars // 36)
+    sink = SlowSink(sys.stdout, sink_latency_us)
+
+    sync_logger = make_sync_logger(sink)
+    sync_s = timeit.timeit(lambda: sync_logger.info(f"Resolved Harbor path: harbor.local/library/python:3.11"),
+                           number=n_records)
+
+    queued_logger, listener = make_queued_logger(sink)
+    listener.start()
+    queued_s = timeit.timeit(lambda: queued_logger.info(f"Resolved Harbor path: harbor.local/library/python:3.11"),
+                             number=n_records)
+    listener.stop()
+
+    # DEBUG disabled: the old f-string builds the payload message anyway
+    eager_s = timeit.timeit(lambda: sync_logger.debug(f"Prompt:\n---\n{payload}\n---"), number=n_records)
+    lazy_s = timeit.timeit(lambda: log_payload(sync_logger, "Prompt", payload), number=n_records)
+
+    return {
+        "records": n_records,
+        "sink_latency_us": sink_latency_us,
+        "sync_info_us": round(sync_s / n_records * 1e6, 3),
+        "queued_info_us": round(queued_s / n_records * 1e6, 3),
+        "eager_debug_payload_us": round(eager_s / n_records * 1e6, 3),
+        "lazy_debug_payload_us": round(lazy_s / n_records * 1e6, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging cost on the request path.")
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--payload-chars", type=int, default=4000)
+    parser.add_argument("--sink-latency-us", type=float, default=50.0,
+                        help="Simulated blocking time per write to stdout")
+    args = parser.parse_args()
+
+    result = run(args.records, args.payload_chars, args.sink_latency_us)
+    for key, value in result.items():
+        print(f"{key:>24}: {value}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
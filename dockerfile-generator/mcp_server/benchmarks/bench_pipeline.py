@@ -0,0 +1,88 @@
+# mcp_server/benchmarks/bench_pipeline.py
+#
+# Micro-benchmarks for the non-AI steps of a generation request: base image selection,
+# Harbor path resolution, prompt construction and the Dockerfile post-processing (whole
+# response, with request validation, and streamed).
+#
+# Usage (from mcp_server/):
+#   python -m benchmarks.bench_pipeline [--iterations 20000] [--repeat 5] [--output results/pipeline.json]
+# Each figure is the median over --repeat runs of --iterations calls, in ns per call.
+
+import argparse
+import logging
+import statistics
+import timeit
+
+from app.api.v1.docker_file import _postprocess_ai_output, get_base_image
+from app.config import config
+from app.core.dockerfile_parser import DockerfileProcessor
+from app.core.prompts import create_dockerfile_prompt
+from app.utils.logger import logger
+from benchmarks.common import build_report, emit_report
+
+LANGUAGES = [("python", "3.11"), ("node", "18"), ("java", "17"), ("go", "1.21"), ("python", None)]
+GENERIC_IMAGE = "python:3.11-slim"
+HARBOR_PATH = "harbor.bench.local/library/python:3.11-slim"
+AI_OUTPUT = "\n".join([
+    f"FROM {GENERIC_IMAGE}", "", "WORKDIR /app", "", "COPY requirements.txt .",
+    "RUN pip install --no-cache-dir -r requirements.txt", "", "COPY . .", "", "EXPOSE 5000", "",
+    'CMD ["gunicorn", "-b", "0.0.0.0:5000", "app:app"]',
+])
+
+
+def _stream_rewrite(chunks):
+    rewriter = DockerfileProcessor(GENERIC_IMAGE, HARBOR_PATH, resolve=config.resolve_harbor_path,
+                                   harbor_base_url=config.harbor_base_url)
+    for chunk in chunks:
+        rewriter.feed(chunk)
+    rewriter.finish()
+    return rewriter.content
+
+
+def measure(fn, iterations: int, repeat: int, calls: int = 1) -> float:
+    """Median ns per call over `repeat` timing runs; fn makes `calls` calls each time."""
+    runs = timeit.repeat(fn, number=iterations, repeat=repeat)
+    return round(statistics.median(runs) / (iterations * calls) * 1e9, 1)
+
+
+def run(iterations: int, repeat: int) -> dict:
+    logger.setLevel(logging.CRITICAL)
+    if config is None:
+        raise SystemExit("Configuration failed to load; check harbor_mapping.yaml.")
+    images = [get_base_image(language, version) for language, version in LANGUAGES]
+    chunks = [AI_OUTPUT[i:i + 16] for i in range(0, len(AI_OUTPUT), 16)]
+    assert _postprocess_ai_output(AI_OUTPUT, GENERIC_IMAGE, HARBOR_PATH, config)[0] == _stream_rewrite(chunks)
+
+    return {
+        "get_base_image_ns": measure(
+            lambda: [get_base_image(language, version) for language, version in LANGUAGES],
+            iterations, repeat, calls=len(LANGUAGES)),
+        "resolve_harbor_path_ns": measure(
+            lambda: [config.resolve_harbor_path(image) for image in images], iterations, repeat, calls=len(images)),
+        "prompt_build_ns": measure(
+            lambda: create_dockerfile_prompt(language="python", version="3.11", dependencies=["flask", "gunicorn"],
+                                             port=5000, app_type="web", generic_base_image=GENERIC_IMAGE),
+            iterations, repeat),
+        "from_rewrite_ns": measure(lambda: _postprocess_ai_output(AI_OUTPUT, GENERIC_IMAGE, HARBOR_PATH, config),
+                                   iterations, repeat),
+        "postprocess_validate_ns": measure(
+            lambda: _postprocess_ai_output(AI_OUTPUT, GENERIC_IMAGE, HARBOR_PATH, config, 5000, ["flask", "gunicorn"]),
+            iterations, repeat),
+        "streaming_from_rewrite_ns": measure(lambda: _stream_rewrite(chunks), iterations, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the request pipeline steps around the AI call.")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.repeat)
+    config_used = {"iterations": args.iterations, "repeat": args.repeat}
+    emit_report(build_report("pipeline", config_used, results), args.output)
+
+
+if __name__ == "__main__":
+    main()
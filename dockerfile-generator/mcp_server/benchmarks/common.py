@@ -0,0 +1,66 @@
+# mcp_server/benchmarks/common.py
+#
+# Helpers shared by the benchmark scripts: latency summaries and JSON result files
+# that benchmarks/compare.py can diff between runs.
+
+import json
+import math
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100) of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize_latencies(latencies_s: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max of a list of latencies in seconds, reported in milliseconds."""
+    values = sorted(latencies_s)
+    if not values:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5, check=True).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_report(benchmark: str, config: dict, results: dict) -> dict:
+    """Wrap results with the settings used and where/when they were measured."""
+    return {
+        "benchmark": benchmark,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+
+
+def emit_report(report: dict, output: Optional[str]) -> None:
+    """Print the results to stderr and, if requested, write the full report as JSON."""
+    for key, value in report["results"].items():
+        print(f"{key:>28}: {value}", file=sys.stderr)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Results written to {output}", file=sys.stderr)
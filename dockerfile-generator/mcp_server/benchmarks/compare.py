@@ -0,0 +1,79 @@
+# mcp_server/benchmarks/compare.py
+#
+# Diff two JSON benchmark reports (from load_test.py or bench_pipeline.py) and flag regressions.
+#
+# Usage (from mcp_server/):
+#   python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+# Exits with status 1 if any timing got slower, or any rate got lower, by more than
+# --threshold percent.
+
+import argparse
+import json
+import sys
+from typing import Dict, Optional
+
+# Metric name suffixes: timings are better when lower, rates when higher
+LOWER_IS_BETTER = ("_ms", "_us", "_ns", "_s")
+HIGHER_IS_BETTER = ("_rps",)
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a nested results dict, keyed by dotted path."""
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def direction(metric: str) -> Optional[int]:
+    """+1 if higher is better, -1 if lower is better, None if the metric isn't judged."""
+    name = metric.rsplit(".", 1)[-1]
+    if name == "elapsed_s":
+        return None  # Depends on the run size, not on speed
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return None
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> bool:
+    """Print a table of changes; return True if no judged metric regressed beyond threshold."""
+    if baseline.get("benchmark") != candidate.get("benchmark"):
+        print(f"Warning: comparing different benchmarks "
+              f"({baseline.get('benchmark')} vs {candidate.get('benchmark')})", file=sys.stderr)
+    old, new = flatten(baseline["results"]), flatten(candidate["results"])
+    ok = True
+    print(f"{'metric':<36} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for metric in sorted(old.keys() & new.keys()):
+        before, after = old[metric], new[metric]
+        change = (after - before) / before * 100 if before else 0.0
+        verdict = ""
+        sign = direction(metric)
+        if sign is not None and -sign * change > threshold:
+            verdict = "  REGRESSION"
+            ok = False
+        print(f"{metric:<36} {before:>12.3f} {after:>12.3f} {change:>+8.1f}%{verdict}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    sys.exit(0 if compare(baseline, candidate, args.threshold) else 1)
+
+
+if __name__ == "__main__":
+    main()
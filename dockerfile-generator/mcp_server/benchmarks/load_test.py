@@ -0,0 +1,220 @@
+# mcp_server/benchmarks/load_test.py
+#
+# Load test for the generation endpoints, driven at a fixed concurrency (closed loop)
+# or a fixed request rate (open loop). By default app.main:app runs in-process behind
+# an ASGI transport with the stub AI provider standing in for Gemini, so runs are
+# reproducible and need no network or API key. Use --url to drive a running server
+# instead (start it with AI_PROVIDERS=stub and the AI_STUB_* settings for the same setup).
+#
+# Usage (from mcp_server/):
+#   python -m benchmarks.load_test --concurrency 32 --requests 2000 --ai-latency 0.2 --ai-jitter 0.05
+#   python -m benchmarks.load_test --rps 50 --duration 30 --ai-error-rate 0.02 --output results/load.json
+#   python -m benchmarks.load_test --url http://localhost:8000 --endpoint stream --concurrency 8
+#
+# In open-loop mode latency is measured from each request's scheduled start, so a
+# server that falls behind shows it in the percentiles (no coordinated omission).
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import build_report, emit_report, summarize_latencies
+
+ENDPOINT_PATHS = {
+    "generate": "/api/v1/generate-dockerfile",
+    "stream": "/api/v1/generate-dockerfile:stream",
+}
+# (language, version) pairs cycled through the request payloads
+LANGUAGES = [("python", "3.11"), ("node", "18"), ("java", "17"), ("go", "1.21")]
+
+
+def make_payloads(distinct: int, generation_mode: str, provider: Optional[str]) -> List[dict]:
+    """Distinct request bodies; the port varies so cache and single-flight don't collapse them."""
+    payloads = []
+    for i in range(distinct):
+        language, version = LANGUAGES[i % len(LANGUAGES)]
+        payload = {"language": language, "version": version, "port": 3000 + i, "app_type": "web",
+                   "generation_mode": generation_mode}
+        if provider:
+            payload["provider"] = provider
+        payloads.append(payload)
+    return payloads
+
+
+async def send_request(client: httpx.AsyncClient, endpoint: str, payload: dict) -> Tuple[str, Optional[float]]:
+    """
+    Send one request and return (outcome, time to first byte).
+    Outcome is 'ok', the HTTP status code, the streamed error_code or the exception name.
+    """
+    started = time.perf_counter()
+    try:
+        if endpoint == "generate":
+            response = await client.post(ENDPOINT_PATHS[endpoint], json=payload)
+            return ("ok" if response.status_code == 200 else str(response.status_code)), None
+
+        first_byte = None
+        last_event: dict = {}
+        async with client.stream("POST", ENDPOINT_PATHS[endpoint], json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return str(response.status_code), None
+            async for line in response.aiter_lines():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                if line:
+                    last_event = json.loads(line)
+        if last_event.get("type") == "done":
+            return "ok", first_byte
+        return last_event.get("error_code", "incomplete"), first_byte
+    except httpx.HTTPError as e:
+        return type(e).__name__, None
+
+
+class LoadResults:
+    """Latencies and outcomes collected during the measured part of a run."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_bytes: List[float] = []
+        self.outcomes: Counter = Counter()
+
+    def record(self, outcome: str, latency: float, first_byte: Optional[float]) -> None:
+        self.outcomes[outcome] += 1
+        if outcome == "ok":
+            self.latencies.append(latency)
+            if first_byte is not None:
+                self.first_bytes.append(first_byte)
+
+    def summary(self, elapsed: float) -> Dict[str, object]:
+        total = sum(self.outcomes.values())
+        ok = self.outcomes.get("ok", 0)
+        results: Dict[str, object] = {
+            "requests": total,
+            "ok": ok,
+            "errors": total - ok,
+            "error_breakdown": dict(sorted((k, v) for k, v in self.outcomes.items() if k != "ok")),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+            "goodput_rps": round(ok / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency": summarize_latencies(self.latencies),
+        }
+        if self.first_bytes:
+            results["time_to_first_byte"] = summarize_latencies(self.first_bytes)
+        return results
+
+
+async def run_closed_loop(client, endpoint, payloads, concurrency: int, n_requests: int,
+                          results: LoadResults) -> None:
+    """Keep `concurrency` requests in flight until n_requests have completed."""
+    counter = iter(range(n_requests))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            outcome, first_byte = await send_request(client, endpoint, payloads[i % len(payloads)])
+            results.record(outcome, time.perf_counter() - started, first_byte)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_open_loop(client, endpoint, payloads, rps: float, duration: float, results: LoadResults) -> None:
+    """Start requests on a fixed schedule regardless of how fast earlier ones complete."""
+    n_requests = int(rps * duration)
+    start = time.perf_counter()
+
+    async def fire(i: int, scheduled: float):
+        outcome, first_byte = await send_request(client, endpoint, payloads[i % len(payloads)])
+        results.record(outcome, time.perf_counter() - scheduled, first_byte)
+
+    tasks = []
+    for i in range(n_requests):
+        scheduled = start + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(fire(i, scheduled)))
+    await asyncio.gather(*tasks)
+
+
+def configure_in_process_app(args) -> httpx.AsyncBaseTransport:
+    """Point the app at a stub provider with the requested latency/error profile."""
+    from app.main import app
+    from app.core.ai_router import ai_router
+    from app.core.cache import get_response_cache
+    from app.core.providers import STUB_PROVIDER, StubProvider
+    from app.utils.logger import logger
+
+    if not args.verbose:
+        logger.setLevel(logging.CRITICAL)
+    ai_router.providers[STUB_PROVIDER] = StubProvider(
+        latency=args.ai_latency, latency_jitter=args.ai_jitter, error_rate=args.ai_error_rate,
+        fatal_error_rate=args.ai_fatal_error_rate, seed=args.seed
+    )
+    if not args.cache:
+        app.dependency_overrides[get_response_cache] = lambda: None
+    return httpx.ASGITransport(app=app)
+
+
+async def run(args) -> dict:
+    random.seed(args.seed)
+    payloads = make_payloads(args.distinct, args.generation_mode, args.provider)
+    random.shuffle(payloads)
+
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        transport, base_url = configure_in_process_app(args), "http://loadtest"
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout,
+                                 limits=limits) as client:
+        if args.warmup:
+            await run_closed_loop(client, args.endpoint, payloads, min(args.concurrency, args.warmup),
+                                  args.warmup, LoadResults())
+
+        results = LoadResults()
+        started = time.perf_counter()
+        if args.rps:
+            await run_open_loop(client, args.endpoint, payloads, args.rps, args.duration, results)
+        else:
+            await run_closed_loop(client, args.endpoint, payloads, args.concurrency, args.requests, results)
+        return results.summary(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Dockerfile generation endpoints.")
+    parser.add_argument("--url", help="Base URL of a running server (default: run app.main:app in-process)")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINT_PATHS), default="generate")
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed loop: requests kept in flight")
+    parser.add_argument("--requests", type=int, default=1000, help="Closed loop: total requests")
+    parser.add_argument("--rps", type=float, help="Open loop: request rate (overrides --concurrency/--requests)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Open loop: seconds to run")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent first")
+    parser.add_argument("--distinct", type=int, default=1000, help="Number of distinct request bodies")
+    parser.add_argument("--generation-mode", choices=["ai", "template", "auto"], default="ai")
+    parser.add_argument("--provider", default="stub", help="AI provider named in each request ('' for routing)")
+    parser.add_argument("--cache", action="store_true", help="In-process: keep the response cache enabled")
+    parser.add_argument("--ai-latency", type=float, default=0.1, help="In-process stub: mean latency (s)")
+    parser.add_argument("--ai-jitter", type=float, default=0.02, help="In-process stub: latency std dev (s)")
+    parser.add_argument("--ai-error-rate", type=float, default=0.0, help="In-process stub: retryable errors")
+    parser.add_argument("--ai-fatal-error-rate", type=float, default=0.0, help="In-process stub: fatal errors")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="In-process: keep server logging")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "verbose")}
+    config["mode"] = "open_loop" if args.rps else "closed_loop"
+    emit_report(build_report("load_test", config, results), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# tests/test_ai_router.py
+
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import resilience
+from app.core.ai_router import AIRouter, LatencyTracker
+from app.core.ai_service import (
+    AIAuthenticationError, AIConnectionError, AIServiceError, create_dockerfile_prompt
+)
+from app.core.cache import DockerfileCache, get_response_cache
+from app.core.providers import AIProvider, OpenAICompatibleProvider, StubProvider
+from app.utils.exceptions import UnsupportedProviderError
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+PROMPT = create_dockerfile_prompt(language="python", version="3.11", port=5000,
+                                  generic_base_image="python:3.11-slim")
+
+
+class _NamedStub(StubProvider):
+    """Stub provider registered under its own name, optionally failing."""
+
+    def __init__(self, name: str, latency: float = 0.0, error: Exception | None = None):
+        super().__init__(latency=latency)
+        self.name = name
+        self.error = error
+        self.calls = 0
+
+    def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return super().generate(prompt) + f"\n# {self.name}"
+
+
+class _FreshResilienceTestCase(unittest.IsolatedAsyncioTestCase):
+    """Each test gets its own retry policy (single attempt) and circuit breakers."""
+
+    def setUp(self):
+        self._patches = [
+            patch.object(resilience, "ai_retry_policy", resilience.RetryPolicy(max_attempts=1, base_delay=0.001)),
+            patch.dict(resilience.circuit_breakers, clear=True),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+
+    @staticmethod
+    def make_router(*providers: AIProvider, policy: str = "primary", hedge_delay: float = 0.0) -> AIRouter:
+        return AIRouter({p.name: p for p in providers}, [p.name for p in providers],
+                        policy=policy, hedge_delay=hedge_delay)
+
+
+class TestStubProvider(unittest.TestCase):
+
+    def test_uses_base_image_from_prompt(self):
+        content = StubProvider().generate(PROMPT)
+        self.assertTrue(content.startswith("FROM python:3.11-slim\n"))
+        self.assertIn("EXPOSE 5000", content)
+
+    def test_stream_reassembles_to_generate(self):
+        provider = StubProvider(chunk_size=5)
+        chunks = list(provider.stream(PROMPT))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), provider.generate(PROMPT))
+
+    def test_injected_errors_follow_rates(self):
+        provider = StubProvider(error_rate=0.2, fatal_error_rate=0.1, seed=7)
+        outcomes = {"ok": 0, "connection": 0, "fatal": 0}
+        for _ in range(1000):
+            try:
+                provider.generate(PROMPT)
+                outcomes["ok"] += 1
+            except AIConnectionError:
+                outcomes["connection"] += 1
+            except AIServiceError:
+                outcomes["fatal"] += 1
+        self.assertAlmostEqual(outcomes["connection"] / 1000, 0.2, delta=0.04)
+        self.assertAlmostEqual(outcomes["fatal"] / 1000, 0.1, delta=0.03)
+
+    def test_seeded_draws_are_reproducible(self):
+        first = StubProvider(latency=0.1, latency_jitter=0.05, seed=3)
+        second = StubProvider(latency=0.1, latency_jitter=0.05, seed=3)
+        draws = [first._draw() for _ in range(5)]
+        self.assertEqual(draws, [second._draw() for _ in range(5)])
+        self.assertTrue(all(delay >= 0 for delay, _ in draws))
+
+
+class TestOpenAICompatibleProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = OpenAICompatibleProvider("test-model", base_url="http://llm.local/v1")
+        self.provider._client = MagicMock()
+
+    def test_generate_strips_fences(self):
+        message = SimpleNamespace(content="```dockerfile\nFROM python:3.11-slim\n```")
+        self.provider._client.chat.completions.create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=message)]
+        )
+        self.assertEqual(self.provider.generate("prompt"), "FROM python:3.11-slim")
+
+    def test_connection_error_is_transient(self):
+        request = httpx.Request("POST", "http://llm.local/v1/chat/completions")
+        self.provider._client.chat.completions.create.side_effect = openai.APIConnectionError(request=request)
+        with self.assertRaises(AIConnectionError):
+            self.provider.generate("prompt")
+
+    def test_authentication_error(self):
+        response = httpx.Response(401, request=httpx.Request("POST", "http://llm.local/v1/chat/completions"))
+        self.provider._client.chat.completions.create.side_effect = openai.AuthenticationError(
+            "bad key", response=response, body=None
+        )
+        with self.assertRaises(AIAuthenticationError):
+            self.provider.generate("prompt")
+
+    def test_not_configured_without_key_or_url(self):
+        self.assertFalse(OpenAICompatibleProvider("test-model").is_configured)
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def test_p95_and_error_rate(self):
+        tracker = LatencyTracker(window=100)
+        for i in range(1, 101):
+            tracker.record("a", i / 100, ok=True)
+        self.assertAlmostEqual(tracker.p95("a"), 0.96)
+        tracker.record("a", 5.0, ok=False)
+        self.assertAlmostEqual(tracker.error_rate("a"), 1 / 100)
+        self.assertEqual(tracker.p95("missing"), 0.0)
+
+    def test_window_is_bounded(self):
+        tracker = LatencyTracker(window=3)
+        for _ in range(10):
+            tracker.record("a", 0.1, ok=True)
+        self.assertEqual(tracker.sample_count("a"), 3)
+
+
+class TestRouting(_FreshResilienceTestCase):
+
+    async def test_primary_policy_uses_pool_order(self):
+        first, second = _NamedStub("first"), _NamedStub("second")
+        router = self.make_router(first, second)
+        self.assertTrue((await router.generate(PROMPT)).endswith("# first"))
+        self.assertEqual(second.calls, 0)
+
+    async def test_latency_policy_prefers_lowest_p95(self):
+        slow, fast = _NamedStub("slow"), _NamedStub("fast")
+        router = self.make_router(slow, fast, policy="latency")
+        router.tracker.record("slow", 2.0, ok=True)
+        router.tracker.record("fast", 0.2, ok=True)
+        self.assertEqual([p.name for p in router.candidates()], ["fast", "slow"])
+
+    async def test_latency_policy_ranks_failing_provider_last(self):
+        broken, fresh, sampled = _NamedStub("broken"), _NamedStub("fresh"), _NamedStub("sampled")
+        router = self.make_router(broken, sampled, fresh, policy="latency")
+        router.tracker.record("broken", 0.01, ok=False)
+        router.tracker.record("sampled", 0.5, ok=True)
+        self.assertEqual([p.name for p in router.candidates()], ["fresh", "sampled", "broken"])
+
+    async def test_error_rate_policy(self):
+        flaky, steady = _NamedStub("flaky"), _NamedStub("steady")
+        router = self.make_router(flaky, steady, policy="error_rate")
+        router.tracker.record("flaky", 0.1, ok=True)
+        router.tracker.record("flaky", 0.1, ok=False)
+        router.tracker.record("steady", 1.0, ok=True)
+        self.assertEqual(router.candidates()[0].name, "steady")
+
+    async def test_open_circuit_is_skipped(self):
+        first, second = _NamedStub("first"), _NamedStub("second")
+        router = self.make_router(first, second)
+        breaker = resilience.get_circuit_breaker("first")
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        self.assertTrue((await router.generate(PROMPT)).endswith("# second"))
+
+    async def test_failures_are_tracked(self):
+        down = _NamedStub("down", error=AIConnectionError("down"))
+        router = self.make_router(down)
+        with self.assertRaises(AIConnectionError):
+            await router.generate(PROMPT)
+        self.assertEqual(router.tracker.error_rate("down"), 1.0)
+
+    async def test_explicit_provider(self):
+        first, second = _NamedStub("first"), _NamedStub("second")
+        router = self.make_router(first, second)
+        self.assertTrue((await router.generate(PROMPT, provider="second")).endswith("# second"))
+        with self.assertRaises(UnsupportedProviderError):
+            await router.generate(PROMPT, provider="nope")
+
+
+class TestHedging(_FreshResilienceTestCase):
+
+    async def test_slow_primary_is_hedged(self):
+        slow, fast = _NamedStub("slow", latency=0.5), _NamedStub("fast")
+        router = self.make_router(slow, fast, hedge_delay=0.05)
+        started = time.perf_counter()
+        result = await router.generate(PROMPT)
+        self.assertTrue(result.endswith("# fast"))
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual((router.hedges_sent, router.hedges_won), (1, 1))
+
+    async def test_fast_primary_is_not_hedged(self):
+        first, second = _NamedStub("first"), _NamedStub("second")
+        router = self.make_router(first, second, hedge_delay=0.5)
+        self.assertTrue((await router.generate(PROMPT)).endswith("# first"))
+        self.assertEqual(router.hedges_sent, 0)
+        self.assertEqual(second.calls, 0)
+
+    async def test_fast_failure_fails_over_to_backup(self):
+        down = _NamedStub("down", error=AIConnectionError("down"))
+        backup = _NamedStub("backup")
+        router = self.make_router(down, backup, hedge_delay=0.5)
+        started = time.perf_counter()
+        self.assertTrue((await router.generate(PROMPT)).endswith("# backup"))
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual((router.failovers, router.hedges_sent), (1, 0))
+
+    def test_provider_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            AIProvider("model")
+
+    async def test_hedge_survives_failing_backup(self):
+        slow = _NamedStub("slow", latency=0.2)
+        down = _NamedStub("down", error=AIConnectionError("down"))
+        router = self.make_router(slow, down, hedge_delay=0.05)
+        self.assertTrue((await router.generate(PROMPT)).endswith("# slow"))
+        self.assertEqual(router.hedges_won, 0)
+
+
+class TestProviderSelectionEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        app.dependency_overrides[get_response_cache] = lambda: DockerfileCache(max_entries=16, ttl_seconds=60)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def test_stub_provider_end_to_end(self):
+        payload = {"language": "python", "version": "3.11", "port": 5000, "generation_mode": "ai", "provider": "stub"}
+        response = self.client.post("/api/v1/generate-dockerfile", json=payload)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body["dockerfile_content"].startswith(f"FROM {body['base_image']['harbor_path']}"))
+
+    def test_unknown_provider_is_rejected(self):
+        payload = {"language": "python", "generation_mode": "ai", "provider": "nope"}
+        response = self.client.post("/api/v1/generate-dockerfile", json=payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error_code"], "UNSUPPORTED_PROVIDER")
+
+    def test_providers_stats(self):
+        body = self.client.get("/api/v1/ai/providers").json()
+        self.assertIn("stub", body["providers"])
+        self.assertIn("policy", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
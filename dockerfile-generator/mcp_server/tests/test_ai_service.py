@@ -0,0 +1,281 @@
+# tests/test_ai_service.py
+
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from prometheus_client import REGISTRY
+
+from app.core import ai_service, resilience, tracing
+from app.core.prompts import Prompt
+from app.core.providers import GeminiProvider
+from app.core.rate_limiter import PRIORITY_INTERACTIVE
+from app.core.ai_service import (
+    DEFAULT_MODEL_NAME,
+    AIAuthenticationError,
+    AICircuitOpenError,
+    AIConnectionError
+)
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+
+def _token_sample(kind):
+    return REGISTRY.get_sample_value("dockerfile_ai_tokens_sum", {"provider": "gemini", "kind": kind}) or 0.0
+
+
+def _slow_suggestion(prompt, model_name):
+    """Stand-in for the blocking Gemini call."""
+    time.sleep(0.2)
+    return f"FROM python:3.11-slim\n# {prompt}"
+
+
+async def _suggest(prompt, model_name=DEFAULT_MODEL_NAME):
+    """A Gemini call through the provider path the AI router takes."""
+    provider = GeminiProvider(model_name)
+    return await ai_service.call_with_resilience(provider.generate, prompt, PRIORITY_INTERACTIVE, provider.breaker)
+
+
+class _FreshResilienceMixin:
+    """Give each test its own retry policy and circuit breaker with fast backoff."""
+
+    def setUp(self):
+        super().setUp()
+        self.policy = resilience.RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.005)
+        self.breaker = resilience.CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+        self._patches = [patch.object(resilience, "ai_retry_policy", self.policy),
+                         patch.dict(resilience.circuit_breakers, {"gemini": self.breaker}, clear=True)]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+        super().tearDown()
+
+
+class TestAsyncSuggestion(_FreshResilienceMixin, unittest.IsolatedAsyncioTestCase):
+
+    async def test_calls_run_concurrently(self):
+        """Several blocking AI calls should overlap instead of running back to back."""
+        with patch.object(ai_service, "get_gemini_dockerfile_suggestion", side_effect=_slow_suggestion):
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(_suggest(f"prompt {i}") for i in range(5))
+            )
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(results), 5)
+        self.assertIn("# prompt 3", results[3])
+        self.assertLess(elapsed, 0.6)
+
+    async def test_event_loop_not_blocked(self):
+        """The event loop keeps ticking while an AI call is in flight."""
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        with patch.object(ai_service, "get_gemini_dockerfile_suggestion", side_effect=_slow_suggestion):
+            task = asyncio.create_task(ticker())
+            await _suggest("prompt")
+            task.cancel()
+
+        self.assertGreater(ticks, 5)
+
+    async def test_errors_propagate(self):
+        """Exceptions from the sync call surface unchanged from the async wrapper."""
+        with patch.object(ai_service, "get_gemini_dockerfile_suggestion", side_effect=AIConnectionError("down")):
+            with self.assertRaises(AIConnectionError):
+                await _suggest("prompt")
+
+    async def test_timed_out_call_keeps_its_slot(self):
+        """A call abandoned by wait_for holds its executor slot until the thread returns."""
+        with patch.object(ai_service, "AI_MAX_CONCURRENCY", 1), patch.object(ai_service, "_ai_slots", None):
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(ai_service.run_on_ai_executor(time.sleep, 0.2), 0.01)
+            self.assertEqual(ai_service._ai_threads_busy, 1)
+            start = time.perf_counter()
+            self.assertEqual(await ai_service.run_on_ai_executor(lambda: "done"), "done")
+            self.assertGreater(time.perf_counter() - start, 0.1) # Waited for the abandoned call
+        self.assertEqual(ai_service._ai_threads_busy, 0)
+
+    async def test_call_sees_the_request_trace(self):
+        """Executor threads run in the caller's context, so AI-side logs carry its trace id."""
+        with tracing.start_request_trace("test", None):
+            trace_id = tracing.current_trace_id()
+            self.assertEqual(await ai_service.run_on_ai_executor(tracing.current_trace_id), trace_id)
+
+
+class TestRetryAndCircuitBreaker(_FreshResilienceMixin, unittest.IsolatedAsyncioTestCase):
+
+    async def test_transient_error_is_retried(self):
+        outcomes = [AIConnectionError("unavailable"), "FROM x"]
+
+        def flaky(prompt, model_name):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with patch.object(ai_service, "get_gemini_dockerfile_suggestion", side_effect=flaky):
+            self.assertEqual(await _suggest("prompt"), "FROM x")
+        self.assertEqual(self.policy.retries, 1)
+        self.assertEqual(self.breaker.state, resilience.CIRCUIT_CLOSED)
+
+    async def test_retries_are_bounded(self):
+        with patch.object(ai_service, "get_gemini_dockerfile_suggestion", side_effect=AIConnectionError("down")) as call:
+            with self.assertRaises(AIConnectionError):
+                await _suggest("prompt")
+        self.assertEqual(call.call_count, 3)
+        self.assertEqual(self.policy.exhausted, 1)
+
+    async def test_non_transient_error_not_retried(self):
+        with patch.object(ai_service, "get_gemini_dockerfile_suggestion", side_effect=AIAuthenticationError("bad key")) as call:
+            with self.assertRaises(AIAuthenticationError):
+                await _suggest("prompt")
+        self.assertEqual(call.call_count, 1)
+        self.assertEqual(self.breaker.consecutive_failures, 0)
+
+    async def test_open_circuit_fails_fast(self):
+        with patch.object(ai_service, "get_gemini_dockerfile_suggestion", side_effect=AIConnectionError("down")) as call:
+            with self.assertRaises(AIConnectionError):
+                await _suggest("prompt")
+            self.assertEqual(self.breaker.state, resilience.CIRCUIT_OPEN)
+            with self.assertRaises(AICircuitOpenError):
+                await _suggest("prompt")
+        self.assertEqual(call.call_count, 3)
+        self.assertEqual(self.breaker.stats()["rejected_calls"], 1)
+
+    async def test_half_open_trial_closes_circuit(self):
+        self.breaker.recovery_timeout = 0
+        for _ in range(3):
+            self.breaker.record_failure()
+        with patch.object(ai_service, "get_gemini_dockerfile_suggestion", return_value="FROM x"):
+            self.assertEqual(await _suggest("prompt"), "FROM x")
+        self.assertEqual(self.breaker.state, resilience.CIRCUIT_CLOSED)
+
+    def test_decorrelated_jitter_bounds(self):
+        policy = resilience.RetryPolicy(base_delay=0.5, max_delay=8)
+        delay = policy.base_delay
+        for _ in range(50):
+            new_delay = policy.next_delay(delay)
+            self.assertGreaterEqual(new_delay, 0.5)
+            self.assertLessEqual(new_delay, min(8, max(0.5, delay * 3)))
+            delay = new_delay
+
+
+class TestModelRegistry(unittest.TestCase):
+
+    def setUp(self):
+        ai_service._model_registry.clear()
+
+    def tearDown(self):
+        ai_service._model_registry.clear()
+
+    def test_model_created_once_per_name(self):
+        """Repeated lookups reuse one client per model name with the shared config."""
+        with patch.object(ai_service.genai, "GenerativeModel", side_effect=lambda *a, **kw: MagicMock()) as model_cls:
+            first = ai_service.get_model("models/a")
+            second = ai_service.get_model("models/a")
+            other = ai_service.get_model("models/b")
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(model_cls.call_count, 2)
+        _, kwargs = model_cls.call_args
+        self.assertIs(kwargs["safety_settings"], ai_service.SAFETY_SETTINGS)
+        self.assertIs(kwargs["generation_config"], ai_service.GENERATION_CONFIG)
+
+    def test_suggestion_reuses_registered_model(self):
+        with patch.object(ai_service.genai, "GenerativeModel") as model_cls, \
+             patch.object(ai_service, "is_configured", True):
+            model_cls.return_value.generate_content.return_value.text = "```dockerfile\nFROM x\n```"
+            for _ in range(3):
+                self.assertEqual(ai_service.get_gemini_dockerfile_suggestion("prompt", "models/a"), "FROM x")
+
+        self.assertEqual(model_cls.call_count, 1)
+        model_cls.return_value.generate_content.assert_called_with("prompt")
+
+    def test_system_prompt_sent_as_system_instruction(self):
+        before = _token_sample("cached_input")
+        with patch.object(ai_service.genai, "GenerativeModel") as model_cls, \
+             patch.object(ai_service, "is_configured", True):
+            response = model_cls.return_value.generate_content.return_value
+            response.text = "FROM x"
+            response.usage_metadata = MagicMock(prompt_token_count=120, candidates_token_count=30,
+                                                cached_content_token_count=100)
+            ai_service.get_gemini_dockerfile_suggestion(Prompt("system rules", "request"), "models/a")
+
+        self.assertEqual(model_cls.call_args.kwargs["system_instruction"], "system rules")
+        model_cls.return_value.generate_content.assert_called_with("request")
+        self.assertEqual(_token_sample("cached_input") - before, 100)
+
+    def test_context_cache_used_when_enabled(self):
+        with patch.object(ai_service.genai, "GenerativeModel") as model_cls, \
+             patch.object(ai_service.caching.CachedContent, "create") as create, \
+             patch.object(ai_service, "GEMINI_CONTEXT_CACHE_TTL_SECONDS", 600):
+            model = ai_service.get_model("models/a", "system rules")
+        self.assertIs(model, model_cls.from_cached_content.return_value)
+        self.assertEqual(create.call_args.kwargs["system_instruction"], "system rules")
+
+    def test_context_cache_failure_falls_back_to_system_instruction(self):
+        with patch.object(ai_service.genai, "GenerativeModel") as model_cls, \
+             patch.object(ai_service.caching.CachedContent, "create", side_effect=RuntimeError("too small")), \
+             patch.object(ai_service, "GEMINI_CONTEXT_CACHE_TTL_SECONDS", 600):
+            model = ai_service.get_model("models/a", "system rules")
+            self.assertIs(ai_service.get_model("models/a", "system rules"), model)
+        self.assertIs(model, model_cls.return_value)
+        self.assertEqual(model_cls.call_args.kwargs["system_instruction"], "system rules")
+
+    def test_warm_up_skipped_when_not_configured(self):
+        with patch.object(ai_service, "is_configured", False):
+            self.assertFalse(ai_service.warm_up_ai_client("models/a"))
+
+    def test_warm_up_failure_is_not_raised(self):
+        with patch.object(ai_service.genai, "GenerativeModel") as model_cls, \
+             patch.object(ai_service, "is_configured", True):
+            model_cls.return_value.count_tokens.side_effect = RuntimeError("no network")
+            self.assertFalse(ai_service.warm_up_ai_client("models/a"))
+
+
+class TestStreamingSuggestion(_FreshResilienceMixin, unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        super().setUp()
+        ai_service._model_registry.clear()
+
+    def tearDown(self):
+        ai_service._model_registry.clear()
+        super().tearDown()
+
+    async def _collect(self, model_cls):
+        with patch.object(ai_service.genai, "GenerativeModel", model_cls), \
+             patch.object(ai_service, "is_configured", True):
+            provider = GeminiProvider("models/a")
+            return [chunk async for chunk in ai_service.stream_with_resilience(provider.stream, "prompt",
+                                                                               PRIORITY_INTERACTIVE, provider.breaker)]
+
+    async def test_chunks_are_forwarded_in_order(self):
+        model_cls = MagicMock()
+        model_cls.return_value.generate_content.return_value = [MagicMock(text=t) for t in ("FROM ", "x\n", "CMD y")]
+        self.assertEqual(await self._collect(model_cls), ["FROM ", "x\n", "CMD y"])
+        model_cls.return_value.generate_content.assert_called_with("prompt", stream=True)
+
+    async def test_sdk_errors_are_translated(self):
+        from google.api_core import exceptions as google_exceptions
+        model_cls = MagicMock()
+        model_cls.return_value.generate_content.side_effect = google_exceptions.ServiceUnavailable("down")
+        with self.assertRaises(AIConnectionError):
+            await self._collect(model_cls)
+
+
+if __name__ == '__main__':
+    unittest.main()
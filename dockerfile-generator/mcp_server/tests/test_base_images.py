@@ -0,0 +1,125 @@
+# tests/test_base_images.py
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app import config as app_config
+from app.config import Config, reload_config
+from app.api.v1.docker_file import get_base_image
+from app.core.base_images import BaseImageTable, default_base_images
+from app.utils.exceptions import ConfigurationError, UnsupportedLanguageError
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+
+class TestBuiltInRules(unittest.TestCase):
+    """The built-in table keeps the images the old if/elif chain produced."""
+
+    def test_legacy_languages(self):
+        cases = [
+            ("python", None, "python:3.11-slim"),
+            ("python", "3.10", "python:3.10-slim"),
+            ("python", "3.10-alpine", "python:3.10-alpine"),
+            ("Node", None, "node:18-alpine"),
+            ("node", "20", "node:20-alpine"),
+            ("node", "20-slim", "node:20-slim"),
+            ("java", None, "openjdk:17-jdk-slim"),
+            ("java", "11-jre", "openjdk:11-jre"),
+            ("java", "21", "openjdk:21-jdk-slim"),
+            ("go", None, "golang:1.20-alpine"),
+            ("go", "1.21", "golang:1.21-alpine"),
+            ("rust", None, "rust:1.68"),
+            ("rust", "1.77", "rust:1.77"),
+        ]
+        for language, version, expected in cases:
+            self.assertEqual(get_base_image(language, version), expected, (language, version))
+
+    def test_more_ecosystems_and_aliases(self):
+        self.assertEqual(default_base_images.select("ruby"), "ruby:3.3-slim")
+        self.assertEqual(default_base_images.select("php", "8.2"), "php:8.2-fpm-alpine")
+        self.assertEqual(default_base_images.select("php", "8.2-apache"), "php:8.2-apache")
+        self.assertEqual(default_base_images.select("csharp", "8.0"), "mcr.microsoft.com/dotnet/sdk:8.0")
+        self.assertEqual(default_base_images.select("golang", "1.22"), "golang:1.22-alpine")
+        self.assertEqual(default_base_images.canonical_language(" TypeScript "), "node")
+
+    def test_unsupported_language_lists_supported(self):
+        with self.assertRaises(UnsupportedLanguageError) as ctx:
+            default_base_images.select("cobol")
+        self.assertIn("python", ctx.exception.message)
+
+    def test_lookups_are_memoized(self):
+        table = BaseImageTable.from_config(None)
+        for _ in range(3):
+            table.select("python", "3.12")
+        info = table.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 1))
+
+
+class TestConfigSection(unittest.TestCase):
+
+    def test_override_add_and_remove(self):
+        table = BaseImageTable.from_config({
+            "python": {"default_version": "3.12"},
+            "zig": {"image": "ziglang/zig", "default_version": "0.12", "aliases": ["ziglang"]},
+            "rust": None,
+        })
+        self.assertEqual(table.select("python"), "python:3.12-slim")
+        self.assertEqual(table.select("python", "3.11-bookworm"), "python:3.11-bookworm")
+        self.assertEqual(table.select("ziglang"), "ziglang/zig:0.12")
+        self.assertNotIn("rust", table.languages())
+        with self.assertRaises(UnsupportedLanguageError):
+            table.select("rust")
+
+    def test_invalid_sections(self):
+        for section in (["python"], {"zig": {"image": "zig"}}, {"python": {"default_version": 3.1}},
+                        {"python": {"tags": []}}, {"ruby": {"aliases": ["py"]}}):
+            with self.assertRaises(ConfigurationError, msg=section):
+                BaseImageTable.from_config(section)
+
+
+class TestReloadAndEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "mapping.yaml")
+        self._write('harbor_base_url: "harbor.test.local"\nmappings:\n  python: "base/python"\n')
+        self.config_patch = patch.object(app_config, "config", Config(config_path=self.path))
+        self.config_patch.start()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.config_patch.stop()
+        self.tmpdir.cleanup()
+
+    def _write(self, content):
+        with open(self.path, "w") as f:
+            f.write(content)
+
+    def test_reload_applies_new_rules(self):
+        payload = {"language": "python", "generation_mode": "template", "app_type": "web"}
+        first = self.client.post("/api/v1/generate-dockerfile", json=payload).json()
+        self.assertEqual(first["base_image"]["generic"], "python:3.11-slim")
+
+        self._write('harbor_base_url: "harbor.test.local"\nmappings:\n  python: "base/python"\n'
+                    'base_images:\n  python:\n    default_version: "3.12"\n')
+        reload_config()
+        second = self.client.post("/api/v1/generate-dockerfile", json=payload).json()
+        self.assertEqual(second["base_image"]["generic"], "python:3.12-slim")
+        self.assertEqual(second["base_image"]["harbor_path"], "harbor.test.local/base/python:3.12-slim")
+
+    def test_languages_endpoint(self):
+        body = self.client.get("/api/v1/languages").json()
+        self.assertEqual(body["languages"]["node"]["default_image"], "node:18-alpine")
+        self.assertIn("golang", body["languages"]["go"]["aliases"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+# tests/test_cache.py
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.core.cache import DockerfileCache, make_request_key
+from app.models.request import DockerfileRequest
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+HARBOR_PATH = "harbor.test.local/prod/python:3.11-slim-v2"
+MODEL = "models/test-model"
+
+
+class TestRequestKey(unittest.TestCase):
+
+    def test_equivalent_requests_share_key(self):
+        """Case, whitespace and dependency order should not change the key."""
+        a = DockerfileRequest(language="Python", version="3.11", dependencies=["flask", "requests"],
+                              app_type="Web", additional_instructions="Include  healthcheck")
+        b = DockerfileRequest(language="python", version=" 3.11 ", dependencies=["requests", "flask", " flask"],
+                              app_type="web", additional_instructions="Include healthcheck ")
+        self.assertEqual(make_request_key(a, HARBOR_PATH, MODEL), make_request_key(b, HARBOR_PATH, MODEL))
+
+    def test_harbor_path_and_model_change_key(self):
+        """Keys depend on the resolved Harbor path and the model name."""
+        request = DockerfileRequest(language="python", version="3.11")
+        key = make_request_key(request, HARBOR_PATH, MODEL)
+        self.assertNotEqual(key, make_request_key(request, HARBOR_PATH + "-v3", MODEL))
+        self.assertNotEqual(key, make_request_key(request, HARBOR_PATH, "models/other"))
+
+    def test_package_manager_changes_key(self):
+        a = DockerfileRequest(language="python")
+        b = DockerfileRequest(language="python", package_manager="poetry")
+        c = DockerfileRequest(language="python", package_manager=" Poetry ")
+        self.assertNotEqual(make_request_key(a, HARBOR_PATH, MODEL), make_request_key(b, HARBOR_PATH, MODEL))
+        self.assertEqual(make_request_key(b, HARBOR_PATH, MODEL), make_request_key(c, HARBOR_PATH, MODEL))
+
+    def test_port_changes_key(self):
+        a = DockerfileRequest(language="python", port=5000)
+        b = DockerfileRequest(language="python", port=8000)
+        self.assertNotEqual(make_request_key(a, HARBOR_PATH, MODEL), make_request_key(b, HARBOR_PATH, MODEL))
+
+
+class TestDockerfileCache(unittest.TestCase):
+
+    def test_hit_and_miss_counters(self):
+        cache = DockerfileCache(max_entries=4, ttl_seconds=60)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", "FROM x")
+        self.assertEqual(cache.get("a"), "FROM x")
+        stats = cache.stats()
+        self.assertEqual(stats["memory_hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted once capacity is exceeded."""
+        cache = DockerfileCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")  # 'b' is now least recently used
+        cache.set("c", "3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.get("c"), "3")
+
+    def test_ttl_expiry(self):
+        cache = DockerfileCache(max_entries=4, ttl_seconds=10)
+        with patch("app.core.cache.time.monotonic", return_value=100.0):
+            cache.set("a", "1")
+        with patch("app.core.cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+
+    def test_disk_tier_survives_restart(self):
+        """A new cache instance pointed at the same file sees earlier entries."""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "cache.sqlite3")
+            DockerfileCache(db_path=db_path).set("a", "FROM x")
+
+            restarted = DockerfileCache(db_path=db_path)
+            self.assertEqual(restarted.get("a"), "FROM x")
+            self.assertEqual(restarted.stats()["disk_hits"], 1)
+            # Promoted into memory for the next lookup
+            self.assertEqual(restarted.get("a"), "FROM x")
+            self.assertEqual(restarted.stats()["memory_hits"], 1)
+            restarted.close()
+
+
+class TestDockerfileCacheAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_write_behind_is_read_back_from_disk(self):
+        """set_nowait answers from memory at once; the queued disk write survives a restart."""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "cache.sqlite3")
+            cache = DockerfileCache(db_path=db_path)
+            pending = cache.set_nowait("a", "FROM x")
+            self.assertEqual(await cache.aget("a"), "FROM x")
+            self.assertEqual(cache.stats()["memory_hits"], 1)
+            await asyncio.wrap_future(pending)
+            cache.close()
+
+            restarted = DockerfileCache(db_path=db_path)
+            self.assertEqual(await restarted.aget("a"), "FROM x")
+            self.assertIsNone(await restarted.aget("b"))
+            stats = restarted.stats()
+            self.assertEqual((stats["disk_hits"], stats["misses"]), (1, 1))
+            restarted.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# tests/test_config_reload.py
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import config as app_config
+from app.config import Config, reload_config, watch_config_file, get_config_status
+from app.utils.exceptions import ConfigurationError
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+YAML_V1 = """
+harbor_base_url: "harbor.test.local"
+mappings:
+  python: "base/python"
+"""
+
+YAML_V2 = """
+harbor_base_url: "harbor.test.local"
+mappings:
+  python: "hardened/python"
+"""
+
+
+class TestConfigReload(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "mapping.yaml")
+        self._write(YAML_V1)
+        self.initial = Config(config_path=self.path)
+        self.config_patch = patch.object(app_config, "config", self.initial)
+        self.config_patch.start()
+
+    def tearDown(self):
+        self.config_patch.stop()
+        self.tmpdir.cleanup()
+
+    def _write(self, content):
+        with open(self.path, "w") as f:
+            f.write(content)
+
+    def test_reload_swaps_snapshot(self):
+        """In-flight holders of the old snapshot are unaffected by a reload."""
+        held = app_config.get_config()
+        self._write(YAML_V2)
+        new_config = reload_config()
+
+        self.assertIs(app_config.get_config(), new_config)
+        self.assertNotEqual(new_config.version, held.version)
+        self.assertEqual(held.resolve_harbor_path("python:3.11"), "harbor.test.local/base/python:3.11")
+        self.assertEqual(new_config.resolve_harbor_path("python:3.11"), "harbor.test.local/hardened/python:3.11")
+        self.assertEqual(get_config_status()["version"], new_config.version)
+
+    def test_invalid_file_keeps_current_snapshot(self):
+        self._write("mappings: [not, a, mapping]")
+        with self.assertRaises(ConfigurationError):
+            reload_config()
+        self.assertIs(app_config.get_config(), self.initial)
+
+    async def test_watcher_reloads_on_change(self):
+        watcher = asyncio.create_task(watch_config_file(interval=0.02))
+        await asyncio.sleep(0.05)
+        self._write(YAML_V2 + "\n# changed\n")
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if app_config.config is not self.initial:
+                break
+        watcher.cancel()
+        self.assertIsNot(app_config.config, self.initial)
+        self.assertEqual(app_config.config.mappings["python"], "hardened/python")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,325 @@
+# tests/test_dockerfile_generator.py
+
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.cache import DockerfileCache, get_response_cache
+from app.core.ai_service import AIConnectionError, AIRateLimitError, AICircuitOpenError
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+AI_OUTPUT = ("FROM python:3.11-slim\nWORKDIR /app\nCOPY requirements.txt .\nRUN pip install -r requirements.txt\n"
+             "COPY . .\nEXPOSE 5000\nCMD [\"python\", \"app.py\"]")
+PAYLOAD = {"language": "python", "version": "3.11", "dependencies": ["flask"], "port": 5000, "app_type": "web",
+           "generation_mode": "ai"}
+
+
+class TestGenerateDockerfileEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = DockerfileCache(max_entries=16, ttl_seconds=60)
+        app.dependency_overrides[get_response_cache] = lambda: self.cache
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def test_generate_replaces_from_line(self):
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", return_value=AI_OUTPUT):
+            response = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["base_image"]["generic"], "python:3.11-slim")
+        self.assertTrue(body["dockerfile_content"].startswith(f"FROM {body['base_image']['harbor_path']}"))
+        self.assertFalse(body["cached"])
+
+    def test_repeated_request_served_from_cache(self):
+        """The second identical request must not reach the AI service."""
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", return_value=AI_OUTPUT) as ai:
+            first = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD).json()
+            second = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD).json()
+        self.assertEqual(ai.call_count, 1)
+        self.assertTrue(second["cached"])
+        self.assertEqual(first["dockerfile_content"], second["dockerfile_content"])
+
+        stats = self.client.get("/api/v1/cache/stats").json()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_rate_limited_ai_call_returns_503(self):
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion",
+                   side_effect=AIRateLimitError("AI admission queue is full")):
+            response = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["error_code"], "AI_SERVICE_UNAVAILABLE")
+
+    def test_open_circuit_falls_back_to_template(self):
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion",
+                   side_effect=AICircuitOpenError("circuit open")):
+            body = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD).json()
+        self.assertEqual(body["status"], "success")
+        self.assertEqual(body["generator"], "template")
+
+    def test_template_fast_path_skips_ai(self):
+        payload = dict(PAYLOAD, generation_mode="auto")
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion") as ai:
+            response = self.client.post("/api/v1/generate-dockerfile", json=payload)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["generator"], "template")
+        self.assertTrue(body["dockerfile_content"].startswith(f"FROM {body['base_image']['harbor_path']}"))
+        ai.assert_not_called()
+
+    def test_language_alias_uses_template(self):
+        payload = {"language": "golang", "app_type": "web", "generation_mode": "auto"}
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion") as ai:
+            body = self.client.post("/api/v1/generate-dockerfile", json=payload).json()
+        self.assertEqual(body["generator"], "template")
+        ai.assert_not_called()
+
+    def test_additional_instructions_fall_back_to_ai(self):
+        payload = dict(PAYLOAD, generation_mode="auto", additional_instructions="Include healthcheck")
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", return_value=AI_OUTPUT) as ai:
+            body = self.client.post("/api/v1/generate-dockerfile", json=payload).json()
+        self.assertEqual(body["generator"], "ai")
+        ai.assert_called_once()
+
+    def test_template_mode_without_template_is_rejected(self):
+        payload = {"language": "rust", "generation_mode": "template"}
+        response = self.client.post("/api/v1/generate-dockerfile", json=payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error_code"], "TEMPLATE_NOT_AVAILABLE")
+
+    def test_matching_etag_returns_304_without_generating(self):
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", return_value=AI_OUTPUT) as ai:
+            first = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD)
+            etag = first.headers["ETag"]
+            self.assertTrue(etag.startswith('W/"'))
+            self.assertIn("X-Config-Version", first.headers)
+            revalidated = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD,
+                                           headers={"If-None-Match": etag.removeprefix("W/")})
+            changed = self.client.post("/api/v1/generate-dockerfile", json=dict(PAYLOAD, port=5001),
+                                       headers={"If-None-Match": etag})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.headers["ETag"], etag)
+        self.assertEqual(revalidated.content, b"")
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+        self.assertEqual(ai.call_count, 2)
+
+    def test_circuit_fallback_is_not_cacheable(self):
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion",
+                   side_effect=AICircuitOpenError("circuit open")):
+            degraded = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD)
+        self.assertEqual((degraded.status_code, degraded.json()["degraded"]), (200, True))
+        self.assertNotIn("ETag", degraded.headers)
+        self.assertEqual(degraded.headers["Cache-Control"], "no-store")
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion",
+                   side_effect=AICircuitOpenError("circuit open")):
+            batch = self.client.post("/api/v1/generate-dockerfiles:batch", json={"requests": [PAYLOAD]}).json()
+        self.assertIsNone(batch["results"][0]["etag"])
+        # Once the AI recovers, the request is generated again and gets an ETag
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", return_value=AI_OUTPUT) as ai:
+            recovered = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD)
+        self.assertEqual((recovered.json()["generator"], recovered.json()["degraded"]), ("ai", False))
+        self.assertIn("ETag", recovered.headers)
+        ai.assert_called_once()
+
+
+class TestValidationRepair(unittest.TestCase):
+    """Generated Dockerfiles are validated; local fixes come first, then targeted follow-up prompts."""
+
+    def setUp(self):
+        app.dependency_overrides[get_response_cache] = lambda: None
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def _generate(self, *outputs):
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", side_effect=list(outputs)) as ai:
+            response = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD)
+        return response, ai
+
+    def test_missing_expose_fixed_locally(self):
+        response, ai = self._generate(AI_OUTPUT.replace("EXPOSE 5000\n", ""))
+        self.assertEqual(ai.call_count, 1)
+        self.assertIn("EXPOSE 5000\nCMD", response.json()["dockerfile_content"])
+
+    def test_missing_command_triggers_one_repair_prompt(self):
+        broken = AI_OUTPUT.rsplit("\n", 1)[0]
+        response, ai = self._generate(broken, AI_OUTPUT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ai.call_count, 2)
+        repair_prompt = ai.call_args_list[1].args[0]
+        self.assertIn("The final stage has no CMD or ENTRYPOINT.", repair_prompt)
+        self.assertIn(broken, repair_prompt)
+        self.assertTrue(response.json()["dockerfile_content"].endswith('CMD ["python", "app.py"]'))
+
+    def test_wrong_base_image_fails_after_repair_budget(self):
+        response, ai = self._generate("FROM ubuntu:22.04\nCMD bash", "FROM debian:12\nCMD bash")
+        self.assertEqual(ai.call_count, 2)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()["error_code"], "AI_RESPONSE_INVALID")
+
+    def test_unresolved_minor_problems_are_returned(self):
+        broken = AI_OUTPUT.rsplit("\n", 1)[0]
+        with patch("app.api.v1.docker_file.AI_REPAIR_MAX_ATTEMPTS", 0):
+            response, ai = self._generate(broken)
+        self.assertEqual(ai.call_count, 1)
+        self.assertEqual(response.status_code, 200)
+
+
+class TestBatchEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        app.dependency_overrides[get_response_cache] = lambda: DockerfileCache(max_entries=16, ttl_seconds=60)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def test_batch_dedupes_and_reports_partial_failure(self):
+        node_output = "FROM node:18-alpine\nWORKDIR /app\nCMD [\"node\", \"index.js\"]"
+
+        async def fake_ai(prompt, **kwargs):
+            return node_output if "'node'" in prompt else AI_OUTPUT
+
+        items = [PAYLOAD, {"language": "node", "version": "18", "generation_mode": "ai"}, PAYLOAD, {"language": "cobol"}]
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", side_effect=fake_ai) as ai:
+            response = self.client.post("/api/v1/generate-dockerfiles:batch", json={"requests": items})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(ai.call_count, 2)
+        self.assertEqual(body["status"], "partial")
+        self.assertEqual((body["total"], body["succeeded"], body["failed"]), (4, 3, 1))
+        self.assertEqual(body["unique_requests"], 2)
+        self.assertEqual([r["index"] for r in body["results"]], [0, 1, 2, 3])
+        self.assertEqual(body["results"][0]["result"]["dockerfile_content"], body["results"][2]["result"]["dockerfile_content"])
+        self.assertEqual(body["results"][3]["error"]["error_code"], "UNSUPPORTED_LANGUAGE")
+
+    def test_batch_ai_errors_are_per_item(self):
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", side_effect=AIConnectionError("down")):
+            body = self.client.post("/api/v1/generate-dockerfiles:batch", json={"requests": [PAYLOAD]}).json()
+        self.assertEqual(body["status"], "error")
+        self.assertEqual(body["results"][0]["error"]["error_code"], "AI_SERVICE_UNAVAILABLE")
+
+    def test_batch_items_carry_the_generate_etag(self):
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", return_value=AI_OUTPUT):
+            single = self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD)
+            body = self.client.post("/api/v1/generate-dockerfiles:batch", json={"requests": [PAYLOAD]}).json()
+        self.assertEqual(body["results"][0]["etag"], single.headers["ETag"])
+        self.assertEqual(body["config_version"], single.headers["X-Config-Version"])
+
+    def test_unresolvable_image_fails_only_its_items(self):
+        from app.config import Config, ConfigurationError
+        resolve = Config.resolve_harbor_path
+
+        def failing_resolve(config, image):
+            if image.startswith("node"):
+                raise ConfigurationError("no Harbor mapping")
+            return resolve(config, image)
+
+        items = [PAYLOAD, {"language": "node", "version": "18", "generation_mode": "ai"}]
+        with patch.object(Config, "resolve_harbor_path", failing_resolve), \
+             patch("app.api.v1.docker_file.generate_dockerfile_suggestion", return_value=AI_OUTPUT):
+            body = self.client.post("/api/v1/generate-dockerfiles:batch", json={"requests": items}).json()
+        self.assertEqual(body["status"], "partial")
+        self.assertEqual([r["status"] for r in body["results"]], ["success", "error"])
+        self.assertEqual(body["results"][1]["error"]["error_code"], "CONFIG_ERROR")
+
+    def test_empty_batch_rejected(self):
+        response = self.client.post("/api/v1/generate-dockerfiles:batch", json={"requests": []})
+        self.assertEqual(response.status_code, 422)
+
+
+class TestStreamingEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = DockerfileCache(max_entries=16, ttl_seconds=60)
+        app.dependency_overrides[get_response_cache] = lambda: self.cache
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def _stream(self, chunks=None, error=None):
+        async def fake_stream(prompt, **kwargs):
+            for chunk in chunks or []:
+                yield chunk
+            if error is not None:
+                raise error
+
+        with patch("app.api.v1.docker_file.stream_dockerfile_suggestion", side_effect=fake_stream):
+            response = self.client.post("/api/v1/generate-dockerfile:stream", json=PAYLOAD)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_stream_rewrites_from_line(self):
+        events = self._stream(chunks=[AI_OUTPUT[i:i + 7] for i in range(0, len(AI_OUTPUT), 7)])
+        self.assertEqual(events[0]["type"], "metadata")
+        harbor_path = events[0]["base_image"]["harbor_path"]
+        content = "".join(e["content"] for e in events if e["type"] == "chunk")
+        self.assertTrue(content.startswith(f"FROM {harbor_path}\n"))
+        self.assertEqual(events[-1], {"type": "done", "status": "success", "cached": False, "generator": "ai",
+                                      "warnings": []})
+
+        # The completed stream populated the cache
+        cached_events = self._stream(chunks=[])
+        self.assertTrue(cached_events[-1]["cached"])
+
+    def test_stream_reports_missing_from_line(self):
+        events = self._stream(chunks=["FROM ubuntu:22.04\n", "CMD bash\n"])
+        self.assertEqual(events[-1]["type"], "error")
+        self.assertEqual(events[-1]["error_code"], "AI_RESPONSE_INVALID")
+
+    def test_stream_reports_validation_warnings(self):
+        events = self._stream(chunks=["FROM python:3.11-slim\n", "RUN pip install flask\n"])
+        self.assertEqual(events[-1]["type"], "done")
+        self.assertEqual(events[-1]["warnings"], ["The final stage does not EXPOSE port 5000.",
+                                                  "The final stage has no CMD or ENTRYPOINT."])
+
+    def test_stream_reports_ai_errors(self):
+        events = self._stream(error=AIConnectionError("down"))
+        self.assertEqual(events[-1]["error_code"], "AI_SERVICE_UNAVAILABLE")
+
+    def test_unsupported_language_is_http_error(self):
+        response = self.client.post("/api/v1/generate-dockerfile:stream", json={"language": "cobol"})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestConcurrentGeneration(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncTearDown(self):
+        app.dependency_overrides.clear()
+
+    async def test_concurrent_identical_requests_share_ai_call(self):
+        """Concurrent identical requests are coalesced onto one AI call."""
+        async def slow_ai(prompt, **kwargs):
+            await asyncio.sleep(0.1)
+            return AI_OUTPUT
+
+        app.dependency_overrides[get_response_cache] = lambda: None
+        transport = httpx.ASGITransport(app=app)
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", side_effect=slow_ai) as ai:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = await asyncio.gather(
+                    *(client.post("/api/v1/generate-dockerfile", json=PAYLOAD) for _ in range(10))
+                )
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        self.assertEqual(ai.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
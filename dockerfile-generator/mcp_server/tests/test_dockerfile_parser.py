@@ -0,0 +1,165 @@
+# tests/test_dockerfile_parser.py
+
+import unittest
+
+from app.core.dockerfile_parser import DockerfileProcessor, normalize_image, process_dockerfile
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+GENERIC = "python:3.11-slim"
+HARBOR = "harbor.test.local/prod/python:3.11-slim-v2"
+AI_TEXT = "```dockerfile\nFROM python:3.11-slim\nWORKDIR /app\nCOPY . .\nCMD [\"python\", \"app.py\"]\n```"
+EXPECTED = f"FROM {HARBOR}\nWORKDIR /app\nCOPY . .\nCMD [\"python\", \"app.py\"]"
+
+MULTI_STAGE = """```dockerfile
+# syntax=docker/dockerfile:1
+ARG APP_HOME=/app
+FROM --platform=$BUILDPLATFORM python:3.11 as builder
+RUN pip install --prefix=/install \\
+    flask \\
+    # pinned below
+    gunicorn==22.0.0
+RUN <<EOF
+from setuptools import setup
+FROM inside heredoc
+EOF
+FROM \\
+    python:3.11-slim AS runtime
+COPY --from=builder /install /usr/local
+FROM builder AS test
+FROM scratch AS empty
+FROM ${BASE_IMAGE}
+FROM gcr.io/distroless/python3
+CMD ["gunicorn", "app:app"]
+```"""
+
+
+def resolve(image):
+    return f"harbor.test.local/library/{image}"
+
+
+def _run(chunks, **kwargs):
+    processor = DockerfileProcessor(GENERIC, HARBOR, **kwargs)
+    emitted = [processor.feed(chunk) for chunk in chunks]
+    emitted.append(processor.finish())
+    return processor, "".join(emitted)
+
+
+def _chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestStreamingRewrite(unittest.TestCase):
+
+    def test_single_chunk(self):
+        processor, output = _run([AI_TEXT])
+        self.assertTrue(processor.base_image_found)
+        self.assertEqual(output.strip(), EXPECTED)
+        self.assertEqual(processor.content, EXPECTED)
+
+    def test_any_chunking_gives_same_output(self):
+        """Splitting the stream at every possible position yields identical output."""
+        whole = process_dockerfile(MULTI_STAGE, GENERIC, HARBOR, resolve=resolve).content
+        for text in (AI_TEXT, MULTI_STAGE):
+            for size in (1, 2, 3, 5, 7, 13):
+                processor, output = _run(_chunked(text, size), resolve=resolve)
+                self.assertTrue(processor.base_image_found, size)
+                self.assertEqual(output.strip(), EXPECTED if text is AI_TEXT else whole, size)
+
+    def test_from_line_held_until_complete(self):
+        processor = DockerfileProcessor(GENERIC, HARBOR)
+        self.assertEqual(processor.feed("FROM python:3.11"), "")
+        self.assertEqual(processor.feed("-slim\nWORK"), f"FROM {HARBOR}\nWORK")
+
+    def test_other_lines_forwarded_immediately(self):
+        processor = DockerfileProcessor(GENERIC, HARBOR)
+        self.assertEqual(processor.feed("RUN pip"), "RUN pip")
+        self.assertEqual(processor.feed(" install flask"), " install flask")
+
+    def test_continued_from_held_until_instruction_ends(self):
+        processor = DockerfileProcessor(GENERIC, HARBOR)
+        self.assertEqual(processor.feed("FROM \\\n"), "")
+        self.assertEqual(processor.feed("  python:3.11-slim AS app\nRUN"), f"FROM {HARBOR} AS app\nRUN")
+
+    def test_missing_base_image(self):
+        processor, _ = _run(["FROM node:18\nCMD node\n"])
+        self.assertFalse(processor.base_image_found)
+
+
+class TestStageRewrite(unittest.TestCase):
+
+    def setUp(self):
+        self.processor = process_dockerfile(MULTI_STAGE, GENERIC, HARBOR, resolve=resolve,
+                                            harbor_base_url="harbor.test.local")
+        self.lines = self.processor.content.splitlines()
+
+    def test_every_stage_rewritten(self):
+        from_lines = [line for line in self.lines if line.startswith("FROM") and line != "FROM inside heredoc"]
+        self.assertEqual(from_lines, [
+            "FROM --platform=$BUILDPLATFORM harbor.test.local/library/python:3.11 AS builder",
+            f"FROM {HARBOR} AS runtime",
+            "FROM builder AS test",
+            "FROM scratch AS empty",
+            "FROM ${BASE_IMAGE}",
+            "FROM harbor.test.local/library/gcr.io/distroless/python3",
+        ])
+        self.assertEqual([stage.alias for stage in self.processor.stages],
+                         ["builder", "runtime", "test", "empty", None, None])
+
+    def test_heredoc_and_continuation_lines_untouched(self):
+        self.assertIn("FROM inside heredoc", self.lines)
+        self.assertIn("from setuptools import setup", self.lines)
+        self.assertIn("    # pinned below", self.lines)
+        self.assertNotIn("```", self.processor.content)
+
+    def test_ast(self):
+        instructions = self.processor.instructions
+        self.assertEqual([i.keyword for i in instructions],
+                         ["ARG", "FROM", "RUN", "RUN", "FROM", "COPY", "FROM", "FROM", "FROM", "FROM", "CMD"])
+        run = instructions[2]
+        self.assertEqual(run.args, "pip install --prefix=/install flask gunicorn==22.0.0")
+        self.assertEqual(run.line, 5)
+        self.assertEqual(self.processor.issues, [])
+
+    def test_existing_harbor_path_kept(self):
+        processor = process_dockerfile(f"FROM {GENERIC}\nFROM harbor.test.local/base/alpine:3.18\n", GENERIC, HARBOR,
+                                       resolve=resolve, harbor_base_url="harbor.test.local/")
+        self.assertEqual(processor.stages[1].image, "harbor.test.local/base/alpine:3.18")
+
+    def test_tag_drift_still_counts_as_base_image(self):
+        processor = process_dockerfile("from docker.io/library/python:3.11.9-slim\n", GENERIC, HARBOR, resolve=resolve)
+        self.assertTrue(processor.base_image_found)
+        self.assertEqual(processor.content, "FROM harbor.test.local/library/docker.io/library/python:3.11.9-slim")
+
+    def test_normalize_image(self):
+        self.assertEqual(normalize_image("docker.io/library/Python:3.11-slim"), "python:3.11-slim")
+        self.assertEqual(normalize_image("python@sha256:abc"), "python:latest")
+        self.assertEqual(normalize_image("localhost:5000/app"), "localhost:5000/app:latest")
+
+
+class TestIssues(unittest.TestCase):
+
+    def test_structural_issues(self):
+        processor = process_dockerfile("RUN echo hi\nFROM python:3.11-slim\nFOO bar\nRUN <<EOF\necho\n",
+                                       GENERIC, HARBOR)
+        self.assertEqual(processor.issues, [
+            "Line 1: 'RUN' appears before the first FROM.",
+            "Line 3: unknown instruction 'FOO'.",
+            "Line 4: heredoc is not terminated (missing 'EOF').",
+        ])
+
+    def test_dangling_continuation(self):
+        processor = process_dockerfile("FROM python:3.11-slim\nRUN apt-get update && \\\n", GENERIC, HARBOR)
+        self.assertEqual(processor.issues, ["Line 2: instruction ends with a line continuation."])
+
+    def test_escape_directive(self):
+        processor = process_dockerfile("# escape=`\nFROM python:3.11-slim\nRUN echo a `\n    b\n", GENERIC, HARBOR)
+        self.assertEqual(processor.instructions[-1].args, "echo a b")
+        self.assertEqual(processor.issues, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
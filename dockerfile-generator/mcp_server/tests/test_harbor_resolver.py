@@ -0,0 +1,69 @@
+# tests/test_harbor_resolver.py
+
+import os
+import tempfile
+import unittest
+
+from app.config import Config
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+SAMPLE_YAML = """
+harbor_base_url: "harbor.test.local/"
+mappings:
+  python: "/base-images/python-base"
+  python:3.11-slim: "prod/python:3.11-slim-v2"
+  node:18: "dev/node:18.15.0"
+  nginx: "public/nginx:stable"
+  "my-custom-app:v1.0": "apps/my-app"
+"""
+
+
+class TestHarborResolutionIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.tmpdir.name, "mapping.yaml")
+        with open(path, "w") as f:
+            f.write(SAMPLE_YAML)
+        cls.config = Config(config_path=path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_exact_match_with_tag(self):
+        self.assertEqual(self.config.resolve_harbor_path("python:3.11-slim"), "harbor.test.local/prod/python:3.11-slim-v2")
+
+    def test_exact_match_untagged_path_keeps_input_tag_semantics(self):
+        """A tagged key mapped to an untagged path is used as-is."""
+        self.assertEqual(self.config.resolve_harbor_path("my-custom-app:v1.0"), "harbor.test.local/apps/my-app")
+
+    def test_exact_match_without_tag_appends_latest(self):
+        self.assertEqual(self.config.resolve_harbor_path("python"), "harbor.test.local/base-images/python-base:latest")
+
+    def test_base_name_match_appends_input_tag(self):
+        self.assertEqual(self.config.resolve_harbor_path("python:3.10"), "harbor.test.local/base-images/python-base:3.10")
+
+    def test_base_name_match_with_tagged_path(self):
+        self.assertEqual(self.config.resolve_harbor_path("nginx:1.25"), "harbor.test.local/public/nginx:stable")
+
+    def test_no_match_uses_library_scope(self):
+        self.assertEqual(self.config.resolve_harbor_path("ubuntu:22.04"), "harbor.test.local/library/ubuntu:22.04")
+        self.assertEqual(self.config.resolve_harbor_path("redis"), "harbor.test.local/library/redis:latest")
+
+    def test_results_are_memoized(self):
+        self.config._resolve_memo.cache_clear()
+        for _ in range(3):
+            self.config.resolve_harbor_path("node:18")
+        info = self.config.resolve_cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,338 @@
+# tests/test_jobs.py
+
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+from app.main import app
+from app.api.v1.jobs import run_generation_job
+from app.core.cache import DockerfileCache, get_response_cache
+from app.core.jobs import (
+    JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED,
+    JobQueue, JobWorkerPool, MemoryJobStore, SQLiteJobStore, get_job_queue, resolve_webhook_target
+)
+from app.core.rate_limiter import PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from app.utils.exceptions import JobQueueFullError, WebhookNotAllowedError
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+AI_OUTPUT = ("FROM python:3.11-slim\nWORKDIR /app\nCOPY requirements.txt .\nRUN pip install -r requirements.txt\n"
+             "COPY . .\nEXPOSE 5000\nCMD [\"python\", \"app.py\"]")
+PUBLIC_ADDRESS = "93.184.216.34"
+PAYLOAD = {"language": "python", "version": "3.11", "dependencies": ["flask"], "port": 5000, "app_type": "web",
+           "generation_mode": "ai"}
+
+
+async def _succeed(job):
+    return {"status": "success", "language": job.request["language"]}, None
+
+
+class _StoreTests:
+    """Behaviour shared by both job stores; subclasses provide make_store()."""
+
+    def setUp(self):
+        self.queue = JobQueue(self.make_store(), result_ttl=60, max_queued=3, lease_seconds=30)
+
+    async def test_claims_interactive_before_batch_then_oldest_first(self):
+        batch = await self.queue.submit({"n": 1}, PRIORITY_BATCH)
+        first = await self.queue.submit({"n": 2}, PRIORITY_INTERACTIVE)
+        second = await self.queue.submit({"n": 3}, PRIORITY_INTERACTIVE)
+        claimed = [await self.queue.claim() for _ in range(4)]
+        self.assertEqual([job.id if job else None for job in claimed], [first.id, second.id, batch.id, None])
+        self.assertEqual(claimed[0].status, JOB_RUNNING)
+        self.assertEqual((await self.queue.get(first.id)).request, {"n": 2})
+
+    async def test_rejects_submissions_when_full(self):
+        for n in range(3):
+            await self.queue.submit({"n": n})
+        with self.assertRaises(JobQueueFullError):
+            await self.queue.submit({"n": 3})
+        await self.queue.claim()
+        await self.queue.submit({"n": 3})  # A claimed job frees its slot
+
+    async def test_finished_jobs_expire(self):
+        job = await self.queue.submit({"n": 1})
+        await self.queue.finish(await self.queue.claim(), error={"error_code": "X"})
+        stored = await self.queue.get(job.id)
+        self.assertEqual(stored.status, JOB_FAILED)
+        self.assertEqual(stored.error, {"error_code": "X"})
+        self.assertAlmostEqual(stored.expires_at, stored.finished_at + 60)
+        with patch("app.core.jobs.time.time", return_value=stored.expires_at + 1):
+            self.assertIsNone(await self.queue.get(job.id))
+            self.assertEqual(await self.queue.purge_expired(), 1)
+        self.assertEqual((await self.queue.stats())[JOB_FAILED], 0)
+
+
+class TestMemoryJobStore(_StoreTests, unittest.IsolatedAsyncioTestCase):
+
+    def make_store(self):
+        return MemoryJobStore()
+
+
+class TestSQLiteJobStore(_StoreTests, unittest.IsolatedAsyncioTestCase):
+
+    def make_store(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        return SQLiteJobStore(os.path.join(self.tmp.name, "jobs.sqlite3"))
+
+    async def test_store_is_shared_between_connections(self):
+        """A job submitted through one connection (the API) is claimed through another (a worker)."""
+        job = await self.queue.submit({"n": 1})
+        worker_queue = JobQueue(SQLiteJobStore(self.queue.store.db_path), lease_seconds=30)
+        self.assertEqual((await worker_queue.claim()).id, job.id)
+        self.assertIsNone(await self.queue.claim())
+        await worker_queue.finish(await self.queue.get(job.id), result={"ok": True})
+        self.assertEqual((await self.queue.get(job.id)).result, {"ok": True})
+
+    async def test_locked_database_does_not_block_the_event_loop(self):
+        """While another process holds the write lock, submit waits on the store thread, not the loop."""
+        import sqlite3
+        blocker = sqlite3.connect(self.queue.store.db_path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        submit = asyncio.create_task(self.queue.submit({"n": 1}))
+        started = time.perf_counter()
+        await asyncio.sleep(0.1)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertFalse(submit.done())
+        blocker.execute("ROLLBACK")
+        blocker.close()
+        job = await asyncio.wait_for(submit, 5)
+        self.assertEqual((await self.queue.get(job.id)).status, JOB_QUEUED)
+
+    async def test_expired_lease_is_claimed_again(self):
+        job = await self.queue.submit({"n": 1})
+        await self.queue.claim()
+        self.assertIsNone(await self.queue.claim())
+        with patch("app.core.jobs.time.time", return_value=time.time() + 31):
+            self.assertEqual((await self.queue.claim()).id, job.id)
+
+    async def test_renewed_lease_is_not_claimed_again(self):
+        await self.queue.submit({"n": 1})
+        job = await self.queue.claim()
+        with patch("app.core.jobs.time.time", return_value=time.time() + 20):
+            self.assertTrue(await self.queue.renew(job))
+        with patch("app.core.jobs.time.time", return_value=time.time() + 31):
+            self.assertIsNone(await self.queue.claim())
+
+    async def test_only_the_current_claimant_finishes(self):
+        """A worker whose lease ran out can't renew, finish or overwrite the job's new run."""
+        await self.queue.submit({"n": 1})
+        stale = await self.queue.claim()
+        with patch("app.core.jobs.time.time", return_value=time.time() + 31):
+            current = await self.queue.claim()
+        self.assertFalse(await self.queue.renew(stale))
+        self.assertFalse(await self.queue.finish(stale, result={"run": "stale"}))
+        stale.webhook_status = "failed"
+        await self.queue.save(stale)
+        self.assertEqual((await self.queue.get(current.id)).status, JOB_RUNNING)
+        self.assertTrue(await self.queue.finish(current, result={"run": "current"}))
+        stored = await self.queue.get(current.id)
+        self.assertEqual((stored.status, stored.result, stored.webhook_status), (JOB_SUCCEEDED, {"run": "current"}, None))
+
+
+class TestJobWorkerPool(unittest.IsolatedAsyncioTestCase):
+
+    async def test_workers_pick_up_submitted_jobs(self):
+        queue = JobQueue(MemoryJobStore())
+        pool = JobWorkerPool(queue, _succeed, workers=2, poll_interval=30)
+        pool.start()
+        try:
+            job = await queue.submit({"language": "python"})
+            for _ in range(100):
+                if (await queue.get(job.id)).status == JOB_SUCCEEDED:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await pool.stop()
+        self.assertEqual((await queue.get(job.id)).result, {"status": "success", "language": "python"})
+
+    async def test_long_job_keeps_its_lease(self):
+        """A job running longer than its lease is renewed, so no other worker runs it again."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db_path = os.path.join(tmp.name, "jobs.sqlite3")
+        queue = JobQueue(SQLiteJobStore(db_path), lease_seconds=0.3)
+        other_worker = JobQueue(SQLiteJobStore(db_path), lease_seconds=0.3)
+        reclaimed = []
+
+        async def slow(job):
+            for _ in range(5):
+                await asyncio.sleep(0.1)
+                reclaimed.append(await other_worker.claim())
+            return await _succeed(job)
+
+        job = await queue.submit({"language": "python"})
+        self.assertEqual(await JobWorkerPool(queue, slow, workers=0).run_pending(), 1)
+        self.assertEqual(reclaimed, [None] * 5)
+        self.assertEqual((await queue.get(job.id)).status, JOB_SUCCEEDED)
+
+    async def test_webhook_is_signed_and_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500 if len(calls) == 1 else 204)
+
+        queue = JobQueue(MemoryJobStore())
+        pool = JobWorkerPool(queue, _succeed, workers=0)
+        pool._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        job = await queue.submit({"language": "python"}, webhook_url="https://ci.example.com/hook")
+        with patch("app.core.jobs.JOB_WEBHOOK_SECRET", "s3cret"), \
+                patch("app.core.jobs._resolve_host", new=AsyncMock(return_value=[PUBLIC_ADDRESS])), \
+                patch("app.core.jobs.asyncio.sleep", new=AsyncMock()):
+            self.assertEqual(await pool.run_pending(), 1)
+        await pool._client.aclose()
+
+        self.assertEqual(len(calls), 2)
+        body = calls[-1].content
+        self.assertEqual(json.loads(body)["status"], JOB_SUCCEEDED)
+        expected = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+        self.assertEqual(calls[-1].headers["X-Signature-256"], f"sha256={expected}")
+        self.assertEqual((await queue.get(job.id)).webhook_status, "delivered")
+        # Sent to the checked address, under the URL's host name
+        self.assertEqual(calls[-1].url.host, PUBLIC_ADDRESS)
+        self.assertEqual(calls[-1].headers["Host"], "ci.example.com")
+        self.assertEqual(calls[-1].extensions["sni_hostname"], "ci.example.com")
+
+    async def test_slow_webhook_does_not_block_the_worker(self):
+        receiver_called, release = asyncio.Event(), asyncio.Event()
+
+        async def handler(request):
+            receiver_called.set()
+            await release.wait()
+            return httpx.Response(204)
+
+        queue = JobQueue(MemoryJobStore())
+        pool = JobWorkerPool(queue, _succeed, workers=1, poll_interval=30)
+        pool.start()
+        await pool._client.aclose()
+        pool._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch("app.core.jobs._resolve_host", new=AsyncMock(return_value=[PUBLIC_ADDRESS])):
+            try:
+                hooked = await queue.submit({"language": "python"}, webhook_url="https://ci.example.com/hook")
+                await asyncio.wait_for(receiver_called.wait(), 1)
+                plain = await queue.submit({"language": "go"})
+                for _ in range(100):
+                    if (await queue.get(plain.id)).status == JOB_SUCCEEDED:
+                        break
+                    await asyncio.sleep(0.01)
+                self.assertEqual((await queue.get(plain.id)).status, JOB_SUCCEEDED)
+                self.assertEqual((await queue.get(hooked.id)).webhook_status, "pending")
+            finally:
+                await pool.stop(drain_timeout=0.05)  # The receiver never answers: delivery is cancelled
+        self.assertEqual((await queue.get(hooked.id)).webhook_status, "pending")
+
+    async def test_webhook_to_private_address_is_not_sent(self):
+        """A host that resolves to an internal address at delivery time (DNS rebinding) isn't called."""
+        calls = []
+        queue = JobQueue(MemoryJobStore())
+        pool = JobWorkerPool(queue, _succeed, workers=0)
+        pool._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: calls.append(r) or httpx.Response(204)))
+        job = await queue.submit({"language": "python"}, webhook_url="https://ci.example.com/hook")
+        with patch("app.core.jobs._resolve_host", new=AsyncMock(return_value=["169.254.169.254"])):
+            await pool.run_pending()
+        await pool._client.aclose()
+        self.assertEqual(calls, [])
+        self.assertEqual((await queue.get(job.id)).webhook_status, "failed")
+
+
+class TestWebhookPolicy(unittest.IsolatedAsyncioTestCase):
+
+    async def test_internal_and_plain_http_targets_rejected(self):
+        for url in ("http://ci.example.com/hook", "https://127.0.0.1/hook", "https://169.254.169.254/latest/meta-data",
+                    "https://10.0.0.5/hook", "https://[::1]/hook", "https://[::ffff:192.168.1.1]/hook"):
+            with self.subTest(url=url), self.assertRaises(WebhookNotAllowedError):
+                await resolve_webhook_target(url)
+
+    async def test_public_host_is_pinned_to_its_address(self):
+        with patch("app.core.jobs._resolve_host", new=AsyncMock(return_value=[PUBLIC_ADDRESS])):
+            self.assertEqual(await resolve_webhook_target("https://ci.example.com/hook"), PUBLIC_ADDRESS)
+        with patch("app.core.jobs._resolve_host", new=AsyncMock(return_value=[PUBLIC_ADDRESS, "10.1.2.3"])):
+            with self.assertRaises(WebhookNotAllowedError):
+                await resolve_webhook_target("https://ci.example.com/hook")
+
+    async def test_allowlist(self):
+        with patch("app.core.jobs.JOB_WEBHOOK_ALLOWED_HOSTS", ["*.corp.example", "hooks.example.com"]):
+            # Allowlisted hosts may be internal and are called by name
+            self.assertIsNone(await resolve_webhook_target("https://ci.corp.example/hook"))
+            self.assertIsNone(await resolve_webhook_target("https://hooks.example.com/hook"))
+            with self.assertRaises(WebhookNotAllowedError):
+                await resolve_webhook_target("https://other.example.com/hook")
+
+
+class TestJobEndpoints(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.queue = JobQueue(MemoryJobStore())
+        self.pool = JobWorkerPool(self.queue, run_generation_job, workers=0)
+        self.cache = DockerfileCache(max_entries=16, ttl_seconds=60)
+        app.dependency_overrides[get_job_queue] = lambda: self.queue
+        app.dependency_overrides[get_response_cache] = lambda: self.cache
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        app.dependency_overrides.clear()
+
+    async def test_submit_then_poll(self):
+        response = await self.client.post("/api/v1/jobs", json=PAYLOAD)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        self.assertEqual(response.json()["status"], JOB_QUEUED)
+        self.assertEqual(response.headers["Location"], f"/api/v1/jobs/{job_id}")
+
+        pending = await self.client.get(f"/api/v1/jobs/{job_id}")
+        self.assertEqual(pending.json()["status"], JOB_QUEUED)
+        self.assertIn("Retry-After", pending.headers)
+
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", return_value=AI_OUTPUT):
+            await self.pool.run_pending()
+        done = await self.client.get(f"/api/v1/jobs/{job_id}")
+        body = done.json()
+        self.assertEqual(body["status"], JOB_SUCCEEDED)
+        self.assertTrue(body["result"]["dockerfile_content"].startswith(f"FROM {body['result']['base_image']['harbor_path']}"))
+        self.assertNotIn("Retry-After", done.headers)
+
+    async def test_generation_error_fails_the_job(self):
+        job_id = (await self.client.post("/api/v1/jobs", json={"language": "cobol"})).json()["job_id"]
+        await self.pool.run_pending()
+        body = (await self.client.get(f"/api/v1/jobs/{job_id}")).json()
+        self.assertEqual(body["status"], JOB_FAILED)
+        self.assertEqual(body["error"]["error_code"], "UNSUPPORTED_LANGUAGE")
+
+    async def test_unknown_job_returns_404(self):
+        response = await self.client.get("/api/v1/jobs/missing")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["error_code"], "JOB_NOT_FOUND")
+
+    async def test_full_queue_returns_503(self):
+        self.queue.max_queued = 0
+        response = await self.client.post("/api/v1/jobs", json=PAYLOAD)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["error_code"], "JOB_QUEUE_FULL")
+
+    async def test_invalid_webhook_url_rejected(self):
+        response = await self.client.post("/api/v1/jobs", json={**PAYLOAD, "webhook_url": "not a url"})
+        self.assertEqual(response.status_code, 422)
+
+    async def test_internal_webhook_url_rejected(self):
+        response = await self.client.post("/api/v1/jobs", json={**PAYLOAD, "webhook_url": "https://169.254.169.254/x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error_code"], "WEBHOOK_NOT_ALLOWED")
+        self.assertEqual((await self.queue.stats())[JOB_QUEUED], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
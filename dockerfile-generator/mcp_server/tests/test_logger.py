@@ -0,0 +1,106 @@
+# tests/test_logger.py
+
+import json
+import queue
+import unittest
+from unittest.mock import patch
+
+from app.utils import logger as logger_module
+from app.utils.logger import (
+    JsonFormatter, NonBlockingQueueHandler, TextFormatter, TEXT_FORMAT, log_payload, logger, truncate,
+)
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+
+def make_record(msg="hello %s", args=("world",), exc_info=None, **extra):
+    record = logging.LogRecord("dockerfile_generator", logging.INFO, __file__, 1, msg, args, exc_info)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class _ExplodingPayload(str):
+    """A payload that fails if anything tries to measure or render it."""
+
+    def __len__(self):
+        raise AssertionError("payload was built with DEBUG disabled")
+
+
+class TestFormatters(unittest.TestCase):
+
+    def test_json_formatter_fields(self):
+        entry = json.loads(JsonFormatter().format(make_record(trace_id="abc123")))
+        self.assertEqual(entry["message"], "hello world")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["logger"], "dockerfile_generator")
+        self.assertEqual(entry["trace_id"], "abc123")
+        self.assertIn("ts", entry)
+
+    def test_json_formatter_exception(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            import sys
+            record = make_record(exc_info=sys.exc_info())
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertIn("ValueError: boom", entry["exception"])
+        self.assertNotIn("trace_id", entry)
+
+    def test_text_formatter_trace_prefix(self):
+        formatter = TextFormatter(TEXT_FORMAT)
+        self.assertTrue(formatter.format(make_record(trace_id="abc123")).startswith("[trace=abc123] "))
+        self.assertFalse(formatter.format(make_record(trace_id=None)).startswith("[trace="))
+
+    def test_truncate(self):
+        self.assertEqual(truncate("short", 10), "short")
+        self.assertEqual(truncate("x" * 15, 10), "x" * 10 + "... [truncated 5 chars]")
+
+
+class TestQueueHandler(unittest.TestCase):
+
+    def test_record_is_prepared_in_caller(self):
+        handler = NonBlockingQueueHandler(queue.Queue())
+        handler.handle(make_record())
+        queued = handler.queue.get_nowait()
+        self.assertEqual(queued.msg, "hello world")
+        self.assertIsNone(queued.args)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        for _ in range(3):
+            handler.handle(make_record())
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 2)
+
+
+class TestLogPayload(unittest.TestCase):
+
+    def setUp(self):
+        self.log = logging.getLogger("test.log_payload")
+        self.log.propagate = False
+
+    def test_nothing_built_when_debug_disabled(self):
+        self.log.setLevel(logging.INFO)
+        with patch.object(self.log, "debug") as debug:
+            log_payload(self.log, "Prompt", _ExplodingPayload("FROM python"))
+        debug.assert_not_called()
+
+    def test_payload_is_truncated(self):
+        self.log.setLevel(logging.DEBUG)
+        with patch.object(logger_module, "LOG_MAX_PAYLOAD_CHARS", 4), patch.object(self.log, "debug") as debug:
+            log_payload(self.log, "Prompt", "abcdefgh")
+        args = debug.call_args.args
+        self.assertEqual(args[1:], ("Prompt", 8, "abcd... [truncated 4 chars]"))
+
+    def test_payload_sampling(self):
+        self.log.setLevel(logging.DEBUG)
+        with patch.object(logger_module, "LOG_PAYLOAD_SAMPLE_RATIO", 0.0), patch.object(self.log, "debug") as debug:
+            log_payload(self.log, "Prompt", "abc")
+        debug.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+# tests/test_metrics.py
+
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.main import app
+from app.core import resilience
+from app.core.ai_router import AIRouter
+from app.core.ai_service import AIConnectionError
+from app.core.cache import DockerfileCache, get_response_cache
+from app.core.providers import StubProvider
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+AI_OUTPUT = "FROM python:3.11-slim\nWORKDIR /app\nCOPY . .\nCMD [\"python\", \"app.py\"]"
+PAYLOAD = {"language": "python", "version": "3.11", "port": 5000, "app_type": "web", "generation_mode": "ai"}
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def stage_count(stage):
+    return sample("dockerfile_stage_duration_seconds_count", stage=stage)
+
+
+class TestRequestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        app.dependency_overrides[get_response_cache] = lambda: DockerfileCache(max_entries=16, ttl_seconds=60)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def test_ai_pipeline_stages_are_timed(self):
+        stages = ["base_image", "harbor_resolve", "template_render", "cache_lookup",
+                  "prompt_build", "ai_call", "from_rewrite"]
+        before = {stage: stage_count(stage) for stage in stages}
+        requests_before = sample("dockerfile_requests_total", endpoint="generate", language="python",
+                                 outcome="success", generator="ai")
+        with patch("app.api.v1.docker_file.generate_dockerfile_suggestion", return_value=AI_OUTPUT):
+            self.assertEqual(self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD).status_code, 200)
+        for stage in stages:
+            self.assertEqual(stage_count(stage), before[stage] + 1, stage)
+        self.assertEqual(sample("dockerfile_requests_total", endpoint="generate", language="python",
+                                outcome="success", generator="ai"), requests_before + 1)
+        self.assertEqual(sample("dockerfile_requests_in_flight", endpoint="generate"), 0)
+
+    def test_error_outcome_uses_error_code(self):
+        labels = dict(endpoint="generate", language="unknown", outcome="UNSUPPORTED_LANGUAGE", generator="none")
+        before = sample("dockerfile_requests_total", **labels)
+        self.client.post("/api/v1/generate-dockerfile", json={"language": "cobol"})
+        self.assertEqual(sample("dockerfile_requests_total", **labels), before + 1)
+
+    def test_template_stream_is_counted(self):
+        labels = dict(endpoint="stream", language="python", outcome="success", generator="template")
+        before = sample("dockerfile_requests_total", **labels)
+        payload = {**PAYLOAD, "generation_mode": "auto"}
+        with self.client.stream("POST", "/api/v1/generate-dockerfile:stream", json=payload) as response:
+            list(response.iter_lines())
+        self.assertEqual(sample("dockerfile_requests_total", **labels), before + 1)
+        self.assertEqual(sample("dockerfile_requests_in_flight", endpoint="stream"), 0)
+
+    def test_batch_counts_items(self):
+        labels = dict(endpoint="batch", language="python", outcome="success", generator="template")
+        before = sample("dockerfile_requests_total", **labels)
+        item = {**PAYLOAD, "generation_mode": "template"}
+        self.client.post("/api/v1/generate-dockerfiles:batch", json={"requests": [item, item, {"language": "cobol"}]})
+        self.assertEqual(sample("dockerfile_requests_total", **labels), before + 2)
+
+    def test_metrics_endpoint_exposition(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        for name in ("dockerfile_stage_duration_seconds_bucket", "dockerfile_ai_generations_in_flight",
+                     "dockerfile_ai_admission_queue_depth"):
+            self.assertIn(name, response.text)
+
+
+class _FailingStub(StubProvider):
+    name = "failing-stub"
+
+    def generate(self, prompt):
+        raise AIConnectionError("down")
+
+
+class TestAIErrorMetrics(unittest.IsolatedAsyncioTestCase):
+
+    async def test_errors_counted_by_class(self):
+        provider = _FailingStub()
+        router = AIRouter({provider.name: provider}, [provider.name])
+        before = sample("dockerfile_ai_errors_total", provider=provider.name, error="AIConnectionError")
+        with patch.object(resilience, "ai_retry_policy", resilience.RetryPolicy(max_attempts=1)), \
+                patch.dict(resilience.circuit_breakers, clear=True):
+            with self.assertRaises(AIConnectionError):
+                await router.generate("prompt")
+        self.assertEqual(sample("dockerfile_ai_errors_total", provider=provider.name, error="AIConnectionError"),
+                         before + 1)
+        self.assertEqual(sample("dockerfile_ai_calls_in_flight", provider=provider.name), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# tests/test_prompts.py
+
+import unittest
+
+from app.core.prompts import (
+    SYSTEM_PROMPT, Prompt, count_tokens, create_dockerfile_prompt, create_repair_prompt, split_prompt,
+    template_cache_info
+)
+
+
+class TestDockerfilePrompt(unittest.TestCase):
+
+    def test_request_part_is_compact(self):
+        prompt = create_dockerfile_prompt(language="python", version="3.11", dependencies=["flask", "requests"],
+                                          port=5000, app_type="web", generic_base_image="python:3.11-slim")
+        self.assertEqual(prompt.system, SYSTEM_PROMPT)
+        self.assertEqual(prompt.user, "\n".join([
+            "Application: 'python' 3.11, web",
+            "Base image: 'python:3.11-slim'",
+            "Dependencies (install with pip, preferably from a requirements.txt file): flask, requests",
+            "Port: 5000",
+        ]))
+        self.assertEqual(prompt, f"{SYSTEM_PROMPT}\n\n{prompt.user}")
+
+    def test_package_manager_replaces_installer_hint(self):
+        prompt = create_dockerfile_prompt(language="python", dependencies=["flask"], package_manager="poetry",
+                                          generic_base_image="python:3.11-slim")
+        self.assertIn("Dependencies: flask\nPackage manager: poetry (install from its lockfile)", prompt.user)
+        self.assertNotIn("pip", prompt.user)
+
+    def test_optional_parts_omitted(self):
+        prompt = create_dockerfile_prompt(language="go", generic_base_image="golang:1.20-alpine")
+        self.assertEqual(prompt.user, "Application: 'go'\nBase image: 'golang:1.20-alpine'")
+
+    def test_request_values_are_not_template_syntax(self):
+        prompt = create_dockerfile_prompt(language="node%s", app_type="{api}", dependencies=["left-pad"],
+                                          additional_instructions="Use 100% {braces}", generic_base_image="node:18")
+        self.assertIn("Application: 'node%s', {api}", prompt.user)
+        self.assertIn("Dependencies: left-pad", prompt.user)
+        self.assertIn("Additional instructions: Use 100% {braces}", prompt.user)
+
+    def test_templates_are_memoized(self):
+        before = template_cache_info()
+        for port in (3000, 3001, 3002):
+            create_dockerfile_prompt(language="ruby", app_type="cli", port=port, generic_base_image="ruby:3.3-slim")
+        after = template_cache_info()
+        self.assertEqual(after.hits - before.hits, 2)
+
+    def test_repair_prompt_shares_system_prefix(self):
+        prompt = create_repair_prompt("FROM python:3.11-slim", ["The final stage has no CMD or ENTRYPOINT."],
+                                      "python:3.11-slim")
+        self.assertEqual(prompt.system, SYSTEM_PROMPT)
+        self.assertIn("- The final stage has no CMD or ENTRYPOINT.", prompt.user)
+        self.assertIn("Base image: 'python:3.11-slim'", prompt.user)
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_split_prompt(self):
+        self.assertEqual(split_prompt(Prompt("sys", "user")), ("sys", "user"))
+        self.assertEqual(split_prompt("plain"), (None, "plain"))
+
+    def test_count_tokens(self):
+        self.assertEqual(count_tokens(""), 0)
+        self.assertEqual(count_tokens("abcde"), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
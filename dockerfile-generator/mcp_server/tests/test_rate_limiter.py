@@ -0,0 +1,91 @@
+# tests/test_rate_limiter.py
+
+import asyncio
+import unittest
+
+from app.core.rate_limiter import (
+    AdmissionController,
+    AdmissionRejectedError,
+    TokenBucket,
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE
+)
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_refill_over_time(self):
+        bucket = TokenBucket(per_minute=60)  # 1 token per second
+        bucket._updated = 0.0
+        bucket.tokens = 0.0
+        self.assertAlmostEqual(bucket.wait_time(1, now=0.0), 1.0)
+        self.assertEqual(bucket.wait_time(1, now=1.0), 0.0)
+
+    def test_oversized_request_waits_for_full_bucket(self):
+        bucket = TokenBucket(per_minute=60)
+        bucket._updated = 0.0
+        self.assertEqual(bucket.wait_time(1000, now=0.0), 0.0)
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+
+    async def test_disabled_controller_admits_immediately(self):
+        controller = AdmissionController()
+        self.assertEqual(await controller.acquire(10_000), 0.0)
+        self.assertFalse(controller.stats()["enabled"])
+
+    async def test_requests_within_budget_do_not_wait(self):
+        controller = AdmissionController(rpm=60)
+        for _ in range(5):
+            self.assertEqual(await controller.acquire(100), 0.0)
+        self.assertEqual(controller.stats()["admitted"], 5)
+
+    async def test_interactive_admitted_before_batch(self):
+        """With an empty bucket, queued interactive calls go ahead of earlier batch calls."""
+        controller = AdmissionController(rpm=600)  # 10 per second
+        controller.rpm_bucket.tokens = 0
+        order = []
+
+        async def call(name, priority):
+            await controller.acquire(1, priority, timeout=5)
+            order.append(name)
+
+        tasks = [asyncio.create_task(call("batch-1", PRIORITY_BATCH)),
+                 asyncio.create_task(call("batch-2", PRIORITY_BATCH))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE)))
+        await asyncio.sleep(0)
+        self.assertEqual(controller.stats()["queue_depth_by_priority"], {"interactive": 1, "batch": 2})
+
+        await asyncio.gather(*tasks)
+        self.assertEqual(order[0], "interactive")
+        self.assertGreater(controller.stats()["max_wait_ms"], 0)
+
+    async def test_deadline_rejects_call(self):
+        controller = AdmissionController(rpm=1)
+        controller.rpm_bucket.tokens = 0
+        with self.assertRaises(AdmissionRejectedError) as cm:
+            await controller.acquire(1, timeout=0.05)
+        self.assertEqual(cm.exception.reason, "timeout")
+        self.assertEqual(controller.stats()["rejected_timeout"], 1)
+        self.assertEqual(controller.stats()["queue_depth"], 0)
+
+    async def test_full_queue_rejects_call(self):
+        controller = AdmissionController(rpm=1, max_queue_size=1)
+        controller.rpm_bucket.tokens = 0
+        waiting = asyncio.create_task(controller.acquire(1, timeout=5))
+        await asyncio.sleep(0)
+        with self.assertRaises(AdmissionRejectedError) as cm:
+            await controller.acquire(1)
+        self.assertEqual(cm.exception.reason, "queue_full")
+        waiting.cancel()
+
+    async def test_tokens_per_minute_budget(self):
+        controller = AdmissionController(tpm=6000)  # 100 tokens per second
+        self.assertEqual(await controller.acquire(6000), 0.0)
+        waited = await controller.acquire(10, timeout=1)
+        self.assertGreater(waited, 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
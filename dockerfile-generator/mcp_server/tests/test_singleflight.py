@@ -0,0 +1,85 @@
+# tests/test_singleflight.py
+
+import asyncio
+import unittest
+
+from app.core.singleflight import SingleFlight
+from app.utils.exceptions import AIResponseError
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_identical_calls_share_one_execution(self):
+        """N concurrent calls for the same key run the work exactly once."""
+        group = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "FROM python:3.11-slim"
+
+        results = await asyncio.gather(*(group.do("same", work) for _ in range(50)))
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(set(results), {"FROM python:3.11-slim"})
+        self.assertEqual(group.stats(), {"in_flight": 0, "leaders": 1, "coalesced": 49})
+
+    async def test_followers_receive_leader_error(self):
+        group = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise AIResponseError("missing FROM")
+
+        results = await asyncio.gather(*(group.do("same", work) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(r, AIResponseError) for r in results))
+
+    async def test_distinct_keys_run_separately(self):
+        group = SingleFlight()
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(group.do("a", lambda: work("a")), group.do("b", lambda: work("b")))
+        self.assertEqual(results, ["a", "b"])
+        self.assertEqual(group.stats()["leaders"], 2)
+
+    async def test_leader_cancellation_does_not_cancel_followers(self):
+        group = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.create_task(group.do("same", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(group.do("same", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        self.assertEqual(await follower, "done")
+
+    async def test_key_released_after_completion(self):
+        """A call after the first finishes starts fresh work."""
+        group = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        self.assertEqual(await group.do("same", work), 1)
+        self.assertEqual(await group.do("same", work), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# tests/test_templates.py
+
+import time
+import unittest
+
+from app.core.templates import find_template, render_template_dockerfile
+from app.models.request import DockerfileRequest
+
+HARBOR = "harbor.test.local/prod/image:tag"
+
+
+class TestTemplates(unittest.TestCase):
+
+    def test_python_web_installs_listed_dependencies(self):
+        request = DockerfileRequest(language="python", version="3.11", dependencies=["fastapi", "uvicorn[standard]"],
+                                    port=8080, app_type="web")
+        content = render_template_dockerfile(request, HARBOR)
+        self.assertTrue(content.startswith(f"FROM {HARBOR}\n"))
+        self.assertIn("RUN pip install --no-cache-dir fastapi 'uvicorn[standard]'", content)
+        self.assertNotIn("requirements.txt", content) # Not known to exist
+        self.assertIn("EXPOSE 8080", content)
+        self.assertIn('"--port", "8080"', content)
+        self.assertNotIn("\n\n\n", content)
+
+    def test_python_with_requirements_file(self):
+        request = DockerfileRequest(language="python", dependencies=["flask"], package_manager="pip")
+        content = render_template_dockerfile(request, HARBOR)
+        self.assertIn("COPY requirements.txt ./\nRUN pip install --no-cache-dir -r requirements.txt", content)
+
+    def test_python_without_dependencies_skips_install(self):
+        content = render_template_dockerfile(DockerfileRequest(language="python", app_type="cli"), HARBOR)
+        self.assertNotIn("pip install", content)
+        self.assertIn('ENTRYPOINT ["python", "main.py"]', content)
+
+    def test_node_api(self):
+        content = render_template_dockerfile(DockerfileRequest(language="Node", app_type="API", port=3001), HARBOR)
+        self.assertIn("RUN npm install --omit=dev", content) # No package-lock.json known: npm ci would fail
+        self.assertIn("EXPOSE 3001", content)
+        npm = render_template_dockerfile(DockerfileRequest(language="node", package_manager="npm"), HARBOR)
+        self.assertIn("RUN npm ci --omit=dev", npm)
+
+    def test_go_static_binary_is_multi_stage(self):
+        content = render_template_dockerfile(DockerfileRequest(language="go", app_type="web"), HARBOR)
+        self.assertTrue(content.startswith(f"FROM {HARBOR} AS build\n"))
+        self.assertIn("FROM scratch", content)
+        self.assertIn("EXPOSE 8080", content)
+
+    def test_lockfile_package_managers(self):
+        poetry = render_template_dockerfile(DockerfileRequest(language="python", package_manager="Poetry"), HARBOR)
+        self.assertIn("COPY pyproject.toml poetry.lock ./", poetry)
+        self.assertIn("poetry install --only main", poetry)
+        pnpm = render_template_dockerfile(DockerfileRequest(language="node", package_manager="pnpm"), HARBOR)
+        self.assertIn("RUN corepack enable && pnpm install --frozen-lockfile --prod", pnpm)
+        self.assertNotIn("npm ci", pnpm)
+        # Package managers without a template install step go to the AI
+        self.assertIsNone(find_template(DockerfileRequest(language="node", package_manager="bun")))
+        self.assertIsNone(find_template(DockerfileRequest(language="go", package_manager="poetry")))
+
+    def test_needs_ai(self):
+        """Free-form instructions and uncovered stacks have no template."""
+        self.assertIsNone(find_template(DockerfileRequest(language="python", additional_instructions="use poetry")))
+        self.assertIsNone(find_template(DockerfileRequest(language="rust")))
+        self.assertIsNone(find_template(DockerfileRequest(language="node", app_type="cli")))
+
+    def test_canonical_language_selects_template(self):
+        """Aliases resolved by the base-image table ('golang' -> 'go') use the same templates."""
+        request = DockerfileRequest(language="golang", app_type="web")
+        self.assertIsNone(find_template(request))
+        self.assertIsNotNone(find_template(request, "go"))
+        content = render_template_dockerfile(DockerfileRequest(language="nodejs"), HARBOR, "node")
+        self.assertIn("EXPOSE 3000", content)
+
+    def test_render_is_fast(self):
+        request = DockerfileRequest(language="python", dependencies=["flask"], port=5000, app_type="web")
+        start = time.perf_counter()
+        for _ in range(1000):
+            render_template_dockerfile(request, HARBOR)
+        self.assertLess((time.perf_counter() - start) / 1000, 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+# tests/test_tracing.py
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import resilience, tracing
+from app.core.cache import DockerfileCache, get_response_cache
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+CALLER_SPAN_ID = "00f067aa0ba902b7"
+PAYLOAD = {"language": "python", "version": "3.11", "port": 5000, "generation_mode": "ai", "provider": "stub"}
+
+
+class _CollectingProcessor:
+    def __init__(self):
+        self.spans = []
+
+    def on_end(self, span):
+        self.spans.append(span)
+
+
+class TestTraceparent(unittest.TestCase):
+
+    def test_parse_valid(self):
+        parsed = tracing.parse_traceparent(f"00-{TRACE_ID}-{CALLER_SPAN_ID}-01")
+        self.assertEqual(parsed, (TRACE_ID, CALLER_SPAN_ID, True))
+        self.assertFalse(tracing.parse_traceparent(f"00-{TRACE_ID}-{CALLER_SPAN_ID}-00")[2])
+
+    def test_parse_invalid(self):
+        for header in (None, "", "garbage", f"00-{'0' * 32}-{CALLER_SPAN_ID}-01",
+                       f"00-{TRACE_ID}-zzzzzzzzzzzzzzzz-01", f"ff-{TRACE_ID}-{CALLER_SPAN_ID}-01"):
+            self.assertIsNone(tracing.parse_traceparent(header), header)
+
+    def test_round_trip(self):
+        header = tracing.format_traceparent(TRACE_ID, CALLER_SPAN_ID, True)
+        self.assertEqual(tracing.parse_traceparent(header), (TRACE_ID, CALLER_SPAN_ID, True))
+
+
+class TestRequestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.processor = _CollectingProcessor()
+        self._patches = [
+            patch.object(tracing, "span_processor", self.processor),
+            patch.object(resilience, "ai_retry_policy", resilience.RetryPolicy(max_attempts=1)),
+            patch.dict(resilience.circuit_breakers, clear=True),
+        ]
+        for p in self._patches:
+            p.start()
+        app.dependency_overrides[get_response_cache] = lambda: DockerfileCache(max_entries=16, ttl_seconds=60)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        for p in self._patches:
+            p.stop()
+
+    def _post(self, traceparent=None):
+        headers = {"traceparent": traceparent} if traceparent else {}
+        return self.client.post("/api/v1/generate-dockerfile", json=PAYLOAD, headers=headers)
+
+    def test_disabled_records_nothing_but_returns_trace_id(self):
+        with patch.object(tracing, "TRACING_ENABLED", False):
+            response = self._post(f"00-{TRACE_ID}-{CALLER_SPAN_ID}-01")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["x-trace-id"], TRACE_ID)
+        self.assertEqual(self.processor.spans, [])
+
+    def test_caller_trace_is_continued(self):
+        with patch.object(tracing, "TRACING_ENABLED", True), patch.object(tracing, "TRACING_SAMPLE_RATIO", 0.0):
+            response = self._post(f"00-{TRACE_ID}-{CALLER_SPAN_ID}-01")
+        self.assertEqual(response.status_code, 200)
+        spans = {span.name: span for span in self.processor.spans}
+        root = spans["POST /api/v1/generate-dockerfile"]
+        self.assertEqual(root.trace_id, TRACE_ID)
+        self.assertEqual(root.parent_id, CALLER_SPAN_ID)
+        self.assertEqual(root.attributes["http.status_code"], 200)
+        self.assertTrue(all(span.trace_id == TRACE_ID for span in self.processor.spans))
+
+        for stage in ("base_image", "harbor_resolve", "prompt_build", "ai_call", "from_rewrite"):
+            self.assertEqual(spans[f"stage.{stage}"].parent_id, root.span_id, stage)
+        ai_span = spans["ai.generate"]
+        self.assertEqual(ai_span.parent_id, spans["stage.ai_call"].span_id)
+        self.assertEqual(ai_span.attributes["ai.provider"], "stub")
+        self.assertGreater(ai_span.attributes["ai.prompt_chars"], 0)
+        self.assertGreater(ai_span.attributes["ai.response_chars"], 0)
+
+    def test_unsampled_caller_uses_ratio(self):
+        with patch.object(tracing, "TRACING_ENABLED", True), patch.object(tracing, "TRACING_SAMPLE_RATIO", 0.0):
+            response = self._post(f"00-{TRACE_ID}-{CALLER_SPAN_ID}-00")
+        self.assertEqual(response.headers["x-trace-id"], TRACE_ID)
+        self.assertEqual(self.processor.spans, [])
+
+    def test_errors_mark_span(self):
+        with patch.object(tracing, "TRACING_ENABLED", True):
+            self.client.post("/api/v1/generate-dockerfile", json={"language": "cobol"})
+        stage = next(span for span in self.processor.spans if span.name == "stage.base_image")
+        self.assertEqual(stage.status, "error")
+        self.assertEqual(stage.attributes["error.type"], "UnsupportedLanguageError")
+
+
+class TestExporters(unittest.TestCase):
+
+    def _span(self):
+        span = tracing.Span("stage.ai_call", TRACE_ID, CALLER_SPAN_ID, {"ai.prompt_chars": 42})
+        span.end_ns = span.start_ns + 1_000_000
+        return span
+
+    def test_file_exporter_writes_json_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "spans.jsonl")
+            processor = tracing.BatchSpanProcessor([tracing.FileSpanExporter(path)])
+            processor._buffer.extend([self._span(), self._span()])
+            processor.force_flush()
+            with open(path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["trace_id"], TRACE_ID)
+        self.assertEqual(records[0]["duration_ms"], 1.0)
+        self.assertEqual(processor.exported, 2)
+
+    def test_otlp_exporter_payload(self):
+        exporter = tracing.OTLPHttpSpanExporter("http://collector:4318/v1/traces")
+        exporter._client = MagicMock()
+        exporter.export([self._span()])
+        payload = exporter._client.post.call_args.kwargs["json"]
+        otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(otlp_span["traceId"], TRACE_ID)
+        self.assertEqual(otlp_span["parentSpanId"], CALLER_SPAN_ID)
+        self.assertIn({"key": "ai.prompt_chars", "value": {"intValue": "42"}}, otlp_span["attributes"])
+
+    def test_processor_drops_when_full(self):
+        processor = tracing.BatchSpanProcessor([MagicMock()], max_queue_size=1)
+        processor._thread = MagicMock()  # Keep the background exporter out of the test
+        processor.on_end(self._span())
+        processor.on_end(self._span())
+        self.assertEqual(processor.dropped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# tests/test_validator.py
+
+import unittest
+
+from app.core.dockerfile_parser import process_dockerfile
+from app.core.validator import (
+    PROBLEM_BASE_IMAGE, PROBLEM_COMMAND, PROBLEM_DEPENDENCIES, PROBLEM_EXPOSE, PROBLEM_SYNTAX,
+    apply_local_fixes, validate_dockerfile
+)
+from app.utils.logger import logger
+import logging
+
+# Disable logger spam during tests
+logger.setLevel(logging.CRITICAL)
+
+GENERIC = "python:3.11-slim"
+HARBOR = "harbor.test.local/prod/python:3.11-slim-v2"
+GOOD = ("FROM python:3.11-slim AS build\nRUN pip install --prefix=/install -r requirements.txt\n"
+        "FROM python:3.11-slim\nCOPY --from=build /install /usr/local\nEXPOSE 8000/tcp\nCMD [\"gunicorn\", \"app:app\"]\n")
+
+
+def _validate(text, port=8000, dependencies=("flask",)):
+    processor = process_dockerfile(text, GENERIC, HARBOR)
+    return processor, validate_dockerfile(processor, port, list(dependencies))
+
+
+class TestValidateDockerfile(unittest.TestCase):
+
+    def test_valid_dockerfile(self):
+        _, problems = _validate(GOOD)
+        self.assertEqual(problems, [])
+
+    def test_checks_final_stage_only(self):
+        text = "FROM python:3.11-slim AS build\nEXPOSE 8000\nCMD build\nFROM python:3.11-slim\nRUN echo flask\n"
+        _, problems = _validate(text)
+        self.assertEqual([p.code for p in problems], [PROBLEM_EXPOSE, PROBLEM_COMMAND])
+        self.assertEqual([p.fixable for p in problems], [True, False])
+
+    def test_dependency_install(self):
+        _, problems = _validate("FROM python:3.11-slim\nRUN apt-get update\nCMD python app.py\n", port=None)
+        self.assertEqual([p.code for p in problems], [PROBLEM_DEPENDENCIES])
+        _, problems = _validate("FROM python:3.11-slim\nRUN npm ci --omit=dev\nCMD node .\n", port=None)
+        self.assertEqual(problems, [])
+
+    def test_wrong_base_image_and_syntax_issues(self):
+        _, problems = _validate("FROM ubuntu:22.04\nCMD bash\nRUN <<EOF\necho\n", port=None, dependencies=())
+        self.assertEqual([p.code for p in problems], [PROBLEM_BASE_IMAGE, PROBLEM_SYNTAX])
+        self.assertFalse(problems[0].fixable)
+        self.assertIn("ubuntu:22.04", problems[0].message)
+
+
+class TestLocalFixes(unittest.TestCase):
+
+    def test_expose_inserted_before_command(self):
+        processor, problems = _validate(GOOD.replace("EXPOSE 8000/tcp\n", ""))
+        content, fixed, remaining = apply_local_fixes(processor.content, problems, HARBOR, 8000)
+        self.assertEqual([p.code for p in fixed], [PROBLEM_EXPOSE])
+        self.assertEqual(remaining, [])
+        self.assertTrue(content.endswith('EXPOSE 8000\nCMD ["gunicorn", "app:app"]'))
+
+    def test_missing_from_prepended(self):
+        processor, problems = _validate("RUN pip install flask\nEXPOSE 8000\nCMD python app.py\n")
+        self.assertEqual([p.code for p in problems], [PROBLEM_BASE_IMAGE])
+        content, fixed, remaining = apply_local_fixes(processor.content, problems, HARBOR, 8000)
+        self.assertEqual(remaining, [])
+        self.assertTrue(content.startswith(f"FROM {HARBOR}\n\nRUN pip install flask"))
+
+
+if __name__ == '__main__':
+    unittest.main()